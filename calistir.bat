@@ -6,5 +6,7 @@ if not exist "venv\Scripts\activate.bat" (
     exit /b 1
 )
 call venv\Scripts\activate.bat
+echo Dosya isleme kuyrugu ayri pencerede baslatiliyor...
+start "Isleme Kuyrugu" cmd /k "venv\Scripts\activate.bat && python manage.py isleme_kuyrugu"
 echo Sunucu baslatiliyor: http://127.0.0.1:8000
 python manage.py runserver
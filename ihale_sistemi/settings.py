@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -86,9 +87,25 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Web sunucusu, kuyruk çalışanı ve paralel thread'ler aynı anda yazabilir; kilit için bekle
+        'OPTIONS': {'timeout': 20},
     }
 }
 
+# =====================
+# CACHE
+# =====================
+# Dosya tabanlı: web sunucusu süreçleri ve kuyruk çalışanı aynı önbelleği (ve geçersiz kılmaları) görür
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv("CACHE_DIZINI", os.path.join(tempfile.gettempdir(), "ihale_sistemi_cache")),
+        'TIMEOUT': 300,
+    }
+}
+# Anasayfa sayaçlarının önbellekte kalma süresi (sn); durum değişikliklerinde sürüm anahtarıyla hemen geçersiz olur
+ANASAYFA_SAYAC_SURESI = int(os.getenv("ANASAYFA_SAYAC_SURESI", "3600"))
+
 # =====================
 # PASSWORD VALIDATION
 # =====================
@@ -139,6 +156,78 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 # İsteğe bağlı: Kalem çıkarma için model (boşsa sırayla gemini-2.5-flash, gemini-2.0-flash denenecek)
 GEMINI_MODEL = (os.getenv("GEMINI_MODEL") or "").strip() or None
 
+# Vision/LLM yanıt önbelleği (aynı dosya tekrar işlenince API çağrısı yapılmaz)
+LLM_ONBELLEK_AKTIF = os.getenv("LLM_ONBELLEK_AKTIF", "1") != "0"
+# Toplam önbellek boyutu sınırı (MB); aşılınca en uzun süredir kullanılmayan kayıtlar silinir
+LLM_ONBELLEK_MAKS_MB = int(os.getenv("LLM_ONBELLEK_MAKS_MB", "200"))
+
+# LLM istemcileri (süreç başına paylaşılır): bağlantı / yanıt okuma zaman aşımı (sn) ve keep-alive bağlantı havuzu
+LLM_BAGLANTI_ZAMAN_ASIMI = float(os.getenv("LLM_BAGLANTI_ZAMAN_ASIMI", "10"))
+LLM_OKUMA_ZAMAN_ASIMI = float(os.getenv("LLM_OKUMA_ZAMAN_ASIMI", "120"))
+LLM_BAGLANTI_HAVUZU = int(os.getenv("LLM_BAGLANTI_HAVUZU", "20"))
+
+# LLM yönlendirici: istenen sağlayıcı yanıt vermezse denenecek sıra ("sağlayıcı" veya "sağlayıcı:model";
+# çevrimdışı deneme için "sahte:model"). Ardışık LLM_DEVRE_ESIK kota/5xx hatasında veya son LLM_DEVRE_PENCERE
+# çağrıdaki hata oranı LLM_DEVRE_HATA_ORANI'nı aşınca arka uç LLM_DEVRE_BEKLEME sn atlanır.
+LLM_SAGLAYICI_SIRASI = [
+    s.strip() for s in os.getenv("LLM_SAGLAYICI_SIRASI", "openai,anthropic,gemini").split(",") if s.strip()
+]
+LLM_DEVRE_ESIK = int(os.getenv("LLM_DEVRE_ESIK", "3"))
+LLM_DEVRE_PENCERE = int(os.getenv("LLM_DEVRE_PENCERE", "20"))
+LLM_DEVRE_HATA_ORANI = float(os.getenv("LLM_DEVRE_HATA_ORANI", "0.5"))
+LLM_DEVRE_BEKLEME = float(os.getenv("LLM_DEVRE_BEKLEME", "30"))
+# Kota/5xx/zaman aşımı hatalarında aynı arka uçta en fazla LLM_TEKRAR_SAYISI tekrar; bekleme üstel
+# (LLM_TEKRAR_TABAN × 2^deneme, en fazla LLM_TEKRAR_TAVAN sn, jitter'lı) veya Retry-After kadar.
+# Tüm yedekler dahil bir çağrı için toplam bekleme LLM_TEKRAR_SURE_SINIRI sn'yi aşmaz.
+LLM_TEKRAR_SAYISI = int(os.getenv("LLM_TEKRAR_SAYISI", "3"))
+LLM_TEKRAR_TABAN = float(os.getenv("LLM_TEKRAR_TABAN", "1"))
+LLM_TEKRAR_TAVAN = float(os.getenv("LLM_TEKRAR_TAVAN", "30"))
+LLM_TEKRAR_SURE_SINIRI = float(os.getenv("LLM_TEKRAR_SURE_SINIRI", "90"))
+
+# Çok sayfalı cetvellerde aynı anda Vision API'ye gönderilecek en fazla sayfa sayısı
+CETVEL_PARALEL_SAYFA = int(os.getenv("CETVEL_PARALEL_SAYFA", "4"))
+
+# PDF metin çıkarma: bu sayfa sayısını aşan belgeler süreç havuzunda okunur (0 işçi = CPU sayısı, en fazla 4)
+PDF_PARALEL_SAYFA_ESIGI = int(os.getenv("PDF_PARALEL_SAYFA_ESIGI", "40"))
+PDF_ISCI_SAYISI = int(os.getenv("PDF_ISCI_SAYISI", "0"))
+
+# Excel cetvelleri önce LLM'siz ayrıştırılır; güven puanı (0-1) bu eşiğin altındaysa Vision'a gönderilir
+EXCEL_CETVEL_GUVEN_ESIGI = float(os.getenv("EXCEL_CETVEL_GUVEN_ESIGI", "0.75"))
+# Word cetvellerinde tablo başına aynı eşik; altında kalan cetvel benzeri tablolar metin olarak LLM'e gider
+WORD_CETVEL_GUVEN_ESIGI = float(os.getenv("WORD_CETVEL_GUVEN_ESIGI", "0.75"))
+
+# Şartname eşleştirme LLM çağrıları: sağlayıcı başına süreç içi eşzamanlı çağrı sınırı
+LLM_ESZAMANLI = {
+    "openai": int(os.getenv("OPENAI_ESZAMANLI", "8")),
+    "anthropic": int(os.getenv("ANTHROPIC_ESZAMANLI", "4")),
+    "gemini": int(os.getenv("GEMINI_ESZAMANLI", "4")),
+}
+# Tüm LLM çağrıları: dakikalık token (TPM) ve istek (RPM) sınırı; süreçler arası ortak kova (LlmHizKovasi).
+# Model bazlı sınır için "sağlayıcı:model" anahtarı eklenebilir, örn. "openai:gpt-4o": 30000
+LLM_TPM = {
+    "openai": int(os.getenv("OPENAI_TPM", "200000")),
+    "anthropic": int(os.getenv("ANTHROPIC_TPM", "80000")),
+    "gemini": int(os.getenv("GEMINI_TPM", "250000")),
+}
+LLM_RPM = {
+    "openai": int(os.getenv("OPENAI_RPM", "500")),
+    "anthropic": int(os.getenv("ANTHROPIC_RPM", "50")),
+    "gemini": int(os.getenv("GEMINI_RPM", "150")),
+}
+# Pipeline maliyet tahmini (PipelineCalismasi): model başına 1M token fiyatı, USD [girdi, çıktı].
+# Listede olmayan model 0 sayılır; "sağlayıcı:model" anahtarı model adını ezer.
+LLM_FIYATLARI = {
+    "gpt-4o": [2.50, 10.00],
+    "gpt-4o-mini": [0.15, 0.60],
+    "claude-sonnet-4-20250514": [3.00, 15.00],
+    "gemini-2.5-flash": [0.30, 2.50],
+    "gemini-2.5-flash-lite": [0.10, 0.40],
+    "gemini-2.0-flash": [0.10, 0.40],
+}
+
+# Ürün kataloğu bulanık eşleştirme eşiği (0-1; ad 3-gram benzerliği + teknik özellik benzerliği)
+KATALOG_BENZERLIK_ESIGI = float(os.getenv("KATALOG_BENZERLIK_ESIGI", "0.82"))
+
 # =====================
 # OCR (Tesseract) - Resim/tarama metin tanıma
 # =====================
@@ -152,6 +241,8 @@ TESSERACT_CMD = os.getenv(
 OCR_LANG = os.getenv("OCR_LANG", "tur")
 # PSM: 6 = Tek blok metin, 3 = Tam otomatik (detay: https://github.com/tesseract-ocr/tesseract/wiki)
 OCR_PSM = os.getenv("OCR_PSM", "6")
+# Taranmış PDF sayfaları OCR için bu çözünürlükte görsele çevrilir
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
 
 # =====================
 # LOGGING - Dosya / cetvel / şartname işleme (hata payını azaltmak için)
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Hastane, Ihale, Kalem, UrunKutuphanesi
+from .models import (
+    Hastane, Ihale, Kalem, UrunKutuphanesi, DosyaIslemIsi, LlmHizKovasi, LlmOnbellek, PipelineAsamasi,
+    PipelineCalismasi,
+)
 
 
 @admin.register(Kalem)
@@ -28,4 +31,73 @@ class IhaleAdmin(admin.ModelAdmin):
     search_fields = ('ihale_no', 'ihale_adi', 'kazanan_firma')
     list_filter = ('durum',)
 
+
+@admin.register(DosyaIslemIsi)
+class DosyaIslemIsiAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'ihale', 'durum', 'provider', 'ilerleme', 'asama', 'deneme_sayisi', 'olusturulma_tarihi', 'bitis_tarihi')
+    list_filter = ('durum', 'provider')
+    readonly_fields = ('sonuc_json', 'baslama_tarihi', 'son_sinyal', 'bitis_tarihi')
+
+
+@admin.register(LlmOnbellek)
+class LlmOnbellekAdmin(admin.ModelAdmin):
+    list_display = ('icerik_ozeti', 'provider', 'model', 'prompt_surumu', 'boyut', 'isabet_sayisi', 'son_erisim')
+    list_filter = ('provider', 'model')
+    search_fields = ('icerik_ozeti', 'anahtar')
+    readonly_fields = ('anahtar', 'icerik_ozeti', 'olusturulma_tarihi', 'son_erisim')
+
+
+@admin.register(LlmHizKovasi)
+class LlmHizKovasiAdmin(admin.ModelAdmin):
+    list_display = ('anahtar', 'token', 'istek', 'guncelleme')
+    search_fields = ('anahtar',)
+
+
+class PipelineAsamasiInline(admin.TabularInline):
+    model = PipelineAsamasi
+    extra = 0
+    can_delete = False
+    fields = ('sira', 'ad', 'ust', 'baslangic', 'sure', 'girdi_bayt', 'cikti_bayt', 'provider', 'model',
+              'girdi_token', 'cikti_token', 'onbellek', 'maliyet', 'hata')
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class PipelineSiralamaFiltresi(admin.SimpleListFilter):
+    """En yavaş / en pahalı çalışmaları üste alan hızlı sıralama (sıralamayı get_ordering uygular)."""
+    title = 'sıralama'
+    parameter_name = 'sirala'
+    SIRALAMALAR = {
+        'yavas': ('-sure',),
+        'pahali': ('-tahmini_maliyet', '-sure'),
+        'token': ('-girdi_token', '-cikti_token'),
+    }
+
+    def lookups(self, request, model_admin):
+        return (('yavas', 'En yavaş'), ('pahali', 'En pahalı'), ('token', 'En çok token'))
+
+    def queryset(self, request, queryset):
+        return queryset
+
+
+@admin.register(PipelineCalismasi)
+class PipelineCalismasiAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'ihale', 'provider', 'cetvel_kaynak', 'basari', 'sure', 'llm_cagri', 'onbellek_isabet',
+                    'girdi_token', 'cikti_token', 'tahmini_maliyet', 'baslama_tarihi')
+    list_filter = (PipelineSiralamaFiltresi, 'basari', 'provider', 'cetvel_kaynak')
+    search_fields = ('ihale__ihale_no', 'ihale__ihale_adi')
+    date_hierarchy = 'baslama_tarihi'
+    readonly_fields = [f.name for f in PipelineCalismasi._meta.fields]
+    inlines = [PipelineAsamasiInline]
+
+    def get_ordering(self, request):
+        # Sütun başlığıyla sıralanmadıkça en yavaş çalışma üstte
+        return PipelineSiralamaFiltresi.SIRALAMALAR.get(request.GET.get('sirala'), ('-sure',))
+
+    def has_add_permission(self, request):
+        return False
+
+
 admin.site.register(Hastane)
\ No newline at end of file
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class IhalelerConfig(AppConfig):
     name = 'ihaleler'
+
+    def ready(self):
+        from . import signals  # noqa: F401
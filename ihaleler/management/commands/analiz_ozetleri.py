@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ihaleler.utils.analiz_ozet import ozetleri_yeniden_kur
+
+
+class Command(BaseCommand):
+    help = "Analiz sayfası özet tablolarını (ihale sonuç, hastane, ürün, aylık) tüm geçmişten yeniden oluşturur."
+
+    def handle(self, *args, **options):
+        sonuc = ozetleri_yeniden_kur()
+        self.stdout.write(self.style.SUCCESS(
+            f'Analiz özetleri yeniden oluşturuldu: {sonuc["ihale"]} ihale, {sonuc["hastane"]} hastane, '
+            f'{sonuc["urun"]} ürün, {sonuc["ay"]} ay.'
+        ))
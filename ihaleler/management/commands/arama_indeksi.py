@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ihaleler.utils.ihale_arama import fts_kullanilabilir, indeksi_yeniden_kur
+
+
+class Command(BaseCommand):
+    help = "İhale arama indeksini (SQLite FTS5) tüm ihale ve kalemlerden yeniden oluşturur."
+
+    def handle(self, *args, **options):
+        if not fts_kullanilabilir():
+            self.stdout.write(self.style.WARNING('Arama indeksi yalnızca migrate edilmiş SQLite veritabanında kullanılır; atlandı.'))
+            return
+        sayi = indeksi_yeniden_kur()
+        self.stdout.write(self.style.SUCCESS(f'Arama indeksi yeniden oluşturuldu: {sayi} ihale.'))
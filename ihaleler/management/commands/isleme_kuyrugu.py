@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ihaleler.utils.islem_kuyrugu import isi_calistir, siradaki_isi_al, takilan_isleri_kurtar
+
+# Çalışan döngüsünde takılan iş kontrolü aralığı (saniye)
+KURTARMA_ARALIGI = 60
+
+
+class Command(BaseCommand):
+    help = "Dosya işleme kuyruğundaki (DosyaIslemIsi) işleri web isteğinden bağımsız olarak işler."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bir-kez', action='store_true', help='Sıradaki işleri bitirip çık (cron/zamanlanmış görev için).')
+        parser.add_argument('--bekleme', type=float, default=2.0, help='Kuyruk boşken iki kontrol arası bekleme (saniye).')
+
+    def handle(self, *args, **options):
+        bir_kez = options['bir_kez']
+        bekleme = max(0.5, options['bekleme'])
+        self.stdout.write(self.style.SUCCESS('İşleme kuyruğu çalışanı başladı. Durdurmak için Ctrl+C.'))
+        son_kurtarma = None
+        try:
+            while True:
+                # Çöken başka bir çalışanın işi, bu çalışan çalıştıkça (yalnızca açılışta değil) yeniden sıraya alınır
+                if son_kurtarma is None or time.monotonic() - son_kurtarma >= KURTARMA_ARALIGI:
+                    takilan_isleri_kurtar()
+                    son_kurtarma = time.monotonic()
+                is_ = siradaki_isi_al()
+                if is_ is None:
+                    if bir_kez:
+                        break
+                    time.sleep(bekleme)
+                    continue
+                self.stdout.write(f'İş #{is_.pk} işleniyor (ihale {is_.ihale.ihale_no}, {is_.provider})...')
+                sonuc = isi_calistir(is_)
+                if sonuc.get('basari'):
+                    self.stdout.write(self.style.SUCCESS(f'İş #{is_.pk} tamamlandı: {sonuc.get("olusturulan", 0)} kalem.'))
+                else:
+                    self.stdout.write(self.style.WARNING(f'İş #{is_.pk} başarısız: {"; ".join(sonuc.get("hatalar") or [])[:300]}'))
+        except KeyboardInterrupt:
+            self.stdout.write('Çalışan durduruldu.')
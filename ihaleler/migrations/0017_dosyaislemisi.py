@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ihaleler', '0016_arac_mevcut_km_arac_arac_foto'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ihale',
+            name='cetvel_dosya',
+            field=models.FileField(blank=True, null=True, upload_to='ihaleler/cetveller/', verbose_name='Birim Fiyat Cetveli 1'),
+        ),
+        migrations.AlterField(
+            model_name='ihale',
+            name='sartname_dosya',
+            field=models.FileField(blank=True, null=True, upload_to='ihaleler/sartnameler/', verbose_name='Teknik Şartname 1'),
+        ),
+        migrations.CreateModel(
+            name='DosyaIslemIsi',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('durum', models.CharField(choices=[('Bekliyor', 'Sırada Bekliyor'), ('Isleniyor', 'İşleniyor'), ('Tamamlandi', 'Tamamlandı'), ('Hata', 'Hata')], default='Bekliyor', max_length=20, verbose_name='Durum')),
+                ('provider', models.CharField(default='openai', max_length=20, verbose_name='AI Sağlayıcı')),
+                ('asama', models.CharField(blank=True, default='', max_length=200, verbose_name='Aşama')),
+                ('ilerleme', models.PositiveSmallIntegerField(default=0, verbose_name='İlerleme (%)')),
+                ('deneme_sayisi', models.PositiveSmallIntegerField(default=0, verbose_name='Deneme Sayısı')),
+                ('sonuc_json', models.JSONField(blank=True, default=dict, null=True, verbose_name='Pipeline Sonucu')),
+                ('hata_mesaji', models.TextField(blank=True, null=True, verbose_name='Hata Mesajı')),
+                ('olusturulma_tarihi', models.DateTimeField(auto_now_add=True)),
+                ('baslama_tarihi', models.DateTimeField(blank=True, null=True, verbose_name='Başlama')),
+                ('bitis_tarihi', models.DateTimeField(blank=True, null=True, verbose_name='Bitiş')),
+                ('ihale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='islem_isleri', to='ihaleler.ihale', verbose_name='İhale')),
+                ('olusturan_kullanici', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Yükleyen')),
+            ],
+            options={
+                'verbose_name': 'Dosya İşleme İşi',
+                'verbose_name_plural': 'Dosya İşleme Kuyruğu',
+                'ordering': ['olusturulma_tarihi'],
+                'indexes': [models.Index(fields=['durum', 'olusturulma_tarihi'], name='ihaleler_do_durum_187d96_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ihaleler', '0017_dosyaislemisi'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LlmOnbellek',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anahtar', models.CharField(max_length=64, unique=True, verbose_name='Önbellek Anahtarı (SHA-256)')),
+                ('icerik_ozeti', models.CharField(max_length=64, verbose_name='İçerik SHA-256')),
+                ('provider', models.CharField(max_length=20, verbose_name='Sağlayıcı')),
+                ('model', models.CharField(max_length=100, verbose_name='Model')),
+                ('prompt_surumu', models.CharField(max_length=50, verbose_name='Prompt Sürümü')),
+                ('yanit', models.TextField(verbose_name='Ham Yanıt')),
+                ('boyut', models.PositiveIntegerField(default=0, verbose_name='Boyut (bayt)')),
+                ('isabet_sayisi', models.PositiveIntegerField(default=0, verbose_name='İsabet Sayısı')),
+                ('olusturulma_tarihi', models.DateTimeField(auto_now_add=True)),
+                ('son_erisim', models.DateTimeField(db_index=True, verbose_name='Son Erişim')),
+            ],
+            options={
+                'verbose_name': 'LLM Önbellek Kaydı',
+                'verbose_name_plural': 'LLM Önbelleği',
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:33
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Normalizasyon, çalışma zamanı kodundan bağımsız olsun diye burada sabitlenmiştir
+# (ihaleler.utils.turkce.turkce_normalize'nin bu migration tarihindeki hâli).
+_KATLAMA = {
+    'İ': 'i', 'I': 'i', 'ı': 'i', 'i': 'i',
+    'Ç': 'c', 'ç': 'c',
+    'Ğ': 'g', 'ğ': 'g',
+    'Ö': 'o', 'ö': 'o',
+    'Ş': 's', 'ş': 's',
+    'Ü': 'u', 'ü': 'u',
+    'Â': 'a', 'â': 'a',
+    'Î': 'i', 'î': 'i',
+    'Û': 'u', 'û': 'u',
+}
+
+
+def _karakter_katla(c):
+    k = _KATLAMA.get(c)
+    if k is not None:
+        return k
+    k = c.lower()
+    if len(k) != 1:
+        return c
+    if ord(k) > 127:
+        taban = unicodedata.normalize('NFD', k)[0]
+        if taban.isalpha():
+            return taban
+    return k
+
+
+def _katla(metin):
+    return ''.join(_karakter_katla(c) for c in metin)
+
+
+def turkce_normalize(metin):
+    if not metin or not isinstance(metin, str):
+        return ''
+    return re.sub(r'\s+', ' ', _katla(metin)).strip()
+
+
+def urun_adi_norm_doldur(apps, schema_editor):
+    UrunKutuphanesi = apps.get_model('ihaleler', 'UrunKutuphanesi')
+    guncellenecek = []
+    for urun in UrunKutuphanesi.objects.only('id', 'urun_adi').iterator():
+        urun.urun_adi_norm = turkce_normalize(urun.urun_adi)[:500]
+        guncellenecek.append(urun)
+        if len(guncellenecek) >= 500:
+            UrunKutuphanesi.objects.bulk_update(guncellenecek, ['urun_adi_norm'])
+            guncellenecek = []
+    if guncellenecek:
+        UrunKutuphanesi.objects.bulk_update(guncellenecek, ['urun_adi_norm'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ihaleler', '0018_llmonbellek'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='urunkutuphanesi',
+            name='urun_adi_norm',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=500, verbose_name='Normalize Ürün Adı'),
+        ),
+        migrations.RunPython(urun_adi_norm_doldur, migrations.RunPython.noop),
+    ]
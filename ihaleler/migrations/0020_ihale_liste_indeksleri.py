@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ihaleler', '0019_urunkutuphanesi_urun_adi_norm'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ihale',
+            index=models.Index(fields=['is_dogrudan_temin', 'olusturulma_tarihi', 'id'], name='ihaleler_ih_is_dogr_499b87_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ihale',
+            index=models.Index(fields=['is_dogrudan_temin', 'tarih', 'id'], name='ihaleler_ih_is_dogr_f6a6e7_idx'),
+        ),
+    ]
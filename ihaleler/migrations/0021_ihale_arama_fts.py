@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:02
+
+import unicodedata
+
+from django.db import migrations
+
+# Migration çalışma zamanı kodundan bağımsız olsun diye tablo tanımı ve katlama burada sabitlenmiştir
+# (ihaleler.utils.ihale_arama / ihaleler.utils.turkce'nin bu migration tarihindeki hâli).
+TABLO = 'ihaleler_ihale_fts'
+OLUSTUR_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLO} USING fts5("
+    "ihale_adi, hastane_ad, kalem_adlari, kalem_adlari_orj UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+KALDIR_SQL = f"DROP TABLE IF EXISTS {TABLO}"
+
+_KATLAMA = {
+    'İ': 'i', 'I': 'i', 'ı': 'i', 'i': 'i',
+    'Ç': 'c', 'ç': 'c',
+    'Ğ': 'g', 'ğ': 'g',
+    'Ö': 'o', 'ö': 'o',
+    'Ş': 's', 'ş': 's',
+    'Ü': 'u', 'ü': 'u',
+    'Â': 'a', 'â': 'a',
+    'Î': 'i', 'î': 'i',
+    'Û': 'u', 'û': 'u',
+}
+
+
+def _karakter_katla(c):
+    k = _KATLAMA.get(c)
+    if k is not None:
+        return k
+    k = c.lower()
+    if len(k) != 1:
+        return c
+    if ord(k) > 127:
+        taban = unicodedata.normalize('NFD', k)[0]
+        if taban.isalpha():
+            return taban
+    return k
+
+
+def _katla(metin):
+    return ''.join(_karakter_katla(c) for c in metin or '')
+
+
+def fts_olustur(apps, schema_editor):
+    # FTS5 yalnızca SQLite'ta; diğer veritabanlarında arama icontains ile yapılır
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Ihale = apps.get_model('ihaleler', 'Ihale')
+    Kalem = apps.get_model('ihaleler', 'Kalem')
+    schema_editor.execute(OLUSTUR_SQL)
+    schema_editor.execute(f"DELETE FROM {TABLO}")
+    idler = list(Ihale.objects.order_by('pk').values_list('pk', flat=True))
+    for bas in range(0, len(idler), 500):
+        parca = idler[bas:bas + 500]
+        kalemler = {}
+        for ihale_id, urun_adi in (
+            Kalem.objects.filter(ihale_id__in=parca).order_by('ihale_id', 'pk').values_list('ihale_id', 'urun_adi')
+        ):
+            kalemler.setdefault(ihale_id, []).append((urun_adi or '').replace('\n', ' ').replace('\r', ' '))
+        satirlar = []
+        for pk, adi, hastane in Ihale.objects.filter(pk__in=parca).values_list('pk', 'ihale_adi', 'hastane__ad'):
+            kalem_metni = '\n'.join(kalemler.get(pk, []))
+            satirlar.append((pk, _katla(adi), _katla(hastane), _katla(kalem_metni), kalem_metni))
+        if satirlar:
+            with schema_editor.connection.cursor() as cursor:
+                cursor.executemany(
+                    f"INSERT INTO {TABLO} (rowid, ihale_adi, hastane_ad, kalem_adlari, kalem_adlari_orj) VALUES (%s, %s, %s, %s, %s)",
+                    satirlar,
+                )
+
+
+def fts_kaldir(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(KALDIR_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ihaleler', '0020_ihale_liste_indeksleri'),
+    ]
+
+    operations = [
+        migrations.RunPython(fts_olustur, fts_kaldir),
+    ]
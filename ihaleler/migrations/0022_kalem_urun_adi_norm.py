@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:43
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Ürün anahtarı, çalışma zamanı kodundan bağımsız olsun diye burada sabitlenmiştir
+# (ihaleler.utils.turkce.urun_anahtari'nin bu migration tarihindeki hâli).
+_AYIRAC_RE = re.compile(r'[\W_]+')
+
+_KATLAMA = {
+    'İ': 'i', 'I': 'i', 'ı': 'i', 'i': 'i',
+    'Ç': 'c', 'ç': 'c',
+    'Ğ': 'g', 'ğ': 'g',
+    'Ö': 'o', 'ö': 'o',
+    'Ş': 's', 'ş': 's',
+    'Ü': 'u', 'ü': 'u',
+    'Â': 'a', 'â': 'a',
+    'Î': 'i', 'î': 'i',
+    'Û': 'u', 'û': 'u',
+}
+
+
+def _karakter_katla(c):
+    k = _KATLAMA.get(c)
+    if k is not None:
+        return k
+    k = c.lower()
+    if len(k) != 1:
+        return c
+    if ord(k) > 127:
+        taban = unicodedata.normalize('NFD', k)[0]
+        if taban.isalpha():
+            return taban
+    return k
+
+
+def _katla(metin):
+    return ''.join(_karakter_katla(c) for c in metin)
+
+
+def urun_anahtari(metin):
+    if not metin or not isinstance(metin, str):
+        return ''
+    return _AYIRAC_RE.sub(' ', _katla(metin)).strip()
+
+
+def urun_adi_norm_doldur(apps, schema_editor):
+    Kalem = apps.get_model('ihaleler', 'Kalem')
+    guncellenecek = []
+    for kalem in Kalem.objects.only('id', 'urun_adi').iterator():
+        kalem.urun_adi_norm = urun_anahtari(kalem.urun_adi)[:255]
+        guncellenecek.append(kalem)
+        if len(guncellenecek) >= 500:
+            Kalem.objects.bulk_update(guncellenecek, ['urun_adi_norm'])
+            guncellenecek = []
+    if guncellenecek:
+        Kalem.objects.bulk_update(guncellenecek, ['urun_adi_norm'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ihaleler', '0021_ihale_arama_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kalem',
+            name='urun_adi_norm',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255, verbose_name='Normalize Ürün Adı'),
+        ),
+        migrations.RunPython(urun_adi_norm_doldur, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,162 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:44
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+SIFIR = Decimal('0')
+
+
+def _ay_basi(tarih):
+    if timezone.is_aware(tarih):
+        tarih = timezone.localtime(tarih)
+    return tarih.date().replace(day=1)
+
+
+def ozetleri_kur(apps, schema_editor):
+    # Mevcut geçmiş migration sırasında kurulur; sonrası sinyallerle artımlı güncellenir.
+    # Hesap, çalışma zamanı kodundan bağımsız olsun diye burada sabitlenmiştir
+    # (ihaleler.utils.analiz_ozet.ozetleri_yeniden_kur'un bu migration tarihindeki hâli).
+    Ihale = apps.get_model('ihaleler', 'Ihale')
+    Kalem = apps.get_model('ihaleler', 'Kalem')
+    IhaleSonucOzeti = apps.get_model('ihaleler', 'IhaleSonucOzeti')
+    HastaneOzeti = apps.get_model('ihaleler', 'HastaneOzeti')
+    UrunOzeti = apps.get_model('ihaleler', 'UrunOzeti')
+    AylikOzet = apps.get_model('ihaleler', 'AylikOzet')
+
+    satirlar = []
+    aylar = {}
+    for i in Ihale.objects.only(
+        'pk', 'tarih', 'durum', 'bizim_teklif', 'toplam_teklif_bedeli', 'kazanan_fiyat', 'toplam_maliyet', 'satis_fiyati',
+    ).iterator():
+        bizim = i.bizim_teklif or i.toplam_teklif_bedeli or SIFIR
+        kazanan = i.kazanan_fiyat or SIFIR
+        net_kar = fark_yuzde = None
+        if i.durum == 'Kazandik' and i.toplam_maliyet is not None:
+            net_kar = (i.satis_fiyati or i.toplam_teklif_bedeli or SIFIR) - (i.toplam_maliyet or SIFIR)
+        elif i.durum == 'Kaybettik' and kazanan and bizim:
+            fark_yuzde = ((bizim - kazanan) / bizim * 100).quantize(Decimal('0.01'))
+        satirlar.append(IhaleSonucOzeti(
+            ihale_id=i.pk, tarih=i.tarih, durum=i.durum, bizim_teklif=bizim, kazanan_fiyat=kazanan,
+            net_kar=net_kar, fark_yuzde=fark_yuzde,
+        ))
+        ay = aylar.setdefault(_ay_basi(i.tarih), {
+            'ihale_sayisi': 0, 'kazanilan': 0, 'kaybedilen': 0, 'toplam_teklif': SIFIR, 'net_kar': SIFIR,
+        })
+        ay['ihale_sayisi'] += 1
+        ay['kazanilan'] += i.durum == 'Kazandik'
+        ay['kaybedilen'] += i.durum == 'Kaybettik'
+        ay['toplam_teklif'] += bizim
+        ay['net_kar'] += net_kar or SIFIR
+    IhaleSonucOzeti.objects.bulk_create(satirlar, batch_size=500)
+    AylikOzet.objects.bulk_create([AylikOzet(ay=ay, **t) for ay, t in aylar.items()], batch_size=500)
+
+    HastaneOzeti.objects.bulk_create([
+        HastaneOzeti(**{**t, 'toplam_teklif': t['toplam_teklif'] or SIFIR})
+        for t in Ihale.objects.order_by().values('hastane_id').annotate(
+            ihale_sayisi=Count('pk'),
+            dogrudan_temin_sayisi=Count('pk', filter=Q(is_dogrudan_temin=True)),
+            kazanilan=Count('pk', filter=Q(durum='Kazandik')),
+            kaybedilen=Count('pk', filter=Q(durum='Kaybettik')),
+            toplam_teklif=Sum('toplam_teklif_bedeli'),
+        )
+    ], batch_size=500)
+
+    toplamlar = list(
+        Kalem.objects.exclude(urun_adi_norm='').order_by().values('urun_adi_norm').annotate(
+            kalem_sayisi=Count('pk'), toplam_adet=Sum('adet'), toplam_tutar=Sum('toplam_fiyat'), son=Max('pk'),
+        )
+    )
+    adlar = {}
+    for bas in range(0, len(toplamlar), 500):
+        sonlar = [t['son'] for t in toplamlar[bas:bas + 500]]
+        adlar.update(Kalem.objects.filter(pk__in=sonlar).values_list('pk', 'urun_adi'))
+    UrunOzeti.objects.bulk_create([
+        UrunOzeti(
+            urun_adi_norm=t['urun_adi_norm'],
+            urun_adi=adlar.get(t['son'], t['urun_adi_norm'])[:255],
+            kalem_sayisi=t['kalem_sayisi'],
+            toplam_adet=t['toplam_adet'] or SIFIR,
+            toplam_tutar=t['toplam_tutar'] or SIFIR,
+        )
+        for t in toplamlar
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ihaleler', '0022_kalem_urun_adi_norm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AylikOzet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ay', models.DateField(unique=True, verbose_name='Ay (ayın ilk günü)')),
+                ('ihale_sayisi', models.PositiveIntegerField(default=0, verbose_name='Dosya Sayısı')),
+                ('kazanilan', models.PositiveIntegerField(default=0, verbose_name='Kazanılan')),
+                ('kaybedilen', models.PositiveIntegerField(default=0, verbose_name='Kaybedilen')),
+                ('toplam_teklif', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='Toplam Teklif')),
+                ('net_kar', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='Net Kâr')),
+            ],
+            options={
+                'verbose_name': 'Aylık Özet',
+                'verbose_name_plural': 'Aylık Özetler',
+            },
+        ),
+        migrations.CreateModel(
+            name='HastaneOzeti',
+            fields=[
+                ('hastane', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='analiz_ozeti', serialize=False, to='ihaleler.hastane', verbose_name='Hastane')),
+                ('ihale_sayisi', models.PositiveIntegerField(default=0, verbose_name='Toplam Dosya')),
+                ('dogrudan_temin_sayisi', models.PositiveIntegerField(default=0, verbose_name='Doğrudan Temin')),
+                ('kazanilan', models.PositiveIntegerField(default=0, verbose_name='Kazanılan')),
+                ('kaybedilen', models.PositiveIntegerField(default=0, verbose_name='Kaybedilen')),
+                ('toplam_teklif', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='Toplam Teklif')),
+            ],
+            options={
+                'verbose_name': 'Hastane Özeti',
+                'verbose_name_plural': 'Hastane Özetleri',
+                'indexes': [models.Index(fields=['-ihale_sayisi'], name='ihaleler_ha_ihale_s_3e4a7e_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='IhaleSonucOzeti',
+            fields=[
+                ('ihale', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sonuc_ozeti', serialize=False, to='ihaleler.ihale', verbose_name='İhale')),
+                ('tarih', models.DateTimeField(verbose_name='İhale Tarihi')),
+                ('durum', models.CharField(choices=[('Acik', 'Açık/Devam Ediyor'), ('Kazandik', 'Kazanıldı'), ('Kaybettik', 'Kaybedildi'), ('Tamamlandi', 'İş Tamamlandı/Teslim Edildi'), ('Iptal', 'İptal Edildi')], max_length=20, verbose_name='Durum')),
+                ('bizim_teklif', models.DecimalField(decimal_places=2, default=0, max_digits=15, verbose_name='Bizim Teklif')),
+                ('kazanan_fiyat', models.DecimalField(decimal_places=2, default=0, max_digits=15, verbose_name='Kazanan Fiyat')),
+                ('net_kar', models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True, verbose_name='Net Kâr')),
+                ('fark_yuzde', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True, verbose_name='Kazanana Göre Fark (%)')),
+            ],
+            options={
+                'verbose_name': 'İhale Sonuç Özeti',
+                'verbose_name_plural': 'İhale Sonuç Özetleri',
+                'indexes': [models.Index(fields=['tarih', 'ihale'], name='ihaleler_ih_tarih_87d3c6_idx'), models.Index(fields=['durum', 'tarih'], name='ihaleler_ih_durum_408d36_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UrunOzeti',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('urun_adi_norm', models.CharField(max_length=255, unique=True, verbose_name='Normalize Ürün Adı')),
+                ('urun_adi', models.CharField(max_length=255, verbose_name='Ürün Adı (son görülen)')),
+                ('kalem_sayisi', models.PositiveIntegerField(default=0, verbose_name='Kalem Sayısı')),
+                ('toplam_adet', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='Toplam Miktar')),
+                ('toplam_tutar', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='Toplam Teklif Tutarı')),
+            ],
+            options={
+                'verbose_name': 'Ürün Özeti',
+                'verbose_name_plural': 'Ürün Özetleri',
+                'indexes': [models.Index(fields=['-toplam_adet'], name='ihaleler_ur_toplam__45a7eb_idx')],
+            },
+        ),
+        migrations.RunPython(ozetleri_kur, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ihaleler', '0023_analiz_ozet_tablolari'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LlmHizKovasi',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anahtar', models.CharField(max_length=130, unique=True, verbose_name='Sağlayıcı:Model')),
+                ('token', models.FloatField(default=0, verbose_name='Kalan Token')),
+                ('istek', models.FloatField(default=0, verbose_name='Kalan İstek')),
+                ('guncelleme', models.FloatField(default=0, verbose_name='Son Güncelleme (epoch sn)')),
+            ],
+            options={
+                'verbose_name': 'LLM Hız Kovası',
+                'verbose_name_plural': 'LLM Hız Kovaları',
+            },
+        ),
+    ]
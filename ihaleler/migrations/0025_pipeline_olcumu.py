@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ihaleler', '0024_llmhizkovasi'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PipelineCalismasi',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(blank=True, default='', max_length=20, verbose_name='AI Sağlayıcı')),
+                ('basari', models.BooleanField(default=False, verbose_name='Başarılı')),
+                ('cetvel_kaynak', models.CharField(blank=True, default='', max_length=30, verbose_name='Cetvel Kaynağı')),
+                ('baslama_tarihi', models.DateTimeField(db_index=True, verbose_name='Başlama')),
+                ('sure', models.FloatField(db_index=True, default=0, verbose_name='Süre (sn)')),
+                ('llm_cagri', models.PositiveIntegerField(default=0, verbose_name='LLM Çağrısı')),
+                ('onbellek_isabet', models.PositiveIntegerField(default=0, verbose_name='Önbellek İsabeti')),
+                ('girdi_token', models.PositiveIntegerField(default=0, verbose_name='Girdi Token')),
+                ('cikti_token', models.PositiveIntegerField(default=0, verbose_name='Çıktı Token')),
+                ('tahmini_maliyet', models.DecimalField(db_index=True, decimal_places=6, default=0, max_digits=12, verbose_name='Tahmini Maliyet (USD)')),
+                ('ozet_json', models.JSONField(blank=True, default=dict, null=True, verbose_name='Aşama Özeti')),
+                ('ihale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pipeline_calismalari', to='ihaleler.ihale', verbose_name='İhale')),
+                ('islem_isi', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pipeline_calismalari', to='ihaleler.dosyaislemisi', verbose_name='İşleme İşi')),
+            ],
+            options={
+                'verbose_name': 'Pipeline Çalışması',
+                'verbose_name_plural': 'Pipeline Çalışmaları',
+                'ordering': ['-baslama_tarihi'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PipelineAsamasi',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sira', models.PositiveIntegerField(default=0, verbose_name='Sıra')),
+                ('ad', models.CharField(max_length=50, verbose_name='Aşama')),
+                ('ust', models.CharField(blank=True, default='', max_length=50, verbose_name='Üst Aşama')),
+                ('baslangic', models.FloatField(default=0, verbose_name='Başlangıç (sn)')),
+                ('sure', models.FloatField(default=0, verbose_name='Süre (sn)')),
+                ('girdi_bayt', models.PositiveBigIntegerField(default=0, verbose_name='Girdi (bayt)')),
+                ('cikti_bayt', models.PositiveBigIntegerField(default=0, verbose_name='Çıktı (bayt)')),
+                ('girdi_token', models.PositiveIntegerField(default=0, verbose_name='Girdi Token')),
+                ('cikti_token', models.PositiveIntegerField(default=0, verbose_name='Çıktı Token')),
+                ('provider', models.CharField(blank=True, default='', max_length=20, verbose_name='Sağlayıcı')),
+                ('model', models.CharField(blank=True, default='', max_length=100, verbose_name='Model')),
+                ('onbellek', models.BooleanField(blank=True, null=True, verbose_name='Önbellekten')),
+                ('maliyet', models.DecimalField(decimal_places=6, default=0, max_digits=12, verbose_name='Maliyet (USD)')),
+                ('hata', models.CharField(blank=True, default='', max_length=500, verbose_name='Hata')),
+                ('calisma', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='asamalar', to='ihaleler.pipelinecalismasi', verbose_name='Çalışma')),
+            ],
+            options={
+                'verbose_name': 'Pipeline Aşaması',
+                'verbose_name_plural': 'Pipeline Aşamaları',
+                'ordering': ['calisma', 'sira'],
+            },
+        ),
+    ]
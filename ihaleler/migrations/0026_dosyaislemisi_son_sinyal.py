@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ihaleler', '0025_pipeline_olcumu'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dosyaislemisi',
+            name='son_sinyal',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Son Sinyal'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from ihaleler.utils.turkce import turkce_normalize, urun_anahtari
 
 # --- KURUMSAL YAPI ---
 
@@ -76,6 +77,11 @@ class Ihale(models.Model):
     class Meta:
         verbose_name = "İhale/Dosya"
         verbose_name_plural = "İhaleler ve Dosyalar"
+        # Liste sayfalarının keyset sayfalaması (sıralama alanı + id)
+        indexes = [
+            models.Index(fields=['is_dogrudan_temin', 'olusturulma_tarihi', 'id']),
+            models.Index(fields=['is_dogrudan_temin', 'tarih', 'id']),
+        ]
 
 # --- ÜRÜN VE TEKNİK VERİ BANKASI ---
 
@@ -87,6 +93,15 @@ class UrunKutuphanesi(models.Model):
     teknik_ozellikler_json = models.JSONField(blank=True, null=True, default=dict, verbose_name="Teknik Özellikler (eşleştirme için)")
     gorsel = models.ImageField(upload_to='urun_arsivi/', null=True, blank=True, verbose_name="Ürün Görseli")
     son_alis_fiyati = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Son Alış Fiyatı (Mikro)")
+    # Katalog eşleştirmesi için Türkçe normalize edilmiş ad (save() doldurur; bulk_create'te elle verilmeli)
+    urun_adi_norm = models.CharField(max_length=500, blank=True, default='', db_index=True, editable=False, verbose_name="Normalize Ürün Adı")
+
+    def save(self, *args, **kwargs):
+        self.urun_adi_norm = turkce_normalize(self.urun_adi)[:500]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'urun_adi' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'urun_adi_norm'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.marka} - {self.urun_adi}" if self.marka else self.urun_adi
@@ -120,6 +135,15 @@ class Kalem(models.Model):
     alinan_fiyat = models.DecimalField(max_digits=15, decimal_places=2, default=0, verbose_name="Alınan Fiyat")
     satis_fiyati = models.DecimalField(max_digits=15, decimal_places=2, default=0, verbose_name="Satış Fiyatı")
     kar_zarar_durumu = models.CharField(max_length=20, choices=KAR_ZARAR_CHOICES, blank=True, default='', verbose_name="Kâr/Zarar Durumu")
+    # Ürün geçmişi için Türkçe katlanmış, noktalaması sadeleştirilmiş ad (save() doldurur; bulk_create'te elle verilmeli)
+    urun_adi_norm = models.CharField(max_length=255, blank=True, default='', db_index=True, editable=False, verbose_name="Normalize Ürün Adı")
+
+    def save(self, *args, **kwargs):
+        self.urun_adi_norm = urun_anahtari(self.urun_adi)[:255]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'urun_adi' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'urun_adi_norm'}
+        super().save(*args, **kwargs)
 
     def __str__(self): 
         return f"{self.urun_adi} ({self.ihale.ihale_no})"
@@ -128,6 +152,216 @@ class Kalem(models.Model):
         verbose_name = "İhale Kalemi"
         verbose_name_plural = "İhale Kalemleri"
 
+# --- ANALİZ ÖZET TABLOLARI ---
+# Ihale/Kalem sinyalleriyle (ihaleler.utils.analiz_ozet) artımlı güncellenir; `manage.py analiz_ozetleri` yeniden kurar.
+
+class IhaleSonucOzeti(models.Model):
+    """İhale başına sonuç özeti: bizim teklif, kazanan fiyat, net kâr (kazanılan) ve fark yüzdesi (kaybedilen)."""
+    ihale = models.OneToOneField(Ihale, primary_key=True, related_name='sonuc_ozeti', on_delete=models.CASCADE, verbose_name="İhale")
+    tarih = models.DateTimeField(verbose_name="İhale Tarihi")
+    durum = models.CharField(max_length=20, choices=Ihale.DURUM_CHOICES, verbose_name="Durum")
+    bizim_teklif = models.DecimalField(max_digits=15, decimal_places=2, default=0, verbose_name="Bizim Teklif")
+    kazanan_fiyat = models.DecimalField(max_digits=15, decimal_places=2, default=0, verbose_name="Kazanan Fiyat")
+    net_kar = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True, verbose_name="Net Kâr")
+    fark_yuzde = models.DecimalField(max_digits=9, decimal_places=2, null=True, blank=True, verbose_name="Kazanana Göre Fark (%)")
+
+    @property
+    def kazandik(self):
+        return self.durum == 'Kazandik'
+
+    class Meta:
+        verbose_name = "İhale Sonuç Özeti"
+        verbose_name_plural = "İhale Sonuç Özetleri"
+        indexes = [
+            models.Index(fields=['tarih', 'ihale']),
+            models.Index(fields=['durum', 'tarih']),
+        ]
+
+
+class HastaneOzeti(models.Model):
+    """Kurum başına ihale sayıları ve toplam teklif."""
+    hastane = models.OneToOneField(Hastane, primary_key=True, related_name='analiz_ozeti', on_delete=models.CASCADE, verbose_name="Hastane")
+    ihale_sayisi = models.PositiveIntegerField(default=0, verbose_name="Toplam Dosya")
+    dogrudan_temin_sayisi = models.PositiveIntegerField(default=0, verbose_name="Doğrudan Temin")
+    kazanilan = models.PositiveIntegerField(default=0, verbose_name="Kazanılan")
+    kaybedilen = models.PositiveIntegerField(default=0, verbose_name="Kaybedilen")
+    toplam_teklif = models.DecimalField(max_digits=18, decimal_places=2, default=0, verbose_name="Toplam Teklif")
+
+    class Meta:
+        verbose_name = "Hastane Özeti"
+        verbose_name_plural = "Hastane Özetleri"
+        indexes = [models.Index(fields=['-ihale_sayisi'])]
+
+
+class UrunOzeti(models.Model):
+    """Normalize ürün adı (Kalem.urun_adi_norm) başına alım miktarı ve tutarı."""
+    urun_adi_norm = models.CharField(max_length=255, unique=True, verbose_name="Normalize Ürün Adı")
+    urun_adi = models.CharField(max_length=255, verbose_name="Ürün Adı (son görülen)")
+    kalem_sayisi = models.PositiveIntegerField(default=0, verbose_name="Kalem Sayısı")
+    toplam_adet = models.DecimalField(max_digits=18, decimal_places=2, default=0, verbose_name="Toplam Miktar")
+    toplam_tutar = models.DecimalField(max_digits=18, decimal_places=2, default=0, verbose_name="Toplam Teklif Tutarı")
+
+    class Meta:
+        verbose_name = "Ürün Özeti"
+        verbose_name_plural = "Ürün Özetleri"
+        indexes = [models.Index(fields=['-toplam_adet'])]
+
+
+class AylikOzet(models.Model):
+    """İhale tarihinin ayı (yerel saat) başına sayılar, teklif toplamı ve net kâr."""
+    ay = models.DateField(unique=True, verbose_name="Ay (ayın ilk günü)")
+    ihale_sayisi = models.PositiveIntegerField(default=0, verbose_name="Dosya Sayısı")
+    kazanilan = models.PositiveIntegerField(default=0, verbose_name="Kazanılan")
+    kaybedilen = models.PositiveIntegerField(default=0, verbose_name="Kaybedilen")
+    toplam_teklif = models.DecimalField(max_digits=18, decimal_places=2, default=0, verbose_name="Toplam Teklif")
+    net_kar = models.DecimalField(max_digits=18, decimal_places=2, default=0, verbose_name="Net Kâr")
+
+    class Meta:
+        verbose_name = "Aylık Özet"
+        verbose_name_plural = "Aylık Özetler"
+
+# --- ARKA PLAN DOSYA İŞLEME KUYRUĞU ---
+
+class DosyaIslemIsi(models.Model):
+    """Yüklenen cetvel/şartname dosyalarının işlenme kaydı; `manage.py isleme_kuyrugu` çalışanı sırayla işler."""
+    DURUM_CHOICES = [
+        ('Bekliyor', 'Sırada Bekliyor'),
+        ('Isleniyor', 'İşleniyor'),
+        ('Tamamlandi', 'Tamamlandı'),
+        ('Hata', 'Hata'),
+    ]
+
+    ihale = models.ForeignKey(Ihale, related_name='islem_isleri', on_delete=models.CASCADE, verbose_name="İhale")
+    durum = models.CharField(max_length=20, choices=DURUM_CHOICES, default='Bekliyor', verbose_name="Durum")
+    provider = models.CharField(max_length=20, default='openai', verbose_name="AI Sağlayıcı")
+    asama = models.CharField(max_length=200, blank=True, default='', verbose_name="Aşama")
+    ilerleme = models.PositiveSmallIntegerField(default=0, verbose_name="İlerleme (%)")
+    deneme_sayisi = models.PositiveSmallIntegerField(default=0, verbose_name="Deneme Sayısı")
+    sonuc_json = models.JSONField(blank=True, null=True, default=dict, verbose_name="Pipeline Sonucu")
+    hata_mesaji = models.TextField(blank=True, null=True, verbose_name="Hata Mesajı")
+    olusturan_kullanici = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Yükleyen")
+    olusturulma_tarihi = models.DateTimeField(auto_now_add=True)
+    baslama_tarihi = models.DateTimeField(null=True, blank=True, verbose_name="Başlama")
+    bitis_tarihi = models.DateTimeField(null=True, blank=True, verbose_name="Bitiş")
+    # Çalışan iş sürerken düzenli yeniler; takılma kararı buna göre verilir (bkz. islem_kuyrugu)
+    son_sinyal = models.DateTimeField(null=True, blank=True, verbose_name="Son Sinyal")
+
+    @property
+    def bitti_mi(self):
+        return self.durum in ('Tamamlandi', 'Hata')
+
+    def __str__(self):
+        return f"#{self.pk} {self.ihale.ihale_no} ({self.get_durum_display()})"
+
+    class Meta:
+        verbose_name = "Dosya İşleme İşi"
+        verbose_name_plural = "Dosya İşleme Kuyruğu"
+        ordering = ['olusturulma_tarihi']
+        indexes = [models.Index(fields=['durum', 'olusturulma_tarihi'])]
+
+# --- VISION / LLM SONUÇ ÖNBELLEĞİ ---
+
+class LlmOnbellek(models.Model):
+    """İçerik adresli LLM yanıt önbelleği: aynı sayfa/metin + sağlayıcı + model + prompt sürümü tekrar gönderilmez."""
+    anahtar = models.CharField(max_length=64, unique=True, verbose_name="Önbellek Anahtarı (SHA-256)")
+    icerik_ozeti = models.CharField(max_length=64, verbose_name="İçerik SHA-256")
+    provider = models.CharField(max_length=20, verbose_name="Sağlayıcı")
+    model = models.CharField(max_length=100, verbose_name="Model")
+    prompt_surumu = models.CharField(max_length=50, verbose_name="Prompt Sürümü")
+    yanit = models.TextField(verbose_name="Ham Yanıt")
+    boyut = models.PositiveIntegerField(default=0, verbose_name="Boyut (bayt)")
+    isabet_sayisi = models.PositiveIntegerField(default=0, verbose_name="İsabet Sayısı")
+    olusturulma_tarihi = models.DateTimeField(auto_now_add=True)
+    son_erisim = models.DateTimeField(db_index=True, verbose_name="Son Erişim")
+
+    def __str__(self):
+        return f"{self.provider}/{self.model} {self.icerik_ozeti[:12]}"
+
+    class Meta:
+        verbose_name = "LLM Önbellek Kaydı"
+        verbose_name_plural = "LLM Önbelleği"
+
+
+class LlmHizKovasi(models.Model):
+    """
+    Sağlayıcı:model başına süreçler arası ortak token kovası (llm_zamanlayici). Kovalar dakikalık kota kadar
+    dolar, saniyede kota/60 hızla yenilenir; çağrı öncesi tahmini token ayrılır, sonra gerçek kullanımla düzeltilir.
+    """
+    anahtar = models.CharField(max_length=130, unique=True, verbose_name="Sağlayıcı:Model")
+    token = models.FloatField(default=0, verbose_name="Kalan Token")
+    istek = models.FloatField(default=0, verbose_name="Kalan İstek")
+    guncelleme = models.FloatField(default=0, verbose_name="Son Güncelleme (epoch sn)")
+
+    def __str__(self):
+        return self.anahtar
+
+    class Meta:
+        verbose_name = "LLM Hız Kovası"
+        verbose_name_plural = "LLM Hız Kovaları"
+
+
+# --- PIPELINE ÖLÇÜMÜ ---
+
+class PipelineCalismasi(models.Model):
+    """Tek pipeline çalışmasının toplam süresi, LLM kullanımı ve tahmini maliyeti (pipeline_izleme)."""
+    ihale = models.ForeignKey(Ihale, related_name='pipeline_calismalari', on_delete=models.CASCADE, verbose_name="İhale")
+    islem_isi = models.ForeignKey(
+        DosyaIslemIsi, related_name='pipeline_calismalari', on_delete=models.SET_NULL, null=True, blank=True,
+        verbose_name="İşleme İşi",
+    )
+    provider = models.CharField(max_length=20, blank=True, default='', verbose_name="AI Sağlayıcı")
+    basari = models.BooleanField(default=False, verbose_name="Başarılı")
+    cetvel_kaynak = models.CharField(max_length=30, blank=True, default='', verbose_name="Cetvel Kaynağı")
+    baslama_tarihi = models.DateTimeField(db_index=True, verbose_name="Başlama")
+    sure = models.FloatField(default=0, db_index=True, verbose_name="Süre (sn)")
+    llm_cagri = models.PositiveIntegerField(default=0, verbose_name="LLM Çağrısı")
+    onbellek_isabet = models.PositiveIntegerField(default=0, verbose_name="Önbellek İsabeti")
+    girdi_token = models.PositiveIntegerField(default=0, verbose_name="Girdi Token")
+    cikti_token = models.PositiveIntegerField(default=0, verbose_name="Çıktı Token")
+    tahmini_maliyet = models.DecimalField(
+        max_digits=12, decimal_places=6, default=0, db_index=True, verbose_name="Tahmini Maliyet (USD)"
+    )
+    ozet_json = models.JSONField(blank=True, null=True, default=dict, verbose_name="Aşama Özeti")
+
+    @property
+    def toplam_token(self):
+        return self.girdi_token + self.cikti_token
+
+    def __str__(self):
+        return f"#{self.pk} {self.ihale.ihale_no} ({self.sure:.1f} sn)"
+
+    class Meta:
+        verbose_name = "Pipeline Çalışması"
+        verbose_name_plural = "Pipeline Çalışmaları"
+        ordering = ['-baslama_tarihi']
+
+
+class PipelineAsamasi(models.Model):
+    """Pipeline çalışmasının tek aşaması (PDF render, Vision sayfası, LLM çağrısı, DB yazımı...)."""
+    calisma = models.ForeignKey(PipelineCalismasi, related_name='asamalar', on_delete=models.CASCADE, verbose_name="Çalışma")
+    sira = models.PositiveIntegerField(default=0, verbose_name="Sıra")
+    ad = models.CharField(max_length=50, verbose_name="Aşama")
+    ust = models.CharField(max_length=50, blank=True, default='', verbose_name="Üst Aşama")
+    baslangic = models.FloatField(default=0, verbose_name="Başlangıç (sn)")
+    sure = models.FloatField(default=0, verbose_name="Süre (sn)")
+    girdi_bayt = models.PositiveBigIntegerField(default=0, verbose_name="Girdi (bayt)")
+    cikti_bayt = models.PositiveBigIntegerField(default=0, verbose_name="Çıktı (bayt)")
+    girdi_token = models.PositiveIntegerField(default=0, verbose_name="Girdi Token")
+    cikti_token = models.PositiveIntegerField(default=0, verbose_name="Çıktı Token")
+    provider = models.CharField(max_length=20, blank=True, default='', verbose_name="Sağlayıcı")
+    model = models.CharField(max_length=100, blank=True, default='', verbose_name="Model")
+    onbellek = models.BooleanField(null=True, blank=True, verbose_name="Önbellekten")
+    maliyet = models.DecimalField(max_digits=12, decimal_places=6, default=0, verbose_name="Maliyet (USD)")
+    hata = models.CharField(max_length=500, blank=True, default='', verbose_name="Hata")
+
+    def __str__(self):
+        return f"{self.ad} ({self.sure:.2f} sn)"
+
+    class Meta:
+        verbose_name = "Pipeline Aşaması"
+        verbose_name_plural = "Pipeline Aşamaları"
+        ordering = ['calisma', 'sira']
+
 # --- ARAÇ VE ARAÇ HAREKET MODELLERİ ---
 
 class Arac(models.Model):
@@ -6,12 +6,19 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q, Count, Sum
 from django.contrib.auth.models import User
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 
 # Modellerin
 from .models import Ihale, Kalem, Hastane, Mesai, Arac, AracKullanimKaydi, UrunKutuphanesi
+from .utils.analiz_ozet import ozet_planla
+from .utils.ihale_arama import ihale_indeksini_guncelle
+from .utils.llm_yonlendirici import ArkaUc, LlmYonlendirmeHatasi, hata_sinifi, tahmini_token, yonlendir
+from .utils.llm_zamanlayici import mutabakat, rezerve_et
+from .utils.pipeline_izleme import asama
+from .utils.turkce import urun_anahtari
 
 # --- GEMINI (Yedek kalem çıkarma) ---
 try:
@@ -140,27 +147,38 @@ SADECE aşağıdaki JSON yapısını döndür (başka açıklama ekleme):
             prompt += "\n\n--- TEKNİK ŞARTNAME METNİ ---\n" + (sartname_metin[:40000] or "(boş)")
         icerik_listesi.insert(0, prompt)
 
-        # 2. AI Çağrısı — 404 (model bulunamadı) alınırsa yedek model dene
-        response = None
-        last_error = None
-        for name in model_names:
-            if not name:
-                continue
+        # 2. AI Çağrısı — llm_yonlendirici modelleri sırayla dener (404 / kota / 5xx'te sıradakine geçer,
+        # art arda kota hatası veren modelin devresi açılıp bir süre atlanır)
+        zincir = [ArkaUc("gemini", name) for name in dict.fromkeys(model_names) if name]
+        # Ortak dakikalık kotadan ayrılacak tahmin: prompt + belge başına ~2000 token + yanıt payı
+        tahmin = tahmini_token(prompt) + 2000 * (len(icerik_listesi) - 1) + 8192
+        girdi_bayt = sum(
+            len(i.encode("utf-8")) if isinstance(i, str) else len(i["inline_data"]["data"]) for i in icerik_listesi
+        )
+
+        def _gemini_cagir(a):
+            rezervasyon = rezerve_et("gemini", a.model, tahmin)
+            gercek = 0
             try:
-                model = genai.GenerativeModel(name)
-                response = model.generate_content(icerik_listesi)
-                break
-            except Exception as e:
-                last_error = e
-                err_str = str(e).lower()
-                if "404" in err_str or "not found" in err_str or "not supported" in err_str:
-                    continue
-                if "quota" in err_str or "429" in err_str or "resource exhausted" in err_str or "kotası" in err_str:
-                    continue
-                raise
-        if response is None:
-            return (0, f"Kalem çıkarılamadı: Hiçbir Gemini modeli çalışmadı. Son hata: {last_error}")
-        
+                with asama("llm_cagrisi", provider="gemini", model=a.model, girdi_bayt=girdi_bayt,
+                           onbellek=False) as olcum:
+                    yanit = genai.GenerativeModel(a.model).generate_content(icerik_listesi)
+                    kullanim = getattr(yanit, "usage_metadata", None)
+                    olcum["girdi_token"] = getattr(kullanim, "prompt_token_count", 0) or 0
+                    olcum["cikti_token"] = getattr(kullanim, "candidates_token_count", 0) or 0
+                gercek = getattr(kullanim, "total_token_count", None) or tahmin
+                return yanit
+            finally:
+                mutabakat(rezervasyon, gercek)
+
+        try:
+            response, _ = yonlendir(zincir, _gemini_cagir)
+        except LlmYonlendirmeHatasi as e:
+            son_hata = e.hatalar[-1][1] if e.hatalar else None
+            if son_hata is not None and hata_sinifi(son_hata) in ("yetki", "istemci"):
+                raise son_hata
+            return (0, f"Kalem çıkarılamadı: Hiçbir Gemini modeli çalışmadı. Son hata: {e}")
+
         if not response:
             return (0, "Gemini yanıt döndürmedi.")
         if not response.text:
@@ -188,23 +206,30 @@ SADECE aşağıdaki JSON yapısını döndür (başka açıklama ekleme):
             else:
                 raise ValueError("JSON formatı bozuk.")
 
-        # 4. Veritabanına Kayıt
-        kayit_sayisi = 0
+        # 4. Veritabanına Kayıt — tek transaction + bulk_create; bulk_create Kalem.save() ve sinyal çağırmaz,
+        # normalize ad, arama indeksi ve ürün özetleri elle güncellenir (commit'te tek sefer)
+        kalemler = []
         for item in veriler:
             raw_m = str(item.get('miktar', '0')).replace(',', '.')
             temiz_m_str = re.sub(r'[^\d.]', '', raw_m)
             temiz_m = float(temiz_m_str) if temiz_m_str else 0
-            
-            Kalem.objects.create(
+            urun_adi = (item.get('urun_adi') or 'Bilinmeyen Ürün')[:255]
+
+            kalemler.append(Kalem(
                 ihale=ihale_obj,
-                urun_adi=(item.get('urun_adi') or 'Bilinmeyen Ürün')[:255],
+                urun_adi=urun_adi,
+                urun_adi_norm=urun_anahtari(urun_adi)[:255],
                 adet=temiz_m,
                 birim=(item.get('birim') or 'Adet')[:50],
                 teknik_sartname_ozeti=item.get('teknik_metin') or 'Detay yok'
-            )
-            kayit_sayisi += 1
-            
-        return kayit_sayisi
+            ))
+
+        with transaction.atomic():
+            Kalem.objects.bulk_create(kalemler, batch_size=500)
+            ihale_indeksini_guncelle(ihale_obj.pk)
+            ozet_planla(urun=[k.urun_adi_norm for k in kalemler])
+
+        return len(kalemler)
 
     except Exception as e:
         err = str(e)
@@ -270,25 +295,27 @@ def dosya_yukleme(request):
             yeni_ihale.sartname_dosya_3 = request.FILES.get('teknik_sartname_3')
         yeni_ihale.save()
 
-        # Gemini ile kalem çıkarma (ücretsiz kotaya uygun; OpenAI kullanılmıyor)
-        if _gemini_api_key():
-            sonuc = ihale_dosyalarini_isle_ve_kaydet(yeni_ihale, urun_listesi_dosyasi, sartname_dosyasi)
-            if isinstance(sonuc, tuple):
-                sayi, hata = sonuc
-                if sayi and sayi > 0:
-                    messages.success(request, f"İşlem tamam (Gemini). {sayi} kalem eklendi.")
-                else:
-                    messages.warning(request, f"Kalem çıkarılamadı: {hata}")
-            elif sonuc and sonuc > 0:
-                messages.success(request, f"İşlem tamam (Gemini). {sonuc} kalem eklendi.")
-            else:
-                messages.warning(request, "Kalem çıkarılamadı. .env dosyasında GEMINI_API_KEY doğru mu kontrol edin.")
-        else:
-            messages.warning(request, "Kalem çıkarılamadı: .env dosyasına GEMINI_API_KEY ekleyin (API_REHBERI.md).")
-
+        # Kalem çıkarma arka planda: iş kuyruğa alınır, `manage.py isleme_kuyrugu` çalışanı işler
         from django.urls import reverse
-        if yeni_ihale.is_dogrudan_temin:
-            return redirect(reverse('dogrudan_temin_listesi'))
-        return redirect(reverse('ihale_listesi'))
+        from .utils.islem_kuyrugu import is_kuyruga_ekle, varsayilan_provider
+        liste_url = reverse('dogrudan_temin_listesi') if yeni_ihale.is_dogrudan_temin else reverse('ihale_listesi')
+        ajax = request.headers.get('x-requested-with') == 'XMLHttpRequest'
+
+        provider = varsayilan_provider()
+        if not provider:
+            messages.warning(request, "Kalem çıkarılamadı: .env dosyasına GEMINI_API_KEY veya OPENAI_API_KEY ekleyin (API_REHBERI.md).")
+            if ajax:
+                return JsonResponse({"is_id": None, "yonlendir": liste_url})
+            return redirect(liste_url)
+
+        is_ = is_kuyruga_ekle(yeni_ihale, provider=provider, kullanici=request.user)
+        if ajax:
+            return JsonResponse({
+                "is_id": is_.pk,
+                "durum_url": reverse('dosya_islem_durumu', args=[is_.pk]),
+                "yonlendir": liste_url,
+            })
+        messages.info(request, "Dosyalar yüklendi; kalemler arka planda çıkarılıyor. Birkaç dakika içinde listede görünecek.")
+        return redirect(liste_url)
 
     return render(request, 'ihaleler/dosya_yukleme.html')
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""
+Model sinyalleri: ihale arama indeksini (ihale_arama, SQLite FTS5), analiz özet tablolarını (analiz_ozet),
+anasayfa sayaç önbelleğini (anasayfa_sayaclari) ve katalog benzerlik indeksini (katalog_benzerlik)
+kayıt/silme işlemleriyle eşzamanlı tutar. bulk_create / bulk_update / QuerySet.update sinyal üretmez;
+bu yollarla yazan kod ihale_indeksini_guncelle, ozet_planla, sayaclari_gecersiz_kil ve indekse_ekle'yi
+kendisi çağırır.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Hastane, Ihale, Kalem, UrunKutuphanesi
+from .utils.analiz_ozet import ay_basi, ozet_planla
+from .utils.anasayfa_sayaclari import sayaclari_gecersiz_kil
+from .utils.ihale_arama import ihale_indeksini_guncelle
+from .utils.katalog_benzerlik import indekse_ekle, indeksten_cikar
+
+# Bu alanlar değişmeyen kısmi kayıtlar (save(update_fields=[...])) özetleri etkilemez
+_IHALE_OZET_ALANLARI = {
+    "hastane", "tarih", "durum", "is_dogrudan_temin", "bizim_teklif", "toplam_teklif_bedeli",
+    "kazanan_fiyat", "toplam_maliyet", "satis_fiyati",
+}
+_KALEM_OZET_ALANLARI = {"urun_adi", "urun_adi_norm", "adet", "toplam_fiyat"}
+# Eski değeri kayıttan önce okunan alanlar (özet anahtarları + anasayfa sayaçları)
+_IHALE_IZLENEN_ALANLAR = {"hastane", "tarih", "durum", "is_dogrudan_temin"}
+# Katalog benzerlik indeksinin kullandığı alanlar
+_KATALOG_INDEKS_ALANLARI = {"urun_adi", "teknik_ozellikler_json"}
+
+
+def _ozeti_etkiler(update_fields, alanlar) -> bool:
+    return update_fields is None or bool(alanlar & set(update_fields))
+
+
+@receiver(post_save, sender=Ihale)
+@receiver(post_delete, sender=Ihale)
+def ihale_arama_indeksi(sender, instance, **kwargs):
+    ihale_indeksini_guncelle(instance.pk)
+
+
+@receiver(post_save, sender=Kalem)
+@receiver(post_delete, sender=Kalem)
+def kalem_arama_indeksi(sender, instance, **kwargs):
+    ihale_indeksini_guncelle(instance.ihale_id)
+
+
+@receiver(post_save, sender=Hastane)
+def hastane_arama_indeksi(sender, instance, created, **kwargs):
+    # Yeni kurumun ihalesi yoktur; ad değişikliği kurumun tüm ihalelerine yansır
+    if not created:
+        ihale_indeksini_guncelle(*Ihale.objects.filter(hastane=instance).values_list("pk", flat=True))
+
+
+@receiver(pre_save, sender=Ihale)
+def ihale_eski_degerleri(sender, instance, update_fields=None, raw=False, **kwargs):
+    # Kurum/tarih değişirse eski kurumun/ayın özeti, durum/tür/kurum değişirse anasayfa sayaçları yenilenmeli
+    instance._eski_degerler = None
+    if raw or not instance.pk or not _ozeti_etkiler(update_fields, _IHALE_IZLENEN_ALANLAR):
+        return
+    instance._eski_degerler = (
+        Ihale.objects.filter(pk=instance.pk).values("hastane_id", "tarih", "durum", "is_dogrudan_temin").first()
+    )
+
+
+@receiver(post_save, sender=Ihale)
+@receiver(post_delete, sender=Ihale)
+def ihale_analiz_ozeti(sender, instance, update_fields=None, **kwargs):
+    if not _ozeti_etkiler(update_fields, _IHALE_OZET_ALANLARI):
+        return
+    hastaneler, aylar = {instance.hastane_id}, {ay_basi(instance.tarih)}
+    eski = getattr(instance, "_eski_degerler", None)
+    if eski:
+        hastaneler.add(eski["hastane_id"])
+        aylar.add(ay_basi(eski["tarih"]))
+    ozet_planla(ihale=[instance.pk], hastane=hastaneler, ay=aylar)
+
+
+@receiver(post_save, sender=Ihale)
+def ihale_anasayfa_sayaclari(sender, instance, created, **kwargs):
+    eski = getattr(instance, "_eski_degerler", None)
+    if created or (eski and any(
+        eski[alan] != getattr(instance, alan) for alan in ("hastane_id", "durum", "is_dogrudan_temin")
+    )):
+        sayaclari_gecersiz_kil()
+
+
+@receiver(post_delete, sender=Ihale)
+def ihale_silindi_anasayfa_sayaclari(sender, instance, **kwargs):
+    sayaclari_gecersiz_kil()
+
+
+@receiver(pre_save, sender=Kalem)
+def kalem_eski_ozet_anahtari(sender, instance, update_fields=None, raw=False, **kwargs):
+    instance._ozet_eski_norm = None
+    if raw or not instance.pk or not _ozeti_etkiler(update_fields, {"urun_adi", "urun_adi_norm"}):
+        return
+    instance._ozet_eski_norm = Kalem.objects.filter(pk=instance.pk).values_list("urun_adi_norm", flat=True).first()
+
+
+@receiver(post_save, sender=Kalem)
+@receiver(post_delete, sender=Kalem)
+def kalem_analiz_ozeti(sender, instance, update_fields=None, **kwargs):
+    if not _ozeti_etkiler(update_fields, _KALEM_OZET_ALANLARI):
+        return
+    ozet_planla(urun=[instance.urun_adi_norm, getattr(instance, "_ozet_eski_norm", None)])
+
+
+@receiver(post_save, sender=UrunKutuphanesi)
+def katalog_urunu_kaydedildi(sender, instance, update_fields=None, **kwargs):
+    if _ozeti_etkiler(update_fields, _KATALOG_INDEKS_ALANLARI):
+        indekse_ekle(instance)
+
+
+@receiver(post_delete, sender=UrunKutuphanesi)
+def katalog_urunu_silindi(sender, instance, **kwargs):
+    indeksten_cikar(instance.pk)
@@ -1,3 +1,1181 @@
-from django.test import TestCase
+import csv
+import importlib.util
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import docx
+import openpyxl
+from PIL import Image
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    DosyaIslemIsi,
+    Hastane,
+    Ihale,
+    Kalem,
+    LlmHizKovasi,
+    LlmOnbellek,
+    PipelineCalismasi,
+    UrunKutuphanesi,
+    UrunOzeti,
+)
+from .utils import (
+    document_vision,
+    file_to_text,
+    islem_kuyrugu,
+    katalog_benzerlik,
+    liste_disa_aktar,
+    llm_istemci,
+    llm_onbellek,
+    llm_zamanlayici,
+    parsing_service,
+    sartname_cetvel_eslestir,
+    urun_katalog_eslestir,
+)
+from .utils.anasayfa_sayaclari import anasayfa_sayaclari, sayaclari_gecersiz_kil
+from .utils.ihale_arama import sirali_ihale_idleri
+from .utils.kalem_fiyat import fiyat_coz, kalem_fiyatlarini_kaydet
+from .utils.katalog_benzerlik import KatalogIndeksi, benzerlik_esigi, kanonik_ad, katalog_indeksi
+from .utils.liste_disa_aktar import csv_akisi
+from .utils.llm_yonlendirici import (
+    ArkaUc,
+    LlmYonlendirmeHatasi,
+    SahteHata,
+    arka_uc_zinciri,
+    devreleri_sifirla,
+    saglik_durumu,
+    sahte_saglayici,
+    sohbet,
+    yonlendir,
+)
+from .utils.llm_zamanlayici import LlmZamanlayici
+from .utils.pipeline_izleme import asama, asama_kaydet, baglamda, calisma_izle
+from .utils.sartname_indeks import SartnameIndeksi, maddeden_ozellikler
+from .utils.tablo_ayristir import excel_cetvel_ayristir, sayi_coz, tablo_ayristir, word_cetvel_ayristir
+from .utils.turkce import urun_anahtari
+from .utils.urun_katalog_eslestir import kutuphane_urunu_bul_veya_olustur
+from .views import _imlec_coz, _keyset_sayfa
+
+
+def _ihale(hastane=None, ad="İhale", **alanlar):
+    alanlar.setdefault("tarih", timezone.now())
+    hastane = hastane or Hastane.objects.create(ad="Hastane")
+    return Ihale.objects.create(ihale_adi=ad, ihale_no="2026/1", hastane=hastane, **alanlar)
+
+
+# Sahte sağlayıcıyla iki arka uç; tekrar beklemesi 0 sn (testler uyumaz)
+@override_settings(
+    LLM_SAGLAYICI_SIRASI=["sahte:birincil", "sahte:yedek"],
+    LLM_TEKRAR_TABAN=0, LLM_TEKRAR_SAYISI=2, LLM_DEVRE_ESIK=3, LLM_DEVRE_BEKLEME=30,
+)
+class LlmYonlendiriciTest(TestCase):
+    def setUp(self):
+        devreleri_sifirla()
+        sahte_saglayici.sifirla()
+        sahte_saglayici.varsayilan = "{}"
+        self.addCleanup(devreleri_sifirla)
+        self.addCleanup(sahte_saglayici.sifirla)
+
+    def _cagir(self):
+        return yonlendir(arka_uc_zinciri({}), lambda a: sohbet(a, "sistem", "kullanıcı", max_tokens=16))
+
+    def _cagrilan_modeller(self):
+        return [model for model, _ in sahte_saglayici.cagrilar]
+
+    def test_yetki_hatasinda_tekrar_denemeden_yedege_gecer(self):
+        sahte_saglayici.planla("birincil", SahteHata(401))
+        sahte_saglayici.planla("yedek", "yedek yanıtı")
+        self.assertEqual(self._cagir(), ("yedek yanıtı", ArkaUc("sahte", "yedek")))
+        self.assertEqual(self._cagrilan_modeller(), ["birincil", "yedek"])
+
+    def test_gecici_hata_ayni_arka_ucta_tekrar_denenir(self):
+        sahte_saglayici.planla("birincil", SahteHata(503), SahteHata(429, retry_after=0), "tamam")
+        self.assertEqual(self._cagir(), ("tamam", ArkaUc("sahte", "birincil")))
+        self.assertEqual(self._cagrilan_modeller(), ["birincil"] * 3)
+
+    def test_tekrar_hakki_bitince_yedege_gecer(self):
+        sahte_saglayici.planla("birincil", *[SahteHata(500)] * 3)
+        sahte_saglayici.planla("yedek", "yedek yanıtı")
+        self.assertEqual(self._cagir()[1], ArkaUc("sahte", "yedek"))
+        self.assertEqual(self._cagrilan_modeller(), ["birincil"] * 3 + ["yedek"])
+
+    def test_istemci_hatasi_zinciri_durdurur(self):
+        sahte_saglayici.planla("birincil", SahteHata(400, "bozuk istek"))
+        with self.assertRaises(LlmYonlendirmeHatasi) as hata:
+            self._cagir()
+        self.assertEqual(len(hata.exception.hatalar), 1)
+        self.assertEqual(self._cagrilan_modeller(), ["birincil"])
+
+    @override_settings(LLM_TEKRAR_SAYISI=0, LLM_DEVRE_ESIK=2)
+    def test_devre_acilir_ve_bekleme_sonrasi_deneme_cagrisiyla_kapanir(self):
+        sahte_saglayici.planla("birincil", SahteHata(503), SahteHata(503))
+        self._cagir()
+        self._cagir()
+        durumlar = {r["model"]: r["durum"] for r in saglik_durumu()}
+        self.assertEqual(durumlar["birincil"], "acik")
+
+        # Devre açıkken birincil hiç çağrılmaz
+        sahte_saglayici.cagrilar.clear()
+        self.assertEqual(self._cagir()[1], ArkaUc("sahte", "yedek"))
+        self.assertEqual(self._cagrilan_modeller(), ["yedek"])
+
+        # Bekleme dolunca tek deneme çağrısı geçer; başarılıysa devre kapanır
+        with override_settings(LLM_DEVRE_BEKLEME=0):
+            self.assertEqual(self._cagir()[1], ArkaUc("sahte", "birincil"))
+        durumlar = {r["model"]: r["durum"] for r in saglik_durumu()}
+        self.assertEqual(durumlar["birincil"], "kapali")
+
+
+class IslemKuyruguTest(TestCase):
+    def setUp(self):
+        self.ihale = _ihale()
+
+    def _is(self, **alanlar):
+        return DosyaIslemIsi.objects.create(ihale=self.ihale, provider="openai", **alanlar)
+
+    def test_siradaki_isi_al_en_eski_bekleyeni_bir_kez_verir(self):
+        birinci, ikinci = self._is(), self._is()
+        alinan = islem_kuyrugu.siradaki_isi_al()
+        self.assertEqual(alinan.pk, birinci.pk)
+        self.assertEqual((alinan.durum, alinan.deneme_sayisi), ("Isleniyor", 1))
+        self.assertIsNotNone(alinan.son_sinyal)
+        self.assertEqual(islem_kuyrugu.siradaki_isi_al().pk, ikinci.pk)
+        self.assertIsNone(islem_kuyrugu.siradaki_isi_al())
+
+    def test_sinyal_gonderen_uzun_is_kurtarilmaz(self):
+        eski = timezone.now() - timedelta(hours=2)
+        is_ = self._is(durum="Isleniyor", deneme_sayisi=1, baslama_tarihi=eski, son_sinyal=timezone.now())
+        self.assertEqual(islem_kuyrugu.takilan_isleri_kurtar(), 0)
+        is_.refresh_from_db()
+        self.assertEqual(is_.durum, "Isleniyor")
+
+    def test_sinyali_kesilen_is_yeniden_siraya_alinir_veya_kapatilir(self):
+        eski = timezone.now() - timedelta(hours=2)
+        yeniden = self._is(durum="Isleniyor", deneme_sayisi=1, baslama_tarihi=eski, son_sinyal=eski)
+        hakki_biten = self._is(durum="Isleniyor", deneme_sayisi=islem_kuyrugu.MAKS_DENEME, baslama_tarihi=eski)
+        self.assertEqual(islem_kuyrugu.takilan_isleri_kurtar(), 2)
+        yeniden.refresh_from_db()
+        hakki_biten.refresh_from_db()
+        self.assertEqual(yeniden.durum, "Bekliyor")
+        self.assertEqual(hakki_biten.durum, "Hata")
+
+    def test_ilerleme_guncelle_sinyali_yeniler(self):
+        eski = timezone.now() - timedelta(hours=2)
+        is_ = self._is(durum="Isleniyor", deneme_sayisi=1, baslama_tarihi=eski, son_sinyal=eski)
+        islem_kuyrugu.ilerleme_guncelle(is_.pk, 140, "Kalemler eşleştiriliyor")
+        is_.refresh_from_db()
+        self.assertEqual(is_.ilerleme, 100)
+        self.assertGreater(is_.son_sinyal, eski)
+        self.assertEqual(islem_kuyrugu.takilan_isleri_kurtar(), 0)
+
+    def test_devredilen_isin_sonucu_yazilmaz(self):
+        self._is()
+        is_ = islem_kuyrugu.siradaki_isi_al()
+
+        def devredildi(ihale, **kwargs):
+            # İş sürerken başka bir çalışan onu takılmış sayıp yeniden sıraya aldı
+            DosyaIslemIsi.objects.filter(pk=is_.pk).update(durum="Bekliyor")
+            return {"basari": True, "olusturulan": 3, "hatalar": []}
+
+        with mock.patch("ihaleler.utils.document_pipeline.ihale_dosyalarini_isle", devredildi):
+            islem_kuyrugu.isi_calistir(is_)
+        is_.refresh_from_db()
+        self.assertEqual(is_.durum, "Bekliyor")
+
+
+class LlmOnbellekTest(TestCase):
+    def setUp(self):
+        llm_onbellek._boyut[:] = [None, 0]
+        self.addCleanup(llm_onbellek._boyut.__setitem__, slice(None), [None, 0])
+
+    def _cagir(self, yanit, icerik=b"sayfa", model="m1", surum="v1", gecerli=None):
+        cagrilar = []
+
+        def cagir():
+            cagrilar.append(1)
+            return yanit
+
+        sonuc = llm_onbellek.onbellekli_cagir(icerik, "openai", model, surum, cagir, gecerli=gecerli)
+        return sonuc, len(cagrilar)
+
+    def test_anahtar_icerik_saglayici_model_ve_surume_baglidir(self):
+        h = llm_onbellek.icerik_ozeti(b"sayfa")
+        self.assertEqual(h, llm_onbellek.icerik_ozeti("sayfa"))
+        anahtarlar = {
+            llm_onbellek.onbellek_anahtari(h, "openai", "m1", "v1"),
+            llm_onbellek.onbellek_anahtari(h, "anthropic", "m1", "v1"),
+            llm_onbellek.onbellek_anahtari(h, "openai", "m2", "v1"),
+            llm_onbellek.onbellek_anahtari(h, "openai", "m1", "v2"),
+            llm_onbellek.onbellek_anahtari(llm_onbellek.icerik_ozeti(b"diger"), "openai", "m1", "v1"),
+        }
+        self.assertEqual(len(anahtarlar), 5)
+        self.assertNotEqual(llm_onbellek.prompt_surumu("v1", "a"), llm_onbellek.prompt_surumu("v1", "b"))
+
+    def test_ikinci_cagri_onbellekten_gelir(self):
+        self.assertEqual(self._cagir("[1]"), (("[1]", False), 1))
+        self.assertEqual(self._cagir("[2]"), (("[1]", True), 0))
+        # Farklı model ayrı kayıt
+        self.assertEqual(self._cagir("[3]", model="m2"), (("[3]", False), 1))
+
+    def test_gecersiz_yanit_yazilmaz_ve_kayitli_gecersiz_yanit_kullanilmaz(self):
+        gecerli = lambda ham: ham.startswith("[")  # noqa: E731
+        self._cagir("kesik yanıt", gecerli=gecerli)
+        self.assertFalse(LlmOnbellek.objects.exists())
+        llm_onbellek.onbellege_yaz(llm_onbellek.icerik_ozeti(b"sayfa"), "openai", "m1", "v1", "bozuk")
+        self.assertEqual(self._cagir("[1]", gecerli=gecerli), (("[1]", False), 1))
+        self.assertEqual(self._cagir("[2]", gecerli=gecerli), (("[1]", True), 0))
+
+    def test_toplam_boyut_her_yazimda_olculmez(self):
+        h = llm_onbellek.icerik_ozeti
+        llm_onbellek.onbellege_yaz(h("ilk"), "openai", "m1", "v1", "x" * 10)
+        with CaptureQueriesContext(connection) as sorgular:
+            for i in range(20):
+                llm_onbellek.onbellege_yaz(h(str(i)), "openai", "m1", "v1", "x" * 10)
+        self.assertFalse([q for q in sorgular if "SUM(" in q["sql"].upper()])
+
+    def test_sinir_asilinca_en_eski_kayitlar_silinir(self):
+        h = llm_onbellek.icerik_ozeti
+        llm_onbellek.onbellege_yaz(h("eski"), "openai", "m1", "v1", "x" * 600 * 1024)
+        LlmOnbellek.objects.update(son_erisim=timezone.now() - timedelta(days=1))
+        with override_settings(LLM_ONBELLEK_MAKS_MB=1):
+            llm_onbellek.onbellege_yaz(h("yeni"), "openai", "m1", "v1", "y" * 600 * 1024)
+        self.assertEqual(list(LlmOnbellek.objects.values_list("icerik_ozeti", flat=True)), [h("yeni")])
+
+
+class TumSayfalarAnalizTest(TestCase):
+    def test_bellekteki_sayfa_gorseli_pencereyle_sinirlidir_ve_sira_korunur(self):
+        kilit = threading.Lock()
+        durum = {"bellekte": 0, "en_fazla": 0}
+
+        def render(path, page_or_sheet_index=0):
+            if page_or_sheet_index == 3:
+                raise ValueError("boş sheet")
+            with kilit:
+                durum["bellekte"] += 1
+                durum["en_fazla"] = max(durum["en_fazla"], durum["bellekte"])
+            return f"sayfa {page_or_sheet_index}".encode()
+
+        def analiz(image_bytes, provider, ek_talimat):
+            time.sleep(0.005)
+            with kilit:
+                durum["bellekte"] -= 1
+            return {"basari": True, "tablo": [{"ad": image_bytes.decode(), "miktar": "1"}]}
+
+        with mock.patch.object(document_vision, "sayfa_sayisi", return_value=30), \
+                mock.patch.object(document_vision, "file_to_image_bytes", render), \
+                mock.patch.object(document_vision, "gorsel_analiz_et", analiz):
+            sonuc = document_vision.analiz_et_tum_sayfalar("cetvel.pdf", max_workers=3)
+
+        self.assertLessEqual(durum["en_fazla"], 6)
+        self.assertEqual([r["ad"] for r in sonuc["tablo"]], [f"sayfa {i}" for i in range(30) if i != 3])
+        self.assertFalse(sonuc["sayfa_sonuclari"][3]["basari"])
+        self.assertIn("Sayfa 4", sonuc["hata"])
+
+
+def _sahte_sartname_yaniti(system, user, gorsel_png):
+    """Toplu istemde "Kablo B" dışındaki kalemleri yanıtlar; tekil istemde kalemin kendisini."""
+    if "Teklif cetvelindeki kalemler:" in user:
+        adlar = re.findall(r'^(\d+)\. "(.+)"$', user, re.MULTILINE)
+        return json.dumps({"kalemler": {
+            no: {"ilgili_paragraf": f"toplu {ad}", "teknik_ozellikler": {"kesit": ad[-1]}}
+            for no, ad in adlar if ad != "Kablo B"
+        }})
+    ad = re.search(r'kalem adı: "(.+)"', user).group(1)
+    return json.dumps({"ilgili_paragraf": f"tekil {ad}", "teknik_ozellikler": {}})
+
+
+@override_settings(LLM_SAGLAYICI_SIRASI=["sahte:m"], LLM_TEKRAR_TABAN=0, LLM_ESZAMANLI={"sahte": 2})
+class TopluSartnameEslestirmeTest(TestCase):
+    sartname = "Kablolar TS EN standardına uygun, bakır iletkenli ve PVC yalıtımlı olacaktır."
+
+    def setUp(self):
+        devreleri_sifirla()
+        sahte_saglayici.sifirla()
+        sahte_saglayici.varsayilan = _sahte_sartname_yaniti
+        self.addCleanup(setattr, sahte_saglayici, "varsayilan", "{}")
+        self.addCleanup(sahte_saglayici.sifirla)
+
+    def test_gruplar_tek_cagrida_sorulur_atlanan_kalem_tekil_cagriya_duser(self):
+        adlar = ["Kablo A", "Kablo B", "Kablo A", "Kablo C"]
+        bitenler = []
+        sonuclar = sartname_cetvel_eslestir.sartname_metninden_toplu_kalem_ozetleri_cikar(
+            self.sartname, adlar, provider="sahte", grup_boyutu=2, tamamlandi=bitenler.extend,
+        )
+
+        self.assertEqual([r["ilgili_paragraf"] for r in sonuclar],
+                         ["toplu Kablo A", "tekil Kablo B", "toplu Kablo A", "toplu Kablo C"])
+        self.assertEqual(sonuclar[0]["teknik_ozellikler"], {"kesit": "A"})
+        istemler = [user for _, user in sahte_saglayici.cagrilar]
+        toplu = [u for u in istemler if "Teklif cetvelindeki kalemler:" in u]
+        # Aynı ad bir kez sorulur; şartname her grupta bir kez gönderilir
+        self.assertEqual(len(toplu), 2)
+        self.assertEqual(len(istemler), 3)
+        self.assertTrue(all(u.count(self.sartname) == 1 for u in toplu))
+        # Her ad sonucu kesinleşince bir kez bildirilir; atlanan ad tekil çağrıdan sonra
+        self.assertEqual(sorted(bitenler), ["Kablo A", "Kablo B", "Kablo C"])
+        self.assertEqual(bitenler[-1], "Kablo B")
+
+    def test_grup_boyutu_token_butcesine_gore_kuculur(self):
+        adlar = [f"Kalem {i}" for i in range(100)]
+        self.assertEqual(sartname_cetvel_eslestir.toplu_grup_boyutu("kısa", adlar, "openai"), 20)
+        uzun = "x" * int(3.5 * 127000)
+        self.assertLess(sartname_cetvel_eslestir.toplu_grup_boyutu(uzun, adlar, "openai"), 20)
+        self.assertEqual(sartname_cetvel_eslestir.toplu_grup_boyutu(uzun * 2, adlar, "openai"), 1)
+
+
+def _sartname(*maddeler, dolgu=0):
+    """Numaralı maddelerden şartname metni; dolgu karakter kadar ilgisiz madde önce gelir."""
+    satirlar = []
+    for i in range(dolgu // 200):
+        satirlar.append(f"{i + 1}. Genel hüküm {i}: yüklenici işi sözleşme ve eklerine uygun olarak eksiksiz " + "yürütür " * 15)
+    for i, madde in enumerate(maddeler, start=len(satirlar) + 1):
+        satirlar.append(f"{i}. {madde}")
+    return "\n".join(satirlar)
+
+
+class SartnameIndeksiTest(TestCase):
+    kablo = ("NYY kablolar TS EN 60502 standardına uygun, bakır iletkenli ve PVC yalıtımlı olacaktır.\n"
+             "Kesit: 3x2,5 mm²\nGerilim: 0,6/1 kV")
+    enjektor = ("Enjektörler steril, tek kullanımlık, luer lock uçlu olacak ve ambalaj üzerinde son "
+                "kullanma tarihi yazılı olacaktır.\nHacim: 5 ml")
+    eldiven = ("Cerrahi eldivenler pudrasız lateks olacak, her çift ayrı steril pakette teslim edilecek ve "
+               "numaraları ambalajda yazılı olacaktır.")
+
+    def test_bm25_en_ilgili_maddeyi_once_dondurur(self):
+        indeks = SartnameIndeksi(_sartname(self.enjektor, self.kablo, self.eldiven))
+        self.assertEqual(len(indeks), 3)
+        self.assertIn("NYY", indeks.ara("NYY kablo 3x2,5", k=2)[0][1]["metin"])
+        self.assertIn("Enjektörler", indeks.ara("enjektör 5 ml", k=1)[0][1]["metin"])
+        self.assertIn("Enjektörler", indeks.baglam(["enjektör", "eldiven"], k=1))
+        self.assertNotIn("NYY", indeks.baglam(["enjektör", "eldiven"], k=1))
+
+    def test_net_eslesme_tek_madde_one_cikinca_doner(self):
+        indeks = SartnameIndeksi(_sartname(self.enjektor, self.kablo, self.eldiven))
+        madde = indeks.net_eslesme("NYY Kablo")
+        self.assertIn("NYY", madde["metin"])
+        self.assertEqual(maddeden_ozellikler(madde["metin"]), {"kesit": "3x2,5 mm²", "gerilim": "0,6/1 kV"})
+        # "olacak" her maddede geçer; "luer" hiçbir maddede tüm kelimelerle birlikte değil
+        self.assertIsNone(indeks.net_eslesme("olacak"))
+        self.assertIsNone(indeks.net_eslesme("Luer kablo"))
+
+    @override_settings(LLM_SAGLAYICI_SIRASI=["sahte:m"])
+    def test_karakter_sinirinin_otesindeki_madde_de_indekslenir(self):
+        sahte_saglayici.sifirla()
+        self.addCleanup(sahte_saglayici.sifirla)
+        metin = _sartname(self.enjektor, self.kablo, dolgu=130000)
+        self.assertGreater(metin.index("NYY"), 120000)
+
+        sonuc = sartname_cetvel_eslestir.sartname_metninden_kalem_ozetleri_cikar(
+            metin, "NYY Kablo", provider="sahte", max_karakter=120000,
+        )
+        self.assertEqual(sonuc["kaynak"], "indeks")
+        self.assertEqual(sonuc["teknik_ozellikler"]["kesit"], "3x2,5 mm²")
+        self.assertEqual(sahte_saglayici.cagrilar, [])
+
+
+class LlmZamanlayiciTest(TestCase):
+    def test_haritala_sirayi_korur_ve_bitenleri_bildirir(self):
+        def isle(n):
+            time.sleep(0.01 * (3 - n))
+            if n == 1:
+                raise ValueError("bozuk")
+            return n * 10
+
+        bitenler = []
+        sonuclar = LlmZamanlayici("sahte", eszamanli=3).haritala(
+            isle, [0, 1, 2], tamamlandi=lambda sira, sonuc: bitenler.append(sira)
+        )
+        self.assertEqual(sonuclar[0], 0)
+        self.assertIsInstance(sonuclar[1], ValueError)
+        self.assertEqual(sonuclar[2], 20)
+        self.assertEqual(bitenler, [2, 1, 0])
+
+    @override_settings(LLM_SAGLAYICI_SIRASI=["sahte:m"], LLM_ESZAMANLI={"sahte": 2})
+    def test_cetvel_birlestirme_ilerlemeyi_satir_satir_bildirir(self):
+        sahte_saglayici.sifirla()
+        self.addCleanup(sahte_saglayici.sifirla)
+        ihale = _ihale()
+        tablo = [{"ad": ""}, {"ad": "Kablo A", "miktar": "2"}, {"ad": "Kablo B"}, {"ad": "Kablo C"}]
+        ilerleme = []
+
+        sonuc = sartname_cetvel_eslestir.cetvel_ve_sartname_birlestir_ihale_kalem_kaydet(
+            ihale, provider="sahte", cetvel_tablo=tablo, sartname_metni="Kablolar bakır iletkenli olacaktır.",
+            toplu=False, ilerleme_bildir=lambda islenen, toplam: ilerleme.append((islenen, toplam)),
+        )
+        self.assertEqual(sonuc["olusturulan"], 3)
+        self.assertEqual(ilerleme, [(2, 4), (3, 4), (4, 4)])
+
+    def test_db_kovasi_ilk_cagrida_olusur_yetmezse_bekleme_doner(self):
+        with mock.patch.object(llm_zamanlayici.time, "time", return_value=1000.0):
+            self.assertIsNone(llm_zamanlayici._db_ayir("sahte:kova", 600, 1000, 10))
+            kova = LlmHizKovasi.objects.get(anahtar="sahte:kova")
+            self.assertEqual((kova.token, kova.istek), (400, 9))
+            # 200 token eksik, dakikada 1000 yenilenir: 12 sn
+            self.assertAlmostEqual(llm_zamanlayici._db_ayir("sahte:kova", 600, 1000, 10), 12.0)
+        kova.refresh_from_db()
+        self.assertEqual(kova.token, 400)  # yetmeyen ayırma kovaya dokunmaz
+        with mock.patch.object(llm_zamanlayici.time, "time", return_value=1012.0):
+            self.assertIsNone(llm_zamanlayici._db_ayir("sahte:kova", 600, 1000, 10))
+        kova.refresh_from_db()
+        self.assertAlmostEqual(kova.token, 0.0)
+        self.assertAlmostEqual(kova.istek, 9.0)  # 12 sn'de 2 istek yenilendi (kapasite 10'da kesilir), 1 harcandı
+
+    def test_db_kovasi_istek_sinirini_uygular(self):
+        with mock.patch.object(llm_zamanlayici.time, "time", return_value=1000.0):
+            self.assertIsNone(llm_zamanlayici._db_ayir("sahte:rpm", 1, 1000, 1))
+            self.assertAlmostEqual(llm_zamanlayici._db_ayir("sahte:rpm", 1, 1000, 1), 60.0)
+
+    @override_settings(
+        LLM_SAGLAYICI_SIRASI=["sahte:birincil", "sahte:yedek"], LLM_TEKRAR_TABAN=0, LLM_TPM={"sahte": 50000},
+    )
+    def test_yedege_gecen_cagri_yedegin_kovasindan_ayirir(self):
+        devreleri_sifirla()
+        sahte_saglayici.sifirla()
+        self.addCleanup(devreleri_sifirla)
+        self.addCleanup(sahte_saglayici.sifirla)
+        sahte_saglayici.planla("birincil", SahteHata(401))
+        sahte_saglayici.planla("yedek", "yedek yanıtı")
+
+        yonlendir(arka_uc_zinciri({}), lambda a: sohbet(a, "sistem", "kullanıcı", max_tokens=16))
+        kovalar = dict(LlmHizKovasi.objects.values_list("anahtar", "token"))
+        self.assertEqual(set(kovalar), {"sahte:birincil", "sahte:yedek"})
+        self.assertEqual(kovalar["sahte:birincil"], 50000)  # hata alan çağrının token'ı iade edildi
+        self.assertLess(kovalar["sahte:yedek"], 50000)
+
+    @override_settings(LLM_ESZAMANLI={"test_a": 1, "test_b": 1}, LLM_TEKRAR_TABAN=0)
+    def test_yedege_gecen_cagri_yedegin_eszamanlilik_yerini_tutar(self):
+        devreleri_sifirla()
+        self.addCleanup(devreleri_sifirla)
+        bos_yer = {}
+
+        def cagir(arka_uc):
+            # Semafor tek yerlik: doluysa bu çağrı o sağlayıcının yerini tutuyordur
+            for provider in ("test_a", "test_b"):
+                semafor = llm_zamanlayici.zamanlayici_al(provider)._semafor
+                bos_yer[(arka_uc.provider, provider)] = semafor.acquire(blocking=False)
+                if bos_yer[(arka_uc.provider, provider)]:
+                    semafor.release()
+            if arka_uc.provider == "test_a":
+                raise SahteHata(401)
+            return "tamam"
+
+        self.assertEqual(yonlendir([ArkaUc("test_a", "m"), ArkaUc("test_b", "m")], cagir), ("tamam", ArkaUc("test_b", "m")))
+        self.assertEqual(bos_yer, {
+            ("test_a", "test_a"): False, ("test_a", "test_b"): True,
+            ("test_b", "test_a"): True, ("test_b", "test_b"): False,
+        })
+
+
+class KalemKayitTest(TestCase):
+    tablo = [{"ad": "Kablo A", "miktar": "2", "birim_fiyat": "10"}, {"ad": "Bozuk"}, {"ad": "Kablo C"}]
+
+    def _birlestir(self, ihale):
+        return sartname_cetvel_eslestir.cetvel_ve_sartname_birlestir_ihale_kalem_kaydet(
+            ihale, cetvel_tablo=self.tablo, sartname_metni="", mevcut_kalemleri_sil=True,
+        )
+
+    def test_toplu_yazim_tek_transactionda_ve_sure_raporlu(self):
+        ihale = _ihale()
+        Kalem.objects.create(ihale=ihale, urun_adi="Eski", adet=1)
+        with CaptureQueriesContext(connection) as sorgular:
+            sonuc = self._birlestir(ihale)
+        self.assertEqual(sonuc["olusturulan"], 3)
+        kalem_yazimlari = [q["sql"] for q in sorgular if q["sql"].startswith('INSERT INTO "ihaleler_kalem"')]
+        self.assertEqual(len(kalem_yazimlari), 1)
+        self.assertEqual(sorted(ihale.kalemler.values_list("urun_adi", flat=True)), ["Bozuk", "Kablo A", "Kablo C"])
+        self.assertEqual(ihale.kalemler.get(urun_adi="Kablo A").toplam_fiyat, Decimal("20"))
+        self.assertEqual(ihale.kalemler.filter(kutuphane_urunu__isnull=True).count(), 0)
+        self.assertTrue({"katalog_eslestirme", "kayit"} <= set(sonuc["sureler"]))
+
+    def test_toplu_yazim_basarisizsa_satir_satir_yazilir(self):
+        ihale = _ihale()
+        kaydet = Kalem.save
+
+        def bozuk_satiri_reddet(kalem, *args, **kwargs):
+            if kalem.urun_adi == "Bozuk":
+                raise IntegrityError("bozuk satır")
+            return kaydet(kalem, *args, **kwargs)
+
+        with mock.patch.object(Kalem.objects, "bulk_create", side_effect=IntegrityError("toplu")), \
+                mock.patch.object(Kalem, "save", bozuk_satiri_reddet):
+            sonuc = self._birlestir(ihale)
+        self.assertEqual((sonuc["olusturulan"], sonuc["atlanan"]), (2, 1))
+        self.assertIn("Satır 2: bozuk satır", sonuc["hatalar"])
+        self.assertEqual(sorted(ihale.kalemler.values_list("urun_adi", flat=True)), ["Kablo A", "Kablo C"])
+
+    def test_katalog_hatasi_geri_alinir_kalemler_yine_yazilir(self):
+        ihale = _ihale()
+
+        def yarim_kalan_eslestirme(kalemler):
+            UrunKutuphanesi.objects.create(urun_adi="Yarım kalan")
+            raise RuntimeError("katalog bozuk")
+
+        with mock.patch.object(urun_katalog_eslestir, "kalemleri_katalogla_eslestir_toplu", yarim_kalan_eslestirme):
+            sonuc = self._birlestir(ihale)
+        self.assertEqual(sonuc["olusturulan"], 3)
+        self.assertIn("Katalog eşleştirme: katalog bozuk", sonuc["hatalar"])
+        self.assertFalse(UrunKutuphanesi.objects.exists())
+        self.assertEqual(ihale.kalemler.filter(kutuphane_urunu__isnull=True).count(), 3)
+
+
+class KatalogAramaTest(TestCase):
+    def setUp(self):
+        # Süreç içi bulanık indeks önceki testlerin ürünlerini taşımasın
+        katalog_benzerlik._indeks = None
+        self.ihale = _ihale()
+
+    def _kalem(self, ad, **alanlar):
+        return Kalem.objects.create(ihale=self.ihale, urun_adi=ad, adet=1, **alanlar)
+
+    def test_normalize_ad_indeksli_tek_sorguyla_eslesir(self):
+        UrunKutuphanesi.objects.create(urun_adi="İĞNE 21G", teknik_ozellikler_json={"renk": "yeşil"})
+        dogru = UrunKutuphanesi.objects.create(urun_adi="igne  21g", teknik_ozellikler_json={"renk": "mavi"})
+        self.assertEqual(dogru.urun_adi_norm, "igne 21g")
+        kalem = self._kalem("İğne 21G", teknik_ozellikler_json={"renk": "Mavi"})
+
+        with CaptureQueriesContext(connection) as sorgular:
+            self.assertTrue(kutuphane_urunu_bul_veya_olustur(kalem))
+        self.assertEqual(kalem.kutuphane_urunu, dogru)
+        self.assertIn('"urun_adi_norm" =', sorgular[0]["sql"])
+        self.assertEqual(UrunKutuphanesi.objects.count(), 2)
+
+    def test_eslesme_yoksa_yeni_urun_acilir(self):
+        kalem = self._kalem("Steril Gazlı Bez", maliyet_birim_fiyat=Decimal("4.50"))
+        self.assertTrue(kutuphane_urunu_bul_veya_olustur(kalem))
+        kalem.refresh_from_db()
+        self.assertEqual(kalem.kutuphane_urunu.urun_adi_norm, "steril gazli bez")
+        self.assertEqual(kalem.kutuphane_urunu.son_alis_fiyati, Decimal("4.50"))
+
+    def test_toplu_eslestirme_adaylari_tek_sorguda_alir(self):
+        mevcut = UrunKutuphanesi.objects.create(urun_adi="Kablo NYY")
+        kalemler = [Kalem(ihale=self.ihale, urun_adi=ad, adet=1) for ad in ("KABLO nyy", "Şırınga", "şırınga")]
+        # aday sorgusu + bulanık indeksin ilk kurulumu + yeni ürünlerin bulk_create'i
+        with self.assertNumQueries(3):
+            sonuc = urun_katalog_eslestir.kalemleri_katalogla_eslestir_toplu(kalemler)
+        self.assertEqual(sonuc, {"eslesen": 2, "bulanik_eslesen": 0, "yeni_urun": 1})
+        self.assertEqual(kalemler[0].kutuphane_urunu, mevcut)
+        self.assertEqual(kalemler[1].kutuphane_urunu_id, kalemler[2].kutuphane_urunu_id)
+
+
+class KatalogBenzerlikTest(TestCase):
+    def setUp(self):
+        katalog_benzerlik._indeks = None
+
+    def test_kanonik_ad_ve_sayilar(self):
+        self.assertEqual(kanonik_ad("Kablo NYY 3 x 2.5 mm²"), "3x2,5 kablo mm2 nyy")
+        self.assertEqual(kanonik_ad("NYY 3x2,5 kablo"), "3x2,5 kablo nyy")
+        self.assertEqual(katalog_benzerlik.sayilar("Kablo NYY 3 x 2.5 mm²"), ("3x2,5",))
+        self.assertEqual(katalog_benzerlik.sayilar("Sütür 3/0 İpek"), ("0", "3"))
+        self.assertEqual(katalog_benzerlik.sayilar("Enjektör 50ml"), katalog_benzerlik.sayilar("Enjektör 50 ml"))
+
+    def test_yazim_farki_eslesir(self):
+        indeks = KatalogIndeksi()
+        indeks.ekle(1, "NYY 3x2,5 kablo")
+        indeks.ekle(2, "NYY 3x4 kablo")
+        sonuc = indeks.benzerler("Kablo NYY 3 x 2.5 mm²", k=5, esik=benzerlik_esigi())
+        self.assertEqual([r["urun_id"] for r in sonuc], [1])
+
+    def test_olcusu_farkli_urunler_eslesmez(self):
+        ciftler = [
+            ("Enjektör 50 ml", "Enjektör 5 ml"),
+            ("Cerrahi Eldiven No:8", "Cerrahi Eldiven No:7"),
+            ("Foley Sonda 18 Fr", "Foley Sonda 16 Fr"),
+            ("Sütür 3/0 İpek", "Sütür 2/0 İpek"),
+            ("Kan Alma Tüpü 4 ml", "Kan Alma Tüpü 2 ml"),
+        ]
+        for katalogdaki, aranan in ciftler:
+            with self.subTest(aranan=aranan):
+                indeks = KatalogIndeksi()
+                indeks.ekle(1, katalogdaki)
+                self.assertEqual(indeks.benzerler(aranan, esik=0), [])
+                self.assertEqual(len(indeks.benzerler(katalogdaki, esik=0)), 1)
+
+    def test_commit_sonrasi_surum_yenilenir_indeks_yeniden_kurulur(self):
+        katalog_indeksi()
+        surum = katalog_benzerlik._surum()
+        with self.captureOnCommitCallbacks(execute=True):
+            urun = UrunKutuphanesi.objects.create(urun_adi="Foley Sonda 18 Fr")
+        self.assertNotEqual(katalog_benzerlik._surum(), surum)
+        self.assertEqual([r["urun_id"] for r in katalog_indeksi().benzerler("foley sonda 18fr")], [urun.pk])
+
+        # Başka süreç ürün ekleyip sürümü yeniledi: bu süreçteki indeks yeniden kurulur
+        UrunKutuphanesi.objects.bulk_create([UrunKutuphanesi(urun_adi="Foley Sonda 16 Fr")])
+        self.assertEqual(katalog_indeksi().benzerler("foley sonda 16fr"), [])
+        katalog_benzerlik._surumu_yenile()
+        self.assertEqual(len(katalog_indeksi().benzerler("foley sonda 16fr")), 1)
+
+
+class KeysetSayfaTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        hastane = Hastane.objects.create(ad="Hastane")
+        simdi = timezone.now()
+        # Aynı tarihli kayıtlar: sayfa sınırı eşit değerlerin ortasına düşse de atlama/tekrar olmamalı
+        for i in range(7):
+            _ihale(hastane, f"İhale {i}", tarih=simdi - timedelta(days=i // 3))
+
+    def _tum_sayfalar(self, qs, boyut):
+        toplanan, imlec = [], None
+        while True:
+            kayitlar, imlec = _keyset_sayfa(qs, imlec, boyut=boyut)
+            toplanan.extend(k.pk for k in kayitlar)
+            if not imlec:
+                return toplanan
+
+    def test_imlec_gidis_donusu_tum_kayitlari_bir_kez_verir(self):
+        for sira in (("tarih", "pk"), ("-tarih", "-pk")):
+            qs = Ihale.objects.order_by(*sira)
+            beklenen = list(qs.values_list("pk", flat=True))
+            for boyut in (1, 2, 3, 7, 10):
+                self.assertEqual(self._tum_sayfalar(qs, boyut), beklenen, (sira, boyut))
+
+    def test_son_sayfada_imlec_yok(self):
+        _, imlec = _keyset_sayfa(Ihale.objects.order_by("-tarih", "-pk"), None, boyut=7)
+        self.assertIsNone(imlec)
+
+    def test_gecersiz_imlec_ilk_sayfaya_doner(self):
+        self.assertIsNone(_imlec_coz("bozuk!!"))
+        qs = Ihale.objects.order_by("-tarih", "-pk")
+        self.assertEqual(_keyset_sayfa(qs, "bozuk!!", boyut=3)[0], _keyset_sayfa(qs, None, boyut=3)[0])
+
+
+class IhaleAramaTest(TestCase):
+    def test_turkce_buyuk_kucuk_harf_katlama(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            hastane = Hastane.objects.create(ad="Şişli Etfal")
+            ihale = _ihale(hastane, "Tıbbi Sarf Alımı")
+            Kalem.objects.create(ihale=ihale, urun_adi="İĞNE 21G", adet=100)
+            diger = _ihale(hastane, "Kırtasiye")
+            Kalem.objects.create(ihale=diger, urun_adi="iğne uçlu kalem", adet=5)
+        qs = Ihale.objects.all()
+        self.assertEqual(set(sirali_ihale_idleri("iğne", qs)), {ihale.pk, diger.pk})
+        self.assertEqual(set(sirali_ihale_idleri("İĞNE", qs)), {ihale.pk, diger.pk})
+        self.assertEqual(sirali_ihale_idleri("IGNE 21g", qs), [ihale.pk])
+        self.assertEqual(set(sirali_ihale_idleri("ŞİŞLİ", qs)), {ihale.pk, diger.pk})
+        self.assertEqual(sirali_ihale_idleri("tibbi", qs), [ihale.pk])
+
+
+class KalemGecmisTest(TestCase):
+    def test_urun_anahtari(self):
+        self.assertEqual(urun_anahtari("İĞNE  (21G)"), "igne 21g")
+        self.assertEqual(urun_anahtari("igne 21g"), "igne 21g")
+        self.assertEqual(urun_anahtari("3x2.5"), urun_anahtari("3x2,5"))
+        self.assertEqual(urun_anahtari(None), "")
+
+    def test_gecmis_normalize_adla_veya_katalogla_bulunur(self):
+        self.client.force_login(User.objects.create_user("kullanici"))
+        urun = UrunKutuphanesi.objects.create(urun_adi="Steril İğne")
+        hastane = Hastane.objects.create(ad="Hastane")
+        kalem = Kalem.objects.create(ihale=_ihale(hastane), urun_adi="İĞNE (21G)", adet=1, kutuphane_urunu=urun)
+        ayni_ad = Kalem.objects.create(ihale=_ihale(hastane), urun_adi="iğne 21g", adet=1)
+        ayni_katalog = Kalem.objects.create(ihale=_ihale(hastane), urun_adi="Steril iğne", adet=1, kutuphane_urunu=urun)
+        Kalem.objects.create(ihale=_ihale(hastane), urun_adi="İğne 22G", adet=1)
+
+        url = reverse("kalem_gecmis", args=[kalem.pk])
+        with CaptureQueriesContext(connection) as sorgular:
+            cevap = self.client.get(url)
+        self.assertEqual({k.pk for k in cevap.context["gecmis"]}, {kalem.pk, ayni_ad.pk})
+        self.assertTrue(any('"urun_adi_norm" =' in q["sql"] for q in sorgular))
+        cevap = self.client.get(url, {"grup": "katalog"})
+        self.assertEqual({k.pk for k in cevap.context["gecmis"]}, {kalem.pk, ayni_katalog.pk})
+
+
+# Gerçek commit / rollback gerekir: TestCase'in dış transaction'ı on_commit sırasını hiç boşaltmaz
+class AnalizOzetTest(TransactionTestCase):
+    def test_geri_alinan_transaction_sonraki_ozeti_engellemez(self):
+        hastane = Hastane.objects.create(ad="Hastane")
+        ihale = _ihale(hastane)
+        with transaction.atomic():
+            # Dış transaction'da başka bir on_commit bekliyor; geri alınan savepoint yalnızca kendi kaydını siler
+            sayaclari_gecersiz_kil()
+            try:
+                with transaction.atomic():
+                    Kalem.objects.create(ihale=ihale, urun_adi="Ürün A", adet=1)
+                    raise RuntimeError("geri al")
+            except RuntimeError:
+                pass
+            Kalem.objects.create(ihale=ihale, urun_adi="Ürün B", adet=2)
+        self.assertEqual(
+            list(UrunOzeti.objects.values_list("urun_adi_norm", "kalem_sayisi")),
+            [("urun b", 1)],
+        )
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class AnasayfaSayaclariTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_sayaclar_onbellekten_gelir_ve_ilgili_degisiklikte_yenilenir(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            hastane = Hastane.objects.create(ad="Hastane")
+            ihale = _ihale(hastane)
+            _ihale(hastane, "Doğrudan Temin", is_dogrudan_temin=True)
+        beklenen = {"toplam_ihale": 1, "toplam_dogrudan": 1, "aktif_kurum_sayisi": 1}
+        self.assertEqual(anasayfa_sayaclari(), beklenen)
+        with self.assertNumQueries(0):
+            self.assertEqual(anasayfa_sayaclari(), beklenen)
+
+        # Sayaçları etkilemeyen alan: önbellek geçerli kalır
+        with self.captureOnCommitCallbacks(execute=True):
+            ihale.ihale_adi = "Yeni ad"
+            ihale.save()
+        with self.assertNumQueries(0):
+            anasayfa_sayaclari()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ihale.durum = "Kazandik"
+            ihale.save(update_fields=["durum"])
+        self.assertEqual(anasayfa_sayaclari(), {"toplam_ihale": 0, "toplam_dogrudan": 1, "aktif_kurum_sayisi": 0})
+
+    def test_geri_alinan_degisiklik_sayaclari_gecersiz_kilmaz(self):
+        _ihale()
+        anasayfa_sayaclari()
+        try:
+            with transaction.atomic():
+                _ihale()
+                raise RuntimeError("geri al")
+        except RuntimeError:
+            pass
+        with self.assertNumQueries(0):
+            self.assertEqual(anasayfa_sayaclari()["toplam_ihale"], 1)
+
+
+class ListeDisaAktarTest(TestCase):
+    def test_csv_akisi_turkce_excel_bicimi(self):
+        satir = ["2026/1", "İhale", "Kurum", "", "01.01.2026", "", "Açık", "Hayır",
+                 "Kablo", Decimal("2.50"), "Metre", None, Decimal("1250.00")]
+        with mock.patch.object(liste_disa_aktar, "_CSV_GRUP", 2):
+            parcalar = list(csv_akisi([list(satir) for _ in range(3)]))
+        self.assertEqual(len(parcalar), 3)  # başlık + 2'li grup + kalan
+        self.assertTrue(parcalar[0].startswith("\ufeffİhale / İKN No;İhale Adı;"))
+        self.assertEqual(parcalar[2], "2026/1;İhale;Kurum;;01.01.2026;;Açık;Hayır;Kablo;2,50;Metre;;1250,00\r\n")
+
+    def test_liste_filtreyle_kalem_basina_satir_olarak_iner(self):
+        self.client.force_login(User.objects.create_user("kullanici"))
+        hastane = Hastane.objects.create(ad="Şişli Etfal")
+        ihale = _ihale(hastane, "Sarf")
+        Kalem.objects.create(ihale=ihale, urun_adi="İğne", adet=100, birim_fiyat=Decimal("1.25"))
+        Kalem.objects.create(ihale=ihale, urun_adi="Gazlı Bez", adet=3)
+        _ihale(hastane, "Kalemsiz")
+        _ihale(hastane, "Doğrudan", is_dogrudan_temin=True)
+        url = reverse("ihale_excel_indir")
+
+        cevap = self.client.get(url)
+        self.assertTrue(cevap.streaming)
+        satirlar = list(csv.reader(io.StringIO(b"".join(cevap.streaming_content).decode("utf-8-sig")), delimiter=";"))
+        self.assertEqual(len(satirlar), 4)
+        self.assertEqual(sorted((s[1], s[8]) for s in satirlar[1:]),
+                         [("Kalemsiz", ""), ("Sarf", "Gazlı Bez"), ("Sarf", "İğne")])
+        self.assertIn("1,25", next(s for s in satirlar if s[8] == "İğne"))
+
+        cevap = self.client.get(url, {"bicim": "xlsx", "dogrudan_temin": "1"})
+        self.assertEqual(cevap["Content-Disposition"], 'attachment; filename="dogrudan_teminler.xlsx"')
+        sayfa = openpyxl.load_workbook(io.BytesIO(b"".join(cevap.streaming_content))).active
+        degerler = list(sayfa.values)
+        self.assertEqual(list(degerler[0]), liste_disa_aktar.BASLIKLAR)
+        self.assertEqual([(r[1], r[7]) for r in degerler[1:]], [("Doğrudan", "Evet")])
+
+
+class FiyatCozTest(SimpleTestCase):
+    def test_gecerli_yazimlar(self):
+        ornekler = {
+            None: "0",
+            "": "0",
+            "   ": "0",
+            "12,5": "12.50",
+            "1.250,50": "1250.50",
+            "1 250,50": "1250.50",
+            "12.5": "12.50",
+            12.5: "12.50",
+            Decimal("3"): "3.00",
+            "0,004": "0.00",
+            "9999999999,99": "9999999999.99",
+        }
+        for deger, beklenen in ornekler.items():
+            self.assertEqual(fiyat_coz(deger), Decimal(beklenen), deger)
+
+    def test_gecersiz_degerler_none(self):
+        for deger in ("abc", "-1", "-0,01", "NaN", "Infinity", "1e400", "10000000000", "1,2,3"):
+            self.assertIsNone(fiyat_coz(deger), deger)
+
+
+class KalemFiyatTest(TestCase):
+    def setUp(self):
+        hastane = Hastane.objects.create(ad="Hastane")
+        self.ihale = _ihale(hastane)
+        self.diger = _ihale(hastane, "Diğer")
+        self.a = Kalem.objects.create(ihale=self.ihale, urun_adi="A", adet=Decimal("3"))
+        self.b = Kalem.objects.create(ihale=self.ihale, urun_adi="B", adet=Decimal("2"), toplam_fiyat=Decimal("5"))
+        self.c = Kalem.objects.create(ihale=self.diger, urun_adi="C", adet=Decimal("1.5"))
+
+    def test_toplam_teklif_bedeli_kalemlerden_yeniden_hesaplanir(self):
+        sonuc = kalem_fiyatlarini_kaydet({self.a.pk: Decimal("10.50"), self.c.pk: Decimal("3.33"), 999: Decimal("1")})
+        self.assertEqual(sonuc["ihaleler"], {self.ihale.pk: Decimal("36.50"), self.diger.pk: Decimal("5.00")})
+        self.a.refresh_from_db()
+        self.assertEqual((self.a.birim_fiyat, self.a.toplam_fiyat), (Decimal("10.50"), Decimal("31.50")))
+        self.ihale.refresh_from_db()
+        self.assertEqual(self.ihale.toplam_teklif_bedeli, Decimal("36.50"))
+
+    def test_json_uc_noktasi(self):
+        self.client.force_login(User.objects.create_user("kullanici"))
+        url = reverse("toplu_fiyat_guncelle_json")
+
+        def gonder(kalemler):
+            return self.client.post(url, json.dumps({"kalemler": kalemler}), content_type="application/json")
+
+        cevap = gonder([{"id": self.a.pk, "birim_fiyat": "1.250,50"}, {"id": 999, "birim_fiyat": "1"}])
+        self.assertEqual(cevap.status_code, 200)
+        self.assertEqual(cevap.json(), {
+            "kalemler": [{"id": self.a.pk, "birim_fiyat": "1250.50", "toplam_fiyat": "3751.50"}],
+            "ihaleler": {str(self.ihale.pk): "3756.50"},
+            "bulunamayan": [999],
+        })
+
+        # Bir satır geçersizse hiçbir satır yazılmaz
+        cevap = gonder([{"id": self.a.pk, "birim_fiyat": "1"}, {"id": self.b.pk, "birim_fiyat": "-3"}])
+        self.assertEqual(cevap.status_code, 400)
+        self.assertEqual(cevap.json()["hatalar"], [{"id": self.b.pk, "hata": "Geçersiz birim fiyat."}])
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.birim_fiyat, Decimal("1250.50"))
+        self.assertEqual(self.client.post(url, "{bozuk", content_type="application/json").status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+
+def _pdf_yaz(yol, sayfalar):
+    """Test PDF'i: metin sayfası (str), tablo sayfası (satır listesi) veya taranmış sayfa (None: yalnızca görsel)."""
+    belge = file_to_text.fitz.open()
+    for no, icerik in enumerate(sayfalar):
+        sayfa = belge.new_page()
+        if icerik is None:
+            # Her taranmış sayfanın görseli farklı (OCR önbelleği sayfa içeriğiyle anahtarlanır)
+            png = io.BytesIO()
+            Image.new("RGB", (200, 100), (no, no, no)).save(png, format="PNG")
+            sayfa.insert_image(sayfa.rect, stream=png.getvalue())
+        elif isinstance(icerik, str):
+            sayfa.insert_text((72, 72), icerik)
+        else:
+            for i, hucreler in enumerate(icerik):
+                for j, hucre in enumerate(hucreler):
+                    sayfa.insert_text((72 + 200 * j, 72 + 20 * i), hucre)
+    belge.save(yol)
+    belge.close()
+    return yol
+
+
+class PdfMetinTest(TestCase):
+    def setUp(self):
+        dizin = tempfile.TemporaryDirectory()
+        self.addCleanup(dizin.cleanup)
+        self.dizin = dizin.name
+
+    def test_hizli_yol_sira_korur_tablo_sayfasini_pdfplumber_okur(self):
+        tablo = [("Kalem", "Miktar"), ("Kablo", "10"), ("Priz", "4"), ("Sigorta", "2")]
+        yol = _pdf_yaz(os.path.join(self.dizin, "belge.pdf"), ["Birinci sayfa", tablo, "", "Son sayfa"])
+        with mock.patch.object(file_to_text.pdfplumber, "open", wraps=file_to_text.pdfplumber.open) as plumber:
+            sayfalar = list(file_to_text.iter_pdf_pages(yol))
+        self.assertEqual(sayfalar[0], "Birinci sayfa")
+        self.assertIn("Kablo", sayfalar[1])
+        self.assertEqual(sayfalar[2:], ["", "Son sayfa"])
+        self.assertEqual(plumber.call_args.kwargs["pages"], [2])
+        self.assertEqual(file_to_text.extract_pdf(yol), f"Birinci sayfa\n{sayfalar[1]}\nSon sayfa\n")
+
+    @override_settings(PDF_PARALEL_SAYFA_ESIGI=2, PDF_ISCI_SAYISI=2)
+    def test_uzun_belge_araliklarla_paralel_okunur(self):
+        yol = _pdf_yaz(os.path.join(self.dizin, "uzun.pdf"), [f"Sayfa {i}" for i in range(20)])
+        self.assertEqual(list(file_to_text.iter_pdf_pages(yol)), [f"Sayfa {i}" for i in range(20)])
+
+
+@override_settings(PDF_ISCI_SAYISI=1)
+class PdfOcrTest(TestCase):
+    def setUp(self):
+        dizin = tempfile.TemporaryDirectory()
+        self.addCleanup(dizin.cleanup)
+        self.yol = _pdf_yaz(os.path.join(dizin.name, "taranmis.pdf"), ["Metin sayfasi", None, None])
+
+    def test_taranmis_sayfalar_ocrlanir_ve_onbellekten_tekrar_okunur(self):
+        with mock.patch.object(file_to_text, "_ocr_sayfa", side_effect=lambda p, no, *a: f"ocr {no}") as ocr:
+            self.assertEqual(list(file_to_text.iter_pdf_pages(self.yol)), ["Metin sayfasi", "ocr 1", "ocr 2"])
+            self.assertEqual(ocr.call_count, 2)
+            ocr.reset_mock()
+            self.assertEqual(list(file_to_text.iter_pdf_pages(self.yol)), ["Metin sayfasi", "ocr 1", "ocr 2"])
+            ocr.assert_not_called()
+        self.assertEqual(LlmOnbellek.objects.filter(provider="tesseract").count(), 2)
+
+    def test_sayfa_hatasi_diger_sayfalari_etkilemez(self):
+        def ocr(path, no, *args):
+            if no == 1:
+                raise RuntimeError("TesseractError: bozuk")
+            return f"ocr {no}"
+
+        with mock.patch.object(file_to_text, "_ocr_sayfa", ocr):
+            self.assertEqual(list(file_to_text.iter_pdf_pages(self.yol)), ["Metin sayfasi", "", "ocr 2"])
+        self.assertEqual(LlmOnbellek.objects.filter(provider="tesseract").count(), 1)
+
+    def test_ocr_kapaliyken_taranmis_sayfa_bos_doner(self):
+        with mock.patch.object(file_to_text, "_ocr_sayfa") as ocr:
+            self.assertEqual(list(file_to_text.iter_pdf_pages(self.yol, ocr=False)), ["Metin sayfasi", "", ""])
+        ocr.assert_not_called()
+
+
+class TabloAyristirTest(TestCase):
+    cetvel = [
+        ["BİRİM FİYAT TEKLİF CETVELİ", None, None, None, None, None],
+        ["Sıra No", "Malzemenin Adı", "Birimi", "Miktarı", "Teklif Edilen Birim Fiyat", "Tutarı"],
+        [1, "Enjektör 5 ml", "Adet", 1000, 1.25, 1250],
+        [2, "Cerrahi Eldiven No:8", "Çift", "500", "2,50", "1.250,00"],
+        [None, "TIBBİ SARF", None, None, None, None],
+        [3, "Foley Sonda 18 Fr", "adet", "12 adet", None, None],
+        [None, "GENEL TOPLAM", None, None, None, "2.500,00"],
+    ]
+
+    def test_sayi_coz(self):
+        ornekler = {
+            "1.250,50": "1250.50", "1250.5": "1250.5", "1.250": "1250", "1.250.000": "1250000",
+            "12 adet": "12", "1.250,00 TL": "1250.00", 7: "7", 2.5: "2.5", "-3": "-3", "0,5": "0.5",
+        }
+        for deger, beklenen in ornekler.items():
+            self.assertEqual(sayi_coz(deger), Decimal(beklenen), deger)
+        for deger in (None, True, "", "abc", "3x2,5", "No:8"):
+            self.assertIsNone(sayi_coz(deger), deger)
+
+    def test_baslikli_tablo_toplam_ve_grup_satirlari_atlanir(self):
+        sonuc = tablo_ayristir(self.cetvel)
+        self.assertEqual(sonuc["baslik_satiri"], 1)
+        self.assertEqual(sonuc["sutunlar"], {"sira": 0, "ad": 1, "birim": 2, "miktar": 3, "birim_fiyat": 4, "toplam": 5})
+        self.assertEqual(sonuc["kalemler"], [
+            {"ad": "Enjektör 5 ml", "miktar": "1000", "birim": "Adet", "birim_fiyat": "1,25", "toplam": "1250"},
+            {"ad": "Cerrahi Eldiven No:8", "miktar": "500", "birim": "Çift", "birim_fiyat": "2,5", "toplam": "1250"},
+            {"ad": "Foley Sonda 18 Fr", "miktar": "12", "birim": "adet", "birim_fiyat": "", "toplam": ""},
+        ])
+        self.assertGreaterEqual(sonuc["guven"], 0.75)
+
+    def test_basliksiz_tablo_sutun_profilinden_cozulur_guveni_basliklidan_dusuktur(self):
+        veri = [[i, f"Uzun ürün adı {i} steril tek kullanımlık", "Adet", 10 * i, 2, 20 * i] for i in range(1, 8)]
+        sonuc = tablo_ayristir(veri)
+        self.assertIsNone(sonuc["baslik_satiri"])
+        self.assertEqual(sonuc["sutunlar"], {"sira": 0, "birim": 2, "ad": 1, "miktar": 3, "birim_fiyat": 4, "toplam": 5})
+        self.assertEqual(len(sonuc["kalemler"]), 7)
+        self.assertLess(sonuc["guven"], tablo_ayristir(self.cetvel)["guven"])
+
+    def test_excel_kural_tabanli_okunur_guven_dusukse_visiona_duser(self):
+        dizin = tempfile.TemporaryDirectory()
+        self.addCleanup(dizin.cleanup)
+        wb = openpyxl.Workbook()
+        wb.active.title = "Kapak"
+        wb.active.append(["İhale kayıt numarası", "2026/123"])
+        sayfa = wb.create_sheet("Cetvel")
+        for satir in self.cetvel:
+            sayfa.append(satir)
+        wb.create_sheet("Notlar").append(["Teklifler KDV hariç verilecektir."])
+        yol = os.path.join(dizin.name, "cetvel.xlsx")
+        wb.save(yol)
+
+        tablo = excel_cetvel_ayristir(yol)
+        self.assertEqual([s["kalem"] for s in tablo["sayfalar"]], [0, 3, 0])
+        with mock.patch.object(parsing_service, "analiz_et_tum_sayfalar") as vision:
+            sonuc = parsing_service.extract_cetvel_layout_based(yol, tum_sayfalar=True)
+        vision.assert_not_called()
+        self.assertEqual((sonuc["kaynak"], len(sonuc["kalemler"])), ("excel_tablo", 3))
+
+        vision_sonucu = {"basari": True, "tablo": [{"ad": "Vision kalemi", "miktar": "1"}], "sayfa_sonuclari": []}
+        with override_settings(EXCEL_CETVEL_GUVEN_ESIGI=0.99), \
+                mock.patch.object(parsing_service, "analiz_et_tum_sayfalar", return_value=vision_sonucu):
+            sonuc = parsing_service.extract_cetvel_layout_based(yol, tum_sayfalar=True)
+        self.assertEqual(sonuc["kaynak"], "vision")
+        self.assertEqual(sonuc["guven"], tablo["guven"])
+
+
+def _docx_yaz(yol, *tablolar):
+    belge = docx.Document()
+    for tablo in tablolar:
+        belge.add_paragraph("Tablo")
+        t = belge.add_table(rows=0, cols=len(tablo[0]))
+        for satir in tablo:
+            hucreler = t.add_row().cells
+            for hucre, deger in zip(hucreler, satir):
+                hucre.text = str(deger)
+    belge.save(yol)
+    return yol
+
+
+class WordCetvelTest(TestCase):
+    baslik = ["Sıra No", "Malzemenin Adı", "Birimi", "Miktarı"]
+    # Başlıksız, miktar sütunu yarı metin: cetvele benzer ama kural tabanlı sınıflanamaz
+    belirsiz = [["Eldiven", "3"], ["Maske", "9"], ["Bone", "4"], ["Önlük", "talep halinde"], ["Galoş", "talep halinde"]]
+
+    def setUp(self):
+        dizin = tempfile.TemporaryDirectory()
+        self.addCleanup(dizin.cleanup)
+        self.yol = _docx_yaz(
+            os.path.join(dizin.name, "cetvel.docx"),
+            [self.baslik, [1, "Enjektör 5 ml", "Adet", 100], [2, "Enjektör 10 ml", "Adet", 50]],
+            self.belirsiz,
+            [self.baslik, [3, "Foley Sonda 18 Fr", "Adet", 12]],
+        )
+
+    def test_tablolar_siniflanir_belirsiz_tablonun_yeri_tutulur(self):
+        sonuc = word_cetvel_ayristir(self.yol)
+        self.assertEqual([t["kabul"] for t in sonuc["tablolar"]], [True, False, True])
+        self.assertEqual([k["ad"] for k in sonuc["kalemler"]], ["Enjektör 5 ml", "Enjektör 10 ml", "Foley Sonda 18 Fr"])
+        self.assertEqual([(b["tablo"], b["konum"]) for b in sonuc["belirsiz_tablolar"]], [(1, 2)])
+        self.assertTrue(sonuc["belirsiz_tablolar"][0]["metin"].startswith("Eldiven\t3\nMaske\t9\n"))
+
+    def test_llm_satirlari_tablonun_yerine_eklenir(self):
+        def llm(metin, provider="openai"):
+            return [{"ad": f"LLM {satir.split(chr(9))[0]}", "miktar": "1"} for satir in metin.splitlines()]
+
+        with mock.patch.object(parsing_service, "_cetvel_from_word_text", side_effect=llm) as cagri:
+            sonuc = parsing_service.extract_cetvel_layout_based(self.yol)
+        cagri.assert_called_once()
+        self.assertEqual(sonuc["kaynak"], "word_tablo")
+        self.assertEqual([k["ad"] for k in sonuc["kalemler"]], [
+            "Enjektör 5 ml", "Enjektör 10 ml", "LLM Eldiven", "LLM Maske", "LLM Bone", "LLM Önlük", "LLM Galoş",
+            "Foley Sonda 18 Fr",
+        ])
+
+
+class LlmIstemciTest(SimpleTestCase):
+    gercek_olustur = staticmethod(llm_istemci._olustur)
+
+    def setUp(self):
+        # Havuz süreç genelinde; test kendi boş sözlüğüyle çalışır
+        self.enterContext(mock.patch.dict(llm_istemci._istemciler, clear=True))
+        self.olustur = self.enterContext(
+            mock.patch.object(llm_istemci, "_olustur", side_effect=lambda provider, api_key: mock.Mock())
+        )
+
+    def test_ayni_anahtar_ayni_istemciyi_paylasir(self):
+        ilk = llm_istemci.istemci_al("openai", "anahtar-1")
+        self.assertIs(llm_istemci.istemci_al("openai", "anahtar-1"), ilk)
+        self.assertIsNot(llm_istemci.istemci_al("openai", "anahtar-2"), ilk)
+        self.assertIsNot(llm_istemci.istemci_al("anthropic", "anahtar-1"), ilk)
+        self.assertEqual(self.olustur.call_count, 3)
+        # API anahtarı havuz anahtarında düz tutulmaz
+        self.assertNotIn("anahtar-1", repr(list(llm_istemci._istemciler)))
+
+    def test_eszamanli_ilk_cagrilar_tek_istemci_kurar(self):
+        alinanlar = []
+        baslat = threading.Barrier(8)
+
+        def al():
+            baslat.wait()
+            alinanlar.append(llm_istemci.istemci_al("openai", "anahtar"))
+
+        threadler = [threading.Thread(target=al) for _ in range(8)]
+        for t in threadler:
+            t.start()
+        for t in threadler:
+            t.join()
+        self.assertEqual(self.olustur.call_count, 1)
+        self.assertEqual(len({id(i) for i in alinanlar}), 1)
+
+    def test_catallanan_surec_istemcileri_yeniden_kurar(self):
+        ebeveyn = llm_istemci.istemci_al("openai", "anahtar")
+        with mock.patch.object(llm_istemci, "_sahip_pid", -1):
+            cocuk = llm_istemci.istemci_al("openai", "anahtar")
+        self.assertIsNot(cocuk, ebeveyn)
+        ebeveyn.close.assert_not_called()
+
+    def test_kapat_havuzlari_kapatir_ve_bosaltir(self):
+        istemciler = [llm_istemci.istemci_al("openai", "a"), llm_istemci.istemci_al("anthropic", "b")]
+        istemciler[0].close.side_effect = RuntimeError("zaten kapalı")
+        llm_istemci.istemcileri_kapat()
+        for istemci in istemciler:
+            istemci.close.assert_called_once()
+        self.assertEqual(llm_istemci._istemciler, {})
+
+    def test_bilinmeyen_saglayici_reddedilir(self):
+        with self.assertRaises(ValueError):
+            self.gercek_olustur("bilinmeyen", "anahtar")
+
+    @unittest.skipUnless(
+        all(importlib.util.find_spec(m) for m in ("openai", "httpx")), "openai/httpx paketleri yüklü değil"
+    )
+    @override_settings(LLM_BAGLANTI_ZAMAN_ASIMI=3, LLM_OKUMA_ZAMAN_ASIMI=45, LLM_BAGLANTI_HAVUZU=4)
+    def test_istemci_acik_zaman_asimi_ve_tekrarsiz_kurulur(self):
+        istemci = self.gercek_olustur("openai", "anahtar")
+        self.addCleanup(istemci.close)
+        self.assertEqual((istemci.timeout.connect, istemci.timeout.read), (3.0, 45.0))
+        self.assertEqual(istemci.max_retries, 0)
+
+
+class PipelineIzlemeTest(TestCase):
+    def test_etkin_calisma_yokken_hicbir_sey_yazilmaz(self):
+        with asama("cetvel_cikarma", girdi_bayt=10) as olcum:
+            olcum["cikti_bayt"] = 5
+        asama_kaydet("kota_bekleme", 1.0)
+        self.assertEqual(olcum, {"ad": "cetvel_cikarma", "ust": "", "girdi_bayt": 10, "cikti_bayt": 5})
+        self.assertFalse(PipelineCalismasi.objects.exists())
+
+    @override_settings(LLM_FIYATLARI={"sahte:m": [1.0, 2.0]})
+    def test_ic_ice_asamalar_ust_asamaya_baglanir_ve_kaydedilir(self):
+        ihale = _ihale()
+        with calisma_izle(ihale, provider="sahte") as calisma:
+            with asama("sartname_eslestirme", girdi_bayt=100):
+                with asama("llm_cagrisi", provider="sahte", model="m", girdi_token=1000, cikti_token=500):
+                    pass
+                asama_kaydet("kota_bekleme", 0.5, provider="sahte", model="m")
+            with self.assertRaises(ValueError), asama("cetvel_cikarma"):
+                raise ValueError("bozuk")
+            calisma.basari = True
+
+        ozet = calisma.ozet()
+        self.assertEqual(ozet["llm"]["cagri"], 1)
+        self.assertEqual(ozet["llm"]["maliyet_usd"], 0.002)
+        self.assertEqual(ozet["llm_asamalar"]["sartname_eslestirme"]["girdi_token"], 1000)
+        self.assertEqual(ozet["asamalar"]["kota_bekleme"]["ust"], "sartname_eslestirme")
+        self.assertEqual(ozet["asamalar"]["cetvel_cikarma"]["hata"], 1)
+
+        kayit = PipelineCalismasi.objects.get(pk=ozet["calisma_id"])
+        self.assertEqual((kayit.ihale_id, kayit.basari, kayit.llm_cagri, kayit.girdi_token), (ihale.pk, True, 1, 1000))
+        asamalar = list(kayit.asamalar.order_by("sira").values_list("ad", "ust", "hata"))
+        self.assertEqual(asamalar, [
+            ("llm_cagrisi", "sartname_eslestirme", ""),
+            ("kota_bekleme", "sartname_eslestirme", ""),
+            ("sartname_eslestirme", "", ""),
+            ("cetvel_cikarma", "", "ValueError: bozuk"),
+        ])
+
+    def test_thread_havuzundaki_asamalar_ayni_calismaya_yazilir(self):
+        def isle(n):
+            with asama("vision_sayfa", girdi_bayt=n):
+                return n
+
+        with calisma_izle(_ihale()) as calisma, asama("cetvel_cikarma"):
+            self.assertEqual(LlmZamanlayici("sahte", eszamanli=3).haritala(isle, [1, 2, 3]), [1, 2, 3])
+            # Sarmalanmamış thread bağlamı taşımaz
+            yalin = threading.Thread(target=isle, args=(4,))
+            yalin.start()
+            yalin.join()
+            sarili = threading.Thread(target=baglamda(isle), args=(5,))
+            sarili.start()
+            sarili.join()
+
+        sayfalar = sorted((k["girdi_bayt"], k["ust"]) for k in calisma.asamalar if k["ad"] == "vision_sayfa")
+        self.assertEqual(sayfalar, [(1, "cetvel_cikarma"), (2, "cetvel_cikarma"), (3, "cetvel_cikarma"),
+                                    (5, "cetvel_cikarma")])
+
+    def test_kayit_hatasi_pipeline_sonucunu_bozmaz(self):
+        with mock.patch("ihaleler.utils.pipeline_izleme.CalismaOlcumu.kaydet", side_effect=RuntimeError("db yok")):
+            with self.assertLogs("ihaleler.parsing", "WARNING"), calisma_izle(_ihale()) as calisma:
+                with asama("cetvel_cikarma"):
+                    pass
+        self.assertIsNone(calisma.kayit_id)
+        self.assertIsNotNone(calisma.sure)
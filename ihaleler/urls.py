@@ -7,8 +7,10 @@ urlpatterns = [
     path('dogrudan-temin/', views.dogrudan_temin_listesi, name='dogrudan_temin_listesi'),
     path('liste/', views.liste_filtre, name='liste_filtre'),
     path('dosya-yukleme/', views.dosya_yukleme, name='dosya_yukleme'),
+    path('islem/<int:pk>/durum/', views.dosya_islem_durumu, name='dosya_islem_durumu'),
     path('ihale/sil/<int:pk>/', views.ihale_sil, name='ihale_sil'),
     path('ihale/<int:pk>/incele/', views.ihale_detay, name='ihale_detay'),
+    path('ihale/<int:pk>/kalemler/', views.ihale_kalemleri, name='ihale_kalemleri'),
     path('ihale/<int:pk>/excel-indir/', views.ihale_detay_excel_indir, name='ihale_detay_excel_indir'),
     path('ihale/<int:pk>/kalem-ekle/', views.kalem_ekle, name='kalem_ekle'),
     path('kalem/<int:pk>/gecmis/', views.kalem_gecmis, name='kalem_gecmis'),
@@ -16,6 +18,7 @@ urlpatterns = [
     path('ihale/<int:pk>/verilen-teklif-yukle/', views.ihale_verilen_teklif_yukle, name='ihale_verilen_teklif_yukle'),
     path('ihale/excel-indir/', views.ihale_excel_indir, name='ihale_excel_indir'),
     path('toplu-fiyat-guncelle/', views.toplu_fiyat_guncelle, name='toplu_fiyat_guncelle'),
+    path('toplu-fiyat-guncelle/json/', views.toplu_fiyat_guncelle_json, name='toplu_fiyat_guncelle_json'),
 
     path('profilim/', views.profilim, name='profilim'),
     path('analiz/', views.analiz_sayfasi, name='analiz'),
@@ -0,0 +1,234 @@
+"""
+Analiz sayfası özet tabloları (IhaleSonucOzeti, HastaneOzeti, UrunOzeti, AylikOzet).
+
+Özetler her istekte yeniden hesaplanmaz: Ihale/Kalem kaydı ve silinmesinde (ihaleler.signals)
+etkilenen anahtarlar (ihale, hastane, ay, normalize ürün adı) planlanır ve transaction commit'inde
+yalnızca o anahtarların satırları indeksli toplam sorgularıyla yeniden yazılır. bulk_create / bulk_update /
+QuerySet.update sinyal üretmez; bu yollarla yazan kod ozet_planla'yı kendisi çağırır.
+`manage.py analiz_ozetleri` tüm tabloları baştan kurar.
+
+Kullanım:
+    from ihaleler.utils.analiz_ozet import ozet_planla, ozetleri_yeniden_kur
+
+    ozet_planla(urun=["nyy 3x2 5 kablo"])   # commit'te UrunOzeti satırı yenilenir
+    ozetleri_yeniden_kur()                    # {"ihale": 812, "hastane": 40, "urun": 9312, "ay": 37}
+"""
+import logging
+import threading
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+logger = logging.getLogger("ihaleler.parsing")
+
+_PARCA = 500
+_SIFIR = Decimal("0")
+
+_bekleyen = threading.local()
+
+
+def ay_basi(tarih):
+    """İhale tarihinin (yerel saatle) ayının ilk günü."""
+    if tarih is None:
+        return None
+    if timezone.is_aware(tarih):
+        tarih = timezone.localtime(tarih)
+    return tarih.date().replace(day=1)
+
+
+def _ay_araligi(ay):
+    from django.conf import settings
+    bas = datetime(ay.year, ay.month, 1)
+    son = datetime(ay.year + (ay.month == 12), ay.month % 12 + 1, 1)
+    if settings.USE_TZ:
+        bas, son = timezone.make_aware(bas), timezone.make_aware(son)
+    return bas, son
+
+
+def _parcalar(ogeler):
+    ogeler = list(ogeler)
+    for bas in range(0, len(ogeler), _PARCA):
+        yield ogeler[bas:bas + _PARCA]
+
+
+def ihale_sonuc_degerleri(ihale) -> dict:
+    """
+    İhalenin analiz değerleri: bizim teklif (yoksa toplam teklif bedeli), kazanan fiyat,
+    kazanılanlarda net kâr (satış - maliyet), kaybedilenlerde teklifin kazanana göre yüzde farkı.
+    """
+    bizim = ihale.bizim_teklif or ihale.toplam_teklif_bedeli or _SIFIR
+    kazanan = ihale.kazanan_fiyat or _SIFIR
+    net_kar = None
+    fark_yuzde = None
+    if ihale.durum == "Kazandik" and ihale.toplam_maliyet is not None:
+        satis = ihale.satis_fiyati or ihale.toplam_teklif_bedeli or _SIFIR
+        net_kar = satis - (ihale.toplam_maliyet or _SIFIR)
+    elif ihale.durum == "Kaybettik" and kazanan and bizim:
+        fark_yuzde = ((bizim - kazanan) / bizim * 100).quantize(Decimal("0.01"))
+    return {"bizim_teklif": bizim, "kazanan_fiyat": kazanan, "net_kar": net_kar, "fark_yuzde": fark_yuzde}
+
+
+def ihale_ozetlerini_hesapla(ihale_idleri) -> int:
+    """IhaleSonucOzeti satırlarını yeniden yazar (silinmiş ihalelerin satırı kaldırılır)."""
+    from ihaleler.models import Ihale, IhaleSonucOzeti
+    yazilan = 0
+    for parca in _parcalar(sorted(set(ihale_idleri))):
+        satirlar = [
+            IhaleSonucOzeti(ihale_id=i.pk, tarih=i.tarih, durum=i.durum, **ihale_sonuc_degerleri(i))
+            for i in Ihale.objects.filter(pk__in=parca).only(
+                "pk", "tarih", "durum", "bizim_teklif", "toplam_teklif_bedeli", "kazanan_fiyat", "toplam_maliyet", "satis_fiyati",
+            )
+        ]
+        with transaction.atomic():
+            IhaleSonucOzeti.objects.filter(ihale_id__in=parca).delete()
+            IhaleSonucOzeti.objects.bulk_create(satirlar)
+        yazilan += len(satirlar)
+    return yazilan
+
+
+def hastane_ozetlerini_hesapla(hastane_idleri) -> int:
+    """HastaneOzeti satırlarını kurumun ihalelerinden (hastane FK indeksiyle) yeniden yazar."""
+    from ihaleler.models import HastaneOzeti, Ihale
+    yazilan = 0
+    for parca in _parcalar(sorted(set(hastane_idleri))):
+        toplamlar = (
+            Ihale.objects.filter(hastane_id__in=parca).order_by().values("hastane_id").annotate(
+                ihale_sayisi=Count("pk"),
+                dogrudan_temin_sayisi=Count("pk", filter=Q(is_dogrudan_temin=True)),
+                kazanilan=Count("pk", filter=Q(durum="Kazandik")),
+                kaybedilen=Count("pk", filter=Q(durum="Kaybettik")),
+                toplam_teklif=Sum("toplam_teklif_bedeli"),
+            )
+        )
+        satirlar = [
+            HastaneOzeti(**{**t, "toplam_teklif": t["toplam_teklif"] or _SIFIR})
+            for t in toplamlar
+        ]
+        with transaction.atomic():
+            HastaneOzeti.objects.filter(hastane_id__in=parca).delete()
+            HastaneOzeti.objects.bulk_create(satirlar)
+        yazilan += len(satirlar)
+    return yazilan
+
+
+def urun_ozetlerini_hesapla(urun_anahtarlari) -> int:
+    """UrunOzeti satırlarını Kalem.urun_adi_norm indeksiyle yeniden yazar; görünen ad en son kalemin adıdır."""
+    from ihaleler.models import Kalem, UrunOzeti
+    yazilan = 0
+    for parca in _parcalar(sorted({a for a in urun_anahtarlari if a})):
+        toplamlar = list(
+            Kalem.objects.filter(urun_adi_norm__in=parca).order_by().values("urun_adi_norm").annotate(
+                kalem_sayisi=Count("pk"), toplam_adet=Sum("adet"), toplam_tutar=Sum("toplam_fiyat"), son=Max("pk"),
+            )
+        )
+        adlar = dict(Kalem.objects.filter(pk__in=[t["son"] for t in toplamlar]).values_list("pk", "urun_adi"))
+        satirlar = [
+            UrunOzeti(
+                urun_adi_norm=t["urun_adi_norm"],
+                urun_adi=adlar.get(t["son"], t["urun_adi_norm"])[:255],
+                kalem_sayisi=t["kalem_sayisi"],
+                toplam_adet=t["toplam_adet"] or _SIFIR,
+                toplam_tutar=t["toplam_tutar"] or _SIFIR,
+            )
+            for t in toplamlar
+        ]
+        with transaction.atomic():
+            UrunOzeti.objects.filter(urun_adi_norm__in=parca).delete()
+            UrunOzeti.objects.bulk_create(satirlar)
+        yazilan += len(satirlar)
+    return yazilan
+
+
+def ay_ozetlerini_hesapla(aylar) -> int:
+    """AylikOzet satırlarını IhaleSonucOzeti (tarih indeksi) üzerinden yeniden yazar; önce ihale özetleri güncel olmalı."""
+    from ihaleler.models import AylikOzet, IhaleSonucOzeti
+    yazilan = 0
+    for ay in sorted({a for a in aylar if a}):
+        bas, son = _ay_araligi(ay)
+        t = IhaleSonucOzeti.objects.filter(tarih__gte=bas, tarih__lt=son).aggregate(
+            ihale_sayisi=Count("pk"),
+            kazanilan=Count("pk", filter=Q(durum="Kazandik")),
+            kaybedilen=Count("pk", filter=Q(durum="Kaybettik")),
+            toplam_teklif=Sum("bizim_teklif"),
+            net_kar=Sum("net_kar"),
+        )
+        with transaction.atomic():
+            AylikOzet.objects.filter(ay=ay).delete()
+            if t["ihale_sayisi"]:
+                AylikOzet.objects.create(
+                    ay=ay,
+                    ihale_sayisi=t["ihale_sayisi"],
+                    kazanilan=t["kazanilan"],
+                    kaybedilen=t["kaybedilen"],
+                    toplam_teklif=t["toplam_teklif"] or _SIFIR,
+                    net_kar=t["net_kar"] or _SIFIR,
+                )
+                yazilan += 1
+    return yazilan
+
+
+def ozetleri_yeniden_kur() -> dict:
+    """Tüm özet tablolarını baştan hesaplar (yönetim komutu / tutarsızlık şüphesi)."""
+    from ihaleler.models import AylikOzet, HastaneOzeti, Ihale, IhaleSonucOzeti, Kalem, UrunOzeti
+    with transaction.atomic():
+        for model in (IhaleSonucOzeti, HastaneOzeti, UrunOzeti, AylikOzet):
+            model.objects.all().delete()
+        sonuc = {
+            "ihale": ihale_ozetlerini_hesapla(Ihale.objects.values_list("pk", flat=True)),
+            "hastane": hastane_ozetlerini_hesapla(Ihale.objects.order_by().values_list("hastane_id", flat=True).distinct()),
+            "urun": urun_ozetlerini_hesapla(Kalem.objects.order_by().values_list("urun_adi_norm", flat=True).distinct()),
+        }
+        aylar = {ay_basi(t) for t in IhaleSonucOzeti.objects.values_list("tarih", flat=True).iterator()}
+        sonuc["ay"] = ay_ozetlerini_hesapla(aylar)
+    return sonuc
+
+
+def _kuyrukta(fonksiyon) -> bool:
+    """fonksiyon bulunulan transaction'ın on_commit kuyruğunda mı? (commit / geri alma kuyruğu boşaltır)"""
+    return any(kayit[1] is fonksiyon for kayit in connection.run_on_commit)
+
+
+def _bekleyenler():
+    """
+    Bulunulan transaction'ın (commit'te çalışacak fonksiyon, bekleyen anahtarlar) çifti. Fonksiyon on_commit
+    kuyruğunda değilse (commit edildi, geri alındı ya da henüz planlanmadı) yeni çift açılır; geri alınan
+    transaction'ın anahtarları sonraki transaction'a taşınmaz.
+    """
+    kayit = getattr(_bekleyen, "kayit", None)
+    if kayit is None or not _kuyrukta(kayit[0]):
+        anahtarlar = {"ihale": set(), "hastane": set(), "urun": set(), "ay": set()}
+        kayit = _bekleyen.kayit = (lambda: _bosalt(anahtarlar), anahtarlar)
+    return kayit
+
+
+def _bosalt(anahtarlar):
+    if not any(anahtarlar.values()):
+        return
+    try:
+        # Aylık özet ihale özetlerinden okunur: sıra önemli
+        ihale_ozetlerini_hesapla(anahtarlar["ihale"])
+        hastane_ozetlerini_hesapla(anahtarlar["hastane"])
+        urun_ozetlerini_hesapla(anahtarlar["urun"])
+        ay_ozetlerini_hesapla(anahtarlar["ay"])
+    except Exception:
+        logger.exception(
+            "Analiz özetleri güncellenemedi | %s",
+            {k: len(v) for k, v in anahtarlar.items()},
+        )
+
+
+def ozet_planla(ihale=(), hastane=(), urun=(), ay=()):
+    """
+    Etkilenen özet anahtarlarını transaction commit'inde yeniden hesaplanmak üzere kaydeder
+    (aynı transaction içindeki tekrarlar tek hesaplamaya iner). Transaction dışında hemen çalışır.
+    """
+    calistir, anahtarlar = _bekleyenler()
+    anahtarlar["ihale"].update(i for i in ihale if i)
+    anahtarlar["hastane"].update(h for h in hastane if h)
+    anahtarlar["urun"].update(u for u in urun if u)
+    anahtarlar["ay"].update(a for a in ay if a)
+    if any(anahtarlar.values()) and not _kuyrukta(calistir):
+        transaction.on_commit(calistir)
@@ -0,0 +1,83 @@
+"""
+Anasayfa sayaçları (açık ihale, açık doğrudan temin, aktif kurum) için önbellek.
+
+Sayaçlar Django cache'inde sürüm numaralı anahtarla tutulur. Bir ihale eklendiğinde/silindiğinde ya da
+durum, is_dogrudan_temin veya hastane alanı değiştiğinde (ihaleler.signals) sürüm artırılır; eski anahtar
+okunmaz hâle gelir ve sonraki istek sayaçları yeniden hesaplar. Sıcak önbellekte anasayfa veritabanına gitmez.
+
+Kullanım:
+    from ihaleler.utils.anasayfa_sayaclari import anasayfa_sayaclari, sayaclari_gecersiz_kil
+
+    anasayfa_sayaclari()  # {"toplam_ihale": 12, "toplam_dogrudan": 30, "aktif_kurum_sayisi": 4}
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+
+logger = logging.getLogger("ihaleler.parsing")
+
+_SURUM_ANAHTARI = "anasayfa_sayaclari:surum"
+_VERI_ANAHTARI = "anasayfa_sayaclari:{surum}"
+
+
+def _sure() -> int:
+    return int(getattr(settings, "ANASAYFA_SAYAC_SURESI", 3600))
+
+
+def _yeni_surum() -> int:
+    # Sürüm anahtarı önbellekten düşerse eski sayaç kayıtlarıyla çakışmasın diye zamandan türetilir
+    return int(time.time() * 1000)
+
+
+def _surum() -> int:
+    surum = cache.get(_SURUM_ANAHTARI)
+    if surum is None:
+        cache.add(_SURUM_ANAHTARI, _yeni_surum(), timeout=None)
+        surum = cache.get(_SURUM_ANAHTARI)
+    return surum
+
+
+def sayaclari_hesapla() -> dict:
+    """Sayaçları veritabanından hesaplar (iki sorgu; kurum kesişimi SQL'de)."""
+    from ihaleler.models import Hastane, Ihale
+
+    acik = Ihale.objects.filter(durum="Acik")
+    sayilar = acik.aggregate(
+        toplam_ihale=Count("pk", filter=Q(is_dogrudan_temin=False)),
+        toplam_dogrudan=Count("pk", filter=Q(is_dogrudan_temin=True)),
+    )
+    # Aktif kurum: hem açık ihalesi hem açık doğrudan temini olan hastaneler
+    aktif_kurum_sayisi = Hastane.objects.filter(
+        Exists(acik.filter(hastane=OuterRef("pk"), is_dogrudan_temin=False)),
+        Exists(acik.filter(hastane=OuterRef("pk"), is_dogrudan_temin=True)),
+    ).count()
+    return {**sayilar, "aktif_kurum_sayisi": aktif_kurum_sayisi}
+
+
+def anasayfa_sayaclari() -> dict:
+    """Önbellekteki güncel sürümün sayaçları; yoksa hesaplanıp yazılır."""
+    anahtar = _VERI_ANAHTARI.format(surum=_surum())
+    sayaclar = cache.get(anahtar)
+    if sayaclar is None:
+        sayaclar = sayaclari_hesapla()
+        cache.set(anahtar, sayaclar, timeout=_sure())
+    return sayaclar
+
+
+def _surumu_artir():
+    try:
+        cache.incr(_SURUM_ANAHTARI)
+    except ValueError:
+        # Anahtar yok (önbellek temizlenmiş / düşmüş)
+        cache.add(_SURUM_ANAHTARI, _yeni_surum(), timeout=None)
+    except Exception:
+        logger.warning("Anasayfa sayaç sürümü artırılamadı", exc_info=True)
+
+
+def sayaclari_gecersiz_kil():
+    """Sayaç sürümünü transaction commit'inde artırır (transaction dışında hemen)."""
+    transaction.on_commit(_surumu_artir)
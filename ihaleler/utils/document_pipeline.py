@@ -2,10 +2,14 @@
 İhale dosya işleme pipeline'ı: cetvel (PDF/Excel/Word/Resim) + teknik şartname
 layout tabanlı parsing ile işlenir, Kalem kayıtları oluşturulur. Tüm adımlar loglanır.
 """
+import json
 import logging
+import os
+import time
 
 from ihaleler.utils.file_to_text import extract_text_from_file
 from ihaleler.utils.parsing_service import extract_cetvel_layout_based
+from ihaleler.utils.pipeline_izleme import asama, calisma_izle
 from ihaleler.utils.sartname_cetvel_eslestir import (
     cetvel_ve_sartname_birlestir_ihale_kalem_kaydet,
 )
@@ -13,10 +17,19 @@ from ihaleler.utils.sartname_cetvel_eslestir import (
 logger = logging.getLogger("ihaleler.parsing")
 
 
+def _dosya_boyutu(yol) -> int:
+    try:
+        return os.path.getsize(yol)
+    except OSError:
+        return 0
+
+
 def ihale_dosyalarini_isle(
     ihale,
     provider: str = "openai",
     mevcut_kalemleri_sil: bool = True,
+    ilerleme_bildir=None,
+    islem_isi=None,
 ) -> dict:
     """
     İhalenin cetvel ve şartname dosyalarını profesyonel pipeline ile işler:
@@ -29,25 +42,65 @@ def ihale_dosyalarini_isle(
         ihale: Ihale model örneği (cetvel_dosya, isteğe bağlı sartname_dosya).
         provider: "openai" veya "anthropic".
         mevcut_kalemleri_sil: True ise mevcut kalemler silinip yeniden oluşturulur.
+        ilerleme_bildir: İsteğe bağlı callback(yuzde: int, asama: str); arka plan
+            kuyruğu (DosyaIslemIsi) ilerleme çubuğunu güncellemek için kullanır.
+        islem_isi: Çalışmayı başlatan DosyaIslemIsi (varsa); PipelineCalismasi kaydına bağlanır.
+
+    Her çalışma pipeline_izleme ile ölçülür: aşama süreleri, bayt, LLM token ve tahmini maliyet
+    PipelineCalismasi / PipelineAsamasi tablolarına yazılır, özeti sonucun "izleme" alanındadır.
 
     Returns:
         {
             "basari": bool,
             "olusturulan": int,
             "atlanan": int,
+            "llm_atlanan": int,
             "hatalar": [str],
-            "cetvel_kaynak": "vision" | "word_ocr" | None,
+            "sureler": {"cetvel_cikarma": sn, "sartname_okuma": sn, "sartname_eslestirme": sn, ...},
+            "cetvel_kaynak": "excel_tablo" | "word_tablo" | "vision" | "word_ocr" | None,
+            "izleme": {"calisma_id", "sure", "asamalar", "llm", "llm_asamalar", "modeller"},  # CalismaOlcumu.ozet
         }
     """
+    with calisma_izle(ihale, provider=provider, islem_isi=islem_isi) as calisma:
+        sonuc = _ihale_dosyalarini_isle(ihale, provider, mevcut_kalemleri_sil, ilerleme_bildir)
+        calisma.basari = sonuc["basari"]
+        calisma.cetvel_kaynak = sonuc["cetvel_kaynak"]
+    sonuc["izleme"] = calisma.ozet()
+    llm = sonuc["izleme"]["llm"]
+    logger.info(
+        "Pipeline ölçümü | ihale_id=%s | calisma_id=%s | sure=%s | llm_cagri=%s | onbellek=%s | token=%s/%s | maliyet=$%s",
+        ihale.pk,
+        sonuc["izleme"]["calisma_id"],
+        sonuc["izleme"]["sure"],
+        llm["cagri"],
+        llm["onbellek_isabet"],
+        llm["girdi_token"],
+        llm["cikti_token"],
+        llm["maliyet_usd"],
+    )
+    return sonuc
+
+
+def _ihale_dosyalarini_isle(ihale, provider, mevcut_kalemleri_sil, ilerleme_bildir) -> dict:
     sonuc = {
         "basari": False,
         "olusturulan": 0,
         "atlanan": 0,
+        "llm_atlanan": 0,
         "hatalar": [],
         "cetvel_kaynak": None,
+        "sureler": {},
     }
     logger.info("Pipeline başladı | ihale_id=%s | ihale_no=%s", ihale.pk, getattr(ihale, "ihale_no", ""))
 
+    def _bildir(yuzde, asama):
+        if ilerleme_bildir is None:
+            return
+        try:
+            ilerleme_bildir(yuzde, asama)
+        except Exception:
+            logger.debug("İlerleme bildirimi başarısız", exc_info=True)
+
     if not ihale.cetvel_dosya:
         sonuc["hatalar"].append("Cetvel dosyası yok.")
         logger.error("Cetvel dosyası yok | ihale_id=%s", ihale.pk)
@@ -56,8 +109,15 @@ def ihale_dosyalarini_isle(
     try:
         cetvel_path = ihale.cetvel_dosya.path
         logger.info("Cetvel dosyası işleniyor | path=%s", cetvel_path)
-
-        cetvel_analiz = extract_cetvel_layout_based(cetvel_path, provider=provider)
+        _bildir(5, "Birim fiyat cetveli okunuyor")
+
+        t0 = time.perf_counter()
+        with asama("cetvel_cikarma", girdi_bayt=_dosya_boyutu(cetvel_path)) as olcum:
+            cetvel_analiz = extract_cetvel_layout_based(cetvel_path, provider=provider, tum_sayfalar=True)
+            olcum["cikti_bayt"] = len(
+                json.dumps(cetvel_analiz.get("kalemler") or [], ensure_ascii=False, default=str).encode("utf-8")
+            )
+        sonuc["sureler"]["cetvel_cikarma"] = round(time.perf_counter() - t0, 3)
         sonuc["cetvel_kaynak"] = cetvel_analiz.get("kaynak")
 
         if not cetvel_analiz.get("basari"):
@@ -75,8 +135,12 @@ def ihale_dosyalarini_isle(
 
         sartname_metni = None
         if ihale.sartname_dosya:
+            _bildir(30, "Teknik şartname okunuyor")
+            t0 = time.perf_counter()
             try:
-                sartname_metni = extract_text_from_file(ihale.sartname_dosya.path)
+                with asama("sartname_okuma", girdi_bayt=_dosya_boyutu(ihale.sartname_dosya.path)) as olcum:
+                    sartname_metni = extract_text_from_file(ihale.sartname_dosya.path)
+                    olcum["cikti_bayt"] = len((sartname_metni or "").encode("utf-8"))
                 if sartname_metni and not sartname_metni.startswith("Dosya bulunamadı") and not sartname_metni.startswith("Hata"):
                     logger.info("Şartname metni okundu | uzunluk=%s", len(sartname_metni))
                 else:
@@ -85,6 +149,13 @@ def ihale_dosyalarini_isle(
             except Exception as e:
                 logger.exception("Şartname okuma hatası: %s", e)
                 sartname_metni = ""
+            sonuc["sureler"]["sartname_okuma"] = round(time.perf_counter() - t0, 3)
+
+        _bildir(40, "Kalemler şartname ile eşleştiriliyor")
+
+        def _satir_ilerleme(islenen, toplam):
+            if toplam:
+                _bildir(40 + int(55 * islenen / toplam), f"Kalemler eşleştiriliyor ({islenen}/{toplam})")
 
         birlestir_sonuc = cetvel_ve_sartname_birlestir_ihale_kalem_kaydet(
             ihale,
@@ -93,22 +164,28 @@ def ihale_dosyalarini_isle(
             sartname_metni=sartname_metni or "",
             vision_provider=provider,
             mevcut_kalemleri_sil=mevcut_kalemleri_sil,
+            ilerleme_bildir=_satir_ilerleme,
         )
 
         sonuc["olusturulan"] = birlestir_sonuc.get("olusturulan", 0)
         sonuc["atlanan"] = birlestir_sonuc.get("atlanan", 0)
+        sonuc["llm_atlanan"] = birlestir_sonuc.get("llm_atlanan", 0)
         sonuc["hatalar"].extend(birlestir_sonuc.get("hatalar", []))
+        sonuc["sureler"].update(birlestir_sonuc.get("sureler") or {})
         sonuc["basari"] = sonuc["olusturulan"] > 0 or (sonuc["olusturulan"] == 0 and not kalemler)
 
         logger.info(
-            "Pipeline bitti | ihale_id=%s | olusturulan=%s | atlanan=%s | hata_sayisi=%s",
+            "Pipeline bitti | ihale_id=%s | olusturulan=%s | atlanan=%s | llm_atlanan=%s | hata_sayisi=%s",
             ihale.pk,
             sonuc["olusturulan"],
             sonuc["atlanan"],
+            sonuc["llm_atlanan"],
             len(sonuc["hatalar"]),
         )
+        logger.info("Pipeline süreleri | ihale_id=%s | %s", ihale.pk, sonuc["sureler"])
         for h in sonuc["hatalar"]:
             logger.warning("Pipeline hata: %s", h)
+        _bildir(100, "Tamamlandı")
 
         return sonuc
     except Exception as e:
@@ -8,7 +8,7 @@ Kullanım:
     sonuc = analiz_et_ve_tablo_dondur(
         "/path/to/cetvel.pdf",           # veya .xlsx, .jpg
         page_or_sheet_index=0,          # PDF sayfa / Excel sheet
-        provider="openai",               # "openai" veya "anthropic"
+        provider="openai",               # tercih edilen: "openai", "anthropic" veya "gemini"
         ek_talimat="Sadece mal kalemlerini al.",  # isteğe bağlı
     )
     if sonuc["basari"]:
@@ -17,7 +17,6 @@ Kullanım:
     else:
         print(sonuc["hata"])
 """
-import base64
 import io
 import json
 import os
@@ -36,15 +35,21 @@ except ImportError:
 from PIL import Image, ImageDraw, ImageFont
 import openpyxl
 
-# Vision API
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
-try:
-    from anthropic import Anthropic
-except ImportError:
-    Anthropic = None
+from ihaleler.utils.llm_onbellek import onbellekli_cagir, prompt_surumu
+from ihaleler.utils.llm_yonlendirici import arka_uc_zinciri, sohbet, yonlendir
+from ihaleler.utils.pipeline_izleme import asama, baglamda
+
+OPENAI_VISION_MODEL = "gpt-4o"
+ANTHROPIC_VISION_MODEL = "claude-sonnet-4-20250514"
+GEMINI_VISION_MODEL = "gemini-2.5-flash"
+# Yönlendiricinin sağlayıcı başına denediği modeller (istenen sağlayıcı çökerse sıradakine geçilir)
+VISION_MODELLERI = {
+    "openai": [OPENAI_VISION_MODEL],
+    "anthropic": [ANTHROPIC_VISION_MODEL],
+    "gemini": [GEMINI_VISION_MODEL],
+}
+# Prompt veya çıktı formatı değiştiğinde artırın (önbellek anahtarına girer)
+VISION_PROMPT_SURUMU = "v1"
 
 
 # -----------------------------------------------------------------------------
@@ -155,11 +160,35 @@ def file_to_image_bytes(file_path: str, page_or_sheet_index: int = 0) -> bytes:
     ext = path.suffix.lower()
     if ext == ".pdf":
         return _pdf_to_image_bytes(file_path, page_index=page_or_sheet_index)
-    if ext in (".xlsx", ".xls"):
+    if ext in (".xlsx", ".xlsm", ".xls"):
         return _excel_to_image_bytes(file_path, sheet_index=page_or_sheet_index)
     if ext in (".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp"):
         return _image_file_to_bytes(file_path)
-    raise ValueError(f"Desteklenmeyen format: {ext}. Kullanılabilir: .pdf, .xlsx, .xls, .jpg, .jpeg, .png")
+    raise ValueError(f"Desteklenmeyen format: {ext}. Kullanılabilir: .pdf, .xlsx, .xlsm, .xls, .jpg, .jpeg, .png")
+
+
+def sayfa_sayisi(file_path: str) -> int:
+    """PDF için sayfa, Excel için sheet sayısı; resimler için 1."""
+    ext = Path(file_path).suffix.lower()
+    if ext == ".pdf":
+        if fitz:
+            doc = fitz.open(file_path)
+            try:
+                return doc.page_count
+            finally:
+                doc.close()
+        try:
+            from pdf2image import pdfinfo_from_path
+            return int(pdfinfo_from_path(file_path).get("Pages") or 1)
+        except Exception:
+            return 1
+    if ext in (".xlsx", ".xlsm", ".xls"):
+        wb = openpyxl.load_workbook(file_path, read_only=True)
+        try:
+            return len(wb.sheetnames)
+        finally:
+            wb.close()
+    return 1
 
 
 # -----------------------------------------------------------------------------
@@ -179,74 +208,9 @@ Eksik sütunlar olabilir; gördüğün sütunları key olarak kullan (örn. kale
 Her satır bir kalem olsun. Başlık satırlarını tabloya ekleme."""
 
 
-def _get_api_keys():
-    try:
-        from django.conf import settings
-        return {
-            "openai": getattr(settings, "OPENAI_API_KEY", None) or os.environ.get("OPENAI_API_KEY"),
-            "anthropic": getattr(settings, "ANTHROPIC_API_KEY", None) or os.environ.get("ANTHROPIC_API_KEY"),
-        }
-    except Exception:
-        return {
-            "openai": os.environ.get("OPENAI_API_KEY"),
-            "anthropic": os.environ.get("ANTHROPIC_API_KEY"),
-        }
-
-
-def _call_openai_vision(image_base64: str, user_prompt: str, api_key: str) -> str:
-    """OpenAI GPT-4o ile görsel analiz."""
-    if not OpenAI:
-        raise RuntimeError("openai paketi yüklü değil: pip install openai")
-    client = OpenAI(api_key=api_key)
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": VISION_SYSTEM_PROMPT},
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": user_prompt},
-                    {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image_base64}"}},
-                ],
-            },
-        ],
-        max_tokens=4096,
-    )
-    return (response.choices[0].message.content or "").strip()
-
-
-def _call_anthropic_vision(image_base64: str, user_prompt: str, api_key: str) -> str:
-    """Anthropic Claude ile görsel analiz."""
-    if not Anthropic:
-        raise RuntimeError("anthropic paketi yüklü değil: pip install anthropic")
-    client = Anthropic(api_key=api_key)
-    response = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=4096,
-        system=VISION_SYSTEM_PROMPT,
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": user_prompt},
-                    {
-                        "type": "image",
-                        "source": {
-                            "type": "base64",
-                            "media_type": "image/png",
-                            "data": image_base64,
-                        },
-                    },
-                ],
-            },
-        ],
-    )
-    return (response.content[0].text if response.content else "").strip()
-
-
-def _parse_table_from_response(text: str) -> list:
-    """Yanıt metninden JSON tablo çıkarır; bulamazsa boş liste."""
-    text = text.strip()
+def _tablo_coz(text: str):
+    """Yanıt metnindeki JSON tabloyu döndürür; yanıt ayrıştırılamıyorsa (kesik/bozuk/ret) None."""
+    text = (text or "").strip()
     # JSON bloğu ara (```json ... ``` veya doğrudan { ... })
     json_match = re.search(r"```(?:json)?\s*(\{[\s\S]*?\})\s*```", text)
     if json_match:
@@ -257,13 +221,18 @@ def _parse_table_from_response(text: str) -> list:
             text = obj_match.group(0)
     try:
         data = json.loads(text)
-        if isinstance(data, dict) and "tablo" in data:
-            return data["tablo"] if isinstance(data["tablo"], list) else []
-        if isinstance(data, list):
-            return data
-        return []
     except json.JSONDecodeError:
-        return []
+        return None
+    if isinstance(data, dict) and isinstance(data.get("tablo"), list):
+        return data["tablo"]
+    if isinstance(data, list):
+        return data
+    return None
+
+
+def _parse_table_from_response(text: str) -> list:
+    """Yanıt metninden JSON tablo çıkarır; bulamazsa boş liste."""
+    return _tablo_coz(text) or []
 
 
 def analiz_et_ve_tablo_dondur(
@@ -277,9 +246,10 @@ def analiz_et_ve_tablo_dondur(
     teklif cetveli kalemlerini tespit edip yapılandırılmış tablo döndürür.
 
     Args:
-        file_path: Dosya yolu (.pdf, .xlsx, .xls, .jpg, .jpeg, .png).
+        file_path: Dosya yolu (.pdf, .xlsx, .xlsm, .xls, .jpg, .jpeg, .png).
         page_or_sheet_index: PDF için sayfa indeksi (0=ilk), Excel için sheet indeksi.
-        provider: "openai" veya "anthropic". Hangi Vision API kullanılacak.
+        provider: Tercih edilen Vision sağlayıcısı ("openai", "anthropic", "gemini"); yanıt vermezse
+            llm_yonlendirici anahtarı tanımlı diğer sağlayıcılara geçer.
         ek_talimat: LLM'e ek metin talimatı (isteğe bağlı).
 
     Returns:
@@ -287,47 +257,180 @@ def analiz_et_ve_tablo_dondur(
             "basari": True/False,
             "tablo": [ {"kalem": "...", "birim": "...", "miktar": "...", ...}, ... ],
             "ham_yanit": "modelin döndürdüğü ham metin",
-            "hata": "varsa hata mesajı"
+            "hata": "varsa hata mesajı",
+            "onbellek": True/False  (yanıt LLM önbelleğinden geldiyse True),
+            "provider", "model": yanıtı veren arka uç (başarıda)
         }
     """
-    result = {"basari": False, "tablo": [], "ham_yanit": "", "hata": None}
+    try:
+        image_bytes = file_to_image_bytes(file_path, page_or_sheet_index=page_or_sheet_index)
+    except Exception as e:
+        return {"basari": False, "tablo": [], "ham_yanit": "", "hata": f"Dosya görsele çevrilemedi: {e}", "onbellek": False}
+    return gorsel_analiz_et(image_bytes, provider=provider, ek_talimat=ek_talimat)
+
+
+def gorsel_analiz_et(image_bytes: bytes, provider: str = "openai", ek_talimat: str = "") -> dict:
+    """Önceden render edilmiş PNG baytlarını Vision LLM'e gönderir; dönüş analiz_et_ve_tablo_dondur ile aynıdır."""
+    result = {"basari": False, "tablo": [], "ham_yanit": "", "hata": None, "onbellek": False}
     user_prompt = "Bu sayfadaki teklif cetveli / birim fiyat kalemlerini tespit et ve yapılandırılmış tablo olarak döndür."
     if ek_talimat:
         user_prompt += "\n\nEk talimat: " + ek_talimat
 
+    surum = prompt_surumu(VISION_PROMPT_SURUMU, VISION_SYSTEM_PROMPT, user_prompt)
+
+    def _cagir(arka_uc):
+        return onbellekli_cagir(
+            image_bytes, arka_uc.provider, arka_uc.model, surum,
+            lambda: sohbet(arka_uc, VISION_SYSTEM_PROMPT, user_prompt, max_tokens=4096, gorsel_png=image_bytes),
+            # Ayrıştırılamayan yanıt önbelleğe yazılmaz (aynı sayfa için sürekli tekrar edilmesin)
+            gecerli=lambda ham: _tablo_coz(ham) is not None,
+        )
+
     try:
-        image_bytes = file_to_image_bytes(file_path, page_or_sheet_index=page_or_sheet_index)
+        (result["ham_yanit"], result["onbellek"]), arka_uc = yonlendir(
+            arka_uc_zinciri(VISION_MODELLERI, tercih=provider), _cagir
+        )
     except Exception as e:
-        result["hata"] = f"Dosya görsele çevrilemedi: {e}"
+        result["hata"] = f"Vision hatası: {e}"
         return result
+    result["provider"], result["model"] = arka_uc
 
-    b64 = base64.b64encode(image_bytes).decode("utf-8")
-    keys = _get_api_keys()
+    tablo = _tablo_coz(result["ham_yanit"])
+    if tablo is None:
+        result["hata"] = "Vision yanıtı ayrıştırılamadı (geçerli JSON tablo yok)."
+        return result
+    result["tablo"] = tablo
+    result["basari"] = True
+    return result
 
-    if provider == "openai":
-        api_key = keys["openai"]
-        if not api_key:
-            result["hata"] = "OPENAI_API_KEY bulunamadı (.env veya settings)"
-            return result
-        try:
-            result["ham_yanit"] = _call_openai_vision(b64, user_prompt, api_key)
-        except Exception as e:
-            result["hata"] = f"OpenAI Vision hatası: {e}"
-            return result
-    elif provider == "anthropic":
-        api_key = keys["anthropic"]
-        if not api_key:
-            result["hata"] = "ANTHROPIC_API_KEY bulunamadı (.env veya settings)"
-            return result
-        try:
-            result["ham_yanit"] = _call_anthropic_vision(b64, user_prompt, api_key)
-        except Exception as e:
-            result["hata"] = f"Anthropic Vision hatası: {e}"
-            return result
-    else:
-        result["hata"] = f"Bilinmeyen provider: {provider}. 'openai' veya 'anthropic' kullanın."
+
+# -----------------------------------------------------------------------------
+# 3) ÇOK SAYFALI ANALİZ (tüm PDF sayfaları / Excel sheet'leri, paralel)
+# -----------------------------------------------------------------------------
+
+_BASLIK_KELIMELERI = (
+    "sira no", "sıra no", "s.no", "mal kaleminin", "malzemenin adi", "malzemenin adı", "kalem adi", "kalem adı",
+    "aciklama", "açıklama", "birimi", "birim", "miktar", "miktarı", "birim fiyat", "tutar", "toplam", "kalem",
+)
+
+
+def _baslik_satiri_mi(satir: dict) -> bool:
+    """Her sayfada tekrarlanan tablo başlığı satırı mı? (değerlerin çoğu sütun başlığı kelimesi, miktar sayısal değil)."""
+    if not isinstance(satir, dict):
+        return False
+    degerler = [str(v).strip().lower().rstrip(":.") for v in satir.values() if v not in (None, "")]
+    if not degerler:
+        return True
+    miktar = str(satir.get("miktar") or "").strip()
+    if miktar and re.search(r"\d", miktar):
+        return False
+    baslik = sum(1 for v in degerler if v in _BASLIK_KELIMELERI or any(v.startswith(k) for k in _BASLIK_KELIMELERI[:8]))
+    return baslik >= max(2, (len(degerler) + 1) // 2)
+
+
+def _paralel_sayfa_sayisi() -> int:
+    try:
+        from django.conf import settings
+        return max(1, int(getattr(settings, "CETVEL_PARALEL_SAYFA", 4)))
+    except Exception:
+        return max(1, int(os.environ.get("CETVEL_PARALEL_SAYFA", "4")))
+
+
+def analiz_et_tum_sayfalar(
+    file_path: str,
+    provider: str = "openai",
+    ek_talimat: str = "",
+    max_workers: int = None,
+) -> dict:
+    """
+    Dosyanın tüm sayfalarını (PDF) veya sheet'lerini (Excel) görsele çevirir, sınırlı bir
+    thread havuzu ile Vision LLM'e paralel gönderir; satırları sayfa sırasıyla birleştirir
+    ve her sayfada tekrarlanan başlık satırlarını atar.
+
+    Render işlemi ana thread'de sırayla yapılır (PyMuPDF thread güvenli değildir);
+    yalnızca API çağrıları paraleldir. Bellekte en fazla 2 × işçi sayısı sayfa görseli tutulur:
+    sonraki sayfa, kuyruktaki bir sayfa bitince render edilir.
+
+    Returns:
+        {
+            "basari": bool (en az bir sayfa başarılıysa True),
+            "tablo": [...],                 # sayfa sırasıyla birleşik satırlar
+            "sayfa_sayisi": int,
+            "sayfa_sonuclari": [{"sayfa": 0, "basari": bool, "satir": int, "onbellek": bool, "hata": str | None}, ...],
+            "hata": str | None,
+        }
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    result = {"basari": False, "tablo": [], "sayfa_sayisi": 0, "sayfa_sonuclari": [], "hata": None}
+    try:
+        adet = sayfa_sayisi(file_path)
+    except Exception as e:
+        result["hata"] = f"Dosya açılamadı: {e}"
         return result
+    result["sayfa_sayisi"] = adet
 
-    result["tablo"] = _parse_table_from_response(result["ham_yanit"])
-    result["basari"] = True
+    def _sayfa_isle(image_bytes):
+        try:
+            with asama("vision_sayfa", girdi_bayt=len(image_bytes)) as olcum:
+                analiz = gorsel_analiz_et(image_bytes, provider=provider, ek_talimat=ek_talimat)
+                olcum.update(
+                    cikti_bayt=len((analiz.get("ham_yanit") or "").encode("utf-8")),
+                    onbellek=bool(analiz.get("onbellek")),
+                    provider=analiz.get("provider") or "",
+                    model=analiz.get("model") or "",
+                    hata=analiz.get("hata") or "",
+                )
+                return analiz
+        finally:
+            # Önbellek sorguları bu thread'de DB bağlantısı açar; thread dönmeden kapat
+            try:
+                from django.db import connection
+                connection.close()
+            except Exception:
+                pass
+
+    workers = max(1, min(max_workers or _paralel_sayfa_sayisi(), adet or 1))
+    pencere = 2 * workers
+    sayfa_analizleri = {}
+    render_hatalari = {}
+    with ThreadPoolExecutor(max_workers=workers) as havuz:
+        suren = {}  # future -> sayfa no
+        for idx in range(adet):
+            while len(suren) >= pencere:
+                bitenler, _ = wait(suren, return_when=FIRST_COMPLETED)
+                for f in bitenler:
+                    sayfa_analizleri[suren.pop(f)] = f.result()
+            try:
+                with asama("sayfa_render") as olcum:
+                    image_bytes = file_to_image_bytes(file_path, page_or_sheet_index=idx)
+                    olcum["cikti_bayt"] = len(image_bytes)
+            except Exception as e:
+                # Boş Excel sheet'i vb. hata değil, atlanır
+                render_hatalari[idx] = f"Dosya görsele çevrilemedi: {e}"
+                continue
+            # Her sayfa pipeline ölçüm bağlamının kopyasında çalışır (vision_sayfa / llm_cagrisi aşamaları)
+            suren[havuz.submit(baglamda(_sayfa_isle), image_bytes)] = idx
+            del image_bytes
+        for f, idx in suren.items():
+            sayfa_analizleri[idx] = f.result()
+
+    hatalar = []
+    for idx in range(adet):
+        analiz = sayfa_analizleri.get(idx) or {"basari": False, "tablo": [], "hata": render_hatalari.get(idx)}
+        satirlar = [r for r in (analiz.get("tablo") or []) if not _baslik_satiri_mi(r)]
+        result["tablo"].extend(satirlar)
+        result["sayfa_sonuclari"].append({
+            "sayfa": idx,
+            "basari": bool(analiz.get("basari")),
+            "satir": len(satirlar),
+            "onbellek": bool(analiz.get("onbellek")),
+            "hata": analiz.get("hata"),
+        })
+        if analiz.get("hata"):
+            hatalar.append(f"Sayfa {idx + 1}: {analiz['hata']}")
+
+    result["basari"] = any(s["basari"] for s in result["sayfa_sonuclari"])
+    if hatalar:
+        result["hata"] = "; ".join(hatalar)[:1000]
     return result
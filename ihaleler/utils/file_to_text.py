@@ -1,10 +1,32 @@
+import hashlib
+import io
+import logging
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pdfplumber
 import docx
 import openpyxl
 from PIL import Image
 import pytesseract
 
+try:
+    import pymupdf as fitz  # PyMuPDF (eski sürümlerde yalnızca "fitz" adıyla)
+except ImportError:
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+
+logger = logging.getLogger("ihaleler.parsing")
+
+# Yan yana duran (aynı yükseklikte, ayrı sütunlarda) satır parçası çifti sayısı bu eşiği geçen sayfa
+# tablo/çok sütunlu kabul edilir ve satır düzenini koruyan pdfplumber ile okunur
+_YAN_YANA_SATIR_ESIGI = 3
+# Metin katmanı bu kadar karakterden kısa olan görselli sayfa taranmış kabul edilir (sayfa no. damgası vb. olabilir)
+_TARAMA_METIN_ESIGI = 20
+
 # OCR ayarları (Django settings'ten; Django yüklü değilse env/varsayılan)
 def _get_ocr_config():
     try:
@@ -21,6 +43,21 @@ def _get_ocr_config():
     return lang, psm
 
 
+# PDF paralel okuma ayarları (Django settings'ten; Django yüklü değilse env/varsayılan)
+def _get_pdf_config():
+    try:
+        from django.conf import settings
+        esik = getattr(settings, "PDF_PARALEL_SAYFA_ESIGI", 40)
+        isci = getattr(settings, "PDF_ISCI_SAYISI", 0)
+        dpi = getattr(settings, "OCR_DPI", 300)
+    except Exception:
+        esik = os.environ.get("PDF_PARALEL_SAYFA_ESIGI", 40)
+        isci = os.environ.get("PDF_ISCI_SAYISI", 0)
+        dpi = os.environ.get("OCR_DPI", 300)
+    isci = int(isci) or min(4, os.cpu_count() or 1)
+    return int(esik), isci, int(dpi)
+
+
 def extract_text_from_file(file_path):
     if not os.path.exists(file_path):
         return "Dosya bulunamadı"
@@ -48,13 +85,197 @@ def extract_text_from_file(file_path):
 
 
 def extract_pdf(path):
-    text = ""
+    """PDF metni; sayfalar sırayla, her biri satır sonuyla (boş sayfalar atlanır)."""
+    return "".join(page_text + "\n" for page_text in iter_pdf_pages(path) if page_text)
+
+
+def iter_pdf_pages(path, ocr=True):
+    """
+    PDF sayfa metinlerini sırayla üretir (her sayfa için bir str; metinsiz sayfada "").
+
+    PyMuPDF varsa hızlı yol kullanılır; tablo/çok sütunlu sayfalar pdfplumber ile okunur.
+    PDF_PARALEL_SAYFA_ESIGI'nden uzun belgeler sayfa aralıklarına bölünüp süreç havuzunda işlenir;
+    aralıklar tamamlandıkça sırayla verilir. Metin katmanı olmayan (taranmış) sayfalar ocr=True iken
+    görsele çevrilip Tesseract ile okunur (bkz. _ocr_sayfalari).
+    """
+    if fitz is None:
+        yield from _pdfplumber_pages(path)
+        return
+    with fitz.open(path) as doc:
+        sayfa_sayisi = doc.page_count
+    esik, isci, dpi = _get_pdf_config()
+    ocr_havuzu = None
+    try:
+        for bas, sayfalar, taramalar in _metin_araliklari(path, sayfa_sayisi, esik, isci):
+            if taramalar and ocr:
+                # OCR havuzu da PDF_ISCI_SAYISI ile sınırlı (web / kuyruk sürecinde tüm çekirdekleri almasın)
+                if ocr_havuzu is None and isci > 1:
+                    ocr_havuzu = ProcessPoolExecutor(
+                        max_workers=isci, mp_context=multiprocessing.get_context("spawn"),
+                    )
+                for no, metin in _ocr_sayfalari(path, taramalar, dpi, ocr_havuzu).items():
+                    sayfalar[no - bas] = metin
+            yield from sayfalar
+    finally:
+        if ocr_havuzu is not None:
+            ocr_havuzu.shutdown(cancel_futures=True)
+
+
+def _metin_araliklari(path, sayfa_sayisi, esik, isci):
+    """Metin katmanını aralık aralık okur: (ilk sayfa no, sayfa metinleri, {taranmış sayfa no: içerik özeti})."""
+    if isci < 2 or sayfa_sayisi <= esik:
+        yield (0, *_pdf_range_text(path, 0, sayfa_sayisi))
+        return
+    parca = max(8, -(-sayfa_sayisi // (isci * 2)))
+    araliklar = [(bas, min(bas + parca, sayfa_sayisi)) for bas in range(0, sayfa_sayisi, parca)]
+    verilen = 0
+    try:
+        # spawn: iş parçacıklı (Django/kuyruk) süreçte fork güvenli değil; Windows'ta zaten tek seçenek
+        with ProcessPoolExecutor(max_workers=isci, mp_context=multiprocessing.get_context("spawn")) as havuz:
+            for (bas, _), sonuc in zip(araliklar, havuz.map(_pdf_range_text, *zip(*((path, b, s) for b, s in araliklar)))):
+                yield (bas, *sonuc)
+                verilen += len(sonuc[0])
+    except Exception:
+        logger.warning("PDF paralel okunamadı, sırayla devam ediliyor: %s", path, exc_info=True)
+        yield (verilen, *_pdf_range_text(path, verilen, sayfa_sayisi))
+
+
+def _pdf_range_text(path, bas, son):
+    """
+    [bas, son) sayfalarının metni (süreç havuzunda da çalışır; modül düzeyinde olmalı).
+
+    Returns:
+        (sayfa metinleri, {metin katmanı olmayan sayfa no: içerik özeti})
+    """
+    sayfalar = []
+    duzen_hassas = []
+    taramalar = {}
+    with fitz.open(path) as doc:
+        for no in range(bas, son):
+            page = doc[no]
+            satirlar = _sayfa_satirlari(page)
+            if sum(len(s[4]) for s in satirlar) < _TARAMA_METIN_ESIGI and page.get_images():
+                taramalar[no] = _sayfa_ozeti(doc, page)
+                sayfalar.append("\n".join(s[4] for s in satirlar))
+            elif _duzen_hassas_mi(satirlar):
+                duzen_hassas.append(no)
+                sayfalar.append("")
+            else:
+                sayfalar.append("\n".join(s[4] for s in satirlar))
+    if duzen_hassas:
+        # Yalnızca gereken sayfaları yükle (pdfplumber tüm sayfaları ayrıştırmasın)
+        with pdfplumber.open(path, pages=[no + 1 for no in duzen_hassas]) as pdf:
+            for no, page in zip(duzen_hassas, pdf.pages):
+                sayfalar[no - bas] = page.extract_text() or ""
+    return sayfalar, taramalar
+
+
+def _sayfa_ozeti(doc, page):
+    """Sayfa içerik akışları + gömülü görsellerin ham baytlarından SHA-256 (görsele çevirmeden)."""
+    ozet = hashlib.sha256()
+    for xref in page.get_contents():
+        ozet.update(doc.xref_stream_raw(xref) or b"")
+    for gorsel in page.get_images(full=True):
+        ozet.update(doc.xref_stream_raw(gorsel[0]) or b"")
+    ozet.update(f"|{page.rect.width:.1f}x{page.rect.height:.1f}|{page.rotation}".encode())
+    return ozet.hexdigest()
+
+
+def _ocr_sayfalari(path, taramalar, dpi, havuz=None):
+    """
+    Taranmış sayfaları OCR'lar; sonuçlar sayfa içerik özetiyle önbellekte tutulur (LlmOnbellek,
+    provider="tesseract"), böylece aynı belge yeniden işlenirken Tesseract çalışmaz.
+    Önbellek yalnızca Django hazırsa kullanılır. Returns: {sayfa no: metin}.
+    """
+    lang, psm = _get_ocr_config()
+    cmd = pytesseract.pytesseract.tesseract_cmd
+    surum = f"psm{psm}:dpi{dpi}"
+    onbellekten_al = onbellege_yaz = None
+    try:
+        from django.apps import apps
+        if apps.ready:
+            from ihaleler.utils.llm_onbellek import onbellege_yaz, onbellekten_al
+    except Exception:
+        pass
+
+    sonuc = {}
+    eksik = []
+    for no, ozet in sorted(taramalar.items()):
+        onceki = onbellekten_al(ozet, "tesseract", lang, surum) if onbellekten_al else None
+        if onceki is not None:
+            sonuc[no] = onceki
+        else:
+            eksik.append(no)
+    if not eksik:
+        return sonuc
+
+    if havuz is not None and len(eksik) > 1:
+        isler = [(no, havuz.submit(_ocr_sayfa, path, no, dpi, lang, psm, cmd)) for no in eksik]
+        metinler = ((no, is_.result) for no, is_ in isler)
+    else:
+        metinler = ((no, lambda no=no: _ocr_sayfa(path, no, dpi, lang, psm, cmd)) for no in eksik)
+    # Sayfa başına hata yakalanır: tek sayfanın hatası sonraki sayfaları boş bırakmaz
+    for no, sonucu_al in metinler:
+        try:
+            metin = sonucu_al()
+        except Exception as e:
+            logger.warning("PDF OCR sayfa hatası | %s | sayfa=%s | %s", os.path.basename(path), no + 1, e)
+            sonuc[no] = ""
+            continue
+        sonuc[no] = metin
+        if onbellege_yaz:
+            onbellege_yaz(taramalar[no], "tesseract", lang, surum, metin)
+    logger.info("PDF OCR | %s | taranmış=%s | önbellekten=%s", os.path.basename(path), len(taramalar), len(taramalar) - len(eksik))
+    return sonuc
+
+
+def _ocr_sayfa(path, no, dpi, lang, psm, cmd=None):
+    """Tek sayfayı PyMuPDF ile görsele çevirip Tesseract'la okur (süreç havuzunda çalışır)."""
+    if cmd:
+        pytesseract.pytesseract.tesseract_cmd = cmd
+    with fitz.open(path) as doc:
+        pix = doc[no].get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72), alpha=False)
+        img = Image.open(io.BytesIO(pix.tobytes("png")))
+    try:
+        return pytesseract.image_to_string(img, lang=lang, config=f"--psm {psm}").strip()
+    except Exception as e:
+        # pytesseract hataları pickle edilemiyor; havuzu bozmasın diye düz hata olarak döndür
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+
+
+def _sayfa_satirlari(page):
+    """PyMuPDF kelimelerinden satırlar: [x0, y0, x1, y1, metin], yukarıdan aşağı / soldan sağa."""
+    satirlar = {}
+    for x0, y0, x1, y1, kelime, blok, satir, _ in page.get_text("words"):
+        s = satirlar.get((blok, satir))
+        if s is None:
+            satirlar[(blok, satir)] = [x0, y0, x1, y1, kelime]
+        else:
+            s[0], s[1], s[2], s[3] = min(s[0], x0), min(s[1], y0), max(s[2], x1), max(s[3], y1)
+            s[4] += " " + kelime
+    # get_text(sort=True) saf Python'da sıralar ve çok yavaştır; satır düzeyinde sıralamak yeterli
+    return sorted(satirlar.values(), key=lambda s: (s[1], s[0]))
+
+
+def _duzen_hassas_mi(satirlar) -> bool:
+    """Aynı yükseklikte yan yana duran satır parçası (tablo hücresi, sütun) çifti eşiği aşıyor mu?"""
+    yan_yana = 0
+    for i, (x0, y0, x1, y1, _) in enumerate(satirlar):
+        orta = (y0 + y1) / 2
+        for ox0, oy0, ox1, oy1, _ in satirlar[i + 1:]:
+            if oy0 > orta:
+                break
+            if oy1 >= orta and (ox0 >= x1 or ox1 <= x0):
+                yan_yana += 1
+                if yan_yana >= _YAN_YANA_SATIR_ESIGI:
+                    return True
+    return False
+
+
+def _pdfplumber_pages(path):
     with pdfplumber.open(path) as pdf:
         for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-    return text
+            yield page.extract_text() or ""
 
 
 def extract_docx(path):
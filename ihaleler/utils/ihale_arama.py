@@ -0,0 +1,286 @@
+"""
+İhale arama kutusu için SQLite FTS5 tam metin indeksi.
+
+Her ihale için tek satır tutulur (rowid = ihale id): ihale adı, kurum adı ve kalem adları.
+Metin indekslenmeden önce turkce_katla ile katlanır ("İÇ TESİSAT" ~ "iç tesisat" ~ "ic tesisat");
+katlama karakter karakter olduğundan FTS5 highlight() konumları orijinal metne aynen taşınır.
+İndeks Ihale/Kalem/Hastane kaydı ve silinmesinde (ihaleler.signals) transaction commit'inde güncellenir;
+bulk_create gibi sinyal üretmeyen yazımlardan sonra ihale_indeksini_guncelle elle çağrılmalıdır.
+SQLite dışındaki veritabanlarında fts_kullanilabilir() False döner ve arama icontains ile yapılır.
+
+Kullanım:
+    from ihaleler.utils.ihale_arama import fts_kullanilabilir, fts_sorgusu, sirali_ihale_idleri
+
+    if fts_kullanilabilir():
+        idler = sirali_ihale_idleri("nyy kablo", Ihale.objects.filter(durum="Acik"), limit=25)
+        ozetler = arama_ozetleri("nyy kablo", Ihale.objects.filter(pk__in=idler))
+"""
+import logging
+import threading
+
+from django.db import connection, transaction
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from ihaleler.utils.turkce import kelimeler, turkce_katla
+
+logger = logging.getLogger("ihaleler.parsing")
+
+TABLO = "ihaleler_ihale_fts"
+
+# bm25 sütun ağırlıkları: ihale adı, kurum adı, kalem adları
+_BM25_AGIRLIKLARI = (10.0, 5.0, 1.0)
+# Sorguda dikkate alınan en fazla kelime
+_MAKS_SORGU_KELIME = 10
+# highlight() işaretleri (metinde geçmeyen kontrol karakterleri)
+_BAS, _SON = "\x02", "\x03"
+# Kalem özetinde gösterilen en fazla eşleşen kalem ve kalem başına karakter
+_OZET_KALEM = 3
+_OZET_KARAKTER = 120
+
+OLUSTUR_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLO} USING fts5("
+    "ihale_adi, hastane_ad, kalem_adlari, kalem_adlari_orj UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+_tablo_var = False
+_bekleyen = threading.local()
+
+
+def fts_kullanilabilir() -> bool:
+    """Veritabanı SQLite ve FTS tablosu oluşturulmuş mu (migrate edilmiş mi)."""
+    global _tablo_var
+    if connection.vendor != "sqlite":
+        return False
+    if _tablo_var:
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [TABLO])
+        _tablo_var = cursor.fetchone() is not None
+    return _tablo_var
+
+
+def fts_sorgusu(metin: str) -> str:
+    """
+    Kullanıcı aramasını FTS5 MATCH ifadesine çevirir: her kelime katlanıp tırnaklanır ve önek
+    araması yapılır, kelimeler AND ile bağlanır ("NYY Kablo" -> '"nyy"* "kablo"*'). Kelime yoksa "".
+    """
+    terimler = []
+    for kelime in kelimeler(metin):
+        if kelime not in terimler:
+            terimler.append(kelime)
+    return " ".join(f'"{k}"*' for k in terimler[:_MAKS_SORGU_KELIME])
+
+
+def eslesen_ihale_sql(ifade: str):
+    """qs.filter(pk__in=RawSQL(...)) için eşleşen ihale id'lerini veren alt sorgu (sql, params)."""
+    return f"SELECT rowid FROM {TABLO} WHERE {TABLO} MATCH %s", [ifade]
+
+
+def sirali_ihale_idleri(metin: str, qs, limit: int = 25, offset: int = 0) -> list:
+    """
+    Aramayla eşleşen ve qs filtrelerini sağlayan ihale id'leri, ilgililiğe (bm25) göre sıralı.
+    qs'in kendi sıralaması ve ek alanları kullanılmaz; yalnızca filtresi alt sorgu olarak uygulanır.
+    """
+    ifade = fts_sorgusu(metin)
+    if not ifade:
+        return []
+    alt_sql, alt_params = qs.order_by().values("pk").query.sql_with_params()
+    agirlik = ", ".join(str(a) for a in _BM25_AGIRLIKLARI)
+    # "+rowid": IN kısıtı FTS'e verilirse her id için MATCH ayrı çalışır; önce eşleşenler, sonra filtre
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {TABLO} WHERE {TABLO} MATCH %s AND +rowid IN ({alt_sql}) "
+            f"ORDER BY bm25({TABLO}, {agirlik}), rowid LIMIT %s OFFSET %s",
+            [ifade, *alt_params, int(limit), int(offset)],
+        )
+        return [r[0] for r in cursor.fetchall()]
+
+
+def _isaretleri_coz(isaretli: str):
+    """highlight() çıktısından (düz metin, [(baş, son), ...]) üretir."""
+    duz = []
+    araliklar = []
+    bas = None
+    for c in isaretli or "":
+        if c == _BAS:
+            bas = len(duz)
+        elif c == _SON:
+            if bas is not None:
+                araliklar.append((bas, len(duz)))
+            bas = None
+        else:
+            duz.append(c)
+    return "".join(duz), araliklar
+
+
+def _vurgulu_html(orijinal: str, araliklar: list, bas: int = 0, son: int = None) -> str:
+    son = len(orijinal) if son is None else son
+    parcalar = []
+    konum = bas
+    for a, b in araliklar:
+        a, b = max(a, bas), min(b, son)
+        if a >= b:
+            continue
+        parcalar.append(escape(orijinal[konum:a]))
+        parcalar.append(f"<mark>{escape(orijinal[a:b])}</mark>")
+        konum = b
+    parcalar.append(escape(orijinal[konum:son]))
+    return "".join(parcalar)
+
+
+def _vurgula(orijinal: str, isaretli: str):
+    """Orijinal metni katlanmış highlight çıktısındaki konumlara göre işaretler; eşleşme yoksa None."""
+    duz, araliklar = _isaretleri_coz(isaretli)
+    if not araliklar or duz != turkce_katla(orijinal or ""):
+        return None
+    return mark_safe(_vurgulu_html(orijinal, araliklar))
+
+
+def _kalem_ozetleri(orijinal: str, isaretli: str) -> list:
+    """Eşleşme içeren ilk _OZET_KALEM kalem satırını vurgulu ve kısaltılmış olarak döndürür."""
+    duz, araliklar = _isaretleri_coz(isaretli)
+    if not araliklar or len(duz) != len(orijinal or ""):
+        return []
+    ozetler = []
+    satir_bas = 0
+    for satir in orijinal.split("\n"):
+        satir_son = satir_bas + len(satir)
+        icindekiler = [(a, b) for a, b in araliklar if a < satir_son and b > satir_bas]
+        if icindekiler:
+            bas = satir_bas
+            if satir_son - bas > _OZET_KARAKTER:
+                bas = max(satir_bas, icindekiler[0][0] - _OZET_KARAKTER // 3)
+            son = min(satir_son, bas + _OZET_KARAKTER)
+            html = _vurgulu_html(orijinal, icindekiler, bas, son)
+            ozetler.append(mark_safe(("…" if bas > satir_bas else "") + html + ("…" if son < satir_son else "")))
+            if len(ozetler) >= _OZET_KALEM:
+                break
+        satir_bas = satir_son + 1
+    return ozetler
+
+
+def arama_ozetleri(metin: str, ihaleler) -> dict:
+    """
+    Sayfadaki ihaleler için vurgulu arama özetleri.
+
+    Returns:
+        {ihale_id: {"ihale_adi": SafeString | None, "hastane": SafeString | None, "kalemler": [SafeString, ...]}}
+    """
+    ihaleler = list(ihaleler)
+    ifade = fts_sorgusu(metin)
+    if not ihaleler or not ifade:
+        return {}
+    nesneler = {i.pk: i for i in ihaleler}
+    yer = ", ".join(["%s"] * len(nesneler))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, highlight({TABLO}, 0, %s, %s), highlight({TABLO}, 1, %s, %s), "
+            f"highlight({TABLO}, 2, %s, %s), kalem_adlari_orj FROM {TABLO} "
+            f"WHERE {TABLO} MATCH %s AND rowid IN ({yer})",
+            [_BAS, _SON] * 3 + [ifade, *nesneler],
+        )
+        satirlar = cursor.fetchall()
+    ozetler = {}
+    for ihale_id, adi, hastane, kalemler, kalemler_orj in satirlar:
+        ihale = nesneler[ihale_id]
+        ozetler[ihale_id] = {
+            "ihale_adi": _vurgula(ihale.ihale_adi, adi),
+            "hastane": _vurgula(ihale.hastane.ad if ihale.hastane_id else "", hastane),
+            "kalemler": _kalem_ozetleri(kalemler_orj or "", kalemler),
+        }
+    return ozetler
+
+
+def ihaleleri_indeksle(ihale_idleri) -> int:
+    """
+    Verilen ihalelerin FTS satırlarını veritabanındaki güncel hâlinden yeniden yazar
+    (silinmiş ihalelerin satırı kaldırılır).
+
+    Returns:
+        Yazılan satır sayısı.
+    """
+    from ihaleler.models import Ihale, Kalem
+
+    if connection.vendor != "sqlite":
+        return 0
+    idler = sorted({int(i) for i in ihale_idleri if i})
+    yazilan = 0
+    for bas in range(0, len(idler), 500):
+        parca = idler[bas:bas + 500]
+        ihaleler = {
+            pk: (adi or "", hastane or "")
+            for pk, adi, hastane in Ihale.objects.filter(pk__in=parca).values_list("pk", "ihale_adi", "hastane__ad")
+        }
+        kalemler = {}
+        for ihale_id, urun_adi in (
+            Kalem.objects.filter(ihale_id__in=list(ihaleler)).order_by("ihale_id", "pk").values_list("ihale_id", "urun_adi")
+        ):
+            # Satır sonu kalem ayıracı olduğu için ad içindeki satır sonları boşluğa çevrilir (uzunluk korunur)
+            kalemler.setdefault(ihale_id, []).append((urun_adi or "").replace("\n", " ").replace("\r", " "))
+        yer = ", ".join(["%s"] * len(parca))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLO} WHERE rowid IN ({yer})", parca)
+            satirlar = []
+            for pk, (adi, hastane) in ihaleler.items():
+                kalem_metni = "\n".join(kalemler.get(pk, []))
+                satirlar.append((pk, turkce_katla(adi), turkce_katla(hastane), turkce_katla(kalem_metni), kalem_metni))
+            if satirlar:
+                cursor.executemany(
+                    f"INSERT INTO {TABLO} (rowid, ihale_adi, hastane_ad, kalem_adlari, kalem_adlari_orj) VALUES (%s, %s, %s, %s, %s)",
+                    satirlar,
+                )
+        yazilan += len(ihaleler)
+    return yazilan
+
+
+def indeksi_yeniden_kur() -> int:
+    """FTS tablosunu boşaltıp tüm ihaleleri yeniden indeksler (yönetim komutu: arama_indeksi)."""
+    from ihaleler.models import Ihale
+
+    if connection.vendor != "sqlite":
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(OLUSTUR_SQL)
+        cursor.execute(f"DELETE FROM {TABLO}")
+    idler = list(Ihale.objects.order_by("pk").values_list("pk", flat=True))
+    return ihaleleri_indeksle(idler)
+
+
+def _kuyrukta(fonksiyon) -> bool:
+    """fonksiyon bulunulan transaction'ın on_commit kuyruğunda mı? (commit / geri alma kuyruğu boşaltır)"""
+    return any(kayit[1] is fonksiyon for kayit in connection.run_on_commit)
+
+
+def _bekleyenler():
+    """
+    Bulunulan transaction'ın (commit'te çalışacak fonksiyon, bekleyen ihale id kümesi) çifti. Fonksiyon
+    on_commit kuyruğunda değilse (commit edildi, geri alındı ya da henüz planlanmadı) yeni çift açılır;
+    geri alınan transaction'ın id'leri sonraki transaction'da "zaten bekliyor" sayılmaz.
+    """
+    kayit = getattr(_bekleyen, "kayit", None)
+    if kayit is None or not _kuyrukta(kayit[0]):
+        idler = set()
+
+        def _calistir():
+            try:
+                ihaleleri_indeksle(idler)
+            except Exception:
+                logger.exception("Arama indeksi güncellenemedi | ihale_id=%s", sorted(idler))
+
+        kayit = _bekleyen.kayit = (_calistir, idler)
+    return kayit
+
+
+def ihale_indeksini_guncelle(*ihale_idleri):
+    """
+    İhalelerin FTS satırını transaction commit edildiğinde yeniler (aynı transaction içindeki
+    tekrarlı çağrılar tek güncellemeye iner). Transaction dışında hemen çalışır.
+    """
+    if not fts_kullanilabilir():
+        return
+    calistir, idler = _bekleyenler()
+    idler.update(int(i) for i in ihale_idleri if i)
+    if idler and not _kuyrukta(calistir):
+        transaction.on_commit(calistir)
@@ -0,0 +1,230 @@
+"""
+Veritabanı tabanlı dosya işleme kuyruğu.
+
+Dosya yükleme isteği yalnızca bir DosyaIslemIsi kaydı açar ve hemen döner;
+`python manage.py isleme_kuyrugu` çalışanı kayıtları sırayla alıp
+document_pipeline.ihale_dosyalarini_isle ile (OpenAI/Anthropic yoksa Gemini ile) işler.
+Yükleme sayfası ilerlemeyi `islem/<pk>/durum/` adresinden sorgular.
+
+Çalışan, iş sürdükçe kaydın son_sinyal alanını yeniler (ilerleme_guncelle ve SINYAL_SANIYE aralıklı
+arka plan sinyali). TAKILMA_DAKIKA boyunca sinyal gelmeyen iş, çalışanı çökmüş sayılıp
+takilan_isleri_kurtar ile yeniden sıraya alınır; çalışanlar kurtarmayı döngüde düzenli olarak çalıştırır.
+
+Kullanım:
+    from ihaleler.utils.islem_kuyrugu import is_kuyruga_ekle
+    is_ = is_kuyruga_ekle(ihale, kullanici=request.user)
+"""
+import logging
+import os
+import threading
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+logger = logging.getLogger("ihaleler.parsing")
+
+# Bir iş en fazla bu kadar kez denenir (çalışan çökerse takılan iş yeniden sıraya alınır)
+MAKS_DENEME = 3
+# Bu süre boyunca sinyal göndermeyen "İşleniyor" iş takılmış sayılır
+TAKILMA_DAKIKA = 30
+# Çalışan iş sürerken en geç bu aralıkla son_sinyal'i yeniler
+SINYAL_SANIYE = 60
+
+
+def _api_anahtari(ad):
+    try:
+        from django.conf import settings
+        key = getattr(settings, ad, None) or os.environ.get(ad)
+    except Exception:
+        key = os.environ.get(ad)
+    return (key or "").strip()
+
+
+def varsayilan_provider():
+    """Tanımlı API anahtarına göre kullanılacak sağlayıcı: openai > anthropic > gemini; hiçbiri yoksa None."""
+    if _api_anahtari("OPENAI_API_KEY"):
+        return "openai"
+    if _api_anahtari("ANTHROPIC_API_KEY"):
+        return "anthropic"
+    if _api_anahtari("GEMINI_API_KEY"):
+        return "gemini"
+    return None
+
+
+def is_kuyruga_ekle(ihale, provider=None, kullanici=None):
+    """İhale için yeni işleme işi oluşturur ve döndürür. provider None ise varsayilan_provider() kullanılır."""
+    from ihaleler.models import DosyaIslemIsi
+
+    is_ = DosyaIslemIsi.objects.create(
+        ihale=ihale,
+        provider=provider or varsayilan_provider() or "openai",
+        asama="Sırada bekliyor",
+        olusturan_kullanici=kullanici,
+    )
+    logger.info("İş kuyruğa eklendi | is_id=%s | ihale_id=%s | provider=%s", is_.pk, ihale.pk, is_.provider)
+    return is_
+
+
+def siradaki_isi_al():
+    """
+    Sıradaki bekleyen işi 'İşleniyor' olarak işaretleyip döndürür; yoksa None.
+    Koşullu UPDATE ile alındığı için birden fazla çalışan aynı işi alamaz.
+    """
+    from ihaleler.models import DosyaIslemIsi
+
+    while True:
+        aday_id = (
+            DosyaIslemIsi.objects.filter(durum="Bekliyor")
+            .order_by("olusturulma_tarihi", "pk")
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if aday_id is None:
+            return None
+        alindi = DosyaIslemIsi.objects.filter(pk=aday_id, durum="Bekliyor").update(
+            durum="Isleniyor",
+            asama="İşlem başladı",
+            ilerleme=0,
+            baslama_tarihi=timezone.now(),
+            son_sinyal=timezone.now(),
+            deneme_sayisi=F("deneme_sayisi") + 1,
+        )
+        if alindi:
+            return DosyaIslemIsi.objects.select_related("ihale").get(pk=aday_id)
+        # Başka bir çalışan aldı; sıradakine bak
+
+
+def ilerleme_guncelle(is_id, yuzde, asama):
+    """İşin ilerleme yüzdesini ve aşamasını yazar; aynı güncelleme çalışan sinyalini de yeniler."""
+    from ihaleler.models import DosyaIslemIsi
+
+    DosyaIslemIsi.objects.filter(pk=is_id, durum="Isleniyor").update(
+        ilerleme=max(0, min(100, int(yuzde))), asama=asama[:200], son_sinyal=timezone.now(),
+    )
+
+
+def sinyal_gonder(is_id):
+    """Çalışanın işi hâlâ yürüttüğünü kaydeder (son_sinyal)."""
+    from ihaleler.models import DosyaIslemIsi
+
+    DosyaIslemIsi.objects.filter(pk=is_id, durum="Isleniyor").update(son_sinyal=timezone.now())
+
+
+def _sinyal_dongusu(is_id, dur: threading.Event):
+    """İş sürdükçe SINYAL_SANIYE aralıkla sinyal gönderir (uzun tek LLM çağrısında ilerleme gelmese de)."""
+    try:
+        while not dur.wait(SINYAL_SANIYE):
+            try:
+                sinyal_gonder(is_id)
+            except Exception:
+                logger.warning("İş sinyali yazılamadı | is_id=%s", is_id, exc_info=True)
+    finally:
+        close_old_connections()
+
+
+def takilan_isleri_kurtar(dakika: int = TAKILMA_DAKIKA) -> int:
+    """
+    Çalışanı çöken (TAKILMA_DAKIKA boyunca sinyal göndermeyen) işleri yeniden sıraya alır; deneme hakkı
+    bitenleri hata olarak kapatır. Uzun süren ama sinyal gönderen işlere dokunulmaz.
+    """
+    from ihaleler.models import DosyaIslemIsi
+
+    sinir = timezone.now() - timedelta(minutes=dakika)
+    takilanlar = DosyaIslemIsi.objects.alias(
+        sinyal=Coalesce("son_sinyal", "baslama_tarihi"),
+    ).filter(durum="Isleniyor", sinyal__lt=sinir)
+    yeniden = takilanlar.filter(deneme_sayisi__lt=MAKS_DENEME).update(
+        durum="Bekliyor", asama="Yeniden sıraya alındı"
+    )
+    kapatilan = takilanlar.update(
+        durum="Hata",
+        hata_mesaji="İşlem zaman aşımına uğradı.",
+        bitis_tarihi=timezone.now(),
+    )
+    if yeniden or kapatilan:
+        logger.warning("Takılan işler | yeniden_sirada=%s | kapatilan=%s", yeniden, kapatilan)
+    return yeniden + kapatilan
+
+
+def _gemini_ile_isle(ihale, islem_isi=None) -> dict:
+    """services.ihale_dosyalarini_isle_ve_kaydet (Gemini) sonucunu pipeline sonucu biçimine çevirir."""
+    from ihaleler.services import ihale_dosyalarini_isle_ve_kaydet
+    from ihaleler.utils.pipeline_izleme import calisma_izle
+
+    sonuc = {"basari": False, "olusturulan": 0, "atlanan": 0, "hatalar": [], "cetvel_kaynak": "gemini"}
+    cetvel = ihale.cetvel_dosya
+    sartname = ihale.sartname_dosya or None
+    with calisma_izle(ihale, provider="gemini", islem_isi=islem_isi) as calisma:
+        calisma.cetvel_kaynak = "gemini"
+        try:
+            cetvel.open("rb")
+            if sartname:
+                sartname.open("rb")
+            donus = ihale_dosyalarini_isle_ve_kaydet(ihale, cetvel, sartname)
+        finally:
+            cetvel.close()
+            if sartname:
+                sartname.close()
+        calisma.basari = bool(donus[0] if isinstance(donus, tuple) else donus)
+    sonuc["izleme"] = calisma.ozet()
+    if isinstance(donus, tuple):
+        sayi, hata = donus
+        sonuc["olusturulan"] = sayi or 0
+        if hata:
+            sonuc["hatalar"].append(str(hata))
+    else:
+        sonuc["olusturulan"] = donus or 0
+    sonuc["basari"] = sonuc["olusturulan"] > 0
+    return sonuc
+
+
+def isi_calistir(is_) -> dict:
+    """Alınmış (İşleniyor) bir işi çalıştırır; sonucu ve durumu kayda yazar."""
+    from ihaleler.models import DosyaIslemIsi
+    from ihaleler.utils.document_pipeline import ihale_dosyalarini_isle
+
+    ihale = is_.ihale
+
+    def _ilerleme(yuzde, asama):
+        ilerleme_guncelle(is_.pk, yuzde, asama)
+
+    logger.info("İş başladı | is_id=%s | ihale_id=%s | provider=%s", is_.pk, ihale.pk, is_.provider)
+    dur = threading.Event()
+    threading.Thread(target=_sinyal_dongusu, args=(is_.pk, dur), daemon=True, name=f"is-sinyali-{is_.pk}").start()
+    try:
+        if is_.provider == "gemini":
+            _ilerleme(10, "Gemini ile kalemler çıkarılıyor")
+            sonuc = _gemini_ile_isle(ihale, islem_isi=is_)
+        else:
+            sonuc = ihale_dosyalarini_isle(ihale, provider=is_.provider, ilerleme_bildir=_ilerleme, islem_isi=is_)
+            # Pipeline başarısızsa ve Gemini anahtarı varsa yedek olarak Gemini dene
+            if not sonuc.get("basari") and _api_anahtari("GEMINI_API_KEY"):
+                _ilerleme(50, "Yedek yöntem (Gemini) deneniyor")
+                yedek = _gemini_ile_isle(ihale, islem_isi=is_)
+                yedek["hatalar"] = sonuc.get("hatalar", []) + yedek["hatalar"]
+                sonuc = yedek
+    except Exception as e:
+        logger.exception("İş kritik hata | is_id=%s", is_.pk)
+        sonuc = {"basari": False, "olusturulan": 0, "atlanan": 0, "hatalar": [str(e)]}
+    finally:
+        dur.set()
+
+    hatalar = sonuc.get("hatalar") or []
+    # Bu deneme takılmış sayılıp başka çalışana verildiyse sonuç onun kaydının üzerine yazılmaz
+    yazildi = DosyaIslemIsi.objects.filter(pk=is_.pk, durum="Isleniyor", deneme_sayisi=is_.deneme_sayisi).update(
+        durum="Tamamlandi" if sonuc.get("basari") else "Hata",
+        ilerleme=100,
+        asama="Tamamlandı" if sonuc.get("basari") else "Kalem çıkarılamadı",
+        sonuc_json=sonuc,
+        hata_mesaji="\n".join(str(h) for h in hatalar)[:5000] or None,
+        bitis_tarihi=timezone.now(),
+    )
+    if not yazildi:
+        logger.warning("İş başka bir denemeye devredilmiş; sonuç yazılmadı | is_id=%s", is_.pk)
+    logger.info(
+        "İş bitti | is_id=%s | basari=%s | olusturulan=%s", is_.pk, sonuc.get("basari"), sonuc.get("olusturulan")
+    )
+    return sonuc
@@ -0,0 +1,93 @@
+"""
+Kalem teklif fiyatlarının toplu kaydı (ihale detay formu ve satır içi tablo).
+
+Gönderilen kalemler tek in_bulk sorgusuyla okunur, birim_fiyat/toplam_fiyat tek bulk_update ile yazılır ve
+etkilenen ihalelerin toplam_teklif_bedeli aynı transaction içinde kalem toplamından yeniden hesaplanır;
+ya hepsi kaydedilir ya hiçbiri. bulk_update / QuerySet.update sinyal üretmediği için analiz özetleri
+burada planlanır (ürün adı değişmediğinden arama indeksi etkilenmez).
+
+Kullanım:
+    from ihaleler.utils.kalem_fiyat import fiyat_coz, kalem_fiyatlarini_kaydet
+
+    sonuc = kalem_fiyatlarini_kaydet({12: fiyat_coz("1.250,50"), 13: Decimal("4")})
+    sonuc["ihaleler"]  # {5: Decimal("1262.50")}
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .analiz_ozet import ay_basi, ozet_planla
+
+_KURUS = Decimal("0.01")
+# Kalem.birim_fiyat: max_digits=12, decimal_places=2
+_AZAMI_BIRIM_FIYAT = Decimal("9999999999.99")
+
+
+def fiyat_coz(deger):
+    """
+    Formdan/JSON'dan gelen fiyatı Decimal'e çevirir ("12,5", "1.250,50", 12.5 kabul edilir).
+    Boş değer 0'dır; sayı olmayan, negatif veya alana sığmayan değerde None döner.
+    """
+    if deger is None:
+        return Decimal("0")
+    metin = str(deger).strip().replace(" ", "")
+    if not metin:
+        return Decimal("0")
+    if "," in metin:
+        # Türkçe yazım: binlik nokta, ondalık virgül
+        metin = metin.replace(".", "").replace(",", ".")
+    try:
+        fiyat = Decimal(metin).quantize(_KURUS)
+    except (InvalidOperation, ValueError):
+        return None
+    if not fiyat.is_finite() or fiyat < 0 or fiyat > _AZAMI_BIRIM_FIYAT:
+        return None
+    return fiyat
+
+
+def kalem_fiyatlarini_kaydet(fiyatlar: dict) -> dict:
+    """
+    {kalem_id: birim_fiyat} eşlemesini tek transaction'da kaydeder; toplam_fiyat = adet × birim_fiyat.
+    Bulunamayan id'ler atlanır.
+
+    Returns:
+        {"kalemler": [güncellenen Kalem nesneleri], "ihaleler": {ihale_id: yeni toplam_teklif_bedeli}}
+    """
+    from ihaleler.models import Ihale, Kalem
+
+    if not fiyatlar:
+        return {"kalemler": [], "ihaleler": {}}
+    with transaction.atomic():
+        kalemler = Kalem.objects.only("pk", "ihale_id", "adet", "urun_adi_norm").in_bulk(list(fiyatlar))
+        for kid, kalem in kalemler.items():
+            kalem.birim_fiyat = fiyatlar[kid]
+            kalem.toplam_fiyat = ((kalem.adet or 0) * kalem.birim_fiyat).quantize(_KURUS)
+        Kalem.objects.bulk_update(kalemler.values(), ["birim_fiyat", "toplam_fiyat"], batch_size=500)
+
+        ihale_idleri = {k.ihale_id for k in kalemler.values()}
+        kalem_toplami = (
+            Kalem.objects.filter(ihale=OuterRef("pk")).order_by().values("ihale")
+            .annotate(t=Sum("toplam_fiyat")).values("t")
+        )
+        ihaleler = Ihale.objects.filter(pk__in=ihale_idleri)
+        ihaleler.update(
+            toplam_teklif_bedeli=Coalesce(
+                Subquery(kalem_toplami), Value(Decimal("0")),
+                output_field=DecimalField(max_digits=15, decimal_places=2),
+            ),
+            guncellenme_tarihi=timezone.now(),
+        )
+        toplamlar = {}
+        hastaneler, aylar = set(), set()
+        for pk, toplam, hastane_id, tarih in ihaleler.values_list("pk", "toplam_teklif_bedeli", "hastane_id", "tarih"):
+            toplamlar[pk] = toplam
+            hastaneler.add(hastane_id)
+            aylar.add(ay_basi(tarih))
+        ozet_planla(
+            ihale=ihale_idleri, hastane=hastaneler, ay=aylar,
+            urun=[k.urun_adi_norm for k in kalemler.values()],
+        )
+    return {"kalemler": list(kalemler.values()), "ihaleler": toplamlar}
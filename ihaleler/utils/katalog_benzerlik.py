@@ -0,0 +1,245 @@
+"""
+Ürün kataloğu için bulanık (fuzzy) ad eşleştirme indeksi.
+
+Ürün adları Türkçe normalize edilip kanonik biçime getirilir (ondalık ayırıcı, "3 x 2.5" -> "3x2,5",
+kelime sırası önemsiz), ardından karakter 3-gram kümeleri üzerinde ters indeks kurulur.
+Sorguda yalnızca ortak 3-gram'ı olan ürünler taranır (çok sık geçen 3-gram'lar aday üretiminde atlanır),
+bu yüzden arama katalog boyutuyla doğrusal büyümez. Ad benzerliği (Dice katsayısı)
+_ozellik_benzerlik ile birleştirilir. Addaki sayılar (ölçü, numara, kesit: "50 ml", "No:8", "3/0")
+kesin koşuldur: sayı kümesi farklı olan ürün, ad ne kadar benzer olursa olsun aday olmaz.
+
+Kullanım:
+    from ihaleler.utils.katalog_benzerlik import katalog_indeksi
+
+    adaylar = katalog_indeksi().benzerler("Kablo NYY 3 x 2.5 mm²", teknik={"kesit": "2,5 mm²"}, k=5)
+    # [{"urun_id": 12, "skor": 0.91, "ad_skor": 0.88, "ozellik_skor": 1.0}, ...]
+
+İndeks tazeliği: UrunKutuphanesi kayıt/silme sinyalleri (ihaleler.signals) ve bulk_create yapan kod
+indekse_ekle / indeksten_cikar çağırır; commit'te Django cache'indeki katalog sürümü yeni, benzersiz bir
+değerle değiştirilir ve bu süreç dahil her süreç sürümün değiştiğini görünce indeksi yeniden kurar.
+Sürüm artırılmaz: FileBasedCache'te incr atomik değildir (get + set), eşzamanlı iki artırım aynı değeri
+yazıp bir değişikliği başka süreçlerden gizleyebilirdi. QuerySet.update ile ad değiştiren kod
+indekse_ekle'yi kendisi çağırmalıdır.
+"""
+import logging
+import re
+import threading
+import uuid
+from collections import Counter
+
+from ihaleler.utils.turkce import karakter_ngramlari, turkce_normalize
+
+logger = logging.getLogger("ihaleler.parsing")
+
+# Birleşik skor eşiği (settings.KATALOG_BENZERLIK_ESIGI ile değiştirilebilir)
+VARSAYILAN_ESIK = 0.82
+# Ad ve teknik özellik skorlarının ağırlığı (her iki tarafta da özellik varsa)
+AD_AGIRLIK = 0.7
+OZELLIK_AGIRLIK = 0.3
+# Kataloğun bu oranından fazlasında geçen 3-gram aday üretiminde kullanılmaz (skor hesabında kullanılır)
+_SIK_NGRAM_ORANI = 0.2
+_MIN_SIK_NGRAM = 50
+
+_ONDALIK_RE = re.compile(r"(?<=\d)\.(?=\d)")
+_CARPIM_RE = re.compile(r"(?<=\d)\s*[x*×]\s*(?=\d)")
+_AYIRAC_RE = re.compile(r"[^\w,]+")
+# Kanonik addaki kelimenin baştaki sayı kısmı: "50", "3x2,5", "21g" -> "21" ("mm2" gibi birimler sayı değildir)
+_SAYI_RE = re.compile(r"^\d+(?:,\d+)?(?:x\d+(?:,\d+)?)*")
+
+_SURUM_ANAHTARI = "katalog_indeksi:surum"
+
+
+def benzerlik_esigi() -> float:
+    try:
+        from django.conf import settings
+        return float(getattr(settings, "KATALOG_BENZERLIK_ESIGI", VARSAYILAN_ESIK))
+    except Exception:
+        return VARSAYILAN_ESIK
+
+
+def kanonik_ad(adi: str) -> str:
+    """Karşılaştırma için kanonik ad: "Kablo NYY 3 x 2.5 mm²" -> "3x2,5 kablo mm2 nyy" (kelimeler sıralı)."""
+    s = turkce_normalize(adi)
+    s = s.replace("×", "x").replace("²", "2").replace("³", "3")
+    s = _ONDALIK_RE.sub(",", s)
+    s = _CARPIM_RE.sub("x", s)
+    parcalar = [p.strip(",") for p in _AYIRAC_RE.split(s)]
+    return " ".join(sorted(p for p in parcalar if p))
+
+
+def sayilar(adi: str) -> tuple:
+    """Kanonik addaki sayıların sıralı çoklu kümesi: "Sütür 3/0 İpek" -> ("0", "3"), "Enjektör 50ml" -> ("50",)."""
+    bulunan = (_SAYI_RE.match(kelime) for kelime in kanonik_ad(adi).split())
+    return tuple(sorted(m.group(0) for m in bulunan if m))
+
+
+def ngram_kumesi(adi: str) -> frozenset:
+    """Kanonik adın kelime sınırlı 3-gram kümesi."""
+    kumesi = set()
+    for kelime in kanonik_ad(adi).split():
+        kumesi.update(karakter_ngramlari(kelime, 3))
+    return frozenset(kumesi)
+
+
+def birlesik_skor(ad_skor: float, teknik1: dict, teknik2: dict):
+    """
+    Ad benzerliği ile teknik özellik benzerliğini birleştirir.
+
+    Returns:
+        (skor, ozellik_skor). Ortak özellik anahtarları çelişiyorsa (benzerlik < 0.5) skor 0 olur.
+    """
+    from ihaleler.utils.urun_katalog_eslestir import _ozellik_anahtarlari, _ozellik_benzerlik
+
+    if not teknik1 or not teknik2:
+        return ad_skor, None
+    if not (_ozellik_anahtarlari(teknik1) & _ozellik_anahtarlari(teknik2)):
+        return ad_skor, None
+    ozellik = _ozellik_benzerlik(teknik1, teknik2)
+    if ozellik < 0.5:
+        return 0.0, ozellik
+    return AD_AGIRLIK * ad_skor + OZELLIK_AGIRLIK * ozellik, ozellik
+
+
+class KatalogIndeksi:
+    """Ürün adları üzerinde 3-gram ters indeks (bellek içi)."""
+
+    def __init__(self):
+        self._kilit = threading.Lock()
+        self._ngramlar = {}   # urun_id -> frozenset
+        self._teknik = {}     # urun_id -> dict
+        self._sayilar = {}    # urun_id -> sayilar()
+        self._ters = {}       # ngram -> set(urun_id)
+
+    def __len__(self):
+        return len(self._ngramlar)
+
+    def _eskiyi_sil(self, urun_id: int):
+        for g in self._ngramlar.pop(urun_id, ()):
+            liste = self._ters.get(g)
+            if liste is not None:
+                liste.discard(urun_id)
+                if not liste:
+                    del self._ters[g]
+        self._teknik.pop(urun_id, None)
+        self._sayilar.pop(urun_id, None)
+
+    def ekle(self, urun_id: int, urun_adi: str, teknik: dict = None):
+        kume = ngram_kumesi(urun_adi)
+        with self._kilit:
+            self._eskiyi_sil(urun_id)
+            self._ngramlar[urun_id] = kume
+            self._teknik[urun_id] = teknik if isinstance(teknik, dict) else {}
+            self._sayilar[urun_id] = sayilar(urun_adi)
+            for g in kume:
+                self._ters.setdefault(g, set()).add(urun_id)
+
+    def cikar(self, urun_id: int):
+        with self._kilit:
+            self._eskiyi_sil(urun_id)
+
+    def benzerler(self, adi: str, teknik: dict = None, k: int = 5, esik: float = None) -> list:
+        """
+        En benzer k katalog ürünü (birleşik skora göre azalan); esik verilirse altındakiler elenir.
+        Addaki sayıları (sayilar()) sorgununkilerle aynı olmayan ürünler elenir.
+
+        Returns:
+            [{"urun_id", "skor", "ad_skor", "ozellik_skor"}, ...]
+        """
+        sorgu = ngram_kumesi(adi)
+        if not sorgu:
+            return []
+        sorgu_sayilari = sayilar(adi)
+        with self._kilit:
+            sik_sinir = max(_MIN_SIK_NGRAM, int(len(self._ngramlar) * _SIK_NGRAM_ORANI))
+            ortak = Counter()
+            for g in sorgu:
+                liste = self._ters.get(g)
+                if liste and len(liste) <= sik_sinir:
+                    ortak.update(liste)
+            # Dice tavanı düşük adaylar skorlanmaz: paylaşılan seçici 3-gram sayısına göre en iyi 20*k
+            adaylar = [uid for uid, _ in ortak.most_common(max(20 * k, 50))]
+            sonuclar = []
+            for uid in adaylar:
+                if self._sayilar[uid] != sorgu_sayilari:
+                    continue
+                kume = self._ngramlar[uid]
+                ad_skor = 2 * len(sorgu & kume) / (len(sorgu) + len(kume))
+                skor, ozellik = birlesik_skor(ad_skor, teknik or {}, self._teknik.get(uid) or {})
+                if esik is not None and skor < esik:
+                    continue
+                sonuclar.append({
+                    "urun_id": uid,
+                    "skor": round(skor, 4),
+                    "ad_skor": round(ad_skor, 4),
+                    "ozellik_skor": None if ozellik is None else round(ozellik, 4),
+                })
+        sonuclar.sort(key=lambda r: (-r["skor"], r["urun_id"]))
+        return sonuclar[:k]
+
+
+_indeks = None
+_indeks_surumu = None
+_indeks_kilidi = threading.Lock()
+
+
+def _yeni_surum() -> str:
+    # Her değişiklik (ve önbellekten düşen anahtar) daha önce görülmemiş bir sürüm alır
+    return uuid.uuid4().hex
+
+
+def _surum():
+    from django.core.cache import cache
+
+    surum = cache.get(_SURUM_ANAHTARI)
+    if surum is None:
+        cache.add(_SURUM_ANAHTARI, _yeni_surum(), timeout=None)
+        surum = cache.get(_SURUM_ANAHTARI)
+    return surum
+
+
+def katalog_indeksi() -> KatalogIndeksi:
+    """
+    Süreç içi ortak katalog indeksi. Katalog sürümü (cache) değişmişse, yani bu ya da başka bir süreç
+    ürün ekleyip sildiyse ya da adını değiştirdiyse, indeks yeniden kurulur. Sıcak yolda veritabanına gidilmez.
+    """
+    global _indeks, _indeks_surumu
+    from ihaleler.models import UrunKutuphanesi
+
+    surum = _surum()
+    with _indeks_kilidi:
+        if _indeks is not None and surum == _indeks_surumu:
+            return _indeks
+        yeni = KatalogIndeksi()
+        for uid, adi, teknik in UrunKutuphanesi.objects.values_list("id", "urun_adi", "teknik_ozellikler_json").iterator():
+            yeni.ekle(uid, adi, teknik)
+        _indeks, _indeks_surumu = yeni, surum
+        return yeni
+
+
+def _surumu_yenile():
+    """Commit sonrası: katalog sürümünü yeni değere çeker; tüm süreçler (bu dahil) indeksi yeniden kurar."""
+    global _indeks_surumu
+    from django.core.cache import cache
+
+    with _indeks_kilidi:
+        _indeks_surumu = None
+    try:
+        cache.set(_SURUM_ANAHTARI, _yeni_surum(), timeout=None)
+    except Exception:
+        logger.warning("Katalog indeksi sürümü yenilenemedi", exc_info=True)
+
+
+def indekse_ekle(*urunler):
+    """Yeni/değişen katalog ürünleri için indeksi transaction commit'inde geçersiz kılar (transaction dışında hemen)."""
+    from django.db import transaction
+
+    if any(getattr(u, "pk", None) for u in urunler):
+        transaction.on_commit(_surumu_yenile)
+
+
+def indeksten_cikar(*urun_idler):
+    """Silinen katalog ürünleri için indeksi transaction commit'inde geçersiz kılar."""
+    from django.db import transaction
+
+    if any(urun_idler):
+        transaction.on_commit(_surumu_yenile)
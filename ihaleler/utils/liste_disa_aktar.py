@@ -0,0 +1,103 @@
+"""
+İhale listesinin (kalem satırlarıyla) toplu dışa aktarımı.
+
+Satırlar tek sorgudan iterator(chunk_size=...) ile parça parça okunur; hiçbir aşamada listenin tamamı
+bellekte tutulmaz. CSV akış hâlinde (StreamingHttpResponse) hemen inmeye başlar; XLSX openpyxl write-only
+modunda diske yazılıp dosya olarak döndürülür.
+
+Kullanım:
+    from ihaleler.utils.liste_disa_aktar import csv_akisi, liste_satirlari
+
+    yanit = StreamingHttpResponse(csv_akisi(liste_satirlari(qs)), content_type="text/csv; charset=utf-8")
+"""
+import csv
+import tempfile
+
+from django.utils import timezone
+
+BASLIKLAR = [
+    "İhale / İKN No", "İhale Adı", "Hastane / Kurum", "İl", "İhale Tarihi", "Tür", "Durum", "Doğrudan Temin",
+    "Ürün Adı", "Miktar", "Birim", "Birim Fiyat (₺)", "Toplam (₺)",
+]
+# Sayısal sütunların BASLIKLAR içindeki konumları
+_SAYI_SUTUNLARI = (9, 11, 12)
+PARCA_BOYUTU = 2000
+_CSV_GRUP = 200
+
+
+def liste_satirlari(qs, chunk_size: int = PARCA_BOYUTU):
+    """
+    İhale queryset'inden (sıralaması korunarak) kalem başına bir satır üretir; kalemi olmayan ihale
+    boş kalem sütunlarıyla bir kez yazılır. Kalemler ihale içinde id sırasıyladır.
+    """
+    from ihaleler.models import Ihale
+
+    durumlar = dict(Ihale.DURUM_CHOICES)
+    sira = list(qs.query.order_by) + ["kalemler__id"]
+    satirlar = qs.order_by(*sira).values_list(
+        "ihale_no", "ihale_adi", "hastane__ad", "il", "tarih", "tur", "durum", "is_dogrudan_temin",
+        "kalemler__urun_adi", "kalemler__adet", "kalemler__birim", "kalemler__birim_fiyat", "kalemler__toplam_fiyat",
+    )
+    for (no, adi, kurum, il, tarih, tur, durum, dt, urun, adet, birim, birim_fiyat, toplam) in satirlar.iterator(chunk_size=chunk_size):
+        yield [
+            no or "", adi or "", kurum or "", il or "",
+            timezone.localtime(tarih).strftime("%d.%m.%Y") if tarih else "",
+            tur or "", durumlar.get(durum, durum or ""), "Evet" if dt else "Hayır",
+            urun or "", adet, birim or "", birim_fiyat, toplam,
+        ]
+
+
+class _Yanki:
+    """csv.writer için yazılanı geri döndüren dosya benzeri nesne (akış için)."""
+
+    def write(self, deger):
+        return deger
+
+
+def csv_akisi(satirlar):
+    """
+    Excel (Türkçe yerel ayar) uyumlu CSV parçaları: UTF-8 BOM, ';' ayırıcı, ondalık ayırıcı virgül.
+    """
+    yazici = csv.writer(_Yanki(), delimiter=";")
+    yield "\ufeff" + yazici.writerow(BASLIKLAR)
+    tampon = []
+    for satir in satirlar:
+        for i in _SAYI_SUTUNLARI:
+            satir[i] = "" if satir[i] is None else str(satir[i]).replace(".", ",")
+        tampon.append(yazici.writerow(satir))
+        # Satır başına ayrı parça yerine küçük gruplar halinde gönder
+        if len(tampon) >= _CSV_GRUP:
+            yield "".join(tampon)
+            tampon = []
+    if tampon:
+        yield "".join(tampon)
+
+
+def xlsx_dosyasi(satirlar, sayfa_adi: str = "İhaleler"):
+    """
+    openpyxl write-only çalışma kitabını geçici dosyaya yazar (satırlar bellekte birikmez).
+
+    Returns:
+        Başa sarılmış geçici dosya nesnesi (kapatılınca silinir).
+    """
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(sayfa_adi)
+    kalin = Font(bold=True)
+    baslik = []
+    for ad in BASLIKLAR:
+        hucre = WriteOnlyCell(ws, value=ad)
+        hucre.font = kalin
+        baslik.append(hucre)
+    ws.append(baslik)
+    for satir in satirlar:
+        for i in _SAYI_SUTUNLARI:
+            satir[i] = None if satir[i] is None else float(satir[i])
+        ws.append(satir)
+    dosya = tempfile.TemporaryFile()
+    wb.save(dosya)
+    dosya.seek(0)
+    return dosya
@@ -0,0 +1,101 @@
+"""
+Paylaşılan OpenAI / Anthropic istemcileri.
+
+SDK istemcileri thread güvenlidir ve içlerinde bir httpx bağlantı havuzu taşır; her çağrıda yeni istemci
+kurmak havuzu çöpe atıp her kalem için TLS el sıkışmasını tekrarlatır. Burada (sağlayıcı, API anahtarı)
+başına tek istemci tembel olarak kurulur ve süreç boyunca yeniden kullanılır: açık bağlantı/okuma zaman
+aşımları (LLM_BAGLANTI_ZAMAN_ASIMI, LLM_OKUMA_ZAMAN_ASIMI) ve keep-alive'lı sınırlı bağlantı havuzu
+(LLM_BAGLANTI_HAVUZU) ile. Süreç çatallanırsa (fork) istemciler yeniden kurulur. SDK'ların kendi tekrar
+denemesi kapalıdır; tekrar politikası llm_yonlendirici'dedir.
+
+Kullanım:
+    from ihaleler.utils.llm_istemci import istemci_al
+
+    client = istemci_al("openai", api_key)
+    r = client.chat.completions.create(model="gpt-4o-mini", messages=[...])
+"""
+import atexit
+import hashlib
+import logging
+import os
+import threading
+
+logger = logging.getLogger("ihaleler.parsing")
+
+_istemciler = {}
+_kilit = threading.Lock()
+_sahip_pid = os.getpid()
+
+
+def _ayar(ad, varsayilan):
+    try:
+        from django.conf import settings
+        return getattr(settings, ad, varsayilan)
+    except Exception:
+        return os.environ.get(ad, varsayilan)
+
+
+def _http_ayarlari(sdk):
+    """SDK'nın varsayılan httpx istemcisi (proxy/ayarları korur) + zaman aşımı ve havuz sınırları."""
+    import httpx
+
+    baglanti = float(_ayar("LLM_BAGLANTI_ZAMAN_ASIMI", 10))
+    okuma = float(_ayar("LLM_OKUMA_ZAMAN_ASIMI", 120))
+    havuz = int(_ayar("LLM_BAGLANTI_HAVUZU", 20))
+    zaman_asimi = httpx.Timeout(okuma, connect=baglanti)
+    sinirlar = httpx.Limits(max_connections=havuz, max_keepalive_connections=havuz, keepalive_expiry=30.0)
+    http_sinifi = getattr(sdk, "DefaultHttpxClient", None) or httpx.Client
+    return zaman_asimi, http_sinifi(timeout=zaman_asimi, limits=sinirlar)
+
+
+def _olustur(provider: str, api_key: str):
+    if provider == "openai":
+        try:
+            import openai
+        except ImportError:
+            raise RuntimeError("openai paketi yüklü değil: pip install openai") from None
+        zaman_asimi, http_client = _http_ayarlari(openai)
+        return openai.OpenAI(api_key=api_key, timeout=zaman_asimi, http_client=http_client, max_retries=0)
+    if provider == "anthropic":
+        try:
+            import anthropic
+        except ImportError:
+            raise RuntimeError("anthropic paketi yüklü değil: pip install anthropic") from None
+        zaman_asimi, http_client = _http_ayarlari(anthropic)
+        return anthropic.Anthropic(api_key=api_key, timeout=zaman_asimi, http_client=http_client, max_retries=0)
+    raise ValueError(f"Bilinmeyen LLM sağlayıcısı: {provider}")
+
+
+def istemci_al(provider: str, api_key: str):
+    """(provider, api_key) için paylaşılan istemci; ilk çağrıda kurulur."""
+    global _sahip_pid
+    # API anahtarı sözlük anahtarında düz tutulmaz
+    anahtar = (provider, hashlib.sha256((api_key or "").encode("utf-8")).hexdigest())
+    istemci = _istemciler.get(anahtar)
+    if istemci is not None and _sahip_pid == os.getpid():
+        return istemci
+    with _kilit:
+        if _sahip_pid != os.getpid():
+            # Çatallanmış süreç: ebeveynin soketleri paylaşılmamalı
+            _istemciler.clear()
+            _sahip_pid = os.getpid()
+        istemci = _istemciler.get(anahtar)
+        if istemci is None:
+            istemci = _istemciler[anahtar] = _olustur(provider, api_key)
+            logger.debug("LLM istemcisi kuruldu | %s", provider)
+    return istemci
+
+
+def istemcileri_kapat():
+    """Tüm istemcilerin bağlantı havuzlarını kapatır (süreç kapanışı / testler)."""
+    with _kilit:
+        istemciler = list(_istemciler.values())
+        _istemciler.clear()
+    for istemci in istemciler:
+        try:
+            istemci.close()
+        except Exception:
+            pass
+
+
+atexit.register(istemcileri_kapat)
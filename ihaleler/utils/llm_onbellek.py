@@ -0,0 +1,213 @@
+"""
+İçerik adresli Vision/LLM yanıt önbelleği (LlmOnbellek modeli).
+
+Anahtar: SHA-256(sayfa görseli baytları veya metin) + sağlayıcı + model + prompt sürümü.
+Aynı cetvel tekrar yüklendiğinde veya yeniden işlendiğinde API çağrısı yapılmaz.
+Toplam boyut LLM_ONBELLEK_MAKS_MB'yi aşınca en uzun süredir erişilmeyen kayıtlar silinir. Toplam boyut her
+yazımda hesaplanmaz: süreç içi tahmini toplam (son ölçüm + bu süreçte yazılan baytlar) sınırı aşınca ya da
+_OLCUM_ARALIGI yazımda bir (başka süreçlerin yazdıkları için) tablodan yeniden ölçülür.
+
+Kullanım:
+    from ihaleler.utils.llm_onbellek import onbellekli_cagir
+
+    ham, onbellekten = onbellekli_cagir(
+        image_bytes, arka_uc.provider, arka_uc.model, prompt_surumu("v1", system, user),
+        lambda: sohbet(arka_uc, system, user, gorsel_png=image_bytes),
+        gecerli=lambda ham: tablo_coz(ham) is not None,   # ayrıştırılamayan yanıt yazılmaz
+    )
+"""
+import hashlib
+import logging
+import threading
+import time
+
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from ihaleler.utils.pipeline_izleme import asama_kaydet
+
+logger = logging.getLogger("ihaleler.parsing")
+
+_sayaclar = {"isabet": 0, "iska": 0, "yazma": 0, "tahliye": 0}
+_sayac_kilidi = threading.Lock()
+
+# Toplam boyut bu kadar yazımda bir tablodan yeniden ölçülür
+_OLCUM_ARALIGI = 200
+# Süreç içi boyut takibi: [tahmini toplam bayt (None: henüz ölçülmedi), son ölçümden beri yazım sayısı]
+_boyut = [None, 0]
+_boyut_kilidi = threading.Lock()
+
+
+def _artir(ad: str, miktar: int = 1):
+    with _sayac_kilidi:
+        _sayaclar[ad] += miktar
+
+
+def istatistik() -> dict:
+    """Bu süreçteki isabet/ıska/yazma/tahliye sayaçları ve isabet oranı."""
+    with _sayac_kilidi:
+        sonuc = dict(_sayaclar)
+    toplam = sonuc["isabet"] + sonuc["iska"]
+    sonuc["isabet_orani"] = (sonuc["isabet"] / toplam) if toplam else 0.0
+    return sonuc
+
+
+def _ayar(ad, varsayilan):
+    try:
+        from django.conf import settings
+        return getattr(settings, ad, varsayilan)
+    except Exception:
+        return varsayilan
+
+
+def icerik_ozeti(veri) -> str:
+    """Bayt veya metin içeriğin SHA-256 özeti (hex)."""
+    if isinstance(veri, str):
+        veri = veri.encode("utf-8")
+    return hashlib.sha256(veri or b"").hexdigest()
+
+
+def prompt_surumu(surum: str, *promptlar: str) -> str:
+    """Elle verilen sürüm + prompt metinlerinin kısa özeti; prompt değişince önbellek kendiliğinden geçersizleşir."""
+    ozet = hashlib.sha256("\x00".join(p or "" for p in promptlar).encode("utf-8")).hexdigest()[:12]
+    return f"{surum}:{ozet}"[:50]
+
+
+def onbellek_anahtari(icerik_hash: str, provider: str, model: str, surum: str) -> str:
+    return hashlib.sha256(f"{icerik_hash}|{provider}|{model}|{surum}".encode("utf-8")).hexdigest()
+
+
+def onbellekten_al(icerik_hash: str, provider: str, model: str, surum: str):
+    """Önbellekteki ham yanıtı döndürür; yoksa None."""
+    if not _ayar("LLM_ONBELLEK_AKTIF", True):
+        return None
+    anahtar = onbellek_anahtari(icerik_hash, provider, model, surum)
+    try:
+        from ihaleler.models import LlmOnbellek
+        yanit = LlmOnbellek.objects.filter(anahtar=anahtar).values_list("yanit", flat=True).first()
+    except Exception:
+        logger.debug("Önbellek okunamadı", exc_info=True)
+        return None
+    if yanit is None:
+        _artir("iska")
+        return None
+    try:
+        # İsabet sayacı yalnızca istatistik: kilitli DB isabeti hataya çevirmemeli
+        LlmOnbellek.objects.filter(anahtar=anahtar).update(isabet_sayisi=F("isabet_sayisi") + 1, son_erisim=timezone.now())
+    except Exception:
+        logger.debug("Önbellek isabet sayacı güncellenemedi", exc_info=True)
+    _artir("isabet")
+    logger.debug("Önbellek isabeti | %s/%s | %s", provider, model, icerik_hash[:12])
+    return yanit
+
+
+def onbellege_yaz(icerik_hash: str, provider: str, model: str, surum: str, yanit: str):
+    """Ham yanıtı önbelleğe yazar; boyut sınırı aşılırsa eski kayıtları siler. Boş yanıt yazılmaz."""
+    if not yanit or not _ayar("LLM_ONBELLEK_AKTIF", True):
+        return
+    anahtar = onbellek_anahtari(icerik_hash, provider, model, surum)
+    alanlar = {
+        "icerik_ozeti": icerik_hash,
+        "provider": provider,
+        "model": model[:100],
+        "prompt_surumu": surum[:50],
+        "yanit": yanit,
+        "boyut": len(yanit.encode("utf-8")),
+        "son_erisim": timezone.now(),
+    }
+    try:
+        from django.db import IntegrityError
+        from ihaleler.models import LlmOnbellek
+        # update_or_create yerine tek ifadeli yazımlar: SQLite'ta paralel thread/süreçlerde
+        # okuma→yazma kilit yükseltmesi ("database is locked") yaşanmaz.
+        if not LlmOnbellek.objects.filter(anahtar=anahtar).update(**alanlar):
+            try:
+                LlmOnbellek.objects.create(anahtar=anahtar, **alanlar)
+            except IntegrityError:
+                pass  # Aynı anda başka bir thread/süreç yazdı
+        _artir("yazma")
+        if _olcum_gerekli(alanlar["boyut"]):
+            _tahliye_et()
+    except Exception:
+        logger.warning("Önbelleğe yazılamadı", exc_info=True)
+
+
+def _sinir() -> int:
+    return int(_ayar("LLM_ONBELLEK_MAKS_MB", 200)) * 1024 * 1024
+
+
+def _olcum_gerekli(yazilan: int) -> bool:
+    """
+    Yazılan baytı tahmini toplama ekler; tahmin sınırı aştıysa, hiç ölçülmediyse veya _OLCUM_ARALIGI
+    yazım geçtiyse True (gerçek toplam _tahliye_et'te ölçülür). Güncellenen kayıt da eklenir: tahmin
+    gerçek toplamdan küçük olmaz.
+    """
+    with _boyut_kilidi:
+        _boyut[1] += 1
+        if _boyut[0] is not None:
+            _boyut[0] += yazilan
+        return _boyut[0] is None or _boyut[0] > _sinir() or _boyut[1] >= _OLCUM_ARALIGI
+
+
+def _tahliye_et():
+    """Toplam boyut sınırı aşıldıysa en uzun süredir erişilmeyenlerden başlayarak %90'ın altına iner."""
+    from ihaleler.models import LlmOnbellek
+
+    sinir = _sinir()
+    toplam = LlmOnbellek.objects.aggregate(t=Sum("boyut"))["t"] or 0
+    with _boyut_kilidi:
+        _boyut[:] = [toplam, 0]
+    if toplam <= sinir:
+        return
+    hedef = int(sinir * 0.9)
+    silinecek = []
+    for pk, boyut in LlmOnbellek.objects.order_by("son_erisim").values_list("pk", "boyut").iterator():
+        if toplam <= hedef:
+            break
+        silinecek.append(pk)
+        toplam -= boyut
+    if silinecek:
+        LlmOnbellek.objects.filter(pk__in=silinecek).delete()
+        with _boyut_kilidi:
+            _boyut[0] = toplam
+        _artir("tahliye", len(silinecek))
+        logger.info("Önbellek tahliyesi | silinen=%s", len(silinecek))
+
+
+def _gecerli_mi(gecerli, yanit: str) -> bool:
+    if gecerli is None:
+        return True
+    try:
+        return bool(gecerli(yanit))
+    except Exception:
+        return False
+
+
+def onbellekli_cagir(icerik, provider: str, model: str, surum: str, cagir, gecerli=None):
+    """
+    Önbellekte varsa ham yanıtı döndürür, yoksa cagir() ile API'yi çağırıp sonucu yazar.
+
+    gecerli(ham_yanit) -> bool verilirse yalnızca geçerli (ör. ayrıştırılabilen) yanıt yazılır; kesik, reddedilmiş
+    veya bozuk yanıt önbelleğe girip aynı içerik için sürekli tekrar edilmez. Önbellekteki geçersiz kayıt ıska sayılır.
+
+    Returns:
+        (ham_yanit: str, onbellekten: bool)
+    """
+    icerik_hash = icerik_ozeti(icerik)
+    baslangic = time.perf_counter()
+    onceki = onbellekten_al(icerik_hash, provider, model, surum)
+    if onceki is not None and not _gecerli_mi(gecerli, onceki):
+        logger.debug("Önbellekteki yanıt geçersiz; yeniden çağrılıyor | %s/%s", provider, model)
+        onceki = None
+    if onceki is not None:
+        asama_kaydet(
+            "llm_onbellek", time.perf_counter() - baslangic,
+            provider=provider, model=model, onbellek=True, cikti_bayt=len(onceki.encode("utf-8")),
+        )
+        return onceki, True
+    yanit = cagir()
+    if _gecerli_mi(gecerli, yanit):
+        onbellege_yaz(icerik_hash, provider, model, surum, yanit)
+    else:
+        logger.warning("LLM yanıtı geçersiz; önbelleğe yazılmadı | %s/%s", provider, model)
+    return yanit, False
@@ -0,0 +1,526 @@
+"""
+LLM sağlayıcı yönlendiricisi: yedek zinciri + arka uç başına devre kesici.
+
+Bir çağrı sırayla zincirdeki (sağlayıcı, model) arka uçlarına denenir: önce istenen sağlayıcı, sonra
+LLM_SAGLAYICI_SIRASI'ndaki API anahtarı tanımlı diğerleri. Her arka ucun son LLM_DEVRE_PENCERE çağrısı
+(başarı, süre, hata sınıfı) tutulur; ardışık LLM_DEVRE_ESIK kota/sunucu hatasında (429/5xx, zaman aşımı)
+veya penceredeki bu hataların oranı LLM_DEVRE_HATA_ORANI'nı aşınca devre açılır ve arka uç
+LLM_DEVRE_BEKLEME saniye atlanır; süre dolunca tek bir deneme çağrısı geçer, başarılıysa devre kapanır.
+Devre durumu süreç içidir. Geçici hatalar yedeğe geçmeden önce aynı arka uçta üstel geri çekilme + jitter
+ile (Retry-After'a uyarak) birkaç kez tekrar denenir; yetki hataları tekrarlanmaz.
+
+"sahte" sağlayıcı ağ kullanmaz (çevrimdışı deneme ve testler için); LLM_SAGLAYICI_SIRASI'na
+"sahte:<model>" yazılarak veya tercih="sahte" verilerek zincire girer, yanıtları sahte_saglayici.planla ile
+belirlenir.
+
+Kullanım:
+    from ihaleler.utils.llm_yonlendirici import arka_uc_zinciri, sohbet, yonlendir
+
+    zincir = arka_uc_zinciri({"openai": ["gpt-4o-mini"], "anthropic": ["claude-sonnet-4-20250514"]}, tercih="openai")
+    ham, arka_uc = yonlendir(zincir, lambda a: sohbet(a, system, user, max_tokens=2048))
+"""
+import base64
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import deque, namedtuple
+from email.utils import parsedate_to_datetime
+
+from ihaleler.utils.llm_zamanlayici import mutabakat, rezerve_et, zamanlayici_al
+from ihaleler.utils.pipeline_izleme import asama, asama_kaydet
+
+logger = logging.getLogger("ihaleler.parsing")
+
+ArkaUc = namedtuple("ArkaUc", "provider model")
+
+SAGLAYICILAR = ("openai", "anthropic", "gemini", "sahte")
+_VARSAYILAN_SIRA = ("openai", "anthropic", "gemini")
+_ANAHTAR_AYARLARI = {"openai": "OPENAI_API_KEY", "anthropic": "ANTHROPIC_API_KEY", "gemini": "GEMINI_API_KEY"}
+# Devreyi açan hata sınıfları (sağlayıcı tarafı / geçici); diğerleri yalnızca yedeğe geçirir
+_DEVRE_SINIFLARI = {"kota", "sunucu", "zaman_asimi", "baglanti"}
+# Hata oranı ancak pencerede bu kadar çağrı birikince değerlendirilir
+_ORAN_MIN_CAGRI = 10
+_KARAKTER_PER_TOKEN = 3.5
+# Bir sayfa görselinin girdi token tahmini (kova rezervasyonu için)
+_GORSEL_TOKEN = 1500
+
+
+class LlmYonlendirmeHatasi(RuntimeError):
+    """Zincirdeki hiçbir arka uç yanıt veremedi; hatalar: [(ArkaUc, Exception), ...]."""
+
+    def __init__(self, mesaj, hatalar=None):
+        super().__init__(mesaj)
+        self.hatalar = hatalar or []
+
+
+def _ayar(ad, varsayilan):
+    try:
+        from django.conf import settings
+        return getattr(settings, ad, varsayilan)
+    except Exception:
+        return os.environ.get(ad, varsayilan)
+
+
+def api_anahtari(provider: str) -> str:
+    if provider == "sahte":
+        return "sahte"
+    ad = _ANAHTAR_AYARLARI.get(provider)
+    if not ad:
+        return ""
+    return (_ayar(ad, None) or os.environ.get(ad) or "").strip()
+
+
+# -----------------------------------------------------------------------------
+# Hata sınıflandırma
+# -----------------------------------------------------------------------------
+
+def _durum_kodu(e):
+    """SDK hatasındaki HTTP durum kodu (openai/anthropic: status_code, google: code)."""
+    for ad in ("status_code", "code", "http_status"):
+        kod = getattr(e, ad, None)
+        if isinstance(kod, int) and 100 <= kod < 600:
+            return kod
+    yanit = getattr(e, "response", None)
+    kod = getattr(yanit, "status_code", None)
+    return kod if isinstance(kod, int) else None
+
+
+def hata_sinifi(e: Exception) -> str:
+    """
+    Hatayı sınıflandırır: "kota" (429 / resource exhausted), "sunucu" (5xx), "zaman_asimi", "baglanti",
+    "yetki" (401/403), "bulunamadi" (404, model yok), "istemci" (diğer 4xx: istek hatalı) veya "diger".
+    """
+    kod = _durum_kodu(e)
+    ad = type(e).__name__.lower()
+    metin = str(e).lower()
+    if kod == 429 or "ratelimit" in ad or "resourceexhausted" in ad or "quota" in metin or "resource exhausted" in metin \
+            or "resource_exhausted" in metin:
+        return "kota"
+    if kod in (401, 403) or "authentication" in ad or "permissiondenied" in ad or "api key not valid" in metin:
+        return "yetki"
+    if kod == 404 or "notfound" in ad or "not found" in metin or "not supported" in metin:
+        return "bulunamadi"
+    if kod in (408,) or "timeout" in ad or "deadlineexceeded" in ad or "timed out" in metin:
+        return "zaman_asimi"
+    if kod is not None and kod >= 500 or "internalservererror" in ad or "serviceunavailable" in ad or "overloaded" in metin:
+        return "sunucu"
+    if "connection" in ad or "connecterror" in ad:
+        return "baglanti"
+    if kod is not None and 400 <= kod < 500:
+        return "istemci"
+    return "diger"
+
+
+# -----------------------------------------------------------------------------
+# Tekrar politikası
+# -----------------------------------------------------------------------------
+
+# Aynı arka uçta tekrar denenen hata sınıfları ve bekleme çarpanı (kota hatası daha uzun bekler).
+# Yetki, istemci ve model-yok hataları tekrarlanmaz: aynı istek aynı sonucu verir.
+_TEKRAR_CARPANI = {"kota": 2.0, "sunucu": 1.0, "zaman_asimi": 1.0, "baglanti": 0.5}
+_RETRY_IN_RE = re.compile(r"retry in\s+([\d.]+)\s*s", re.IGNORECASE)
+_RETRY_DELAY_RE = re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE)
+
+
+def retry_after(e: Exception):
+    """
+    Sağlayıcının önerdiği bekleme (sn); yoksa None. Sırasıyla: hatadaki retry_after özniteliği,
+    yanıttaki retry-after-ms / Retry-After başlığı (saniye veya HTTP tarihi), Gemini hata metnindeki
+    "retry in Ns" / retry_delay.
+    """
+    deger = getattr(e, "retry_after", None)
+    if isinstance(deger, (int, float)):
+        return max(0.0, float(deger))
+    basliklar = getattr(getattr(e, "response", None), "headers", None)
+    if basliklar is not None:
+        try:
+            ms = basliklar.get("retry-after-ms")
+            if ms:
+                return max(0.0, float(ms) / 1000)
+            ra = basliklar.get("retry-after")
+            if ra:
+                try:
+                    return max(0.0, float(ra))
+                except ValueError:
+                    tarih = parsedate_to_datetime(ra)
+                    return max(0.0, tarih.timestamp() - time.time())
+        except Exception:
+            pass
+    metin = str(e)
+    eslesme = _RETRY_IN_RE.search(metin) or _RETRY_DELAY_RE.search(metin)
+    return float(eslesme.group(1)) if eslesme else None
+
+
+def tekrar_beklemesi(e: Exception, sinif: str, deneme: int):
+    """
+    deneme'inci (0'dan) başarısız çağrıdan sonra beklenecek süre; tekrar denenmeyecekse None.
+    Retry-After varsa ona uyulur; yoksa üstel geri çekilme (taban × çarpan × 2^deneme, LLM_TEKRAR_TAVAN ile
+    sınırlı) ve yarısı rastgele jitter — aynı anda kotaya takılan thread'ler aynı anda geri dönmesin.
+    """
+    carpan = _TEKRAR_CARPANI.get(sinif)
+    if carpan is None or deneme >= int(_ayar("LLM_TEKRAR_SAYISI", 3)):
+        return None
+    onerilen = retry_after(e)
+    if onerilen is not None:
+        return onerilen + random.uniform(0, min(1.0, onerilen * 0.1 + 0.1))
+    ust = min(float(_ayar("LLM_TEKRAR_TAVAN", 30)), float(_ayar("LLM_TEKRAR_TABAN", 1.0)) * carpan * 2 ** deneme)
+    return ust / 2 + random.uniform(0, ust / 2)
+
+
+# -----------------------------------------------------------------------------
+# Devre kesici ve sağlık istatistikleri
+# -----------------------------------------------------------------------------
+
+class _Devre:
+    def __init__(self, pencere: int):
+        self.durum = "kapali"  # kapali | acik | yarim_acik
+        self.ardisik = 0
+        self.acilma = 0.0
+        self.deneme_suruyor = False
+        self.sonuclar = deque(maxlen=pencere)  # (basari, sure, hata_sinifi)
+
+
+_devreler = {}
+_devre_kilidi = threading.Lock()
+
+
+def _devre(arka_uc) -> _Devre:
+    d = _devreler.get(arka_uc)
+    if d is None:
+        d = _devreler.setdefault(arka_uc, _Devre(int(_ayar("LLM_DEVRE_PENCERE", 20))))
+    return d
+
+
+def _izin_var_mi(arka_uc) -> bool:
+    """Devre kapalıysa evet; açıksa bekleme dolduğunda tek bir deneme çağrısına izin verir."""
+    with _devre_kilidi:
+        d = _devre(arka_uc)
+        if d.durum == "kapali":
+            return True
+        if d.durum == "acik":
+            if time.monotonic() - d.acilma < float(_ayar("LLM_DEVRE_BEKLEME", 30)):
+                return False
+            d.durum = "yarim_acik"
+            d.deneme_suruyor = False
+        if d.deneme_suruyor:
+            return False
+        d.deneme_suruyor = True
+        return True
+
+
+def _devre_acik_mi(arka_uc) -> bool:
+    with _devre_kilidi:
+        return _devre(arka_uc).durum == "acik"
+
+
+def _basari_yaz(arka_uc, sure: float):
+    with _devre_kilidi:
+        d = _devre(arka_uc)
+        d.sonuclar.append((True, sure, None))
+        d.ardisik = 0
+        if d.durum != "kapali":
+            logger.info("Devre kapandı | %s/%s", *arka_uc)
+        d.durum = "kapali"
+        d.deneme_suruyor = False
+
+
+def _hata_yaz(arka_uc, sure: float, sinif: str):
+    with _devre_kilidi:
+        d = _devre(arka_uc)
+        d.sonuclar.append((False, sure, sinif))
+        d.deneme_suruyor = False
+        if sinif not in _DEVRE_SINIFLARI:
+            return
+        d.ardisik += 1
+        devre_hatalari = sum(1 for basari, _, s in d.sonuclar if not basari and s in _DEVRE_SINIFLARI)
+        oran = devre_hatalari / len(d.sonuclar)
+        if (
+            d.durum == "yarim_acik"
+            or d.ardisik >= int(_ayar("LLM_DEVRE_ESIK", 3))
+            or (len(d.sonuclar) >= _ORAN_MIN_CAGRI and oran >= float(_ayar("LLM_DEVRE_HATA_ORANI", 0.5)))
+        ):
+            if d.durum != "acik":
+                logger.warning(
+                    "Devre açıldı | %s/%s | ardisik=%s | hata_orani=%.2f | son=%s", *arka_uc, d.ardisik, oran, sinif
+                )
+            d.durum = "acik"
+            d.acilma = time.monotonic()
+
+
+def saglik_durumu() -> list:
+    """Arka uç başına devre durumu, penceredeki çağrı sayısı, hata oranı ve ortalama / en yüksek süre (sn)."""
+    with _devre_kilidi:
+        rapor = []
+        for (provider, model), d in sorted(_devreler.items()):
+            sureler = [s for _, s, _ in d.sonuclar]
+            hatalar = [s for basari, _, s in d.sonuclar if not basari]
+            rapor.append({
+                "provider": provider,
+                "model": model,
+                "durum": d.durum,
+                "cagri": len(d.sonuclar),
+                "hata_orani": round(len(hatalar) / len(d.sonuclar), 3) if d.sonuclar else 0.0,
+                "ort_sure": round(sum(sureler) / len(sureler), 3) if sureler else None,
+                "maks_sure": round(max(sureler), 3) if sureler else None,
+                "son_hata": hatalar[-1] if hatalar else None,
+            })
+    return rapor
+
+
+def devreleri_sifirla():
+    """Tüm devre ve istatistikleri siler (testler / yönetim komutu)."""
+    with _devre_kilidi:
+        _devreler.clear()
+
+
+# -----------------------------------------------------------------------------
+# Zincir ve yönlendirme
+# -----------------------------------------------------------------------------
+
+def _saglayici_sirasi() -> list:
+    sira = _ayar("LLM_SAGLAYICI_SIRASI", None) or _VARSAYILAN_SIRA
+    if isinstance(sira, str):
+        sira = [s.strip() for s in sira.split(",")]
+    return [s for s in sira if s]
+
+
+def arka_uc_zinciri(modeller: dict, tercih: str = None) -> list:
+    """
+    Denenecek arka uçlar. modeller çağıranın sağlayıcı başına model listesidir ({"openai": ["gpt-4o"], ...});
+    LLM_SAGLAYICI_SIRASI'ndaki "sağlayıcı:model" girdileri modeli doğrudan belirler. tercih edilen
+    sağlayıcının arka uçları başa alınır; API anahtarı olmayan sağlayıcılar atlanır.
+    """
+    if tercih and tercih not in SAGLAYICILAR:
+        raise LlmYonlendirmeHatasi(f"Bilinmeyen provider: {tercih}. {', '.join(SAGLAYICILAR[:3])} kullanın.")
+    girdiler = _saglayici_sirasi()
+    if tercih and not any(g.split(":", 1)[0] == tercih for g in girdiler):
+        girdiler = [tercih] + girdiler
+    zincir = []
+    for girdi in girdiler:
+        provider, _, model = girdi.partition(":")
+        if provider not in SAGLAYICILAR or not api_anahtari(provider):
+            continue
+        for m in ([model] if model else (modeller.get(provider) or (["sahte"] if provider == "sahte" else []))):
+            if ArkaUc(provider, m) not in zincir:
+                zincir.append(ArkaUc(provider, m))
+    if tercih:
+        zincir.sort(key=lambda a: a.provider != tercih)
+    if not zincir:
+        raise LlmYonlendirmeHatasi("Tanımlı LLM API anahtarı yok (OPENAI_API_KEY / ANTHROPIC_API_KEY / GEMINI_API_KEY).")
+    return zincir
+
+
+def yonlendir(zincir: list, fonksiyon):
+    """
+    fonksiyon(arka_uc)'u zincirdeki ilk sağlıklı arka uçla çalıştırır. Geçici hatalarda (kota, 5xx, zaman
+    aşımı, bağlantı) aynı arka uç tekrar_beklemesi kadar beklenip en fazla LLM_TEKRAR_SAYISI kez yeniden
+    denenir, sonra sıradakine geçilir; tüm çağrı LLM_TEKRAR_SURE_SINIRI saniyeyi aşacaksa beklenmez.
+    İstemci hataları (400 vb.: istek hatalı) diğer arka uçlarda da tekrarlanacağı için zinciri durdurur.
+    Her deneme, o an hizmet veren arka ucun sağlayıcısının eşzamanlılık sınırı içinde çalışır
+    (zamanlayici_al(arka_uc.provider)); yedeğe geçen çağrı yedeğin sınırına tabidir, tekrar beklemesinde
+    yer tutulmaz.
+
+    Returns:
+        (sonuc, kullanılan ArkaUc)
+    Raises:
+        LlmYonlendirmeHatasi: hiçbir arka uç sonuç veremediyse.
+    """
+    son_an = time.monotonic() + float(_ayar("LLM_TEKRAR_SURE_SINIRI", 90))
+    hatalar = []
+    atlanan = []
+    for arka_uc in zincir:
+        deneme = 0
+        while True:
+            if not _izin_var_mi(arka_uc):
+                atlanan.append(arka_uc)
+                break
+            t0 = time.monotonic()
+            try:
+                sonuc = zamanlayici_al(arka_uc.provider).calistir(fonksiyon, arka_uc)
+            except Exception as e:
+                sinif = hata_sinifi(e)
+                _hata_yaz(arka_uc, time.monotonic() - t0, sinif)
+                logger.warning("LLM arka uç hatası | %s/%s | %s | %s", arka_uc.provider, arka_uc.model, sinif, e)
+                bekle = tekrar_beklemesi(e, sinif, deneme)
+                # Bu hatayla devre açıldıysa beklemeden yedeğe geç
+                if bekle is not None and time.monotonic() + bekle < son_an and not _devre_acik_mi(arka_uc):
+                    logger.info(
+                        "Tekrar denenecek | %s/%s | deneme=%s | %.1f sn bekleniyor",
+                        arka_uc.provider, arka_uc.model, deneme + 1, bekle,
+                    )
+                    time.sleep(bekle)
+                    deneme += 1
+                    continue
+                hatalar.append((arka_uc, e))
+                break
+            _basari_yaz(arka_uc, time.monotonic() - t0)
+            if hatalar or atlanan:
+                logger.info("Yedek arka uç kullanıldı | %s/%s", arka_uc.provider, arka_uc.model)
+            return sonuc, arka_uc
+        if hatalar and hatalar[-1][0] == arka_uc and hata_sinifi(hatalar[-1][1]) == "istemci":
+            break
+    parcalar = [f"{a.provider}/{a.model}: {e}" for a, e in hatalar]
+    parcalar += [f"{a.provider}/{a.model}: devre açık" for a in atlanan]
+    raise LlmYonlendirmeHatasi("; ".join(parcalar) or "Denenecek arka uç yok", hatalar)
+
+
+# -----------------------------------------------------------------------------
+# Sağlayıcı bağdaştırıcıları: aynı imza, düz metin yanıt
+# -----------------------------------------------------------------------------
+
+def _openai_sohbet(model, system, user, max_tokens, gorsel_png, api_key):
+    from ihaleler.utils.llm_istemci import istemci_al
+
+    icerik = user
+    if gorsel_png:
+        b64 = base64.b64encode(gorsel_png).decode("utf-8")
+        icerik = [
+            {"type": "text", "text": user},
+            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{b64}"}},
+        ]
+    r = istemci_al("openai", api_key).chat.completions.create(
+        model=model,
+        messages=[{"role": "system", "content": system}, {"role": "user", "content": icerik}],
+        max_tokens=max_tokens,
+    )
+    kullanim = getattr(r, "usage", None)
+    return (
+        (r.choices[0].message.content or "").strip(),
+        getattr(kullanim, "prompt_tokens", None), getattr(kullanim, "completion_tokens", None),
+    )
+
+
+def _anthropic_sohbet(model, system, user, max_tokens, gorsel_png, api_key):
+    from ihaleler.utils.llm_istemci import istemci_al
+
+    icerik = user
+    if gorsel_png:
+        b64 = base64.b64encode(gorsel_png).decode("utf-8")
+        icerik = [
+            {"type": "text", "text": user},
+            {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": b64}},
+        ]
+    r = istemci_al("anthropic", api_key).messages.create(
+        model=model,
+        max_tokens=max_tokens,
+        system=system,
+        messages=[{"role": "user", "content": icerik}],
+    )
+    kullanim = getattr(r, "usage", None)
+    return (
+        (r.content[0].text if r.content else "").strip(),
+        getattr(kullanim, "input_tokens", None), getattr(kullanim, "output_tokens", None),
+    )
+
+
+_gemini_kilidi = threading.Lock()
+
+
+def _gemini_sohbet(model, system, user, max_tokens, gorsel_png, api_key):
+    try:
+        import google.generativeai as genai
+    except ImportError:
+        raise RuntimeError("google-generativeai paketi yüklü değil: pip install google-generativeai") from None
+    with _gemini_kilidi:
+        genai.configure(api_key=api_key)
+    parcalar = [user]
+    if gorsel_png:
+        parcalar.append({"mime_type": "image/png", "data": gorsel_png})
+    r = genai.GenerativeModel(model, system_instruction=system).generate_content(
+        parcalar, generation_config={"max_output_tokens": max_tokens},
+    )
+    kullanim = getattr(r, "usage_metadata", None)
+    return (
+        (r.text or "").strip(),
+        getattr(kullanim, "prompt_token_count", None), getattr(kullanim, "candidates_token_count", None),
+    )
+
+
+class SahteHata(Exception):
+    """Sahte sağlayıcının fırlattığı HTTP hatası (status_code ile sınıflandırılır, retry_after sn)."""
+
+    def __init__(self, status_code: int = 500, mesaj: str = "", retry_after: float = None):
+        super().__init__(mesaj or f"Sahte sağlayıcı hatası ({status_code})")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class SahteSaglayici:
+    """
+    Ağsız sağlayıcı. Model başına sıralı senaryo: her çağrı sıradaki adımı tüketir; adım metinse döner,
+    Exception ise fırlatılır, çağrılabilirse fonksiyon(system, user, gorsel_png) sonucu döner. Senaryo
+    bitince `varsayilan` kullanılır. Yapılan çağrılar `cagrilar` listesinde (model, user) olarak tutulur.
+    """
+
+    def __init__(self, varsayilan="{}", gecikme: float = 0.0):
+        self.varsayilan = varsayilan
+        self.gecikme = gecikme
+        self.cagrilar = []
+        self._senaryo = {}
+        self._kilit = threading.Lock()
+
+    def planla(self, model: str, *adimlar):
+        with self._kilit:
+            self._senaryo.setdefault(model, deque()).extend(adimlar)
+
+    def sifirla(self):
+        with self._kilit:
+            self._senaryo.clear()
+            self.cagrilar.clear()
+
+    def __call__(self, model, system, user, max_tokens, gorsel_png, api_key):
+        with self._kilit:
+            self.cagrilar.append((model, user))
+            sira = self._senaryo.get(model)
+            adim = sira.popleft() if sira else self.varsayilan
+        if self.gecikme:
+            time.sleep(self.gecikme)
+        if isinstance(adim, BaseException):
+            raise adim
+        metin = adim(system, user, gorsel_png) if callable(adim) else adim
+        return metin, tahmini_token(system + user), tahmini_token(metin)
+
+
+sahte_saglayici = SahteSaglayici()
+
+_BAGDASTIRICILAR = {
+    "openai": _openai_sohbet,
+    "anthropic": _anthropic_sohbet,
+    "gemini": _gemini_sohbet,
+    "sahte": sahte_saglayici,
+}
+
+
+def tahmini_token(metin: str) -> int:
+    """Yaklaşık token sayısı (Türkçe metinde ~3,5 karakter/token)."""
+    return int(len(metin or "") / _KARAKTER_PER_TOKEN) + 1
+
+
+def sohbet(arka_uc, system: str, user: str, max_tokens: int = 4096, gorsel_png: bytes = None) -> str:
+    """
+    Arka uca tek sistem + kullanıcı mesajı (isteğe bağlı PNG görsel) gönderir; yanıt metnini döndürür.
+    Çağrıdan önce sağlayıcı:model kovasından tahmini token ayrılır (llm_zamanlayici.rezerve_et), yanıttan
+    sonra sağlayıcının bildirdiği gerçek kullanımla düzeltilir; hata alan çağrının token'ı iade edilir.
+    Ölçülen bir pipeline çalışması içindeyse çağrı "llm_cagrisi" aşaması olarak yazılır (pipeline_izleme).
+    """
+    tahmin = tahmini_token(system) + tahmini_token(user) + max_tokens + (_GORSEL_TOKEN if gorsel_png else 0)
+    rezervasyon = rezerve_et(arka_uc.provider, arka_uc.model, tahmin)
+    if rezervasyon["bekleme"]:
+        asama_kaydet("kota_bekleme", rezervasyon["bekleme"], provider=arka_uc.provider, model=arka_uc.model)
+    gercek = 0
+    girdi_bayt = len(system.encode("utf-8")) + len(user.encode("utf-8")) + len(gorsel_png or b"")
+    try:
+        with asama("llm_cagrisi", provider=arka_uc.provider, model=arka_uc.model, girdi_bayt=girdi_bayt,
+                   onbellek=False) as olcum:
+            metin, girdi, cikti = _BAGDASTIRICILAR[arka_uc.provider](
+                arka_uc.model, system, user, max_tokens, gorsel_png, api_anahtari(arka_uc.provider),
+            )
+            olcum.update(girdi_token=girdi or 0, cikti_token=cikti or 0, cikti_bayt=len((metin or "").encode("utf-8")))
+        # Kullanım bildirilmediyse tahmin geçerli kalır
+        gercek = (girdi or 0) + (cikti or 0) if girdi is not None or cikti is not None else tahmin
+        return metin
+    finally:
+        mutabakat(rezervasyon, gercek)
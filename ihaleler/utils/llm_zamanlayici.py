@@ -0,0 +1,270 @@
+"""
+LLM çağrı sınırları: süreç içi eşzamanlılık + süreçler arası ortak token kovası.
+
+Eşzamanlılık: kalem/şartname eşleştirme çağrıları sınırlı bir thread havuzunda paralel yapılır (haritala);
+her sağlayıcı için süreç içinde aynı anda en fazla LLM_ESZAMANLI[provider] çağrı açık olur. Sınır, çağrıyı
+fiilen karşılayan arka ucun sağlayıcısına uygulanır: llm_yonlendirici.yonlendir her denemeyi o sağlayıcının
+zamanlayıcısında (calistir) çalıştırır; yedeğe geçen çağrı istenen sağlayıcının değil yedeğin yerini tutar.
+
+Dakikalık kota: her gerçek API çağrısı (llm_yonlendirici.sohbet) önce rezerve_et ile hizmet veren arka ucun
+sağlayıcı:model kovasından tahmini token ve bir istek ayırır, yanıttan sonra mutabakat ile gerçek kullanımı yazar (fazlası
+iade edilir, eksik kalan borç olarak sonraki çağrıları bekletir). Kovalar LlmHizKovasi tablosundadır;
+gunicorn işçileri ve kuyruk çalışanları aynı kotayı paylaşır. Kova kapasitesi dakikalık sınırdır
+(LLM_TPM / LLM_RPM; "sağlayıcı:model" anahtarı sağlayıcı değerini ezer), saniyede sınır/60 yenilenir.
+Güncellemeler tek UPDATE ifadesidir: SQLite'ta okuma→yazma kilit yükseltmesi yaşanmaz. Veritabanı
+kullanılamıyorsa (migrate öncesi, uygulama dışı betik) aynı hesap süreç içinde yapılır.
+
+Kullanım:
+    from ihaleler.utils.llm_zamanlayici import mutabakat, rezerve_et, zamanlayici_al
+
+    rez = rezerve_et("openai", "gpt-4o-mini", 3000)   # kova yetene kadar bekler
+    ...                                                # API çağrısı
+    mutabakat(rez, gercek_token=2140)
+
+    sonuclar = zamanlayici_al("openai").haritala(lambda grup: llm_cagir(grup), gruplar)
+    # sonuclar gruplar ile aynı sırada; fonksiyon hata fırlatırsa o sıradaki eleman Exception nesnesidir
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ihaleler.utils.pipeline_izleme import baglamda
+
+logger = logging.getLogger("ihaleler.parsing")
+
+_VARSAYILAN_ESZAMANLI = {"openai": 8, "anthropic": 4, "gemini": 4}
+_VARSAYILAN_TPM = {"openai": 200000, "anthropic": 80000, "gemini": 250000}
+_VARSAYILAN_RPM = {"openai": 500, "anthropic": 50, "gemini": 150}
+# Kova yetmezse tek seferde en fazla bu kadar uyunur, sonra yeniden denenir (başka süreç iade etmiş olabilir)
+_MAKS_UYKU = 5.0
+
+
+def _ayar_sozluk(ad, varsayilan: dict) -> dict:
+    try:
+        from django.conf import settings
+        deger = getattr(settings, ad, None)
+    except Exception:
+        deger = None
+    return {**varsayilan, **(deger or {})}
+
+
+def _sinir(ad, varsayilan: dict, provider: str, model: str, yedek: int) -> int:
+    sinirlar = _ayar_sozluk(ad, varsayilan)
+    deger = sinirlar.get(f"{provider}:{model}") or sinirlar.get(provider) or yedek
+    return max(1, int(deger))
+
+
+# -----------------------------------------------------------------------------
+# Ortak token kovası
+# -----------------------------------------------------------------------------
+
+_yerel_kovalar = {}  # anahtar -> [token, istek, guncelleme]; veritabanı yokken
+_yerel_kilit = threading.Lock()
+
+
+def _kova_ayarlari(provider: str, model: str):
+    tpm = _sinir("LLM_TPM", _VARSAYILAN_TPM, provider, model, 100000)
+    rpm = _sinir("LLM_RPM", _VARSAYILAN_RPM, provider, model, 1000)
+    return tpm, rpm
+
+
+def _db_kullanilabilir() -> bool:
+    try:
+        from django.apps import apps
+        return apps.ready
+    except Exception:
+        return False
+
+
+def _db_ayir(anahtar: str, token: float, tpm: int, rpm: int):
+    """Kovadan token + 1 istek düşmeyi dener. Başarıda None, yetmezse beklenecek süre (sn) döner."""
+    from django.db import IntegrityError
+    from django.db.models import F, Value
+    from django.db.models.functions import Least
+    from ihaleler.models import LlmHizKovasi
+
+    simdi = time.time()
+    gecen = Value(simdi) - F("guncelleme")
+    token_seviye = Least(Value(float(tpm)), F("token") + gecen * Value(tpm / 60.0))
+    istek_seviye = Least(Value(float(rpm)), F("istek") + gecen * Value(rpm / 60.0))
+    guncellenen = LlmHizKovasi.objects.filter(
+        anahtar=anahtar,
+        # seviye >= gereken  <=>  birikmiş + geçen × hız >= gereken (kapasite kontrolü çağıranda)
+        token__gte=Value(token) - gecen * Value(tpm / 60.0),
+        istek__gte=Value(1.0) - gecen * Value(rpm / 60.0),
+    ).update(token=token_seviye - Value(token), istek=istek_seviye - Value(1.0), guncelleme=Value(simdi))
+    if guncellenen:
+        return None
+    satir = LlmHizKovasi.objects.filter(anahtar=anahtar).values_list("token", "istek", "guncelleme").first()
+    if satir is None:
+        try:
+            LlmHizKovasi.objects.create(anahtar=anahtar, token=tpm - token, istek=rpm - 1, guncelleme=simdi)
+            return None
+        except IntegrityError:
+            return 0.0  # Aynı anda başka süreç oluşturdu; hemen yeniden dene
+    return _bekleme(satir, token, tpm, rpm, simdi)
+
+
+def _bekleme(satir, token: float, tpm: int, rpm: int, simdi: float) -> float:
+    mevcut_token, mevcut_istek, guncelleme = satir
+    gecen = max(0.0, simdi - guncelleme)
+    token_seviye = min(tpm, mevcut_token + gecen * tpm / 60.0)
+    istek_seviye = min(rpm, mevcut_istek + gecen * rpm / 60.0)
+    return max((token - token_seviye) / (tpm / 60.0), (1 - istek_seviye) / (rpm / 60.0), 0.0)
+
+
+def _yerel_ayir(anahtar: str, token: float, tpm: int, rpm: int):
+    with _yerel_kilit:
+        simdi = time.time()
+        kova = _yerel_kovalar.setdefault(anahtar, [float(tpm), float(rpm), simdi])
+        bekle = _bekleme(kova, token, tpm, rpm, simdi)
+        if bekle > 0:
+            return bekle
+        gecen = simdi - kova[2]
+        kova[0] = min(tpm, kova[0] + gecen * tpm / 60.0) - token
+        kova[1] = min(rpm, kova[1] + gecen * rpm / 60.0) - 1
+        kova[2] = simdi
+        return None
+
+
+def rezerve_et(provider: str, model: str, tahmini_token: int) -> dict:
+    """
+    provider:model kovasından tahmini_token ve bir istek ayırır; kova yetene kadar bekler.
+    Dakikalık sınırdan büyük istek kova tam doluyken geçer (yoksa sonsuza dek bekler).
+
+    Returns:
+        mutabakat'a verilecek rezervasyon: {"anahtar", "token", "tpm", "yerel", "bekleme" (sn)}
+    """
+    tpm, rpm = _kova_ayarlari(provider, model)
+    anahtar = f"{provider}:{model}"[:130]
+    token = float(min(max(1, int(tahmini_token or 1)), tpm))
+    toplam_bekleme = 0.0
+    while True:
+        bekle = None
+        if _db_kullanilabilir():
+            try:
+                bekle = _db_ayir(anahtar, token, tpm, rpm)
+                yerel = False
+            except Exception:
+                logger.debug("Hız kovası veritabanında tutulamadı; süreç içi kova kullanılıyor", exc_info=True)
+                yerel = True
+        else:
+            yerel = True
+        if yerel:
+            bekle = _yerel_ayir(anahtar, token, tpm, rpm)
+        if bekle is None:
+            if toplam_bekleme:
+                logger.debug("Hız sınırı | %s | %.1f sn beklendi", anahtar, toplam_bekleme)
+            return {"anahtar": anahtar, "token": token, "tpm": tpm, "yerel": yerel, "bekleme": toplam_bekleme}
+        uyku = min(_MAKS_UYKU, max(0.05, bekle))
+        toplam_bekleme += uyku
+        time.sleep(uyku)
+
+
+def mutabakat(rezervasyon: dict, gercek_token: int):
+    """Ayrılan tahmini token ile gerçek kullanım arasındaki farkı kovaya iade eder (veya borç yazar)."""
+    if not rezervasyon:
+        return
+    fark = float(rezervasyon["token"]) - max(0, int(gercek_token or 0))
+    if not fark:
+        return
+    tpm = rezervasyon["tpm"]
+    if rezervasyon.get("yerel"):
+        with _yerel_kilit:
+            kova = _yerel_kovalar.get(rezervasyon["anahtar"])
+            if kova:
+                kova[0] = min(tpm, kova[0] + fark)
+        return
+    try:
+        from django.db.models import F, Value
+        from django.db.models.functions import Least
+        from ihaleler.models import LlmHizKovasi
+
+        LlmHizKovasi.objects.filter(anahtar=rezervasyon["anahtar"]).update(
+            token=Least(Value(float(tpm)), F("token") + Value(fark))
+        )
+    except Exception:
+        logger.debug("Hız kovası mutabakatı yazılamadı", exc_info=True)
+
+
+# -----------------------------------------------------------------------------
+# Süreç içi eşzamanlılık
+# -----------------------------------------------------------------------------
+
+class LlmZamanlayici:
+    """
+    Tek sağlayıcı için eşzamanlılık semaforu (dakikalık kota rezerve_et ile çağrı başına uygulanır).
+    Semafor yalnızca calistir'da tutulur; haritala yalnızca thread sayısını sınırlar, asıl yer
+    yonlendir'in her denemede hizmet veren sağlayıcının calistir'ı ile alınır.
+    """
+
+    def __init__(self, provider: str, eszamanli: int = None):
+        self.provider = provider
+        self.eszamanli = max(1, int(eszamanli or _ayar_sozluk("LLM_ESZAMANLI", _VARSAYILAN_ESZAMANLI).get(provider, 4)))
+        self._semafor = threading.BoundedSemaphore(self.eszamanli)
+
+    def calistir(self, fonksiyon, *args, **kwargs):
+        """Tek çağrıyı eşzamanlılık sınırı içinde çalıştırır (bulunulan thread'de)."""
+        with self._semafor:
+            return fonksiyon(*args, **kwargs)
+
+    def haritala(self, fonksiyon, ogeler: list, tamamlandi=None) -> list:
+        """
+        fonksiyon(oge) çağrılarını en fazla `eszamanli` thread ile paralel çalıştırır. Semafor burada
+        tutulmaz (iç içe alınırsa yedeğe geçişte kilitlenebilir); LLM çağrısı yonlendir içinde sınırlanır.
+        tamamlandi verilirse her çağrı bittiğinde (bitiş sırasıyla, haritala'yı çağıran thread'de)
+        tamamlandi(sira, sonuc) çağrılır; ilerleme bildirimi için.
+
+        Returns:
+            ogeler ile aynı sırada sonuç listesi; hata fırlatan çağrının yerinde Exception nesnesi bulunur.
+        """
+        ogeler = list(ogeler)
+        if not ogeler:
+            return []
+
+        def _tek(oge):
+            try:
+                return fonksiyon(oge)
+            except Exception as e:
+                return e
+
+        def _havuzda(oge):
+            try:
+                return _tek(oge)
+            finally:
+                # Kova / önbellek sorguları bu thread'de DB bağlantısı açar; thread dönmeden kapat
+                try:
+                    from django.db import connection
+                    connection.close()
+                except Exception:
+                    pass
+
+        sonuclar = [None] * len(ogeler)
+        if len(ogeler) == 1:
+            sonuclar[0] = _tek(ogeler[0])
+            if tamamlandi is not None:
+                tamamlandi(0, sonuclar[0])
+            return sonuclar
+        with ThreadPoolExecutor(max_workers=min(self.eszamanli, len(ogeler))) as havuz:
+            # Pipeline ölçüm bağlamı (pipeline_izleme) havuz thread'lerine taşınır
+            gorevler = {havuz.submit(baglamda(_havuzda), oge): sira for sira, oge in enumerate(ogeler)}
+            for gorev in as_completed(gorevler):
+                sira = gorevler[gorev]
+                sonuclar[sira] = gorev.result()
+                if tamamlandi is not None:
+                    tamamlandi(sira, sonuclar[sira])
+        return sonuclar
+
+
+_zamanlayicilar = {}
+_zamanlayici_kilidi = threading.Lock()
+
+
+def zamanlayici_al(provider: str) -> LlmZamanlayici:
+    """Sağlayıcının süreç içi ortak zamanlayıcısı."""
+    with _zamanlayici_kilidi:
+        z = _zamanlayicilar.get(provider)
+        if z is None:
+            z = _zamanlayicilar[provider] = LlmZamanlayici(provider)
+        return z
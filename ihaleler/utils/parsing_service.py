@@ -11,12 +11,29 @@ from pathlib import Path
 
 from ihaleler.utils.file_to_text import extract_text_from_file
 from ihaleler.utils.document_vision import (
+    analiz_et_tum_sayfalar,
     analiz_et_ve_tablo_dondur,
     file_to_image_bytes,
 )
+from ihaleler.utils.llm_onbellek import onbellekli_cagir, prompt_surumu
+from ihaleler.utils.llm_yonlendirici import LlmYonlendirmeHatasi, arka_uc_zinciri, sohbet, yonlendir
+from ihaleler.utils.llm_zamanlayici import zamanlayici_al
+from ihaleler.utils.pipeline_izleme import asama
+from ihaleler.utils.tablo_ayristir import excel_cetvel_ayristir, word_cetvel_ayristir
 
 logger = logging.getLogger("ihaleler.parsing")
 
+OPENAI_METIN_MODEL = "gpt-4o-mini"
+ANTHROPIC_METIN_MODEL = "claude-sonnet-4-20250514"
+GEMINI_METIN_MODEL = "gemini-2.5-flash"
+METIN_MODELLERI = {
+    "openai": [OPENAI_METIN_MODEL],
+    "anthropic": [ANTHROPIC_METIN_MODEL],
+    "gemini": [GEMINI_METIN_MODEL],
+}
+# Prompt veya çıktı formatı değiştiğinde artırın (önbellek anahtarına girer)
+CETVEL_METIN_PROMPT_SURUMU = "v1"
+
 # Word için metin tabanlı LLM tablo çıkarma
 _CETVEL_METIN_SYSTEM = """Sen bir birim fiyat cetveli / teklif listesi analiz uzmanısın.
 Sana bir belgenin ham metni (OCR veya Word'den) verilecek. Görsel yerleşim (layout) bilgisi metin sırası ve satır yapısından anlaşılacak.
@@ -26,66 +43,48 @@ Yanıtını SADECE şu JSON formatında ver: {"tablo": [{"ad": "...", "miktar":
 Başlık satırlarını tabloya ekleme. Belirsiz satırları atla."""
 
 
-def _get_api_keys():
+def _guven_esigi(ad: str) -> float:
+    """Kural tabanlı cetvel ayrıştırma güven eşiği (EXCEL_CETVEL_GUVEN_ESIGI / WORD_CETVEL_GUVEN_ESIGI)."""
     try:
         from django.conf import settings
-        return {
-            "openai": getattr(settings, "OPENAI_API_KEY", None) or os.environ.get("OPENAI_API_KEY"),
-            "anthropic": getattr(settings, "ANTHROPIC_API_KEY", None) or os.environ.get("ANTHROPIC_API_KEY"),
-        }
+        return float(getattr(settings, ad, 0.75))
     except Exception:
-        return {"openai": os.environ.get("OPENAI_API_KEY"), "anthropic": os.environ.get("ANTHROPIC_API_KEY")}
+        return float(os.environ.get(ad, "0.75"))
 
 
-def _call_openai_text(system: str, user: str, api_key: str) -> str:
-    from openai import OpenAI
-    client = OpenAI(api_key=api_key)
-    r = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "system", "content": system}, {"role": "user", "content": user}],
-        max_tokens=4096,
-    )
-    return (r.choices[0].message.content or "").strip()
-
-
-def _call_anthropic_text(system: str, user: str, api_key: str) -> str:
-    from anthropic import Anthropic
-    client = Anthropic(api_key=api_key)
-    r = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=4096,
-        system=system,
-        messages=[{"role": "user", "content": user}],
-    )
-    return (r.content[0].text if r.content else "").strip()
-
-
-def _parse_tablo_from_text(text: str) -> list:
-    text = text.strip()
-    match = re.search(r"\{[\s\S]*\}", text)
+def _tablo_coz(text: str):
+    """Yanıttaki {"tablo": [...]} listesini döndürür; yanıt ayrıştırılamıyorsa (kesik/bozuk JSON) None."""
+    match = re.search(r"\{[\s\S]*\}", (text or "").strip())
     if not match:
-        return []
+        return None
     try:
         data = json.loads(match.group(0))
-        tablo = data.get("tablo") if isinstance(data, dict) else data
-        return tablo if isinstance(tablo, list) else []
     except json.JSONDecodeError:
-        return []
+        return None
+    tablo = data.get("tablo") if isinstance(data, dict) else data
+    return tablo if isinstance(tablo, list) else None
+
+
+def _parse_tablo_from_text(text: str) -> list:
+    return _tablo_coz(text) or []
 
 
 def _cetvel_from_word_text(word_text: str, provider: str = "openai", max_chars: int = 80000) -> list:
     """Word veya OCR metninden layout mantığıyla cetvel tablosu çıkarır."""
-    keys = _get_api_keys()
     metin = word_text[:max_chars] if len(word_text) > max_chars else word_text
     user = f"Belge metni:\n\n{metin}\n\nYukarıdaki metinden birim fiyat cetveli kalemlerini çıkar (ad, miktar, birim, birim_fiyat, toplam)."
+    surum = prompt_surumu(CETVEL_METIN_PROMPT_SURUMU, _CETVEL_METIN_SYSTEM)
     try:
-        if provider == "openai" and keys.get("openai"):
-            raw = _call_openai_text(_CETVEL_METIN_SYSTEM, user, keys["openai"])
-        elif provider == "anthropic" and keys.get("anthropic"):
-            raw = _call_anthropic_text(_CETVEL_METIN_SYSTEM, user, keys["anthropic"])
-        else:
-            logger.warning("Word/OCR tablo çıkarma için API anahtarı yok; boş tablo dönüyor.")
-            return []
+        zincir = arka_uc_zinciri(METIN_MODELLERI, tercih=provider)
+    except LlmYonlendirmeHatasi as e:
+        logger.warning("Word/OCR tablo çıkarma yapılamadı (%s); boş tablo dönüyor.", e)
+        return []
+    try:
+        (raw, _), _ = yonlendir(zincir, lambda a: onbellekli_cagir(
+            user, a.provider, a.model, surum,
+            lambda: sohbet(a, _CETVEL_METIN_SYSTEM, user, max_tokens=4096),
+            gecerli=lambda ham: _tablo_coz(ham) is not None,
+        ))
         tablo = _parse_tablo_from_text(raw)
         for row in tablo:
             if "ad" not in row and "kalem" in row:
@@ -122,20 +121,28 @@ def extract_cetvel_layout_based(
     file_path: str,
     provider: str = "openai",
     page_or_sheet_index: int = 0,
+    tum_sayfalar: bool = False,
 ) -> dict:
     """
     Her türlü formatı (PDF, Excel, Word, Resim) analiz eder; sütun adına bağımlı kalmadan
     görsel yerleşimden birim teklif cetveli kalemlerini çıkarır: ad, miktar, birim, fiyat.
 
+    tum_sayfalar=True ise page_or_sheet_index yok sayılır; PDF'in tüm sayfaları / Excel'in
+    tüm sheet'leri paralel olarak Vision'a gönderilip sayfa sırasıyla birleştirilir.
+
     Returns:
         {
             "basari": bool,
             "kalemler": [{"ad": "...", "miktar": "...", "birim": "...", "birim_fiyat": "...", "toplam": "..."}, ...],
             "hata": str | None,
-            "kaynak": "vision" | "word_ocr",
+            "kaynak": "excel_tablo" | "word_tablo" | "vision" | "word_ocr",
+            "guven": float | None,   # kural tabanlı Excel/Word ayrıştırmasının güven puanı
         }
+
+    Excel (.xlsx) hücreleri ve Word (.docx) tabloları önce LLM'siz ayrıştırılır (tablo_ayristir); Excel'de
+    güven puanı EXCEL_CETVEL_GUVEN_ESIGI'nin altındaysa Vision'a, Word'de sınıflanamayan tablolar LLM'e gider.
     """
-    result = {"basari": False, "kalemler": [], "hata": None, "kaynak": None}
+    result = {"basari": False, "kalemler": [], "hata": None, "kaynak": None, "guven": None}
     path = Path(file_path)
     if not path.exists():
         result["hata"] = f"Dosya bulunamadı: {file_path}"
@@ -143,12 +150,43 @@ def extract_cetvel_layout_based(
         return result
 
     ext = path.suffix.lower()
+    boyut = path.stat().st_size
     logger.info("Cetvel dosyası işleniyor: %s (uzantı: %s)", path.name, ext)
 
+    # Word: tablolar kural tabanlı; yalnızca sınıflanamayan cetvel benzeri tablolar (veya hiç tablo yoksa metin) LLM'e
+    if ext == ".docx":
+        try:
+            with asama("word_tablo", girdi_bayt=boyut):
+                tablo = word_cetvel_ayristir(str(path), guven_esigi=_guven_esigi("WORD_CETVEL_GUVEN_ESIGI"))
+            if tablo["kalemler"]:
+                kalemler = list(tablo["kalemler"])
+                belirsiz = tablo["belirsiz_tablolar"]
+                if belirsiz:
+                    # Her tablo ayrı sorulur; satırları belgedeki yerine (tablonun konumuna) eklenir
+                    logger.info("Word: %s tablo sınıflanamadı; LLM'e gönderiliyor", len(belirsiz))
+                    llm_satirlari = zamanlayici_al(provider).haritala(
+                        lambda b: _cetvel_from_word_text(b["metin"], provider=provider), belirsiz,
+                    )
+                    # Sondan başa: önceki tabloların konumları kaymaz
+                    for b, satirlar in reversed(list(zip(belirsiz, llm_satirlari))):
+                        if not isinstance(satirlar, Exception):
+                            kalemler[b["konum"]:b["konum"]] = satirlar
+                result["guven"] = tablo["guven"]
+                result["kaynak"] = "word_tablo"
+                result["kalemler"] = [_normalize_row(r) for r in kalemler]
+                result["basari"] = True
+                logger.info("Word cetvel kural tabanlı çıkarıldı: %s kalem (güven=%s)", len(result["kalemler"]), tablo["guven"])
+                return result
+            logger.info("Word tablolarında cetvel bulunamadı; metin LLM ile işlenecek")
+        except Exception:
+            logger.warning("Word tabloları kural tabanlı okunamadı; metin LLM ile işlenecek", exc_info=True)
+
     # Word: metin + LLM (layout metin üzerinden)
     if ext in (".docx", ".doc"):
         try:
-            text = extract_text_from_file(str(path))
+            with asama("metin_cikarma", girdi_bayt=boyut) as olcum:
+                text = extract_text_from_file(str(path))
+                olcum["cikti_bayt"] = len((text or "").encode("utf-8"))
             if not text or text.startswith("Dosya bulunamadı") or text.startswith("Hata"):
                 result["hata"] = "Word metni okunamadı."
                 logger.warning(result["hata"])
@@ -165,14 +203,41 @@ def extract_cetvel_layout_based(
             logger.exception("Word cetvel işleme hatası")
             return result
 
+    # Excel: hücreler zaten yapılandırılmış; güven yeterliyse Vision'a gerek yok
+    if ext in (".xlsx", ".xlsm"):
+        try:
+            with asama("excel_tablo", girdi_bayt=boyut):
+                tablo = excel_cetvel_ayristir(str(path), sayfa_index=None if tum_sayfalar else page_or_sheet_index)
+            result["guven"] = tablo["guven"]
+            if tablo["kalemler"] and tablo["guven"] >= _guven_esigi("EXCEL_CETVEL_GUVEN_ESIGI"):
+                result["kaynak"] = "excel_tablo"
+                result["kalemler"] = [_normalize_row(r) for r in tablo["kalemler"]]
+                result["basari"] = True
+                logger.info("Excel cetvel kural tabanlı çıkarıldı: %s kalem (güven=%s)", len(result["kalemler"]), tablo["guven"])
+                return result
+            logger.info("Excel cetvel güveni düşük (%s); Vision kullanılacak", tablo["guven"])
+        except Exception:
+            logger.warning("Excel cetvel kural tabanlı okunamadı; Vision kullanılacak", exc_info=True)
+
     # PDF, Excel, Resim: Vision (görsel layout)
+    ek_talimat = "Her satır için mutlaka: kalem adı (ad), miktar, birim, birim_fiyat, toplam alanlarını döndür. Sütun başlıklarına bakma, görsel düzenden anla."
     try:
-        analiz = analiz_et_ve_tablo_dondur(
-            str(path),
-            page_or_sheet_index=page_or_sheet_index,
-            provider=provider,
-            ek_talimat="Her satır için mutlaka: kalem adı (ad), miktar, birim, birim_fiyat, toplam alanlarını döndür. Sütun başlıklarına bakma, görsel düzenden anla.",
-        )
+        if tum_sayfalar:
+            analiz = analiz_et_tum_sayfalar(str(path), provider=provider, ek_talimat=ek_talimat)
+            logger.info(
+                "Vision tüm sayfalar | sayfa=%s | basarili=%s",
+                analiz.get("sayfa_sayisi"),
+                sum(1 for s in analiz.get("sayfa_sonuclari", []) if s["basari"]),
+            )
+            if analiz.get("basari") and analiz.get("hata"):
+                logger.warning("Bazı sayfalar işlenemedi: %s", analiz["hata"])
+        else:
+            analiz = analiz_et_ve_tablo_dondur(
+                str(path),
+                page_or_sheet_index=page_or_sheet_index,
+                provider=provider,
+                ek_talimat=ek_talimat,
+            )
         if not analiz.get("basari"):
             result["hata"] = analiz.get("hata") or "Vision analiz başarısız"
             logger.warning(result["hata"])
@@ -0,0 +1,282 @@
+"""
+Pipeline aşama ölçümü: her ihale işleme çalışması için aşama bazında süre, bayt, token ve maliyet kaydı.
+
+calisma_izle bir çalışmayı başlatır (contextvars ile); içinde açılan her asama(...) bloğu duvar saati süresini,
+girdi/çıktı bayt sayısını ve isteğe bağlı alanları (provider, model, token, önbellek) bellekte biriktirir.
+llm_yonlendirici.sohbet her API çağrısını "llm_cagrisi", llm_onbellek her önbellek isabetini "llm_onbellek"
+aşaması olarak yazar; böylece token ve maliyet, çağrının yapıldığı üst aşamaya (vision_sayfa,
+sartname_eslestirme, ...) bağlanır. Çalışma bitince PipelineCalismasi + PipelineAsamasi kayıtları tek seferde
+yazılır ve ozet() pipeline sonucuna eklenir. Etkin çalışma yoksa asama/asama_kaydet hiçbir şey yapmaz.
+
+Thread havuzları bağlamı kendiliğinden taşımaz: havuza iş verirken baglamda(fonksiyon) ile sarılır.
+Süreç havuzlarındaki (PDF metin / OCR) alt işler ayrıca ölçülmez; onları başlatan aşamanın süresine girer.
+
+Kullanım:
+    from ihaleler.utils.pipeline_izleme import asama, calisma_izle
+
+    with calisma_izle(ihale, provider="openai") as calisma:
+        with asama("cetvel_cikarma", girdi_bayt=boyut) as olcum:
+            kalemler = ...
+            olcum["cikti_bayt"] = len(json.dumps(kalemler))
+    sonuc["izleme"] = calisma.ozet()
+"""
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+logger = logging.getLogger("ihaleler.parsing")
+
+# USD / 1M token: [girdi, çıktı]. LLM_FIYATLARI ayarı ezer ("sağlayıcı:model" veya model adı).
+_VARSAYILAN_FIYATLAR = {
+    "gpt-4o": [2.50, 10.00],
+    "gpt-4o-mini": [0.15, 0.60],
+    "claude-sonnet-4-20250514": [3.00, 15.00],
+    "gemini-2.5-flash": [0.30, 2.50],
+    "gemini-2.5-flash-lite": [0.10, 0.40],
+    "gemini-2.0-flash": [0.10, 0.40],
+}
+_LLM_ASAMALARI = ("llm_cagrisi", "llm_onbellek")
+
+_aktif_calisma = contextvars.ContextVar("pipeline_calismasi", default=None)
+_ust_asama = contextvars.ContextVar("pipeline_ust_asama", default="")
+
+
+def _fiyatlar() -> dict:
+    try:
+        from django.conf import settings
+        deger = getattr(settings, "LLM_FIYATLARI", None)
+    except Exception:
+        deger = None
+    return {**_VARSAYILAN_FIYATLAR, **(deger or {})}
+
+
+def maliyet(provider: str, model: str, girdi_token: int, cikti_token: int) -> float:
+    """Tahmini çağrı maliyeti (USD); fiyatı tanımlı olmayan model için 0."""
+    fiyatlar = _fiyatlar()
+    fiyat = fiyatlar.get(f"{provider}:{model}") or fiyatlar.get(model)
+    if not fiyat:
+        return 0.0
+    return ((girdi_token or 0) * float(fiyat[0]) + (cikti_token or 0) * float(fiyat[1])) / 1_000_000
+
+
+class CalismaOlcumu:
+    """Tek çalışmanın bellekteki aşama kayıtları; thread'ler arasında paylaşılır."""
+
+    def __init__(self, ihale_id, provider: str, islem_isi_id=None):
+        from django.utils import timezone
+
+        self.ihale_id = ihale_id
+        self.provider = provider
+        self.islem_isi_id = islem_isi_id
+        self.baslama_tarihi = timezone.now()
+        self.basari = False
+        self.cetvel_kaynak = None
+        self.sure = None
+        self.kayit_id = None
+        self.asamalar = []
+        self._t0 = time.perf_counter()
+        self._kilit = threading.Lock()
+
+    def ekle(self, kayit: dict, baslangic: float, sure: float):
+        kayit["baslangic"] = round(baslangic - self._t0, 4)
+        kayit["sure"] = round(sure, 4)
+        if kayit["ad"] == "llm_cagrisi":
+            kayit["maliyet"] = maliyet(
+                kayit.get("provider"), kayit.get("model"), kayit.get("girdi_token"), kayit.get("cikti_token")
+            )
+        with self._kilit:
+            kayit["sira"] = len(self.asamalar)
+            self.asamalar.append(kayit)
+
+    def bitir(self):
+        self.sure = round(time.perf_counter() - self._t0, 4)
+
+    def ozet(self) -> dict:
+        """
+        Pipeline sonucuna eklenecek özet:
+            {
+                "calisma_id": int | None,
+                "sure": sn,
+                "asamalar": {ad: {"ust", "adet", "sure", "girdi_bayt", "cikti_bayt", "hata"}},  # LLM dışı
+                "llm": {"cagri", "hata", "onbellek_isabet", "girdi_token", "cikti_token", "maliyet_usd", "sure"},
+                "llm_asamalar": {ust_asama: {"cagri", "onbellek_isabet", "girdi_token", "cikti_token", "maliyet_usd"}},
+                "modeller": {"sağlayıcı:model": {"cagri", "girdi_token", "cikti_token", "maliyet_usd"}},
+            }
+        """
+        with self._kilit:
+            kayitlar = list(self.asamalar)
+        asamalar, llm_asamalar, modeller = {}, {}, {}
+        llm = {"cagri": 0, "hata": 0, "onbellek_isabet": 0, "girdi_token": 0, "cikti_token": 0,
+               "maliyet_usd": 0.0, "sure": 0.0}
+        for k in kayitlar:
+            if k["ad"] not in _LLM_ASAMALARI:
+                a = asamalar.setdefault(k["ad"], {"ust": k.get("ust") or "", "adet": 0, "sure": 0.0,
+                                                  "girdi_bayt": 0, "cikti_bayt": 0, "hata": 0})
+                a["adet"] += 1
+                a["sure"] += k["sure"]
+                a["girdi_bayt"] += k.get("girdi_bayt") or 0
+                a["cikti_bayt"] += k.get("cikti_bayt") or 0
+                a["hata"] += 1 if k.get("hata") else 0
+                continue
+            ust = llm_asamalar.setdefault(k.get("ust") or "-", {"cagri": 0, "onbellek_isabet": 0, "girdi_token": 0,
+                                                                "cikti_token": 0, "maliyet_usd": 0.0})
+            if k["ad"] == "llm_onbellek":
+                llm["onbellek_isabet"] += 1
+                ust["onbellek_isabet"] += 1
+                continue
+            model = modeller.setdefault(f"{k.get('provider')}:{k.get('model')}",
+                                        {"cagri": 0, "girdi_token": 0, "cikti_token": 0, "maliyet_usd": 0.0})
+            for hedef in (llm, ust, model):
+                hedef["cagri"] += 1
+                hedef["girdi_token"] += k.get("girdi_token") or 0
+                hedef["cikti_token"] += k.get("cikti_token") or 0
+                hedef["maliyet_usd"] += k.get("maliyet") or 0.0
+            llm["sure"] += k["sure"]
+            llm["hata"] += 1 if k.get("hata") else 0
+        for a in asamalar.values():
+            a["sure"] = round(a["sure"], 3)
+        for hedef in [llm, *llm_asamalar.values(), *modeller.values()]:
+            hedef["maliyet_usd"] = round(hedef["maliyet_usd"], 6)
+        llm["sure"] = round(llm["sure"], 3)
+        return {
+            "calisma_id": self.kayit_id,
+            "sure": self.sure,
+            "asamalar": asamalar,
+            "llm": llm,
+            "llm_asamalar": llm_asamalar,
+            "modeller": modeller,
+        }
+
+    def kaydet(self):
+        """Çalışmayı ve aşamalarını veritabanına yazar (tek INSERT + toplu INSERT)."""
+        from django.db import transaction
+        from ihaleler.models import PipelineAsamasi, PipelineCalismasi
+
+        ozet = self.ozet()
+        llm = ozet["llm"]
+        with transaction.atomic():
+            calisma = PipelineCalismasi.objects.create(
+                ihale_id=self.ihale_id,
+                islem_isi_id=self.islem_isi_id,
+                provider=self.provider or "",
+                basari=self.basari,
+                cetvel_kaynak=(self.cetvel_kaynak or "")[:30],
+                baslama_tarihi=self.baslama_tarihi,
+                sure=self.sure or 0,
+                llm_cagri=llm["cagri"],
+                onbellek_isabet=llm["onbellek_isabet"],
+                girdi_token=llm["girdi_token"],
+                cikti_token=llm["cikti_token"],
+                tahmini_maliyet=Decimal(str(llm["maliyet_usd"])),
+                ozet_json={k: v for k, v in ozet.items() if k != "calisma_id"},
+            )
+            PipelineAsamasi.objects.bulk_create(
+                [
+                    PipelineAsamasi(
+                        calisma=calisma,
+                        sira=k["sira"],
+                        ad=k["ad"][:50],
+                        ust=(k.get("ust") or "")[:50],
+                        baslangic=k["baslangic"],
+                        sure=k["sure"],
+                        girdi_bayt=k.get("girdi_bayt") or 0,
+                        cikti_bayt=k.get("cikti_bayt") or 0,
+                        girdi_token=k.get("girdi_token") or 0,
+                        cikti_token=k.get("cikti_token") or 0,
+                        provider=(k.get("provider") or "")[:20],
+                        model=(k.get("model") or "")[:100],
+                        onbellek=k.get("onbellek"),
+                        maliyet=Decimal(str(round(k.get("maliyet") or 0.0, 6))),
+                        hata=(k.get("hata") or "")[:500],
+                    )
+                    for k in sorted(self.asamalar, key=lambda k: k["sira"])
+                ],
+                batch_size=500,
+            )
+        self.kayit_id = calisma.pk
+
+
+@contextmanager
+def calisma_izle(ihale, provider: str = "", islem_isi=None):
+    """
+    İhale için ölçülen bir pipeline çalışması açar. Blok bitince (hata olsa da) kayıt yazılır;
+    kayıt yazılamazsa yalnızca loglanır, pipeline sonucu etkilenmez.
+    """
+    calisma = CalismaOlcumu(ihale.pk, provider, getattr(islem_isi, "pk", islem_isi))
+    belirtec = _aktif_calisma.set(calisma)
+    ust_belirteci = _ust_asama.set("")
+    try:
+        yield calisma
+    finally:
+        _ust_asama.reset(ust_belirteci)
+        _aktif_calisma.reset(belirtec)
+        calisma.bitir()
+        try:
+            calisma.kaydet()
+        except Exception:
+            logger.warning("Pipeline ölçümü kaydedilemedi | ihale_id=%s", ihale.pk, exc_info=True)
+
+
+def aktif_calisma():
+    """Bulunulan bağlamdaki ölçülen çalışma (yoksa None)."""
+    return _aktif_calisma.get()
+
+
+@contextmanager
+def asama(ad: str, **alanlar):
+    """
+    Bloğu ad adlı aşama olarak ölçer. Dönen sözlüğe blok içinde cikti_bayt, girdi_token, model vb. yazılabilir;
+    blok hata fırlatırsa hata alanı doldurulur. İç içe aşamalarda içteki aşamanın "ust" alanı dıştakinin adıdır.
+    """
+    calisma = _aktif_calisma.get()
+    kayit = {"ad": ad, "ust": _ust_asama.get(), **alanlar}
+    if calisma is None:
+        yield kayit
+        return
+    belirtec = _ust_asama.set(ad)
+    baslangic = time.perf_counter()
+    try:
+        yield kayit
+    except BaseException as e:
+        kayit.setdefault("hata", f"{type(e).__name__}: {e}"[:500])
+        raise
+    finally:
+        _ust_asama.reset(belirtec)
+        calisma.ekle(kayit, baslangic, time.perf_counter() - baslangic)
+
+
+def asama_kaydet(ad: str, sure: float, **alanlar):
+    """Şimdi biten, süresi ölçülmüş bir aşamayı yazar (kontrol noktası ile süre tutan kod için)."""
+    calisma = _aktif_calisma.get()
+    if calisma is None:
+        return
+    simdi = time.perf_counter()
+    calisma.ekle({"ad": ad, "ust": _ust_asama.get(), **alanlar}, simdi - sure, sure)
+
+
+@contextmanager
+def asama_baglami(ad: str):
+    """Süre yazmadan iç aşamaların (ör. LLM çağrıları) üst aşamasını ad olarak işaretler."""
+    belirtec = _ust_asama.set(ad)
+    try:
+        yield
+    finally:
+        _ust_asama.reset(belirtec)
+
+
+def baglamda(fonksiyon):
+    """
+    fonksiyon'u çağıran thread'in bağlam kopyasında çalıştıran sarmalayıcı (thread havuzuna verilecek işler için).
+    Her çağrı kendi kopyasını alır; aynı anda birden çok thread'de çalışabilir.
+    """
+    if _aktif_calisma.get() is None:
+        return fonksiyon
+    baglam = contextvars.copy_context()
+
+    def _sarili(*args, **kwargs):
+        return baglam.copy().run(fonksiyon, *args, **kwargs)
+
+    return _sarili
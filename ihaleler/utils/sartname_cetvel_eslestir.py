@@ -17,22 +17,28 @@ Kullanım (view veya management command içinde):
     # sonuc["olusturulan"], sonuc["hatalar"], ...
 """
 import json
-import os
+import logging
 import re
+import time
+from collections import Counter
 from decimal import Decimal, InvalidOperation
 
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
-try:
-    from anthropic import Anthropic
-except ImportError:
-    Anthropic = None
-
+from ihaleler.utils.analiz_ozet import ozet_planla
 from ihaleler.utils.file_to_text import extract_text_from_file
 from ihaleler.utils.document_vision import analiz_et_ve_tablo_dondur
-from ihaleler.utils.parsing_service import extract_cetvel_layout_based
+from ihaleler.utils.ihale_arama import ihale_indeksini_guncelle
+from ihaleler.utils.parsing_service import METIN_MODELLERI, extract_cetvel_layout_based
+from ihaleler.utils.pipeline_izleme import asama_baglami, asama_kaydet
+from ihaleler.utils.llm_yonlendirici import LlmYonlendirmeHatasi, arka_uc_zinciri, sohbet, yonlendir
+from ihaleler.utils.llm_zamanlayici import zamanlayici_al
+from ihaleler.utils.sartname_indeks import SartnameIndeksi, maddeden_ozellikler
+from ihaleler.utils.turkce import urun_anahtari
+
+logger = logging.getLogger("ihaleler.parsing")
+
+# Şartname indeksinden kalem başına LLM'e gönderilecek madde sayısı ve bağlam üst sınırı
+SARTNAME_TOP_K = 5
+SARTNAME_BAGLAM_KARAKTER = 12000
 
 
 # -----------------------------------------------------------------------------
@@ -51,48 +57,6 @@ Yanıtını SADECE aşağıdaki JSON formatında ver. Başka açıklama yazma.
 Eğer şartnamede bu kalemle ilgili net bir bölüm bulamazsan ilgili_paragraf ve teknik_ozellikler boş bırakılabilir."""
 
 
-def _get_api_keys():
-    try:
-        from django.conf import settings
-        return {
-            "openai": getattr(settings, "OPENAI_API_KEY", None) or os.environ.get("OPENAI_API_KEY"),
-            "anthropic": getattr(settings, "ANTHROPIC_API_KEY", None) or os.environ.get("ANTHROPIC_API_KEY"),
-        }
-    except Exception:
-        return {
-            "openai": os.environ.get("OPENAI_API_KEY"),
-            "anthropic": os.environ.get("ANTHROPIC_API_KEY"),
-        }
-
-
-def _call_openai_chat(system: str, user: str, api_key: str, max_tokens: int = 2048) -> str:
-    if not OpenAI:
-        raise RuntimeError("openai paketi yüklü değil")
-    client = OpenAI(api_key=api_key)
-    r = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": system},
-            {"role": "user", "content": user},
-        ],
-        max_tokens=max_tokens,
-    )
-    return (r.choices[0].message.content or "").strip()
-
-
-def _call_anthropic_chat(system: str, user: str, api_key: str, max_tokens: int = 2048) -> str:
-    if not Anthropic:
-        raise RuntimeError("anthropic paketi yüklü değil")
-    client = Anthropic(api_key=api_key)
-    r = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=max_tokens,
-        system=system,
-        messages=[{"role": "user", "content": user}],
-    )
-    return (r.content[0].text if r.content else "").strip()
-
-
 def _parse_sartname_llm_response(text: str) -> dict:
     """LLM yanıtından ilgili_paragraf ve teknik_ozellikler çıkarır."""
     out = {"ilgili_paragraf": "", "teknik_ozellikler": {}}
@@ -114,36 +78,44 @@ def sartname_metninden_kalem_ozetleri_cikar(
     kalem_adi: str,
     provider: str = "openai",
     max_karakter: int = 120000,
+    indeks: SartnameIndeksi = None,
+    top_k: int = SARTNAME_TOP_K,
 ) -> dict:
     """
     Şartname metninde bu kalem adına karşılık gelen paragrafı bulur ve teknik özellikleri çıkarır.
+    LLM'e şartnamenin tamamı değil, indeksteki en ilgili top_k madde gönderilir; tek bir madde
+    açıkça eşleşiyorsa LLM çağrılmaz (özellikler maddedeki "Anahtar: değer" satırlarından alınır).
+    indeks verilmezse sartname_metni'nin tamamından oluşturulur; max_karakter yalnızca LLM'e giden
+    metni sınırlar.
 
     Returns:
-        {"ilgili_paragraf": "...", "teknik_ozellikler": {"kesit": "...", "voltaj": "...", ...}, "hata": None veya mesaj}
+        {"ilgili_paragraf": "...", "teknik_ozellikler": {"kesit": "...", "voltaj": "...", ...},
+         "hata": None veya mesaj, "kaynak": "llm" / "indeks"}
     """
-    result = {"ilgili_paragraf": "", "teknik_ozellikler": {}, "hata": None}
+    result = {"ilgili_paragraf": "", "teknik_ozellikler": {}, "hata": None, "kaynak": "llm"}
     if not sartname_metni or not kalem_adi or not kalem_adi.strip():
         return result
-    metin = sartname_metni[:max_karakter] if len(sartname_metni) > max_karakter else sartname_metni
+    if indeks is None:
+        indeks = SartnameIndeksi(sartname_metni)
+    if len(indeks) > 1:
+        madde = indeks.net_eslesme(kalem_adi)
+        if madde is not None:
+            result.update(
+                ilgili_paragraf=madde["metin"][:8000],
+                teknik_ozellikler=maddeden_ozellikler(madde["metin"]),
+                kaynak="indeks",
+            )
+            return result
+        metin = indeks.baglam(kalem_adi, k=top_k, max_karakter=SARTNAME_BAGLAM_KARAKTER) or sartname_metni[:max_karakter]
+    else:
+        metin = sartname_metni[:max_karakter] if len(sartname_metni) > max_karakter else sartname_metni
     user = f"""Teknik şartname metni:\n\n{metin}\n\n---\n\nTeklif cetvelindeki kalem adı: "{kalem_adi.strip()}"\n\nBu kalem için şartnamede ilgili paragrafı bul ve teknik özellikleri JSON ile döndür."""
 
-    keys = _get_api_keys()
     try:
-        if provider == "openai":
-            api_key = keys["openai"]
-            if not api_key:
-                result["hata"] = "OPENAI_API_KEY yok"
-                return result
-            raw = _call_openai_chat(_SARTNAME_ESLESTIRME_SYSTEM, user, api_key)
-        elif provider == "anthropic":
-            api_key = keys["anthropic"]
-            if not api_key:
-                result["hata"] = "ANTHROPIC_API_KEY yok"
-                return result
-            raw = _call_anthropic_chat(_SARTNAME_ESLESTIRME_SYSTEM, user, api_key)
-        else:
-            result["hata"] = f"Bilinmeyen provider: {provider}"
-            return result
+        raw, _ = yonlendir(
+            arka_uc_zinciri(METIN_MODELLERI, tercih=provider),
+            lambda a: sohbet(a, _SARTNAME_ESLESTIRME_SYSTEM, user, max_tokens=2048),
+        )
         parsed = _parse_sartname_llm_response(raw)
         result["ilgili_paragraf"] = parsed["ilgili_paragraf"]
         result["teknik_ozellikler"] = parsed["teknik_ozellikler"]
@@ -152,6 +124,199 @@ def sartname_metninden_kalem_ozetleri_cikar(
     return result
 
 
+# -----------------------------------------------------------------------------
+# Toplu eşleştirme: şartname bir kez gönderilir, N kalem tek çağrıda eşleştirilir
+# -----------------------------------------------------------------------------
+
+_SARTNAME_TOPLU_SYSTEM = """Sen bir teknik şartname analiz uzmanısın. Sana bir teknik şartname metni ve teklif cetvelinden numaralı bir kalem listesi verilecek.
+Her kalem için: İnsan gözüyle mantık kurarak şartnamede o kalemi anlatan paragraf(lar)ı bul ve oradaki teknik özellikleri yapılandırılmış şekilde çıkar.
+Özellikle şunları mutlaka ayıkla (varsa): renk, ölçü (boyut, en, boy, çap, kalınlık), kesit, voltaj, standart, marka, model, malzeme, birim.
+Kalem adı tam eşleşmeyebilir (eşanlamlı, kısaltma, farklı yazım); anlamsal olarak aynı ürün/hizmeti anlatan kısmı bul.
+
+Yanıtını SADECE aşağıdaki JSON formatında ver; anahtarlar kalem numaralarıdır ve listedeki HER numara yanıtta bulunmalıdır. Başka açıklama yazma.
+{"kalemler": {"1": {"ilgili_paragraf": "...", "teknik_ozellikler": {"kesit": "...", "voltaj": "..."}}, "2": {"ilgili_paragraf": "", "teknik_ozellikler": {}}}}
+Şartnamede bir kalemle ilgili net bölüm bulamazsan o kalemin ilgili_paragraf ve teknik_ozellikler alanlarını boş bırak (numarayı yine de yaz)."""
+
+# Yaklaşık token hesabı (Türkçe metinde ~3,5 karakter/token)
+_KARAKTER_PER_TOKEN = 3.5
+# Bir kalemin yanıtta kapladığı tahmini token (paragraf + özellikler)
+_KALEM_BASINA_CIKTI_TOKEN = 400
+# Toplu çağrıda istenecek en fazla çıktı token'ı ve bağlam penceresi
+_TOPLU_MAKS_CIKTI_TOKEN = 8000
+_BAGLAM_TOKEN = {"openai": 128000, "anthropic": 200000, "gemini": 1000000}
+_TOPLU_MAKS_GRUP = 25
+
+
+def _tahmini_token(metin: str) -> int:
+    return int(len(metin or "") / _KARAKTER_PER_TOKEN) + 1
+
+
+def toplu_grup_boyutu(sartname_metni: str, kalem_adlari: list, provider: str = "openai") -> int:
+    """
+    Token bütçesine göre tek çağrıda gönderilecek kalem sayısı: çıktı bütçesi
+    (_TOPLU_MAKS_CIKTI_TOKEN / kalem başı çıktı) ve şartnameden sonra bağlamda kalan yer ile sınırlanır.
+    """
+    cikti_siniri = _TOPLU_MAKS_CIKTI_TOKEN // _KALEM_BASINA_CIKTI_TOKEN
+    kalan_baglam = _BAGLAM_TOKEN.get(provider, 128000) - _tahmini_token(sartname_metni) - _TOPLU_MAKS_CIKTI_TOKEN - 1000
+    ortalama_ad = (sum(_tahmini_token(a) for a in kalem_adlari) / len(kalem_adlari) + 8) if kalem_adlari else 8
+    girdi_siniri = int(kalan_baglam / ortalama_ad) if kalan_baglam > 0 else 1
+    return max(1, min(_TOPLU_MAKS_GRUP, cikti_siniri, girdi_siniri))
+
+
+def _parse_toplu_llm_response(text: str) -> dict:
+    """Toplu yanıttan {"1": {"ilgili_paragraf", "teknik_ozellikler"}, ...} çıkarır; bozuksa boş dict."""
+    match = re.search(r"\{[\s\S]*\}", (text or "").strip())
+    if not match:
+        return {}
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return {}
+    kalemler = data.get("kalemler") if isinstance(data, dict) else None
+    if not isinstance(kalemler, dict):
+        return {}
+    out = {}
+    for no, deger in kalemler.items():
+        if not isinstance(deger, dict):
+            continue
+        out[str(no).strip()] = {
+            "ilgili_paragraf": (deger.get("ilgili_paragraf") or "")[:8000],
+            "teknik_ozellikler": deger.get("teknik_ozellikler") if isinstance(deger.get("teknik_ozellikler"), dict) else {},
+        }
+    return out
+
+
+def sartname_metninden_toplu_kalem_ozetleri_cikar(
+    sartname_metni: str,
+    kalem_adlari: list,
+    provider: str = "openai",
+    max_karakter: int = 120000,
+    grup_boyutu: int = None,
+    indeks: SartnameIndeksi = None,
+    top_k: int = SARTNAME_TOP_K,
+    tamamlandi=None,
+) -> list:
+    """
+    sartname_metninden_kalem_ozetleri_cikar'ın toplu hali: şartname her grup için bir kez
+    gönderilir, gruptaki kalemler numaralı liste olarak sorulur. Grup boyutu verilmezse
+    toplu_grup_boyutu() ile token bütçesine göre belirlenir. Aynı ad bir kez sorulur.
+    Şartname indeksi varsa her gruba yalnızca gruptaki kalemlerin en ilgili maddeleri gönderilir;
+    indekste açıkça eşleşen kalemler hiç LLM'e gitmez. İndeks şartnamenin tamamından kurulur;
+    max_karakter yalnızca indeks kullanılamadığında LLM'e giden ham metni sınırlar.
+    Modelin yanıtta atladığı kalemler tek tek (sartname_metninden_kalem_ozetleri_cikar) sorulur.
+    Çağrılar llm_zamanlayici ile sağlayıcının eşzamanlılık ve (süreçler arası ortak) TPM/RPM sınırları
+    içinde paralel yapılır. tamamlandi verilirse sonucu kesinleşen adlar geldikçe tamamlandi([ad, ...])
+    çağrılır (ilerleme bildirimi için; her benzersiz ad bir kez).
+
+    Returns:
+        kalem_adlari ile aynı sırada liste: [{"ilgili_paragraf", "teknik_ozellikler", "hata"}, ...]
+    """
+    bos = {"ilgili_paragraf": "", "teknik_ozellikler": {}, "hata": None, "kaynak": "llm"}
+    sonuclar = [dict(bos) for _ in kalem_adlari]
+    if not sartname_metni:
+        return sonuclar
+    metin = sartname_metni[:max_karakter] if len(sartname_metni) > max_karakter else sartname_metni
+
+    # Benzersiz adlar (sıra korunur)
+    benzersiz = []
+    for ad in kalem_adlari:
+        ad = (ad or "").strip()
+        if ad and ad not in benzersiz:
+            benzersiz.append(ad)
+    if not benzersiz:
+        return sonuclar
+
+    ad_sonuc = {}
+    if indeks is None:
+        indeks = SartnameIndeksi(sartname_metni)
+    if len(indeks) > 1:
+        for ad in benzersiz:
+            madde = indeks.net_eslesme(ad)
+            if madde is not None:
+                ad_sonuc[ad] = {
+                    "ilgili_paragraf": madde["metin"][:8000],
+                    "teknik_ozellikler": maddeden_ozellikler(madde["metin"]),
+                    "hata": None,
+                    "kaynak": "indeks",
+                }
+        benzersiz = [ad for ad in benzersiz if ad not in ad_sonuc]
+    else:
+        indeks = None
+
+    try:
+        zincir = arka_uc_zinciri(METIN_MODELLERI, tercih=provider)
+        hata = None
+    except LlmYonlendirmeHatasi as e:
+        hata = str(e)
+    if hata:
+        for ad in benzersiz:
+            ad_sonuc[ad] = {**bos, "hata": hata}
+        benzersiz = []
+    if tamamlandi is not None and ad_sonuc:
+        tamamlandi(list(ad_sonuc))
+
+    grup_metin_siniri = SARTNAME_BAGLAM_KARAKTER * 3
+    n = grup_boyutu or toplu_grup_boyutu(
+        metin[:grup_metin_siniri] if indeks is not None else metin, benzersiz, provider
+    )
+    gruplar = []
+    for bas in range(0, len(benzersiz), n):
+        grup = benzersiz[bas:bas + n]
+        grup_metni = metin
+        if indeks is not None:
+            grup_metni = indeks.baglam(grup, k=top_k, max_karakter=grup_metin_siniri) or metin
+        liste = "\n".join(f'{i + 1}. "{ad}"' for i, ad in enumerate(grup))
+        user = f"""Teknik şartname metni:\n\n{grup_metni}\n\n---\n\nTeklif cetvelindeki kalemler:\n{liste}\n\nHer kalem için şartnamede ilgili paragrafı bul ve teknik özellikleri numaraya göre JSON ile döndür."""
+        max_tokens = min(_TOPLU_MAKS_CIKTI_TOKEN, 500 + len(grup) * _KALEM_BASINA_CIKTI_TOKEN)
+        gruplar.append({"adlar": grup, "user": user, "max_tokens": max_tokens})
+
+    def _grup_cagir(g):
+        raw, _ = yonlendir(zincir, lambda a: sohbet(a, _SARTNAME_TOPLU_SYSTEM, g["user"], max_tokens=g["max_tokens"]))
+        return _parse_toplu_llm_response(raw)
+
+    def _grup_bitti(sira, parsed):
+        # Yanıtta atlanan adlar tekil çağrıdan sonra bildirilir
+        adlar = gruplar[sira]["adlar"]
+        if not isinstance(parsed, Exception):
+            adlar = [ad for i, ad in enumerate(adlar) if str(i + 1) in parsed]
+        if adlar:
+            tamamlandi(adlar)
+
+    # Gruplar paralel gönderilir; eşzamanlılık ve TPM/RPM kotası hizmet veren arka uç başına uygulanır (yonlendir)
+    zamanlayici = zamanlayici_al(provider)
+    yanitlar = zamanlayici.haritala(_grup_cagir, gruplar, tamamlandi=_grup_bitti if tamamlandi else None)
+    eksikler = []
+    for g, parsed in zip(gruplar, yanitlar):
+        if isinstance(parsed, Exception):
+            for ad in g["adlar"]:
+                ad_sonuc[ad] = {**bos, "hata": str(parsed)}
+            continue
+        for i, ad in enumerate(g["adlar"]):
+            cevap = parsed.get(str(i + 1))
+            if cevap is None:
+                eksikler.append(ad)
+            else:
+                ad_sonuc[ad] = {**cevap, "hata": None, "kaynak": "llm"}
+
+    # Modelin atladığı (veya yanıtı kesilen) kalemler: tek kalemlik çağrılar, yine paralel
+    if eksikler:
+        tekil = zamanlayici.haritala(
+            lambda ad: sartname_metninden_kalem_ozetleri_cikar(
+                sartname_metni, ad, provider=provider, max_karakter=max_karakter, indeks=indeks, top_k=top_k
+            ),
+            eksikler,
+            tamamlandi=(lambda sira, _: tamamlandi([eksikler[sira]])) if tamamlandi else None,
+        )
+        for ad, r in zip(eksikler, tekil):
+            ad_sonuc[ad] = {**bos, "hata": str(r)} if isinstance(r, Exception) else r
+
+    for idx, ad in enumerate(kalem_adlari):
+        ad = (ad or "").strip()
+        if ad in ad_sonuc:
+            sonuclar[idx] = dict(ad_sonuc[ad])
+    return sonuclar
+
+
 # -----------------------------------------------------------------------------
 # Sayı / para formatı (Türkçe: 1.500,50)
 # -----------------------------------------------------------------------------
@@ -234,6 +399,8 @@ def cetvel_ve_sartname_birlestir_ihale_kalem_kaydet(
     sartname_metni: str = None,
     vision_provider: str = "openai",
     mevcut_kalemleri_sil: bool = False,
+    ilerleme_bildir=None,
+    toplu: bool = True,
 ) -> dict:
     """
     Teklif cetveli ile teknik şartnameyi karşılaştırır; her cetvel satırı için
@@ -242,25 +409,47 @@ def cetvel_ve_sartname_birlestir_ihale_kalem_kaydet(
 
     Args:
         ihale: Ihale model örneği (cetvel_dosya ve sartname_dosya dolu olmalı).
-        provider: Şartname eşleştirme için LLM ("openai" veya "anthropic").
+        provider: Şartname eşleştirme için tercih edilen LLM ("openai", "anthropic", "gemini");
+            yanıt vermezse llm_yonlendirici yedek sağlayıcıya geçer.
         cetvel_tablo: Önceden çıkarılmış cetvel satırları listesi. None ise
             ihale.cetvel_dosya'dan document_vision ile çıkarılır.
         sartname_metni: Önceden okunmuş şartname metni. None ise
             ihale.sartname_dosya'dan file_to_text ile okunur.
         vision_provider: Cetvel görsel analizi için kullanılacak API (cetvel_tablo None ise).
         mevcut_kalemleri_sil: True ise bu ihaleye ait mevcut kalemler silinir, yeniden oluşturulur.
+        ilerleme_bildir: İsteğe bağlı callback(islenen_satir, toplam_satir); şartname eşleştirmesi
+            sürerken her çağrı (grup veya satır) bittikçe çağrılır.
+        toplu: True ise kalemler şartnameyle gruplar halinde tek çağrıda eşleştirilir
+            (sartname_metninden_toplu_kalem_ozetleri_cikar); False ise satır başına bir çağrı.
+            Her iki durumda çağrılar llm_zamanlayici ile paralel yapılır; kalemler tüm sonuçlar
+            geldikten sonra satır sırasıyla kaydedilir.
 
     Returns:
         {
             "olusturulan": int,
             "guncellenen": int,
             "atlanan": int,
+            "llm_atlanan": int,  # şartname indeksinde açık eşleşme bulunduğu için LLM'e gitmeyen kalem
             "hatalar": [str, ...],
+            "katalog": {"eslesen": int, "yeni_urun": int},
+            "sureler": {"sartname_eslestirme": sn, "katalog_eslestirme": sn, "kayit": sn, ...},
         }
     """
+    from django.db import transaction
     from ihaleler.models import Kalem
+    from ihaleler.utils.urun_katalog_eslestir import kalemleri_katalogla_eslestir_toplu
 
-    sonuc = {"olusturulan": 0, "guncellenen": 0, "atlanan": 0, "hatalar": []}
+    sonuc = {"olusturulan": 0, "guncellenen": 0, "atlanan": 0, "llm_atlanan": 0, "hatalar": [], "sureler": {}}
+    sureler = sonuc["sureler"]
+    t0 = time.perf_counter()
+
+    def _sure(asama, **alanlar):
+        # Süre hem sonuca hem (ölçülen çalışma varsa) pipeline aşaması olarak yazılır
+        nonlocal t0
+        simdi = time.perf_counter()
+        sureler[asama] = round(simdi - t0, 3)
+        asama_kaydet(asama, simdi - t0, **alanlar)
+        t0 = simdi
 
     # Şartname metni
     if sartname_metni is None:
@@ -272,6 +461,7 @@ def cetvel_ve_sartname_birlestir_ihale_kalem_kaydet(
         if not sartname_metni or sartname_metni.startswith("Dosya bulunamadı") or sartname_metni.startswith("Hata"):
             sonuc["hatalar"].append("Teknik şartname metni okunamadı veya boş.")
             sartname_metni = ""
+        _sure("sartname_okuma", cikti_bayt=len(sartname_metni.encode("utf-8")))
 
     # Cetvel tablosu (layout-based: PDF, Excel, Word, Resim)
     if cetvel_tablo is None:
@@ -279,31 +469,74 @@ def cetvel_ve_sartname_birlestir_ihale_kalem_kaydet(
             sonuc["hatalar"].append("İhaleye birim fiyat cetveli dosyası yüklenmemiş.")
             return sonuc
         cetvel_path = ihale.cetvel_dosya.path
-        analiz = extract_cetvel_layout_based(cetvel_path, provider=vision_provider)
+        analiz = extract_cetvel_layout_based(cetvel_path, provider=vision_provider, tum_sayfalar=True)
         if not analiz.get("basari") or not analiz.get("kalemler"):
             sonuc["hatalar"].append(analiz.get("hata") or "Cetvel tablosu çıkarılamadı.")
             return sonuc
         cetvel_tablo = analiz["kalemler"]
+        _sure("cetvel_cikarma")
 
     if not cetvel_tablo:
         sonuc["hatalar"].append("Cetvel tablosu boş.")
         return sonuc
 
-    if mevcut_kalemleri_sil:
-        Kalem.objects.filter(ihale=ihale).delete()
-
+    # 1) Cetvel satırlarını alanlara çevir
+    hazir = []  # (idx, alanlar)
     for idx, satir in enumerate(cetvel_tablo):
         try:
             alanlar = _cetvel_satirindan_kalem_alanlari(satir)
-            urun_adi = alanlar["urun_adi"]
-            if not urun_adi or urun_adi == "Belirtilmemiş kalem":
-                sonuc["atlanan"] += 1
-                continue
-
-            # Şartnameden bu kalem için paragraf + teknik özellikler
-            sartname_sonuc = sartname_metninden_kalem_ozetleri_cikar(
-                sartname_metni, urun_adi, provider=provider
+        except Exception as e:
+            sonuc["hatalar"].append(f"Satır {idx + 1}: {e}")
+            sonuc["atlanan"] += 1
+            continue
+        if not alanlar["urun_adi"] or alanlar["urun_adi"] == "Belirtilmemiş kalem":
+            sonuc["atlanan"] += 1
+            continue
+        hazir.append((idx, alanlar))
+
+    # 2) Şartnameden paragraf + teknik özellikler (toplu: şartname grup başına bir kez gönderilir)
+    adlar = [alanlar["urun_adi"] for _, alanlar in hazir]
+    indeks = SartnameIndeksi(sartname_metni) if sartname_metni else None
+    _sure("sartname_indeks")
+
+    # Atlanan satırlar baştan işlenmiş sayılır; aynı addaki satırlar adın sonucu gelince birlikte biter
+    toplam_satir = len(cetvel_tablo)
+    islenen = toplam_satir - len(hazir)
+    bekleyen = Counter(adlar)
+
+    def _satir_bitti(satir_sayisi):
+        nonlocal islenen
+        islenen += satir_sayisi
+        if ilerleme_bildir is not None and satir_sayisi:
+            ilerleme_bildir(islenen, toplam_satir)
+
+    with asama_baglami("sartname_eslestirme"):
+        if toplu:
+            sartname_sonuclari = sartname_metninden_toplu_kalem_ozetleri_cikar(
+                sartname_metni, adlar, provider=provider, indeks=indeks,
+                tamamlandi=lambda biten: _satir_bitti(sum(bekleyen.pop(ad, 0) for ad in biten)),
+            )
+        else:
+            sartname_sonuclari = zamanlayici_al(provider).haritala(
+                lambda ad: sartname_metninden_kalem_ozetleri_cikar(sartname_metni, ad, provider=provider, indeks=indeks),
+                adlar,
+                tamamlandi=lambda sira, _: _satir_bitti(1),
             )
+        sartname_sonuclari = [
+            {"ilgili_paragraf": "", "teknik_ozellikler": {}, "hata": str(r), "kaynak": "llm"}
+            if isinstance(r, Exception) else r
+            for r in sartname_sonuclari
+        ]
+    sonuc["llm_atlanan"] = sum(1 for r in sartname_sonuclari if r.get("kaynak") == "indeks")
+    _sure("sartname_eslestirme", girdi_bayt=len(sartname_metni.encode("utf-8")))
+    if ilerleme_bildir is not None and islenen < toplam_satir:
+        ilerleme_bildir(toplam_satir, toplam_satir)
+
+    # 3) Kalem nesnelerini bellekte kur
+    yeni_kalemler = []
+    for (idx, alanlar), sartname_sonuc in zip(hazir, sartname_sonuclari):
+        urun_adi = alanlar["urun_adi"]
+        try:
             teknik_ozet = _teknik_ozet_metin(
                 sartname_sonuc["ilgili_paragraf"],
                 sartname_sonuc["teknik_ozellikler"],
@@ -314,6 +547,8 @@ def cetvel_ve_sartname_birlestir_ihale_kalem_kaydet(
             create_kwargs = {
                 "ihale": ihale,
                 "urun_adi": alanlar["urun_adi"],
+                # bulk_create Kalem.save()'i çağırmaz
+                "urun_adi_norm": urun_anahtari(alanlar["urun_adi"])[:255],
                 "adet": alanlar["adet"],
                 "birim": alanlar["birim"],
                 "birim_fiyat": alanlar["birim_fiyat"],
@@ -322,15 +557,45 @@ def cetvel_ve_sartname_birlestir_ihale_kalem_kaydet(
             }
             if hasattr(Kalem, "teknik_ozellikler_json") and sartname_sonuc.get("teknik_ozellikler"):
                 create_kwargs["teknik_ozellikler_json"] = sartname_sonuc["teknik_ozellikler"]
-            kalem = Kalem.objects.create(**create_kwargs)
-            try:
-                from ihaleler.utils.urun_katalog_eslestir import kutuphane_urunu_bul_veya_olustur
-                kutuphane_urunu_bul_veya_olustur(kalem)
-            except Exception:
-                pass
-            sonuc["olusturulan"] += 1
+            yeni_kalemler.append((idx, Kalem(**create_kwargs)))
         except Exception as e:
             sonuc["hatalar"].append(f"Satır {idx + 1}: {e}")
             sonuc["atlanan"] += 1
 
+    # 4) Tek transaction: eski kalemleri sil, katalog bağlantılarını tek geçişte çöz, toplu yaz
+    with transaction.atomic():
+        if mevcut_kalemleri_sil:
+            Kalem.objects.filter(ihale=ihale).delete()
+        kalemler = [k for _, k in yeni_kalemler]
+        try:
+            with transaction.atomic():
+                sonuc["katalog"] = kalemleri_katalogla_eslestir_toplu(kalemler)
+        except Exception as e:
+            logger.exception("Toplu katalog eşleştirme hatası")
+            sonuc["hatalar"].append(f"Katalog eşleştirme: {e}")
+            for kalem in kalemler:
+                kalem.kutuphane_urunu = None
+        _sure("katalog_eslestirme")
+        try:
+            with transaction.atomic():
+                Kalem.objects.bulk_create(kalemler, batch_size=500)
+            sonuc["olusturulan"] = len(kalemler)
+        except Exception:
+            # Hatalı satırı bulmak için tek tek yaz (yalnızca toplu yazım başarısızsa)
+            logger.warning("Toplu kalem yazımı başarısız; satır satır deneniyor", exc_info=True)
+            for idx, kalem in yeni_kalemler:
+                kalem.pk = None
+                try:
+                    with transaction.atomic():
+                        kalem.save(force_insert=True)
+                    sonuc["olusturulan"] += 1
+                except Exception as e:
+                    sonuc["hatalar"].append(f"Satır {idx + 1}: {e}")
+                    sonuc["atlanan"] += 1
+        # bulk_create sinyal üretmez: arama indeksi ve ürün özetleri commit'te elle güncellenir
+        ihale_indeksini_guncelle(ihale.pk)
+        ozet_planla(urun=[k.urun_adi_norm for k in kalemler])
+    _sure("kayit")
+
+    logger.info("Birleştirme süreleri | ihale_id=%s | %s", ihale.pk, sureler)
     return sonuc
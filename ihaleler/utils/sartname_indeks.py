@@ -0,0 +1,252 @@
+"""
+Teknik şartname için yerel arama indeksi.
+
+Şartname metni numaralı maddelere / başlıklara bölünür; maddeler üzerinde
+kelime BM25 + karakter 3-gram BM25 (Türkçe ek ve yazım farklarına dayanıklı) skoru hesaplanır.
+Böylece LLM'e şartnamenin tamamı yerine her kalem için yalnızca en ilgili birkaç madde gönderilir;
+tek bir madde açıkça öne çıkıyorsa LLM hiç çağrılmadan o madde kullanılabilir.
+
+Kullanım:
+    from ihaleler.utils.sartname_indeks import SartnameIndeksi
+
+    indeks = SartnameIndeksi(sartname_metni)
+    baglam = indeks.baglam("NYY 3x2,5 kablo", k=5)     # LLM'e gidecek metin
+    madde = indeks.net_eslesme("NYY 3x2,5 kablo")       # açık eşleşme yoksa None
+"""
+import math
+import re
+from collections import Counter
+
+from ihaleler.utils.turkce import karakter_ngramlari, kelimeler
+
+# Madde başı: "1.", "3.2.1", "3.2.1)", "a)", "MADDE 5", "Madde 5 -"
+_MADDE_BASI_RE = re.compile(
+    r"^\s*(?:\d{1,3}(?:\.\d{1,3}){0,4}[.)\-]?\s+\S|[a-zçğıöşü]\)\s+\S|madde\s+\d+)",
+    re.IGNORECASE,
+)
+# Tamamı büyük harf kısa satır: başlık
+_BASLIK_RE = re.compile(r"^[\sA-ZÇĞİÖŞÜ0-9.\-:/()]{4,80}$")
+
+# Madde boyu sınırları (karakter)
+MIN_MADDE = 120
+MAKS_MADDE = 2500
+
+# Aramada dikkate alınmayacak sık kelimeler (katlanmış biçimde)
+_DURAK_KELIMELER = {
+    "ve", "ile", "veya", "icin", "bir", "bu", "da", "de", "olan", "olarak", "adet",
+    "en", "az", "cok", "her", "gibi", "ya", "ki", "mi", "the", "of",
+}
+
+_BM25_K1 = 1.5
+_BM25_B = 0.75
+# Kelime skoru ile 3-gram skorunun birleşim ağırlıkları
+_KELIME_AGIRLIK = 0.6
+_NGRAM_AGIRLIK = 0.4
+
+
+def maddelere_bol(metin: str) -> list:
+    """
+    Şartname metnini madde/başlık sınırlarından böler. Çok kısa maddeler bir sonrakiyle
+    birleştirilir, çok uzunlar paragraf/cümle sınırından parçalanır.
+
+    Returns:
+        [{"no": 0, "baslik": "3.2 Kablolar", "metin": "..."}, ...]  (belge sırasıyla)
+    """
+    if not metin:
+        return []
+    bloklar = []
+    mevcut = []
+    for satir in metin.splitlines():
+        temiz = satir.strip()
+        if not temiz:
+            if mevcut:
+                mevcut.append("")
+            continue
+        yeni_madde = bool(_MADDE_BASI_RE.match(temiz)) or (
+            len(temiz) <= 80 and temiz.upper() == temiz and bool(_BASLIK_RE.match(temiz)) and any(c.isalpha() for c in temiz)
+        )
+        if yeni_madde and mevcut:
+            bloklar.append("\n".join(mevcut).strip())
+            mevcut = []
+        mevcut.append(temiz)
+    if mevcut:
+        bloklar.append("\n".join(mevcut).strip())
+
+    # Kısa blokları birleştir
+    birlesik = []
+    for blok in bloklar:
+        if birlesik and len(birlesik[-1]) < MIN_MADDE:
+            birlesik[-1] = birlesik[-1] + "\n" + blok
+        else:
+            birlesik.append(blok)
+
+    # Uzun blokları böl
+    maddeler = []
+    for blok in birlesik:
+        for parca in _uzun_blogu_bol(blok):
+            if parca.strip():
+                maddeler.append(parca.strip())
+
+    return [
+        {"no": i, "baslik": m.split("\n", 1)[0][:120], "metin": m}
+        for i, m in enumerate(maddeler)
+    ]
+
+
+def _uzun_blogu_bol(blok: str) -> list:
+    if len(blok) <= MAKS_MADDE:
+        return [blok]
+    parcalar = []
+    kalan = blok
+    while len(kalan) > MAKS_MADDE:
+        kesim = kalan.rfind("\n", 0, MAKS_MADDE)
+        if kesim < MAKS_MADDE // 2:
+            kesim = kalan.rfind(". ", 0, MAKS_MADDE)
+            kesim = kesim + 1 if kesim >= MAKS_MADDE // 2 else MAKS_MADDE
+        parcalar.append(kalan[:kesim])
+        kalan = kalan[kesim:]
+    parcalar.append(kalan)
+    return parcalar
+
+
+def _kelime_terimleri(metin: str) -> list:
+    return [k for k in kelimeler(metin) if k not in _DURAK_KELIMELER]
+
+
+def _ngram_terimleri(terimler: list) -> list:
+    out = []
+    for k in terimler:
+        if not k[0].isdigit():
+            out.extend(karakter_ngramlari(k, 3))
+    return out
+
+
+class _Bm25:
+    """Basit bellek içi BM25 (belge = madde)."""
+
+    def __init__(self, belgeler: list):
+        self.tf = [Counter(b) for b in belgeler]
+        self.uzunluk = [len(b) for b in belgeler]
+        self.ort_uzunluk = (sum(self.uzunluk) / len(belgeler)) if belgeler else 0.0
+        df = Counter()
+        for tf in self.tf:
+            df.update(tf.keys())
+        n = len(belgeler)
+        self.idf = {t: math.log(1 + (n - d + 0.5) / (d + 0.5)) for t, d in df.items()}
+
+    def skorlar(self, sorgu: list) -> list:
+        skor = [0.0] * len(self.tf)
+        if not self.ort_uzunluk:
+            return skor
+        for terim in set(sorgu):
+            idf = self.idf.get(terim)
+            if idf is None:
+                continue
+            for i, tf in enumerate(self.tf):
+                f = tf.get(terim)
+                if not f:
+                    continue
+                norm = 1 - _BM25_B + _BM25_B * self.uzunluk[i] / self.ort_uzunluk
+                skor[i] += idf * f * (_BM25_K1 + 1) / (f + _BM25_K1 * norm)
+        return skor
+
+
+def _gecer(terim: str, kume: set) -> bool:
+    """Terim kümede aynen ya da (4+ harfli kelimelerde) ek almış biçimde geçiyor mu."""
+    if terim in kume:
+        return True
+    if len(terim) < 4 or terim[0].isdigit():
+        return False
+    return any(k.startswith(terim) for k in kume)
+
+
+class SartnameIndeksi:
+    """Şartname maddeleri üzerinde kelime + karakter 3-gram BM25 indeksi."""
+
+    def __init__(self, sartname_metni: str):
+        self.maddeler = maddelere_bol(sartname_metni or "")
+        kelime_belgeleri = [_kelime_terimleri(m["metin"]) for m in self.maddeler]
+        self._kelime_kumeleri = [set(b) for b in kelime_belgeleri]
+        self._kelime = _Bm25(kelime_belgeleri)
+        self._ngram = _Bm25([_ngram_terimleri(b) for b in kelime_belgeleri])
+
+    def __len__(self):
+        return len(self.maddeler)
+
+    def ara(self, sorgu: str, k: int = 5) -> list:
+        """
+        Sorguya en ilgili k maddeyi döndürür (skora göre azalan).
+
+        Returns:
+            [(skor, madde_dict), ...]  skor 0-1 arası (iki skorun en iyiye göre normalize ağırlıklı toplamı)
+        """
+        terimler = _kelime_terimleri(sorgu)
+        if not terimler or not self.maddeler:
+            return []
+        ks = self._kelime.skorlar(terimler)
+        ns = self._ngram.skorlar(_ngram_terimleri(terimler))
+        kmax = max(ks) or 1.0
+        nmax = max(ns) or 1.0
+        birlesik = [
+            (_KELIME_AGIRLIK * ks[i] / kmax + _NGRAM_AGIRLIK * ns[i] / nmax, i)
+            for i in range(len(self.maddeler))
+        ]
+        birlesik.sort(key=lambda x: (-x[0], x[1]))
+        return [(skor, self.maddeler[i]) for skor, i in birlesik[:k] if skor > 0]
+
+    def baglam(self, sorgu, k: int = 5, max_karakter: int = 12000) -> str:
+        """
+        Sorgu (veya sorgu listesi) için en ilgili maddeleri belge sırasıyla birleştirip döndürür.
+        Liste verilirse her sorgunun ilk k maddesinin birleşimi alınır.
+        """
+        sorgular = [sorgu] if isinstance(sorgu, str) else list(sorgu)
+        sonuclar = [self.ara(s, k=k) for s in sorgular]
+        # Önce her sorgunun 1. maddesi, sonra 2. maddesi... (bütçe dolunca her kalemin en iyisi içeride kalır)
+        secilen = {}
+        toplam = 0
+        for sira in range(k):
+            for liste in sonuclar:
+                if sira >= len(liste):
+                    continue
+                madde = liste[sira][1]
+                if madde["no"] in secilen:
+                    continue
+                if toplam + len(madde["metin"]) > max_karakter and secilen:
+                    continue
+                secilen[madde["no"]] = madde["metin"]
+                toplam += len(madde["metin"])
+        return "\n\n[...]\n\n".join(secilen[no] for no in sorted(secilen))
+
+    def net_eslesme(self, sorgu: str, fark_orani: float = 2.0):
+        """
+        Tek bir madde açıkça öne çıkıyorsa onu döndürür, yoksa None.
+        Koşullar: sorgudaki tüm anlamlı kelimeler maddede (Türkçe ekleriyle: "kablo" ~ "kablolar") geçer, başka hiçbir maddede
+        hepsi birlikte geçmez ve ilk maddenin kelime BM25 skoru ikincinin en az fark_orani katıdır.
+        """
+        terimler = [t for t in _kelime_terimleri(sorgu) if len(t) >= 2]
+        if not terimler or not self.maddeler:
+            return None
+        tam = [i for i, kume in enumerate(self._kelime_kumeleri) if all(_gecer(t, kume) for t in terimler)]
+        if len(tam) != 1:
+            return None
+        ks = self._kelime.skorlar(terimler)
+        ilk = ks[tam[0]]
+        ikinci = max((s for i, s in enumerate(ks) if i != tam[0]), default=0.0)
+        if ilk <= 0 or (ikinci and ilk < fark_orani * ikinci):
+            return None
+        return self.maddeler[tam[0]]
+
+
+_OZELLIK_SATIR_RE = re.compile(r"^\s*[-•*]?\s*([A-Za-zÇĞİÖŞÜçğıöşü][\wÇĞİÖŞÜçğıöşü /()]{1,40}?)\s*[:=]\s*(\S.{0,200})$")
+
+
+def maddeden_ozellikler(madde_metni: str) -> dict:
+    """Madde içindeki "Anahtar: değer" satırlarından basit teknik özellik dict'i (LLM'siz yol için)."""
+    ozellikler = {}
+    for satir in (madde_metni or "").splitlines():
+        m = _OZELLIK_SATIR_RE.match(satir)
+        if m:
+            anahtar = m.group(1).strip().lower()
+            if anahtar not in ozellikler:
+                ozellikler[anahtar] = m.group(2).strip()
+    return ozellikler
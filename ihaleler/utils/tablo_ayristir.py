@@ -0,0 +1,405 @@
+"""
+Yapılandırılmış cetvel tablolarının (Excel hücreleri, Word tabloları) LLM'siz, kural tabanlı ayrıştırılması.
+
+Hücreler zaten tablo olduğundan görsele çevirip Vision'a göndermek gerekmez: başlık satırı bulanık eşleşmeyle
+(Sıra No / Açıklama / Birim / Miktar / Birim Fiyat / Tutar) bulunur, başlıkla eşleşmeyen sütunlar veri tipi
+profiline (uzun metin, birim sözcükleri, artan sıra numarası, sayısal sütunlar, miktar × birim fiyat ≈ tutar)
+göre tamamlanır. Her sonuç 0-1 arası bir güven puanı taşır; puan düşükse çağıran Vision'a düşer
+(bkz. parsing_service.extract_cetvel_layout_based, EXCEL_CETVEL_GUVEN_ESIGI / WORD_CETVEL_GUVEN_ESIGI).
+
+Kullanım:
+    from ihaleler.utils.tablo_ayristir import excel_cetvel_ayristir
+
+    sonuc = excel_cetvel_ayristir("/path/to/cetvel.xlsx")   # Word: word_cetvel_ayristir("/path/to/cetvel.docx")
+    sonuc["guven"]      # 0.93
+    sonuc["kalemler"]   # [{"ad": "...", "miktar": "12", "birim": "Adet", "birim_fiyat": "", "toplam": ""}, ...]
+"""
+import difflib
+import logging
+import re
+from decimal import Decimal, InvalidOperation
+
+from ihaleler.utils.turkce import urun_anahtari
+
+logger = logging.getLogger("ihaleler.parsing")
+
+# Sütun rolleri ve başlık eşanlamlıları (urun_anahtari biçiminde: katlanmış, noktalama boşluk)
+_BASLIKLAR = {
+    "sira": ("sira no", "sira", "s no", "sn", "no"),
+    "ad": (
+        "aciklama", "malzemenin adi", "malzeme adi", "mal kaleminin adi", "mal kalemi", "kalem adi",
+        "urun adi", "urunun adi", "is kalemi", "malzemenin cinsi", "cinsi", "tanimi", "malzeme", "urun",
+        "mal hizmet", "hizmet adi",
+    ),
+    "birim": ("birimi", "birim", "olcu birimi", "olcu"),
+    "miktar": ("miktari", "miktar", "adet", "adedi", "istenen miktar"),
+    "birim_fiyat": ("birim fiyat", "birim fiyati", "teklif edilen birim fiyat", "b fiyat", "fiyat"),
+    "toplam": ("tutar", "tutari", "toplam", "toplam tutar", "toplam fiyat", "toplam tutari"),
+}
+# Bu roller bulunamazsa tablo cetvel sayılmaz
+_ZORUNLU_ROLLER = ("ad", "miktar")
+_BIRIM_SOZCUKLERI = {
+    "adet", "ad", "kg", "gr", "g", "ton", "lt", "litre", "ml", "m", "mt", "metre", "m2", "m3", "cm", "mm", "km",
+    "paket", "pk", "kutu", "koli", "takim", "tk", "cift", "set", "rulo", "top", "tup", "sise", "kavanoz",
+    "flakon", "ampul", "tablet", "kapsul", "doz", "test", "kit", "boy", "plaka", "torba", "cuval", "bidon",
+    "teneke", "varil", "tabaka", "blok", "demet", "hizmet", "ay", "gun", "saat", "kisi", "sefer", "tane",
+}
+_TOPLAM_SATIRI_RE = re.compile(r"^(genel toplam|ara toplam|toplam|kdv|yekun|teklif tutari)\b")
+_BASLIK_TARAMA_SATIRI = 30
+_PROFIL_SATIRI = 200
+# Yalnızca veri tipinden bulunan sütunun eşleşme puanı (başlıksız tablo tek başına eşiği zor geçer)
+_PROFIL_PUANI = 0.4
+
+
+def _metin(deger) -> str:
+    if deger is None:
+        return ""
+    if isinstance(deger, float) and deger.is_integer():
+        deger = int(deger)
+    return str(deger).strip()
+
+
+def sayi_coz(deger):
+    """Hücre değerini Decimal'e çevirir (sayı veya "1.250,50" / "1250.5" / "12 adet" metni); değilse None."""
+    if deger is None or isinstance(deger, bool):
+        return None
+    if isinstance(deger, (int, float, Decimal)):
+        try:
+            return Decimal(str(deger))
+        except InvalidOperation:
+            return None
+    # Sondaki birim/para birimi sözcüğü atılır ("12 adet", "1.250,00 TL")
+    eslesme = re.fullmatch(r"(-?[\d.,]*\d)\s*[^\d\s.,]{0,12}", str(deger).strip().replace("\u00a0", " "))
+    if not eslesme:
+        return None
+    metin = eslesme.group(1)
+    if "," in metin:
+        metin = metin.replace(".", "").replace(",", ".")
+    elif metin.count(".") > 1 or re.fullmatch(r"-?\d{1,3}\.\d{3}", metin):
+        # "1.250" / "1.250.000": binlik ayırıcı
+        metin = metin.replace(".", "")
+    try:
+        return Decimal(metin)
+    except InvalidOperation:
+        return None
+
+
+def _sayi_metni(sayi) -> str:
+    """Decimal'i cetvel akışının beklediği biçime çevirir (binlik ayırıcısız, ondalık virgül: "1250,5")."""
+    if sayi is None:
+        return ""
+    metin = format(sayi, "f")
+    if "." in metin:
+        metin = metin.rstrip("0").rstrip(".")
+    return metin.replace(".", ",")
+
+
+def _baslik_puani(hucre: str, rol: str) -> float:
+    anahtar = urun_anahtari(hucre)
+    if not anahtar or len(anahtar) > 60:
+        return 0.0
+    en_iyi = 0.0
+    for es in _BASLIKLAR[rol]:
+        if anahtar == es:
+            puan = 1.0
+        elif re.search(rf"(^| ){re.escape(es)}( |$)", anahtar):
+            # Eşanlamlı hücrenin içinde geçiyor ("teklif edilen birim fiyat (tl)"); uzun eşanlamlı daha güvenilir
+            puan = 0.75 + 0.2 * len(es) / len(anahtar)
+        else:
+            puan = difflib.SequenceMatcher(None, anahtar, es).ratio()
+            puan = puan * 0.8 if puan >= 0.8 else 0.0
+        en_iyi = max(en_iyi, puan)
+    return min(en_iyi, 1.0)
+
+
+def _baslik_esle(satir) -> dict:
+    """Satırı başlık olarak yorumlar: {rol: (sütun, puan)}; her sütun ve rol en fazla bir kez kullanılır."""
+    adaylar = []
+    for sutun, deger in enumerate(satir):
+        hucre = _metin(deger)
+        if not hucre or sayi_coz(hucre) is not None:
+            continue
+        for rol in _BASLIKLAR:
+            puan = _baslik_puani(hucre, rol)
+            if puan > 0:
+                adaylar.append((puan, len(urun_anahtari(hucre)), sutun, rol))
+    esleme, kullanilan = {}, set()
+    for puan, _, sutun, rol in sorted(adaylar, reverse=True):
+        if rol in esleme or sutun in kullanilan:
+            continue
+        esleme[rol] = (sutun, puan)
+        kullanilan.add(sutun)
+    return esleme
+
+
+def _baslik_bul(satirlar):
+    """İlk satırlar içinde en iyi başlık satırı: (satır no, {rol: (sütun, puan)}) ya da (None, {})."""
+    en_iyi = (None, {}, 0.0)
+    for no, satir in enumerate(satirlar[:_BASLIK_TARAMA_SATIRI]):
+        dolu = [d for d in (_metin(h) for h in satir) if d]
+        if sum(1 for d in dolu if sayi_coz(d) is not None) * 2 >= max(len(dolu), 2):
+            # Sayısal hücresi çok olan satır veri satırıdır (sütun numarası satırı "1 2 3 4" de başlık değildir)
+            continue
+        esleme = _baslik_esle(satir)
+        if len(esleme) < 2 or ("ad" not in esleme and "miktar" not in esleme):
+            continue
+        puan = sum(p for _, p in esleme.values())
+        if puan > en_iyi[2]:
+            en_iyi = (no, esleme, puan)
+    return en_iyi[0], en_iyi[1]
+
+
+def _sutun_profili(satirlar, sutun_sayisi) -> list:
+    """Veri satırlarından sütun başına tip profili (dolu/sayısal/metin oranı, ortalama uzunluk, birim, sıra)."""
+    profiller = []
+    for sutun in range(sutun_sayisi):
+        degerler = [_metin(s[sutun]) if sutun < len(s) else "" for s in satirlar]
+        dolu = [d for d in degerler if d]
+        sayilar = [sayi_coz(d) for d in dolu]
+        sayisal = [s for s in sayilar if s is not None]
+        metinler = [d for d, s in zip(dolu, sayilar) if s is None]
+        tamsayilar = [int(s) for s in sayisal if s == s.to_integral()]
+        profiller.append({
+            "dolu": len(dolu) / len(degerler) if degerler else 0.0,
+            "sayisal": len(sayisal) / len(dolu) if dolu else 0.0,
+            "metin": len(metinler) / len(dolu) if dolu else 0.0,
+            "uzunluk": sum(len(m) for m in metinler) / len(metinler) if metinler else 0.0,
+            "birim": (
+                sum(1 for m in metinler if urun_anahtari(m).replace(" ", "") in _BIRIM_SOZCUKLERI) / len(dolu)
+                if dolu else 0.0
+            ),
+            "sira": (
+                len(tamsayilar) >= 3 and len(tamsayilar) == len(sayisal)
+                and sum(1 for a, b in zip(tamsayilar, tamsayilar[1:]) if b == a + 1) >= 0.8 * (len(tamsayilar) - 1)
+            ),
+        })
+    return profiller
+
+
+def _profille_tamamla(esleme: dict, satirlar, sutun_sayisi) -> dict:
+    """Başlıkla bulunamayan rolleri sütun tip profiline göre doldurur (eşleşme puanı _PROFIL_PUANI)."""
+    profiller = _sutun_profili(satirlar[:_PROFIL_SATIRI], sutun_sayisi)
+    kullanilan = {s for s, _ in esleme.values()}
+
+    def _bos(sutun):
+        return sutun not in kullanilan and profiller[sutun]["dolu"] > 0
+
+    if "sira" not in esleme:
+        for sutun in range(sutun_sayisi):
+            if _bos(sutun) and profiller[sutun]["sira"]:
+                esleme["sira"] = (sutun, _PROFIL_PUANI)
+                kullanilan.add(sutun)
+                break
+    if "birim" not in esleme:
+        adaylar = [s for s in range(sutun_sayisi) if _bos(s) and profiller[s]["birim"] >= 0.6]
+        if adaylar:
+            sutun = max(adaylar, key=lambda s: profiller[s]["birim"])
+            esleme["birim"] = (sutun, _PROFIL_PUANI)
+            kullanilan.add(sutun)
+    if "ad" not in esleme:
+        adaylar = [s for s in range(sutun_sayisi) if _bos(s) and profiller[s]["metin"] >= 0.7]
+        if adaylar:
+            sutun = max(adaylar, key=lambda s: profiller[s]["uzunluk"] * profiller[s]["dolu"])
+            esleme["ad"] = (sutun, _PROFIL_PUANI)
+            kullanilan.add(sutun)
+    # Sayısal sütunlar soldan sağa: miktar, birim fiyat, tutar (cetvel düzeni); tutar ≈ miktar × fiyat ise doğrulanır
+    sayisal = [s for s in range(sutun_sayisi) if _bos(s) and profiller[s]["sayisal"] >= 0.8]
+    for rol in ("miktar", "birim_fiyat", "toplam"):
+        if rol not in esleme and sayisal:
+            sutun = sayisal.pop(0)
+            esleme[rol] = (sutun, _PROFIL_PUANI)
+            kullanilan.add(sutun)
+    return esleme
+
+
+def _hucre(satir, esleme, rol):
+    if rol not in esleme:
+        return None
+    sutun = esleme[rol][0]
+    return satir[sutun] if sutun < len(satir) else None
+
+
+def _kalemleri_cikar(veri, esleme: dict, baslik_no) -> dict:
+    """Sütun eşlemesiyle veri satırlarından kalemleri çıkarır ve güven puanını hesaplar."""
+    sutunlar = {r: s for r, (s, _) in esleme.items()}
+    if any(rol not in esleme for rol in _ZORUNLU_ROLLER):
+        return {"kalemler": [], "guven": 0.0, "baslik_satiri": baslik_no, "sutunlar": sutunlar, "baslik_puani": 0.0}
+
+    kalemler = []
+    aday = gecerli_miktar = tutarli = kontrol = 0
+    for satir in veri:
+        ad = _metin(_hucre(satir, esleme, "ad"))
+        if not ad:
+            continue
+        miktar = sayi_coz(_hucre(satir, esleme, "miktar"))
+        if _TOPLAM_SATIRI_RE.match(urun_anahtari(ad)) or (miktar is None and len(_baslik_esle(satir)) >= 2):
+            # Toplam/KDV satırı veya sayfa başında tekrarlanan başlık
+            continue
+        birim_fiyat = sayi_coz(_hucre(satir, esleme, "birim_fiyat"))
+        toplam = sayi_coz(_hucre(satir, esleme, "toplam"))
+        aday += 1
+        if miktar is None or miktar <= 0:
+            # Grup başlığı / açıklama satırı (miktarsız): kalem değil
+            continue
+        gecerli_miktar += 1
+        if birim_fiyat and toplam:
+            kontrol += 1
+            if abs(miktar * birim_fiyat - toplam) <= max(Decimal("0.05"), abs(toplam) * Decimal("0.01")):
+                tutarli += 1
+        kalemler.append({
+            "ad": re.sub(r"\s+", " ", ad),
+            "miktar": _sayi_metni(miktar),
+            "birim": _metin(_hucre(satir, esleme, "birim")) or "Adet",
+            "birim_fiyat": _sayi_metni(birim_fiyat),
+            "toplam": _sayi_metni(toplam),
+        })
+
+    # Güven: zorunlu sütunların başlık eşleşmesi + miktarı sayısal aday satır oranı + tutar tutarlılığı
+    baslik_puani = sum(esleme[r][1] for r in _ZORUNLU_ROLLER) / len(_ZORUNLU_ROLLER)
+    tip_uyumu = gecerli_miktar / aday if aday else 0.0
+    tutarlilik = tutarli / kontrol if kontrol else 1.0
+    guven = round(0.4 * baslik_puani + 0.4 * tip_uyumu + 0.2 * tutarlilik, 3) if kalemler else 0.0
+    return {
+        "kalemler": kalemler, "guven": guven, "baslik_satiri": baslik_no, "sutunlar": sutunlar,
+        "baslik_puani": baslik_puani,
+    }
+
+
+def tablo_ayristir(satirlar, onceki: dict = None) -> dict:
+    """
+    Hücre ızgarasını (satır listesi; her satır hücre değerleri dizisi) cetvel kalemlerine çevirir.
+    Başlık + profil eşlemesi ile yalnızca profil eşlemesi denenir, güveni yüksek olan döner.
+    onceki: aynı belgedeki bir önceki tablonun sonucu; başlıksız devam tablosu (sayfa sonunda bölünmüş
+    Word tablosu) aynı sütun düzeniyle ayrıca denenir.
+
+    Returns:
+        {
+            "kalemler": [{"ad", "miktar", "birim", "birim_fiyat", "toplam"}, ...],   # _normalize_row anahtarları
+            "guven": float (0-1),
+            "baslik_satiri": int | None,
+            "sutunlar": {rol: sütun no},
+            "baslik_puani": float,
+        }
+    """
+    satirlar = [list(s) for s in satirlar if s is not None]
+    if not satirlar:
+        return {"kalemler": [], "guven": 0.0, "baslik_satiri": None, "sutunlar": {}, "baslik_puani": 0.0}
+    sutun_sayisi = max(len(s) for s in satirlar)
+    baslik_no, esleme = _baslik_bul(satirlar)
+    veri = satirlar[baslik_no + 1:] if baslik_no is not None else satirlar
+    sonuclar = [_kalemleri_cikar(veri, _profille_tamamla({}, veri, sutun_sayisi), None)]
+    if esleme:
+        sonuclar.insert(0, _kalemleri_cikar(veri, _profille_tamamla(dict(esleme), veri, sutun_sayisi), baslik_no))
+    elif onceki and onceki.get("kalemler") and max(onceki["sutunlar"].values()) < sutun_sayisi:
+        devam = {rol: (sutun, onceki["baslik_puani"]) for rol, sutun in onceki["sutunlar"].items()}
+        sonuclar.insert(0, _kalemleri_cikar(satirlar, devam, None))
+    return max(sonuclar, key=lambda r: r["guven"])
+
+
+def excel_cetvel_ayristir(file_path: str, sayfa_index: int = None) -> dict:
+    """
+    Excel cetvelini openpyxl read-only modunda okuyup tablo_ayristir ile çözer. sayfa_index verilmezse
+    tüm sheet'ler sırayla birleştirilir; kalem çıkmayan sheet'ler (kapak, açıklama) yok sayılır.
+
+    Returns:
+        {"kalemler": [...], "guven": float (kalem sayısıyla ağırlıklı), "sayfalar": [{"sayfa", "kalem", "guven"}, ...]}
+    """
+    import openpyxl
+
+    sonuc = {"kalemler": [], "guven": 0.0, "sayfalar": []}
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheetler = wb.worksheets if sayfa_index is None else [wb.worksheets[sayfa_index]]
+        for idx, sheet in enumerate(sheetler):
+            tablo = tablo_ayristir(sheet.iter_rows(values_only=True))
+            sonuc["sayfalar"].append({"sayfa": idx if sayfa_index is None else sayfa_index,
+                                      "kalem": len(tablo["kalemler"]), "guven": tablo["guven"]})
+            sonuc["kalemler"].extend(tablo["kalemler"])
+    finally:
+        wb.close()
+    toplam = sum(s["kalem"] for s in sonuc["sayfalar"])
+    if toplam:
+        sonuc["guven"] = round(sum(s["kalem"] * s["guven"] for s in sonuc["sayfalar"]) / toplam, 3)
+    logger.info(
+        "Excel cetvel (kural tabanlı) | kalem=%s | güven=%s | sayfalar=%s",
+        toplam, sonuc["guven"], [(s["sayfa"], s["kalem"], s["guven"]) for s in sonuc["sayfalar"]],
+    )
+    return sonuc
+
+
+def _word_tablo_satirlari(tablo) -> list:
+    """python-docx tablosunu hücre metni ızgarasına çevirir; birleştirilmiş hücre yalnızca ilk sütununda yazılır."""
+    satirlar = []
+    for row in tablo.rows:
+        try:
+            hucreler = row.cells
+        except Exception:
+            continue
+        satir, gorulen = [], set()
+        for hucre in hucreler:
+            if id(hucre._tc) in gorulen:
+                satir.append("")
+                continue
+            gorulen.add(id(hucre._tc))
+            satir.append(" ".join((hucre.text or "").split()))
+        satirlar.append(satir)
+    return satirlar
+
+
+def word_cetvel_ayristir(file_path: str, guven_esigi: float = 0.75) -> dict:
+    """
+    Word (.docx) tablolarını python-docx ile doğrudan gezer; her tabloyu tablo_ayristir ile sınıflar.
+
+    Returns:
+        {
+            "kalemler": [...],                       # güveni eşiği geçen tablolardan, belge sırasıyla
+            "guven": float,                          # kabul edilen tabloların kalem sayısıyla ağırlıklı güveni
+            "tablolar": [{"tablo", "satir", "kalem", "guven", "kabul"}, ...],
+            # cetvele benzeyen ama sınıflanamayan tablolar (LLM için): TAB'lı metin ve tablonun kalemlerinin
+            # yeri, yani belgede kendisinden önceki tablolardan gelen kalem sayısı
+            "belirsiz_tablolar": [{"tablo": int, "konum": int, "metin": str}, ...],
+        }
+    """
+    import docx
+
+    sonuc = {"kalemler": [], "guven": 0.0, "tablolar": [], "belirsiz_tablolar": []}
+    onceki = None
+    for idx, tablo in enumerate(docx.Document(file_path).tables):
+        satirlar = _word_tablo_satirlari(tablo)
+        ayristirma = tablo_ayristir(satirlar, onceki=onceki)
+        kabul = bool(ayristirma["kalemler"]) and ayristirma["guven"] >= guven_esigi
+        sonuc["tablolar"].append({
+            "tablo": idx, "satir": len(satirlar), "kalem": len(ayristirma["kalemler"]),
+            "guven": ayristirma["guven"], "kabul": kabul,
+        })
+        if kabul:
+            sonuc["kalemler"].extend(ayristirma["kalemler"])
+            onceki = ayristirma
+        elif _cetvele_benziyor(satirlar):
+            sonuc["belirsiz_tablolar"].append({
+                "tablo": idx,
+                "konum": len(sonuc["kalemler"]),
+                "metin": "\n".join("\t".join(h for h in satir) for satir in satirlar if any(satir)),
+            })
+    kabul_edilen = [t for t in sonuc["tablolar"] if t["kabul"]]
+    toplam = sum(t["kalem"] for t in kabul_edilen)
+    if toplam:
+        sonuc["guven"] = round(sum(t["kalem"] * t["guven"] for t in kabul_edilen) / toplam, 3)
+    logger.info(
+        "Word cetvel (kural tabanlı) | kalem=%s | güven=%s | tablolar=%s | belirsiz=%s",
+        toplam, sonuc["guven"], len(sonuc["tablolar"]), len(sonuc["belirsiz_tablolar"]),
+    )
+    return sonuc
+
+
+def _cetvele_benziyor(satirlar) -> bool:
+    """En az üç satırında hem metin hem sayı bulunan tablo (imza/kapak tablosu değil) cetvel adayıdır."""
+    uygun = 0
+    for satir in satirlar:
+        dolu = [h for h in satir if h]
+        sayi = sum(1 for h in dolu if sayi_coz(h) is not None)
+        if sayi and len(dolu) > sayi:
+            uygun += 1
+            if uygun >= 3:
+                return True
+    return False
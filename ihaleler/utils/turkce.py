@@ -0,0 +1,84 @@
+"""
+Türkçe metin normalizasyonu (arama, eşleştirme ve indeksleme için ortak).
+
+Python'un str.lower() fonksiyonu Türkçe'ye uygun değildir ("I" -> "i", "İ" -> "i̇" iki karakter).
+Buradaki fonksiyonlar İ/ı/I farkını ve aksanları (ç, ğ, ö, ş, ü, â, î, û) katlar:
+"KABLO İÇ TESİSAT" ve "kablo ic tesisat" aynı biçime iner.
+
+Kullanım:
+    from ihaleler.utils.turkce import turkce_normalize, kelimeler
+    turkce_normalize("  İÇ  Tesisat Kablosu ")  # "ic tesisat kablosu"
+"""
+import re
+import unicodedata
+
+_KATLAMA = {
+    "İ": "i", "I": "i", "ı": "i", "i": "i",
+    "Ç": "c", "ç": "c",
+    "Ğ": "g", "ğ": "g",
+    "Ö": "o", "ö": "o",
+    "Ş": "s", "ş": "s",
+    "Ü": "u", "ü": "u",
+    "Â": "a", "â": "a",
+    "Î": "i", "î": "i",
+    "Û": "u", "û": "u",
+}
+
+_KELIME_RE = re.compile(r"[a-z0-9]+(?:[.,/][0-9]+)*")
+_AYIRAC_RE = re.compile(r"[\W_]+")
+
+
+def _karakter_katla(c: str) -> str:
+    k = _KATLAMA.get(c)
+    if k is not None:
+        return k
+    k = c.lower()
+    if len(k) != 1:
+        return c
+    if ord(k) > 127:
+        taban = unicodedata.normalize("NFD", k)[0]
+        if taban.isalpha():
+            return taban
+    return k
+
+
+def turkce_katla(metin: str) -> str:
+    """
+    Karakter karakter küçük harf + aksan katlama. Çıktı girdiyle AYNI uzunluktadır
+    (i. karakter i. karaktere karşılık gelir); eşleşme konumlarını orijinal metne taşımak için kullanılır.
+    """
+    if not metin:
+        return ""
+    return "".join(_karakter_katla(c) for c in metin)
+
+
+def turkce_normalize(metin: str) -> str:
+    """Katlanmış, baştaki/sondaki ve tekrarlanan boşlukları temizlenmiş metin."""
+    if not metin or not isinstance(metin, str):
+        return ""
+    return re.sub(r"\s+", " ", turkce_katla(metin)).strip()
+
+
+def urun_anahtari(metin: str) -> str:
+    """
+    Ürün adını karşılaştırma anahtarına indirir: katlama + noktalama/boşluk dizileri tek boşluk
+    ("İĞNE  (21G)" ve "igne 21g" -> "igne 21g"; "3x2.5" ve "3x2,5" -> "3x2 5"). Kalem.urun_adi_norm bu biçimdedir.
+    """
+    if not metin or not isinstance(metin, str):
+        return ""
+    return _AYIRAC_RE.sub(" ", turkce_katla(metin)).strip()
+
+
+def kelimeler(metin: str) -> list:
+    """Katlanmış metindeki kelime/sayı parçaları ("NYY 3x2,5 mm²" -> ["nyy", "3x2,5", "mm"])."""
+    return _KELIME_RE.findall(turkce_katla(metin or ""))
+
+
+def karakter_ngramlari(kelime: str, n: int = 3) -> list:
+    """Kelimenin sınır işaretli karakter n-gramları ("kablo" -> ["_ka", "kab", "abl", "blo", "lo_"])."""
+    if not kelime:
+        return []
+    k = f"_{kelime}_"
+    if len(k) <= n:
+        return [k]
+    return [k[i:i + n] for i in range(len(k) - n + 1)]
@@ -3,19 +3,23 @@
 (isim + teknik özellik) karşılaştırır; eşleşme varsa aynı benzersiz ID (UrunKutuphanesi) ile ilişkilendirir.
 """
 import logging
-import re
 from decimal import Decimal
 
+from ihaleler.utils.katalog_benzerlik import (
+    KatalogIndeksi,
+    benzerlik_esigi,
+    indekse_ekle,
+    katalog_indeksi,
+)
+from ihaleler.utils.turkce import turkce_normalize
+
 logger = logging.getLogger("ihaleler.parsing")
 
 
 def _normalize_urun_adi(adi: str) -> str:
-    """Eşleştirme için ürün adını normalize eder (küçük harf, fazla boşluk temizle)."""
-    if not adi or not isinstance(adi, str):
-        return ""
-    s = adi.lower().strip()
-    s = re.sub(r"\s+", " ", s)
-    return s[:500]
+    """Eşleştirme için ürün adını normalize eder (Türkçe küçük harf/aksan katlama, fazla boşluk temizle).
+    UrunKutuphanesi.urun_adi_norm ile aynı biçimdir."""
+    return turkce_normalize(adi)[:500]
 
 
 def _ozellik_anahtarlari(teknik_ozellikler: dict) -> set:
@@ -43,10 +47,148 @@ def _ozellik_benzerlik(tek1: dict, tek2: dict) -> float:
     return eslesen / len(ortak) if ortak else 0.0
 
 
+def _en_iyi_aday(teknik: dict, adaylar):
+    """Aynı normalize isimli adaylar içinden teknik özellik benzerliği en yüksek olanı ve eşik sağlanıyor mu bilgisini döndürür."""
+    en_iyi = None
+    en_iyi_skor = 0.0
+    for urun in adaylar:
+        urun_tek = getattr(urun, "teknik_ozellikler_json", None) or {}
+        skor = _ozellik_benzerlik(teknik, urun_tek)
+        if not teknik and not urun_tek:
+            skor = 1.0
+        if skor > en_iyi_skor:
+            en_iyi_skor = skor
+            en_iyi = urun
+    # Eşik: isim aynı ve (teknik yoksa veya benzerlik yeterliyse)
+    if en_iyi and (en_iyi_skor >= 0.5 or (not teknik and not getattr(en_iyi, "teknik_ozellikler_json", None))):
+        return en_iyi
+    return None
+
+
+def _yeni_katalog_urunu(kalem, urun_adi: str, teknik):
+    """Kalemden kaydedilmemiş UrunKutuphanesi örneği üretir."""
+    from ihaleler.models import UrunKutuphanesi
+
+    son_alis = Decimal("0")
+    if getattr(kalem, "maliyet_birim_fiyat", None):
+        try:
+            son_alis = Decimal(str(kalem.maliyet_birim_fiyat))
+        except Exception:
+            pass
+    return UrunKutuphanesi(
+        urun_adi=urun_adi[:500],
+        urun_adi_norm=_normalize_urun_adi(urun_adi),
+        teknik_ozellikler_json=teknik if isinstance(teknik, dict) else {},
+        teknik_sartname_metni=(getattr(kalem, "teknik_sartname_ozeti", None) or "")[:10000],
+        son_alis_fiyati=son_alis,
+    )
+
+
+def katalog_adaylari(urun_adi: str, teknik: dict = None, k: int = 5, esik: float = None) -> list:
+    """
+    Bulanık eşleştirme: ada (3-gram indeksi) ve teknik özelliklere göre en benzer k katalog ürünü.
+    esik None ise settings.KATALOG_BENZERLIK_ESIGI (varsayılan 0.82) kullanılır; 0 verilirse elenmez.
+
+    Returns:
+        [{"urun": UrunKutuphanesi, "skor": float, "ad_skor": float, "ozellik_skor": float | None}, ...]
+    """
+    from ihaleler.models import UrunKutuphanesi
+    esik = benzerlik_esigi() if esik is None else esik
+    sonuclar = katalog_indeksi().benzerler(urun_adi, teknik=teknik or {}, k=k, esik=esik)
+    urunler = UrunKutuphanesi.objects.in_bulk([r["urun_id"] for r in sonuclar])
+    return [{**r, "urun": urunler[r["urun_id"]]} for r in sonuclar if r["urun_id"] in urunler]
+
+
+def kalemleri_katalogla_eslestir_toplu(kalemler: list) -> dict:
+    """
+    Kaydedilmemiş Kalem örneklerinin kutuphane_urunu alanını tek geçişte doldurur:
+    adaylar tek indeksli sorguyla (urun_adi_norm) sözlüğe alınır, tam ad eşleşmesi yoksa bulanık
+    katalog indeksine (katalog_benzerlik) bakılır, yine yoksa yeni ürünler bulk_create ile yazılır
+    (aynı toplu işteki benzer adlı + benzer özellikli kalemler tek yeni ürünü paylaşır).
+    Kalemler kaydedilmez; çağıran bulk_create ile yazar. transaction.atomic() içinde çağrılmalıdır.
+
+    Returns:
+        {"eslesen": int, "bulanik_eslesen": int, "yeni_urun": int}
+    """
+    from ihaleler.models import UrunKutuphanesi
+    sonuc = {"eslesen": 0, "bulanik_eslesen": 0, "yeni_urun": 0}
+    bekleyen = []
+    for kalem in kalemler:
+        if getattr(kalem, "kutuphane_urunu_id", None):
+            continue
+        urun_adi = (getattr(kalem, "urun_adi", None) or "").strip()
+        if urun_adi:
+            bekleyen.append((kalem, urun_adi, _normalize_urun_adi(urun_adi)))
+    if not bekleyen:
+        return sonuc
+
+    # Adaylar indeksli urun_adi_norm üzerinden (SQLite değişken sınırı için parça parça) tek sözlüğe alınır
+    aranan = sorted({norm for _, _, norm in bekleyen})
+    katalog = {}
+    for bas in range(0, len(aranan), 500):
+        adaylar = UrunKutuphanesi.objects.filter(urun_adi_norm__in=aranan[bas:bas + 500]).only(
+            "id", "urun_adi", "urun_adi_norm", "teknik_ozellikler_json"
+        )
+        for urun in adaylar:
+            katalog.setdefault(urun.urun_adi_norm, []).append(urun)
+
+    esik = benzerlik_esigi()
+    genel = katalog_indeksi()
+    yerel = KatalogIndeksi()  # bu toplu işte oluşturulacak (henüz pk'sı olmayan) ürünler
+    bulanik = []  # (kalem, urun_id)
+    yeniler = []
+    for kalem, urun_adi, norm in bekleyen:
+        teknik = getattr(kalem, "teknik_ozellikler_json", None) or {}
+        en_iyi = _en_iyi_aday(teknik, katalog.get(norm, []))
+        if en_iyi is not None:
+            sonuc["eslesen"] += 1
+            kalem.kutuphane_urunu = en_iyi
+            continue
+        aday = genel.benzerler(urun_adi, teknik=teknik, k=1, esik=esik)
+        if aday:
+            bulanik.append((kalem, aday[0]["urun_id"]))
+            continue
+        aday = yerel.benzerler(urun_adi, teknik=teknik, k=1, esik=esik)
+        if aday:
+            en_iyi = yeniler[aday[0]["urun_id"]]
+            sonuc["eslesen"] += 1
+        else:
+            en_iyi = _yeni_katalog_urunu(kalem, urun_adi, teknik)
+            yerel.ekle(len(yeniler), urun_adi, teknik)
+            katalog.setdefault(norm, []).append(en_iyi)
+            yeniler.append(en_iyi)
+        kalem.kutuphane_urunu = en_iyi
+
+    if bulanik:
+        urunler = UrunKutuphanesi.objects.in_bulk({uid for _, uid in bulanik})
+        for kalem, uid in bulanik:
+            if uid in urunler:
+                kalem.kutuphane_urunu = urunler[uid]
+                sonuc["bulanik_eslesen"] += 1
+            else:
+                # İndeks bayat (ürün silinmiş): yeni ürün aç
+                yeni = _yeni_katalog_urunu(kalem, kalem.urun_adi.strip(), getattr(kalem, "teknik_ozellikler_json", None) or {})
+                yeniler.append(yeni)
+                kalem.kutuphane_urunu = yeni
+
+    if yeniler:
+        UrunKutuphanesi.objects.bulk_create(yeniler, batch_size=500)
+        # Atama bulk_create'den önce yapıldığı için FK id'lerini tazele
+        for kalem, _, _ in bekleyen:
+            kalem.kutuphane_urunu = kalem.kutuphane_urunu
+        indekse_ekle(*yeniler)  # bulk_create sinyal üretmez
+    sonuc["yeni_urun"] = len(yeniler)
+    logger.info(
+        "Toplu katalog eşleştirme | eslesen=%s | bulanik_eslesen=%s | yeni_urun=%s",
+        sonuc["eslesen"], sonuc["bulanik_eslesen"], sonuc["yeni_urun"],
+    )
+    return sonuc
+
+
 def kutuphane_urunu_bul_veya_olustur(kalem) -> bool:
     """
-    Kalem için katalogda eşleşen ürün arar; bulursa kalem.kutuphane_urunu atar,
-    bulamazsa yeni UrunKutuphanesi oluşturup ona bağlar. Kalem kaydedilmiş olmalı (pk var).
+    Kalem için katalogda eşleşen ürün arar (önce aynı normalize ad, sonra katalog_adaylari ile
+    bulanık eşleşme); bulursa kalem.kutuphane_urunu atar, bulamazsa yeni UrunKutuphanesi oluşturup ona bağlar. Kalem kaydedilmiş olmalı (pk var).
 
     Returns:
         True eğer eşleştirme yapıldı veya yeni kayıt oluşturuldu.
@@ -68,41 +210,22 @@ def kutuphane_urunu_bul_veya_olustur(kalem) -> bool:
         return True
 
     # Aynı normalize isim + teknik özellik benzerliği yüksek olan katalog kaydını ara
-    adaylar = UrunKutuphanesi.objects.all()
-    en_iyi = None
-    en_iyi_skor = 0.0
-
-    for urun in adaylar:
-        if _normalize_urun_adi(urun.urun_adi) != norm_adi:
-            continue
-        urun_tek = getattr(urun, "teknik_ozellikler_json", None) or {}
-        skor = _ozellik_benzerlik(teknik, urun_tek)
-        if not teknik and not urun_tek:
-            skor = 1.0
-        if skor > en_iyi_skor:
-            en_iyi_skor = skor
-            en_iyi = urun
-
-    # Eşik: isim aynı ve (teknik yoksa veya benzerlik yeterliyse)
-    if en_iyi and (en_iyi_skor >= 0.5 or (not teknik and not getattr(en_iyi, "teknik_ozellikler_json", None))):
+    adaylar = UrunKutuphanesi.objects.filter(urun_adi_norm=norm_adi)
+    en_iyi = _en_iyi_aday(teknik, adaylar)
+    if en_iyi is None:
+        bulanik = katalog_adaylari(urun_adi, teknik, k=1)
+        if bulanik:
+            en_iyi = bulanik[0]["urun"]
+
+    if en_iyi:
         kalem.kutuphane_urunu = en_iyi
         kalem.save(update_fields=["kutuphane_urunu"])
         logger.info("Kalem %s katalog ürünü ile eşlendi: %s (id=%s)", kalem.pk, en_iyi.urun_adi, en_iyi.pk)
         return True
 
     # Yeni katalog ürünü oluştur
-    son_alis = Decimal("0")
-    if getattr(kalem, "maliyet_birim_fiyat", None):
-        try:
-            son_alis = Decimal(str(kalem.maliyet_birim_fiyat))
-        except Exception:
-            pass
-    yeni = UrunKutuphanesi.objects.create(
-        urun_adi=urun_adi[:500],
-        teknik_ozellikler_json=teknik if isinstance(teknik, dict) else {},
-        teknik_sartname_metni=(getattr(kalem, "teknik_sartname_ozeti", None) or "")[:10000],
-        son_alis_fiyati=son_alis,
-    )
+    yeni = _yeni_katalog_urunu(kalem, urun_adi, teknik)
+    yeni.save()  # katalog indeksine sinyalle işlenir
     kalem.kutuphane_urunu = yeni
     kalem.save(update_fields=["kutuphane_urunu"])
     logger.info("Yeni katalog ürünü oluşturuldu: id=%s, ad=%s; Kalem %s bağlandı.", yeni.pk, yeni.urun_adi, kalem.pk)
@@ -1,22 +1,65 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count, Q
+from django.db.models import Avg, Sum, Count, Q, Exists, OuterRef, Subquery, Value, DecimalField
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
 from django.urls import reverse
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 from decimal import Decimal
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
 
 from django.contrib.auth.models import User
-from .models import UrunKutuphanesi, Kalem, Ihale, Hastane, Arac, AracKullanimKaydi
+from .models import UrunKutuphanesi, Kalem, Ihale, Hastane, Arac, AracKullanimKaydi, DosyaIslemIsi
+from .models import AylikOzet, HastaneOzeti, IhaleSonucOzeti, UrunOzeti
+from .utils.anasayfa_sayaclari import anasayfa_sayaclari
+from .utils.ihale_arama import arama_ozetleri, eslesen_ihale_sql, fts_kullanilabilir, fts_sorgusu, sirali_ihale_idleri
+from .utils.kalem_fiyat import fiyat_coz, kalem_fiyatlarini_kaydet
+from .utils.liste_disa_aktar import csv_akisi, liste_satirlari, xlsx_dosyasi
+from .utils.turkce import urun_anahtari
+
+
+# Liste sayfalarında bir sayfadaki ihale sayısı
+LISTE_SAYFA_BOYUTU = 25
+
+# sirala parametresi -> (sıralama alanı, azalan mı); keyset sayfalama için id ikincil anahtardır.
+# Arama yapılırken "ilgili" (varsayılan) FTS ilgililik sırasıdır; aramasız listede sisteme_yeni gibi davranır.
+_SIRALAMALAR = {
+    "sisteme_yeni": ("olusturulma_tarihi", True),
+    "sisteme_eski": ("tarih", False),
+    "ihale_yeniden_eski": ("tarih", True),
+    "ihale_eskiden_yeni": ("tarih", False),
+}
+
+
+def _kalem_ozet_ekle(qs):
+    """Kalem sayısı ve toplam teklif tutarını kalemleri belleğe almadan (alt sorgu ile) ekler."""
+    kalemler = Kalem.objects.filter(ihale=OuterRef("pk")).order_by().values("ihale")
+    return qs.annotate(
+        kalem_sayisi=Coalesce(Subquery(kalemler.annotate(n=Count("pk")).values("n")), 0),
+        kalem_toplami=Coalesce(
+            Subquery(kalemler.annotate(t=Sum("toplam_fiyat")).values("t")),
+            Value(Decimal("0")),
+            output_field=DecimalField(max_digits=15, decimal_places=2),
+        ),
+    )
 
 
-def _ihale_queryset(request, is_dogrudan_temin):
-    """İhale listesini filtre ve sıralamaya göre döndürür."""
-    qs = Ihale.objects.filter(is_dogrudan_temin=is_dogrudan_temin).select_related("hastane").prefetch_related("kalemler").order_by("-tarih")
+def _ihale_filtrele(request, is_dogrudan_temin):
+    """İhale listesine arama ve yan filtreleri uygular (sıralamasız, ek alansız)."""
+    qs = Ihale.objects.filter(is_dogrudan_temin=is_dogrudan_temin).select_related("hastane", "olusturan_kullanici")
     q = request.GET.get("q", "").strip()
     if q:
-        qs = qs.filter(
-            Q(ihale_adi__icontains=q) | Q(hastane__ad__icontains=q) | Q(kalemler__urun_adi__icontains=q)
-        ).distinct()
+        ifade = fts_sorgusu(q) if fts_kullanilabilir() else ""
+        if ifade:
+            qs = qs.filter(pk__in=RawSQL(*eslesen_ihale_sql(ifade)))
+        else:
+            # FTS yok (SQLite dışı veritabanı / migrate edilmemiş) veya sorguda kelime yok
+            qs = qs.filter(
+                Q(ihale_adi__icontains=q) | Q(hastane__ad__icontains=q)
+                | Q(Exists(Kalem.objects.filter(ihale=OuterRef("pk"), urun_adi__icontains=q)))
+            )
     il = request.GET.get("il", "").strip()
     if il:
         qs = qs.filter(il__iexact=il)
@@ -26,75 +69,183 @@ def _ihale_queryset(request, is_dogrudan_temin):
     durum = request.GET.get("durum", "").strip()
     if durum:
         qs = qs.filter(durum=durum)
-    sirala = request.GET.get("sirala", "sisteme_yeni")
-    if sirala == "sisteme_eski":
-        qs = qs.order_by("tarih")
-    elif sirala == "ihale_yeniden_eski":
-        qs = qs.order_by("-tarih")
-    elif sirala == "ihale_eskiden_yeni":
-        qs = qs.order_by("tarih")
-    else:
-        qs = qs.order_by("-olusturulma_tarihi")
     return qs
 
 
+def _ihale_queryset(request, is_dogrudan_temin):
+    """İhale listesini filtre ve sıralamaya göre döndürür (kalem_sayisi / kalem_toplami ek alanlarıyla)."""
+    return _kalem_ozet_ekle(_ihale_filtrele(request, is_dogrudan_temin).order_by(*_ihale_sirasi(request)))
+
+
+def _ihale_sirasi(request):
+    """sirala parametresine göre (alan, pk) sıralaması; bilinmeyen değer / "ilgili" için sisteme_yeni."""
+    alan, azalan = _SIRALAMALAR.get(request.GET.get("sirala", "sisteme_yeni"), _SIRALAMALAR["sisteme_yeni"])
+    return (f"-{alan}", "-pk") if azalan else (alan, "pk")
+
+
+def _imlec_coz(imlec):
+    """Sayfa imlecini (sıralama değeri, pk) olarak çözer; geçersizse None."""
+    if not imlec:
+        return None
+    try:
+        deger, pk = urlsafe_b64decode(imlec.encode("ascii") + b"==").decode("utf-8").rsplit("|", 1)
+        return datetime.fromisoformat(deger), int(pk)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def _keyset_sayfa(qs, imlec, boyut=LISTE_SAYFA_BOYUTU):
+    """
+    Sıralı queryset'in imleçten sonraki sayfasını döndürür (OFFSET yerine WHERE (alan, id) > imleç).
+    qs ilk sıralama alanı + pk ile sıralanmış olmalı (_ihale_queryset).
+
+    Returns:
+        (kayitlar: list, sonraki_imlec: str | None)
+    """
+    sira = qs.query.order_by[0]
+    azalan = sira.startswith("-")
+    alan = sira.lstrip("-")
+    coz = _imlec_coz(imlec)
+    if coz:
+        deger, pk = coz
+        op = "lt" if azalan else "gt"
+        qs = qs.filter(Q(**{f"{alan}__{op}": deger}) | Q(**{alan: deger, f"pk__{op}": pk}))
+    kayitlar = list(qs[:boyut + 1])
+    sonraki = None
+    if len(kayitlar) > boyut:
+        son = kayitlar[boyut - 1]
+        sonraki = urlsafe_b64encode(f"{getattr(son, alan).isoformat()}|{son.pk}".encode("utf-8")).decode("ascii").rstrip("=")
+    return kayitlar[:boyut], sonraki
+
+
+def _sayfa_url(request, **imlecler):
+    """Mevcut filtreleri koruyarak imleç parametrelerini değiştiren liste adresi (None verilen parametre kaldırılır)."""
+    params = request.GET.copy()
+    for param, imlec in imlecler.items():
+        if imlec:
+            params[param] = imlec
+        else:
+            params.pop(param, None)
+    return f"?{params.urlencode()}"
+
+
+def _ilgililik_sayfasi(request, is_dogrudan_temin, imlec, boyut=LISTE_SAYFA_BOYUTU):
+    """
+    Arama sonuçlarının FTS ilgililik (bm25) sırasıyla sayfası; imleç sonuç listesindeki konumdur.
+
+    Returns:
+        (kayitlar: list, sonraki_imlec: str | None)
+    """
+    try:
+        konum = max(0, int(imlec or 0))
+    except ValueError:
+        konum = 0
+    qs = _ihale_filtrele(request, is_dogrudan_temin)
+    idler = sirali_ihale_idleri(request.GET.get("q", ""), qs, limit=boyut + 1, offset=konum)
+    nesneler = _kalem_ozet_ekle(qs).in_bulk(idler[:boyut])
+    kayitlar = [nesneler[i] for i in idler[:boyut] if i in nesneler]
+    return kayitlar, (str(konum + boyut) if len(idler) > boyut else None)
+
+
+def _liste_baglami(request, is_dogrudan_temin):
+    imlec = request.GET.get("sonraki", "")
+    q = request.GET.get("q", "").strip()
+    arama = bool(q) and fts_kullanilabilir() and bool(fts_sorgusu(q))
+    if arama and request.GET.get("sirala", "ilgili") == "ilgili":
+        ihaleler, sonraki = _ilgililik_sayfasi(request, is_dogrudan_temin, imlec)
+    else:
+        ihaleler, sonraki = _keyset_sayfa(_ihale_queryset(request, is_dogrudan_temin), imlec)
+    if arama:
+        ozetler = arama_ozetleri(q, ihaleler)
+        for ihale in ihaleler:
+            ihale.arama_ozeti = ozetler.get(ihale.pk)
+    return {
+        "ihaleler": ihaleler,
+        "sonraki_url": _sayfa_url(request, sonraki=sonraki) if sonraki else None,
+        "ilk_sayfa_url": _sayfa_url(request, sonraki=None) if imlec else None,
+        "blur_content": not request.user.is_authenticated,
+    }
+
+
 # =========================
 # ANA SAYFA
 # =========================
 def anasayfa(request):
-    # Açık ihaleler (is_dogrudan_temin=False, durum=Acik)
-    toplam_ihale = Ihale.objects.filter(is_dogrudan_temin=False, durum='Acik').count()
-    # Açık doğrudan teminler
-    toplam_dogrudan = Ihale.objects.filter(is_dogrudan_temin=True, durum='Acik').count()
-    # Aktif kurum: hem açık ihale hem açık doğrudan temini olan hastaneler (tekil)
-    ihale_hastane_ids = set(
-        Ihale.objects.filter(is_dogrudan_temin=False, durum='Acik').values_list('hastane_id', flat=True).distinct()
-    )
-    dt_hastane_ids = set(
-        Ihale.objects.filter(is_dogrudan_temin=True, durum='Acik').values_list('hastane_id', flat=True).distinct()
-    )
-    aktif_kurum_sayisi = len(ihale_hastane_ids & dt_hastane_ids)
-    return render(request, "ihaleler/index.html", {
-        "toplam_ihale": toplam_ihale,
-        "toplam_dogrudan": toplam_dogrudan,
-        "aktif_kurum_sayisi": aktif_kurum_sayisi,
-    })
+    # Açık ihale / açık doğrudan temin / aktif kurum (ikisinde de açık kaydı olan) sayıları; önbellekten
+    return render(request, "ihaleler/index.html", anasayfa_sayaclari())
 
 
 # =========================
 # İHALE & DOĞRUDAN TEMİN
 # =========================
 def ihale_listesi(request):
-    ihaleler = _ihale_queryset(request, is_dogrudan_temin=False)
-    return render(request, "ihaleler/ihaleler.html", {"ihaleler": ihaleler, "blur_content": not request.user.is_authenticated})
+    return render(request, "ihaleler/ihaleler.html", _liste_baglami(request, is_dogrudan_temin=False))
 
 
 def dogrudan_temin_listesi(request):
-    ihaleler = _ihale_queryset(request, is_dogrudan_temin=True)
-    return render(request, "ihaleler/dogrudan_temin.html", {"ihaleler": ihaleler, "blur_content": not request.user.is_authenticated})
+    return render(request, "ihaleler/dogrudan_temin.html", _liste_baglami(request, is_dogrudan_temin=True))
 
 
 def liste_filtre(request):
     """Ana sayfadaki Mal/Yapım/Hizmet/Açık tıklanınca: tek sayfada hem ihale hem doğrudan temin listesi (filtreli)."""
     tur = request.GET.get("tur", "").strip()
     durum = request.GET.get("durum", "").strip()
-    qs_ihale = Ihale.objects.filter(is_dogrudan_temin=False).select_related("hastane").prefetch_related("kalemler").order_by("-tarih")
-    qs_dt = Ihale.objects.filter(is_dogrudan_temin=True).select_related("hastane").prefetch_related("kalemler").order_by("-tarih")
+    qs_ihale = Ihale.objects.filter(is_dogrudan_temin=False).select_related("hastane", "olusturan_kullanici").order_by("-tarih", "-pk")
+    qs_dt = Ihale.objects.filter(is_dogrudan_temin=True).select_related("hastane", "olusturan_kullanici").order_by("-tarih", "-pk")
     if tur:
         qs_ihale = qs_ihale.filter(tur=tur)
         qs_dt = qs_dt.filter(tur=tur)
     if durum:
         qs_ihale = qs_ihale.filter(durum=durum)
         qs_dt = qs_dt.filter(durum=durum)
+    imlec_ihale = request.GET.get("sonraki_ihale", "")
+    imlec_dt = request.GET.get("sonraki_dt", "")
+    ihaleler, sonraki_ihale = _keyset_sayfa(_kalem_ozet_ekle(qs_ihale), imlec_ihale)
+    dogrudan_teminler, sonraki_dt = _keyset_sayfa(_kalem_ozet_ekle(qs_dt), imlec_dt)
     return render(request, "ihaleler/liste_filtre.html", {
-        "ihaleler": qs_ihale,
-        "dogrudan_teminler": qs_dt,
+        "ihaleler": ihaleler,
+        "dogrudan_teminler": dogrudan_teminler,
+        "ihale_sayisi": qs_ihale.count(),
+        "dogrudan_temin_sayisi": qs_dt.count(),
+        "sonraki_ihale_url": _sayfa_url(request, sonraki_ihale=sonraki_ihale) if sonraki_ihale else None,
+        "sonraki_dt_url": _sayfa_url(request, sonraki_dt=sonraki_dt) if sonraki_dt else None,
+        "ilk_sayfa_url": _sayfa_url(request, sonraki_ihale=None, sonraki_dt=None) if (imlec_ihale or imlec_dt) else None,
         "filtre_tur": tur,
         "filtre_durum": durum,
         "blur_content": not request.user.is_authenticated,
     })
 
 
+@login_required
+def ihale_kalemleri(request, pk):
+    """Liste kartı açıldığında kalemleri JSON olarak döndürür (id sırasıyla, ?sonraki=<id> ile devam)."""
+    ihale = get_object_or_404(Ihale.objects.only("pk"), pk=pk)
+    boyut = 200
+    qs = Kalem.objects.filter(ihale=ihale).order_by("pk")
+    try:
+        son_id = int(request.GET.get("sonraki", "0") or 0)
+    except ValueError:
+        son_id = 0
+    if son_id:
+        qs = qs.filter(pk__gt=son_id)
+    satirlar = list(qs.values("pk", "urun_adi", "adet", "birim", "birim_fiyat", "toplam_fiyat")[:boyut + 1])
+    return JsonResponse({
+        "kalemler": [
+            {
+                "id": r["pk"],
+                "urun_adi": r["urun_adi"],
+                "adet": str(r["adet"]),
+                "birim": r["birim"],
+                "birim_fiyat": str(r["birim_fiyat"]),
+                "toplam_fiyat": str(r["toplam_fiyat"]),
+                "gecmis_url": reverse("kalem_gecmis", args=[r["pk"]]),
+            }
+            for r in satirlar[:boyut]
+        ],
+        "sonraki": satirlar[boyut - 1]["pk"] if len(satirlar) > boyut else None,
+    })
+
+
 @login_required
 def ihale_detay(request, pk):
     """İhale / doğrudan temin dosyasının tam sayfa detayı; kalemler ve geçmiş linkleri."""
@@ -158,10 +309,15 @@ def ihale_detay_excel_indir(request, pk):
 @login_required
 def kalem_gecmis(request, pk):
     """Kalemin ürün geçmişi: aynı ürünün geçtiği ihaleler, görseller, faturalar, fiyatlar."""
-    kalem = get_object_or_404(Kalem, pk=pk)
-    # Aynı ürün adına sahip tüm kalemler (bu ihale + diğer ihaleler)
-    gecmis = Kalem.objects.filter(urun_adi__iexact=kalem.urun_adi).select_related("ihale").order_by("-ihale__tarih")
-    return render(request, "ihaleler/kalem_gecmis.html", {"kalem": kalem, "gecmis": gecmis})
+    kalem = get_object_or_404(Kalem.objects.select_related("kutuphane_urunu"), pk=pk)
+    # ?grup=katalog: aynı katalog ürününe bağlı kalemler; varsayılan: aynı normalize ad (indeksli urun_adi_norm)
+    grup = "katalog" if request.GET.get("grup") == "katalog" and kalem.kutuphane_urunu_id else "ad"
+    if grup == "katalog":
+        gecmis = Kalem.objects.filter(kutuphane_urunu_id=kalem.kutuphane_urunu_id)
+    else:
+        gecmis = Kalem.objects.filter(urun_adi_norm=kalem.urun_adi_norm or urun_anahtari(kalem.urun_adi))
+    gecmis = gecmis.select_related("ihale", "ihale__hastane").order_by("-ihale__tarih", "-pk")
+    return render(request, "ihaleler/kalem_gecmis.html", {"kalem": kalem, "gecmis": gecmis, "grup": grup})
 
 
 # =========================
@@ -172,6 +328,25 @@ def dosya_yukleme(request):
     return dosya_yukleme_handler(request)
 
 
+@login_required
+def dosya_islem_durumu(request, pk):
+    """Arka plan dosya işleme işinin durumu (JSON); yükleme sayfası periyodik olarak sorgular."""
+    is_ = get_object_or_404(DosyaIslemIsi.objects.select_related("ihale"), pk=pk)
+    sonuc = is_.sonuc_json or {}
+    return JsonResponse({
+        "is_id": is_.pk,
+        "ihale_id": is_.ihale_id,
+        "durum": is_.durum,
+        "durum_metni": is_.get_durum_display(),
+        "asama": is_.asama,
+        "ilerleme": is_.ilerleme,
+        "bitti": is_.bitti_mi,
+        "olusturulan": sonuc.get("olusturulan", 0),
+        "hatalar": sonuc.get("hatalar", [])[:10],
+        "ihale_url": reverse("ihale_detay", args=[is_.ihale_id]),
+    })
+
+
 @login_required
 def ihale_sil(request, pk):
     """İhaleyi veya doğrudan temin kaydını siler, listeye yönlendirir."""
@@ -185,8 +360,26 @@ def ihale_sil(request, pk):
     return redirect(reverse("ihale_listesi"))
 
 
+@login_required
 def ihale_excel_indir(request):
-    return render(request, "ihaleler/index.html")
+    """
+    İhale / doğrudan temin listesini liste sayfasıyla aynı filtre ve sıralamayla, kalem başına bir satır
+    olarak dışa aktarır. Varsayılan CSV akıştır (hemen iner); ?bicim=xlsx write-only Excel dosyası üretir.
+    """
+    is_dogrudan_temin = request.GET.get("dogrudan_temin") == "1"
+    qs = _ihale_filtrele(request, is_dogrudan_temin).order_by(*_ihale_sirasi(request))
+    satirlar = liste_satirlari(qs)
+    dosya_adi = "dogrudan_teminler" if is_dogrudan_temin else "ihaleler"
+    if request.GET.get("bicim") == "xlsx":
+        return FileResponse(
+            xlsx_dosyasi(satirlar),
+            as_attachment=True,
+            filename=f"{dosya_adi}.xlsx",
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+    response = StreamingHttpResponse(csv_akisi(satirlar), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{dosya_adi}.csv"'
+    return response
 
 
 # =========================
@@ -194,30 +387,65 @@ def ihale_excel_indir(request):
 # =========================
 @login_required
 def toplu_fiyat_guncelle(request):
+    """Detay sayfası fiyat formu: tüm satırlar tek transaction'da kaydedilir (geçersiz fiyat 0 sayılır)."""
     from django.contrib import messages
+    geri = request.META.get("HTTP_REFERER", reverse("ihale_listesi"))
     if request.method != "POST":
-        return redirect(request.META.get("HTTP_REFERER", reverse("ihale_listesi")))
+        return redirect(geri)
     ids = request.POST.getlist("kalem_id[]") or request.POST.getlist("kalem_id")
     fiyatlar = request.POST.getlist("fiyat[]") or request.POST.getlist("fiyat")
-    if not ids:
-        messages.info(request, "Kaydedilecek kalem bulunamadı.")
-        return redirect(request.META.get("HTTP_REFERER", reverse("ihale_listesi")))
+    guncellenecek = {}
     for i, kid in enumerate(ids):
-        if not kid:
-            continue
         try:
-            kalem = Kalem.objects.get(pk=int(kid))
-        except (Kalem.DoesNotExist, ValueError):
+            kid = int(kid)
+        except (TypeError, ValueError):
             continue
-        try:
-            bf = Decimal(str(fiyatlar[i] if i < len(fiyatlar) else "0").replace(",", "."))
-        except Exception:
-            bf = Decimal("0")
-        kalem.birim_fiyat = bf
-        kalem.toplam_fiyat = kalem.adet * bf
-        kalem.save()
+        guncellenecek[kid] = fiyat_coz(fiyatlar[i] if i < len(fiyatlar) else "0") or Decimal("0")
+    if not guncellenecek:
+        messages.info(request, "Kaydedilecek kalem bulunamadı.")
+        return redirect(geri)
+    kalem_fiyatlarini_kaydet(guncellenecek)
     messages.success(request, "Fiyatlar güncellendi.")
-    return redirect(request.META.get("HTTP_REFERER", reverse("ihale_listesi")))
+    return redirect(geri)
+
+
+@login_required
+def toplu_fiyat_guncelle_json(request):
+    """
+    Satır içi tablo kaydı. POST gövdesi: {"kalemler": [{"id": 12, "birim_fiyat": "1.250,50"}, ...]}.
+    Geçersiz fiyat varsa hiçbir satır yazılmaz (400); başarıda güncel satırlar ve ihale toplamları döner.
+    """
+    if request.method != "POST":
+        return JsonResponse({"hata": "Yalnızca POST desteklenir."}, status=405)
+    try:
+        satirlar = json.loads(request.body or b"{}").get("kalemler") or []
+        if not isinstance(satirlar, list):
+            raise ValueError
+    except (ValueError, AttributeError):
+        return JsonResponse({"hata": "Geçersiz JSON gövdesi."}, status=400)
+    guncellenecek, hatalar = {}, []
+    for satir in satirlar:
+        try:
+            kid = int(satir.get("id"))
+        except (AttributeError, TypeError, ValueError):
+            hatalar.append({"id": None, "hata": "Geçersiz kalem id."})
+            continue
+        fiyat = fiyat_coz(satir.get("birim_fiyat"))
+        if fiyat is None:
+            hatalar.append({"id": kid, "hata": "Geçersiz birim fiyat."})
+            continue
+        guncellenecek[kid] = fiyat
+    if hatalar:
+        return JsonResponse({"hatalar": hatalar}, status=400)
+    sonuc = kalem_fiyatlarini_kaydet(guncellenecek)
+    return JsonResponse({
+        "kalemler": [
+            {"id": k.pk, "birim_fiyat": str(k.birim_fiyat), "toplam_fiyat": str(k.toplam_fiyat)}
+            for k in sonuc["kalemler"]
+        ],
+        "ihaleler": {str(pk): str(toplam) for pk, toplam in sonuc["ihaleler"].items()},
+        "bulunamayan": sorted(set(guncellenecek) - {k.pk for k in sonuc["kalemler"]}),
+    })
 
 
 @login_required
@@ -315,46 +543,19 @@ def analiz_sayfasi(request):
             ihale.save()
         return redirect("analiz")
 
-    hastane_verileri = Hastane.objects.annotate(
-        toplam=Count("ihale_set"),
-    ).order_by("-toplam")
+    # Özet tabloları sinyallerle güncel tutulur (ilk kurulum 0023 migration'ında)
+    hastane_verileri = HastaneOzeti.objects.select_related("hastane").order_by("-ihale_sayisi", "hastane_id")
+    en_cok_alinanlar = UrunOzeti.objects.order_by("-toplam_adet")[:10]
+    aylik_ozet = AylikOzet.objects.order_by("-ay")[:12]
 
-    en_cok_alinanlar = (
-        Kalem.objects.values("urun_adi")
-        .annotate(adet_sum=Sum("adet"))
-        .order_by("-adet_sum")[:10]
+    imlec = request.GET.get("sonraki", "")
+    sonuc_ihaleler, sonraki = _keyset_sayfa(
+        IhaleSonucOzeti.objects.select_related("ihale").order_by("-tarih", "-pk"), imlec, boyut=50,
     )
 
-    ihaleler = Ihale.objects.all().order_by("-tarih")[:50]
-    sonuc_ihaleler = []
-    for i in ihaleler:
-        bizim = i.bizim_teklif or i.toplam_teklif_bedeli or Decimal("0")
-        kazanan = i.kazanan_fiyat or Decimal("0")
-        kazandik = i.durum == "Kazandik"
-        net_kar = None
-        fark_yuzde = None
-        if kazandik and i.toplam_maliyet is not None:
-            satis = i.satis_fiyati or i.toplam_teklif_bedeli or Decimal("0")
-            net_kar = (satis or Decimal("0")) - (i.toplam_maliyet or Decimal("0"))
-        elif i.durum == "Kaybettik" and kazanan and bizim:
-            fark_yuzde = ((bizim - kazanan) / bizim * 100) if bizim else None
-        sonuc_ihaleler.append({
-            "ihale": i,
-            "bizim_teklif": bizim,
-            "kazanan_fiyat": kazanan,
-            "kazandik": kazandik,
-            "net_kar": net_kar,
-            "fark_yuzde": fark_yuzde,
-        })
-
-    kaybedilen = [
-        s for s in sonuc_ihaleler
-        if s["ihale"].durum == "Kaybettik" and s["kazanan_fiyat"] and s["bizim_teklif"]
-    ]
-    ortalama_fark_yuzde = None
-    if kaybedilen:
-        toplam = sum((s["fark_yuzde"] or 0) for s in kaybedilen)
-        ortalama_fark_yuzde = toplam / len(kaybedilen)
+    kaybedilen = IhaleSonucOzeti.objects.filter(durum="Kaybettik", fark_yuzde__isnull=False)
+    ortalama_fark_yuzde = kaybedilen.aggregate(ort=Avg("fark_yuzde"))["ort"]
+    kaybedilen = kaybedilen.select_related("ihale").order_by("-tarih", "-pk")[:50]
 
     return render(request, "ihaleler/analiz.html", {
         "hastane_verileri": hastane_verileri,
@@ -362,6 +563,9 @@ def analiz_sayfasi(request):
         "sonuc_ihaleler": sonuc_ihaleler,
         "kaybedilen_ihaleler": kaybedilen,
         "ortalama_fark_yuzde": ortalama_fark_yuzde,
+        "aylik_ozet": aylik_ozet,
+        "sonraki_url": _sayfa_url(request, sonraki=sonraki) if sonraki else None,
+        "ilk_sayfa_url": _sayfa_url(request, sonraki=None) if imlec else None,
         "durum_choices": Ihale.DURUM_CHOICES,
     })
 